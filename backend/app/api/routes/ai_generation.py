@@ -1,9 +1,21 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import time
+from fastapi import APIRouter, Header, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 from typing import List, Optional
-from app.services.ai.gemini_service import GeminiService
+from app.services.ai.gemini_service import FALLBACK_SUBJECT_LINES
+from app.services.ai.model_router import model_router
 from app.services.ai.prompt_builder import PromptBuilder
+from app.services.ai.prompt_budget import PromptBudget, role_keywords
+from app.services.ai.draft_quality import draft_quality
 from app.core.supabase_client import get_supabase_client
+from app.core.deadline import DeadlineExceeded, expired
+from app.core.metrics import span
+from app.core.idempotency import coalescer
+from app.core.responses import conditional_json
+from app.db.email_rollups import email_rollups
+from app.db.optional_columns import save_row
 from datetime import datetime, timedelta
 import logging
 
@@ -17,11 +29,6 @@ router = APIRouter()
 
 
 
-gemini = GeminiService()
-supabase = get_supabase_client()
-
-
-
 COMMON_TECH_KEYWORDS = [
     # Languages
     "python", "java", "javascript", "typescript", "go", "c++", "c#", "ruby", "rust",
@@ -42,11 +49,16 @@ COMMON_TECH_KEYWORDS = [
 
 
 
-def parse_job_description(job_description: str) -> dict:
+def parse_job_description(
+    job_description: str,
+    role_name: Optional[str] = None,
+    budget: Optional[PromptBudget] = None
+) -> dict:
     """
     Very simple parser:
     - Extracts tech stack keywords by scanning text
-    - Uses first 2-3 sentences as a 'mission' summary fallback
+    - Uses the sentences that mention the tech stack / role as a 'mission'
+      summary, within the prompt budget for that section
     """
     if not job_description:
         return {"company_tech_stack": None, "company_mission": None}
@@ -72,12 +84,12 @@ def parse_job_description(job_description: str) -> dict:
             seen.add(t.lower())
 
 
-    # Very basic mission extraction: first 2-3 sentences
-    import re
-    sentences = re.split(r'(?<=[.!?])\s+', job_description.strip())
-    mission = None
-    if sentences:
-        mission = " ".join(sentences[:2]).strip()
+    # Mission: most relevant sentences instead of the whole (often huge) JD
+    budget = budget or PromptBudget()
+    mission = budget.condense_job_description(
+        job_description,
+        [t.lower() for t in tech_stack] + role_keywords(role_name)
+    )
 
 
     return {
@@ -165,6 +177,13 @@ class CompleteEmailRequest(BaseModel):
     tone: str = "professional"
 
 
+    # Best-of-N: generate several drafts in one request and keep the best
+    candidates: int = Field(
+        1, ge=1, le=4,
+        description="Number of drafts to generate and rank; runners-up are returned as alternatives"
+    )
+
+
 
 
 # Response Models
@@ -175,6 +194,15 @@ class SubjectLineResponse(BaseModel):
 
 
 
+class EmailDraft(BaseModel):
+    subject_line: str
+    body: str
+    confidence_score: float
+    key_hook: Optional[str] = None
+    quality: Optional[dict] = None
+
+
+
 class CompleteEmailResponse(BaseModel):
     subject_line: str
     body: str
@@ -183,8 +211,12 @@ class CompleteEmailResponse(BaseModel):
     word_count: int
     estimated_read_time: int
     key_hook: Optional[str] = None
+    quality: Optional[dict] = None  # Draft analysis behind confidence_score
     email_id: Optional[str] = None  # 🆕 Supabase row ID
     duplicate_warning: Optional[str] = None  # 🆕 If already emailed this person
+    alternatives: List[EmailDraft] = []  # Runners-up when candidates > 1
+    metadata: dict = {}  # Models actually used, candidate count
+    partial: bool = False  # Request deadline hit: canned subjects and/or no duplicate check
 
 
 
@@ -207,6 +239,16 @@ class EmailHistoryResponse(BaseModel):
 
 
 
+def route_subject_lines(prompt: str) -> tuple:
+    """Subject lines from the routed model; canned lines if every model fails"""
+    try:
+        return model_router.run("subject", lambda g: g.generate_subject_lines(prompt, raise_errors=True))
+    except Exception as e:
+        logger.error(f"Subject line generation failed on every model: {e}")
+        return list(FALLBACK_SUBJECT_LINES), None
+
+
+
 @router.post("/generate-subject", response_model=SubjectLineResponse)
 async def generate_subject_lines(request: SubjectLineRequest):
     """Generate killer subject lines in Varad's style - no generic BS"""
@@ -214,22 +256,24 @@ async def generate_subject_lines(request: SubjectLineRequest):
         logger.info(f"Generating Varad-style subject lines for {request.recipient_first_name} at {request.recipient_company}")
 
 
-        prompt = PromptBuilder.build_subject_line_prompt(
-            recipient_name=request.recipient_first_name,
-            recipient_company=request.recipient_company,
-            recipient_title=request.recipient_title,
-            sender_name=request.sender_name,
-            sender_role=request.sender_current_role,
-            purpose=request.purpose,
-            company_mission=request.company_mission,
-            role_name=request.role_name
-        )
+        with span("prompt_build"):
+            prompt = PromptBuilder.build_subject_line_prompt(
+                recipient_name=request.recipient_first_name,
+                recipient_company=request.recipient_company,
+                recipient_title=request.recipient_title,
+                sender_name=request.sender_name,
+                sender_role=request.sender_current_role,
+                purpose=request.purpose,
+                company_mission=request.company_mission,
+                role_name=request.role_name
+            )
 
 
         logger.info(f"Calling Gemini API...")
 
 
-        subject_lines = gemini.generate_subject_lines(prompt)
+        with span("gemini_subject"):
+            subject_lines, model = await run_in_threadpool(route_subject_lines, prompt)
 
 
         logger.info(f"Generated {len(subject_lines)} killer subject lines")
@@ -239,7 +283,7 @@ async def generate_subject_lines(request: SubjectLineRequest):
             subject_lines=subject_lines,
             primary=subject_lines[0] if subject_lines else "I Know What You're Building",
             metadata={
-                "model": "gemini-2.5-flash",
+                "model": model,
                 "purpose": request.purpose,
                 "style": "varad_killer"
             }
@@ -253,51 +297,59 @@ async def generate_subject_lines(request: SubjectLineRequest):
 
 
 @router.post("/generate-complete", response_model=CompleteEmailResponse)
-async def generate_complete_email(request: CompleteEmailRequest):
-    """Generate a complete email in Varad's winning style"""
-    try:
-        logger.info(f"Generating Varad-style email for {request.recipient_first_name} at {request.recipient_company}")
-
-
-        # 🆕 Check for duplicates if recipient_email is provided
-        duplicate_warning = None
-        if request.recipient_email:
-            try:
-                # Calculate 90 days ago (FIXED!)
-                ninety_days_ago = (datetime.utcnow() - timedelta(days=90)).isoformat()
-
-                result = supabase.table("emails").select("*").eq(
-                    "recipient_email", request.recipient_email
-                ).gte(
-                    "created_at", ninety_days_ago  # ✅ Fixed: Check past 90 days, not future
-                ).execute()
-
-
-                if result.data and len(result.data) > 0:
-                    last_email = result.data[0]
-                    email_date = last_email['created_at'][:10]  # Just the date part
-                    duplicate_warning = f"⚠️ You already emailed {request.recipient_email} on {email_date}"
-                    logger.warning(duplicate_warning)
-            except Exception as dup_err:
-                logger.error(f"Duplicate check failed: {dup_err}")
+async def generate_complete_email(
+    request: CompleteEmailRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None)
+):
+    """
+    Generate a complete email in Varad's winning style
 
+    Identical requests already in flight share one generation; send an
+    Idempotency-Key header to also get the stored result on later retries.
 
-        # 🔹 If job_description is provided, auto-derive mission/tech_stack when missing
-        company_mission = request.company_mission
-        company_tech_stack = request.company_tech_stack
+    Runs within the request deadline (X-Request-Timeout header, default
+    REQUEST_TIMEOUT). Steps that don't fit are skipped and the response is
+    marked partial; 504 if there was no time left for the body itself.
+    """
+    return await coalescer.run(
+        "generate-complete",
+        request,
+        lambda: _generate_complete_email(request),
+        idempotency_key=idempotency_key,
+        response=response
+    )
 
 
-        if request.job_description and (not company_mission or not company_tech_stack):
-            parsed = parse_job_description(request.job_description)
-            if not company_mission and parsed["company_mission"]:
-                company_mission = parsed["company_mission"]
-                logger.info("Derived company_mission from job_description")
-            if not company_tech_stack and parsed["company_tech_stack"]:
-                company_tech_stack = parsed["company_tech_stack"]
-                logger.info(f"Derived tech stack from JD: {company_tech_stack}")
 
+async def compose_email(request: CompleteEmailRequest) -> dict:
+    """
+    Draft one email: derive company context, build the prompt, generate
+    body candidates and subject lines side by side and rank the drafts
 
-        # Build prompt with all the new context
+    No database access, so campaigns (app.tasks.campaigns) can reuse it.
+    Raises DeadlineExceeded when the body can't be generated in time.
+    """
+    started = time.perf_counter()
+    # 🔹 If job_description is provided, auto-derive mission/tech_stack when missing
+    company_mission = request.company_mission
+    company_tech_stack = request.company_tech_stack
+
+
+    budget = PromptBudget()
+    if request.job_description and (not company_mission or not company_tech_stack):
+        with span("jd_parse"):
+            parsed = parse_job_description(request.job_description, request.role_interested_in, budget)
+        if not company_mission and parsed["company_mission"]:
+            company_mission = parsed["company_mission"]
+            logger.info("Derived company_mission from job_description")
+        if not company_tech_stack and parsed["company_tech_stack"]:
+            company_tech_stack = parsed["company_tech_stack"]
+            logger.info(f"Derived tech stack from JD: {company_tech_stack}")
+
+
+    # Build prompt with all the new context
+    with span("prompt_build"):
         prompt = PromptBuilder.build_complete_email_prompt(
             recipient_first_name=request.recipient_first_name,
             recipient_last_name=request.recipient_last_name,
@@ -319,49 +371,138 @@ async def generate_complete_email(request: CompleteEmailRequest):
             company_notable_clients=request.company_notable_clients,
             specific_passion_point=request.specific_passion_point,
             technical_hook=request.technical_hook,
-            tone=request.tone
+            tone=request.tone,
+            budget=budget
         )
+    prompt_stats = budget.report(prompt)
+    if prompt_stats.get("over_budget"):
+        logger.warning(f"Prompt is ~{prompt_stats['tokens']} tokens, over the budget")
+
+
+    subject_prompt = PromptBuilder.build_subject_line_prompt(
+        recipient_name=request.recipient_first_name,
+        recipient_company=request.recipient_company,
+        recipient_title=request.recipient_title,
+        sender_name=request.sender_name,
+        sender_role=request.sender_background,
+        purpose=request.purpose,
+        company_mission=request.company_mission,
+        role_name=request.role_interested_in
+    )
 
 
-        logger.info(f"Generating email body with Gemini (Varad style)...")
+    logger.info(f"Generating {request.candidates} email draft(s) and subject variations with Gemini (Varad style)...")
 
 
-        # Generate email
-        email_data = gemini.generate_json(prompt)
+    def generate_drafts():
+        with span("gemini_body"):
+            return model_router.run("body", lambda g: g.generate_json_candidates(prompt, request.candidates))
 
 
-        logger.info(f"Email generated successfully")
+    def generate_subjects():
+        with span("gemini_subject"):
+            return route_subject_lines(subject_prompt)
 
 
-        # Calculate metrics
-        body = email_data.get('body', '')
-        word_count = len(body.split())
-        read_time = max(1, word_count // 200)
-        confidence = gemini.calculate_confidence(body)
-        key_hook = email_data.get('key_hook', '')
+    # Body and subject calls are independent, so run them side by side
+    (drafts, body_model), (subject_variations, subject_model) = await asyncio.gather(
+        run_in_threadpool(generate_drafts),
+        run_in_threadpool(generate_subjects)
+    )
 
 
-        # Generate subject variations
-        logger.info(f"Generating subject variations...")
+    logger.info(f"Email generated successfully")
 
 
-        subject_prompt = PromptBuilder.build_subject_line_prompt(
-            recipient_name=request.recipient_first_name,
-            recipient_company=request.recipient_company,
-            recipient_title=request.recipient_title,
-            sender_name=request.sender_name,
-            sender_role=request.sender_background,
-            purpose=request.purpose,
-            company_mission=request.company_mission,
-            role_name=request.role_interested_in
+    # Rank drafts locally: clichés, length, readability, personalization
+    qualities = draft_quality.analyze_batch(
+        [d.get('body', '') for d in drafts],
+        request.recipient_first_name,
+        request.recipient_company
+    )
+    ranked = sorted(zip(drafts, qualities), key=lambda pair: pair[1]["score"], reverse=True)
+    email_data, quality = ranked[0]
+    alternatives = [
+        EmailDraft(
+            subject_line=d.get('subject', subject_variations[0]),
+            body=d.get('body', ''),
+            confidence_score=q["score"],
+            key_hook=d.get('key_hook'),
+            quality=q
         )
+        for d, q in ranked[1:]
+    ]
+
+
+    # Calculate metrics
+    body = email_data.get('body', '')
+    word_count = len(body.split())
+    read_time = max(1, word_count // 200)
+    confidence = quality["score"]
+    key_hook = email_data.get('key_hook', '')
+
+
+    subject_line = email_data.get('subject', subject_variations[0])
+
+
+    return {
+        "subject_line": subject_line,
+        "body": body,
+        "confidence_score": confidence,
+        "subject_variations": subject_variations,
+        "word_count": word_count,
+        "estimated_read_time": read_time,
+        "key_hook": key_hook,
+        "quality": quality,
+        "alternatives": alternatives,
+        "body_model": body_model,
+        "subject_model": subject_model,
+        "candidates": len(drafts),
+        "prompt": prompt_stats,
+        "latency_ms": round((time.perf_counter() - started) * 1000),
+    }
+
+
 
+async def _generate_complete_email(request: CompleteEmailRequest) -> CompleteEmailResponse:
+    try:
+        logger.info(f"Generating Varad-style email for {request.recipient_first_name} at {request.recipient_company}")
 
-        subject_variations = gemini.generate_subject_lines(subject_prompt)
 
+        # 🆕 Check for duplicates if recipient_email is provided
+        duplicate_warning = None
+        skipped = []
+        if request.recipient_email and expired():
+            skipped.append("duplicate_check")
+        elif request.recipient_email:
+            try:
+                # Calculate 90 days ago (FIXED!)
+                ninety_days_ago = (datetime.utcnow() - timedelta(days=90)).isoformat()
+
+                supabase = get_supabase_client()  # Get client only when needed
+                with span("duplicate_check"):
+                    result = supabase.table("emails").select("*").eq(
+                        "recipient_email", request.recipient_email
+                    ).gte(
+                        "created_at", ninety_days_ago  # ✅ Fixed: Check past 90 days, not future
+                    ).execute()
+
+
+                if result.data and len(result.data) > 0:
+                    last_email = result.data[0]
+                    email_date = last_email['created_at'][:10]  # Just the date part
+                    duplicate_warning = f"⚠️ You already emailed {request.recipient_email} on {email_date}"
+                    logger.warning(duplicate_warning)
+            except Exception as dup_err:
+                logger.error(f"Duplicate check failed: {dup_err}")
 
-        subject_line = email_data.get('subject', subject_variations[0])
 
+        draft = await compose_email(request)
+        if draft["subject_model"] is None and expired():
+            skipped.append("subject_lines")
+        subject_line = draft["subject_line"]
+        body = draft["body"]
+        key_hook = draft["key_hook"]
 
         # 🆕 INSERT into Supabase
         email_id = None
@@ -378,37 +519,58 @@ async def generate_complete_email(request: CompleteEmailRequest):
                 "subject_line": subject_line,
                 "body": body,
                 "status": "generated",  # vs "sent" later
+                "model": draft["body_model"],
+                "tone": request.tone,
+                "confidence_score": draft["confidence_score"],
+                "generation_ms": draft["latency_ms"],
                 "created_at": datetime.utcnow().isoformat()
             }
 
 
-            result = supabase.table("emails").insert(insert_data).execute()
+            with span("supabase_insert"):
+                # Tolerates columns whose README migration isn't applied yet
+                saved = save_row("emails", insert_data)
 
 
-            if result.data:
-                email_id = result.data[0].get('id')
+            if saved:
+                email_id = saved[0].get('id')
+                email_rollups.add(saved[0], "generated_count")
                 logger.info(f"✅ Email saved to Supabase with ID: {email_id}")
         except Exception as db_err:
             logger.error(f"Failed to save email to Supabase: {db_err}")
             # Don't fail the request, just log it
 
 
-        logger.info(f"Complete! Word count: {word_count}, Key hook: {key_hook[:50] if key_hook else 'N/A'}...")
+        logger.info(f"Complete! Word count: {draft['word_count']}, Key hook: {key_hook[:50] if key_hook else 'N/A'}...")
 
 
         return CompleteEmailResponse(
             subject_line=subject_line,
             body=body,
-            confidence_score=confidence,
-            subject_variations=subject_variations,
-            word_count=word_count,
-            estimated_read_time=read_time,
+            confidence_score=draft["confidence_score"],
+            subject_variations=draft["subject_variations"],
+            word_count=draft["word_count"],
+            estimated_read_time=draft["estimated_read_time"],
             key_hook=key_hook,
+            quality=draft["quality"],
             email_id=email_id,
-            duplicate_warning=duplicate_warning
+            duplicate_warning=duplicate_warning,
+            alternatives=draft["alternatives"],
+            metadata={
+                "models": {"body": draft["body_model"], "subject": draft["subject_model"]},
+                "candidates": draft["candidates"],
+                "prompt": draft["prompt"],
+                "purpose": request.purpose,
+                "tone": request.tone,
+                "skipped": skipped
+            },
+            partial=bool(skipped)
         )
 
 
+    except DeadlineExceeded as e:
+        logger.warning(f"Complete email generation ran out of time: {e}")
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Complete email generation failed: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -417,6 +579,7 @@ async def generate_complete_email(request: CompleteEmailRequest):
 
 @router.get("/history", response_model=EmailHistoryResponse)
 async def get_email_history(
+    request: Request,
     limit: int = 20,
     offset: int = 0,
     company: Optional[str] = None
@@ -429,11 +592,15 @@ async def get_email_history(
     - limit: Number of emails to return (default 20)
     - offset: Pagination offset (default 0)
     - company: Filter by company name (optional)
+
+    Sends an ETag; a request with a matching If-None-Match gets 304.
     """
     try:
         logger.info(f"Fetching email history (limit={limit}, offset={offset}, company={company})")
 
 
+        supabase = get_supabase_client()  # Get client only when needed
+
         query = supabase.table("emails").select("*", count="exact")
 
 
@@ -450,7 +617,8 @@ async def get_email_history(
         query = query.range(offset, offset + limit - 1)
 
 
-        result = query.execute()
+        with span("supabase_history"):
+            result = query.execute()
 
 
         emails = [
@@ -475,10 +643,11 @@ async def get_email_history(
         logger.info(f"Retrieved {len(emails)} emails (total: {total_count})")
 
 
-        return EmailHistoryResponse(
-            emails=emails,
-            total_count=total_count
-        )
+        with span("encode"):
+            return conditional_json(request, EmailHistoryResponse(
+                emails=emails,
+                total_count=total_count
+            ).model_dump())
 
 
     except Exception as e:
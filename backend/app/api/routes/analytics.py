@@ -0,0 +1,146 @@
+"""
+Analytics API Routes
+"""
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from typing import Callable, Dict, List, Optional
+from datetime import datetime, timedelta
+from app.core.config import settings
+from app.core.metrics import span
+from app.core.singleflight import SingleFlight
+from app.core.supabase_client import get_supabase_client
+from app.db.cache_store import SQLiteCache
+from app.db.campaign_counters import COUNTER_FIELDS
+from app.db.email_rollups import DIMENSIONS, SUM_FIELDS, summarize
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Shared by all workers; rollups change every few seconds at most
+analytics_cache = SQLiteCache(settings.CACHE_DB_PATH, "analytics")
+_flights = SingleFlight()
+
+SORT_COLUMNS = {
+    "volume": "generated_count",
+    "sent": "sent_count",
+    "replies": "replied_count",
+    "opens": "opened_count",
+    "recent": "value",
+}
+
+
+# Response Models
+class RollupItem(BaseModel):
+    value: str
+    generated: int
+    sent: int
+    opened: int
+    clicked: int
+    replied: int
+    failed: int
+    open_rate: Optional[float] = None
+    click_rate: Optional[float] = None
+    reply_rate: Optional[float] = None
+    avg_confidence: Optional[float] = None
+    avg_generation_ms: Optional[float] = None
+
+
+class RollupResponse(BaseModel):
+    dimension: str
+    items: List[RollupItem]
+    as_of: str
+
+
+class SummaryResponse(BaseModel):
+    days: int
+    totals: RollupItem
+    by_day: List[RollupItem]
+    as_of: str
+
+
+async def _cached(key: str, load: Callable[[], Dict], response: Response) -> Dict:
+    """Serve from the analytics cache; concurrent misses share one database read"""
+    response.headers["Cache-Control"] = f"private, max-age={settings.ANALYTICS_CACHE_TTL}"
+    cached = analytics_cache.get(key)
+    if cached is not None:
+        return cached
+
+    async def fill() -> Dict:
+        with span("supabase_rollups"):
+            value = await run_in_threadpool(load)
+        analytics_cache.set(key, value, ttl=settings.ANALYTICS_CACHE_TTL)
+        return value
+
+    return await _flights.do(key, fill)
+
+
+def _since(days: int) -> str:
+    return (datetime.utcnow() - timedelta(days=days - 1)).date().isoformat()
+
+
+@router.get("/rollups/{dimension}", response_model=RollupResponse)
+async def get_rollups(
+    dimension: str,
+    response: Response,
+    sort: str = Query("volume", description="volume, sent, replies, opens or recent"),
+    limit: int = Query(50, ge=1, le=500),
+    days: Optional[int] = Query(None, ge=1, le=366, description="Only for dimension=day")
+):
+    """
+    Outreach performance grouped by day, company, role, tone or model
+
+    Counts, open/click/reply rates (per sent email), average confidence and
+    average generation time, read from precomputed rollups; no scan of the
+    emails table. Events count toward the email's own attributes (for
+    "day", the day it was generated). Cached for ANALYTICS_CACHE_TTL.
+    """
+    if dimension not in DIMENSIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown dimension; use one of {', '.join(DIMENSIONS)}")
+    if sort not in SORT_COLUMNS:
+        raise HTTPException(status_code=422, detail=f"Unknown sort; use one of {', '.join(SORT_COLUMNS)}")
+
+    def load() -> Dict:
+        query = get_supabase_client().table("email_rollups").select("*").eq("dimension", dimension)
+        if days and dimension == "day":
+            query = query.gte("value", _since(days))
+        rows = query.order(SORT_COLUMNS[sort], desc=True).limit(limit).execute().data
+        return {
+            "dimension": dimension,
+            "items": [summarize(row) for row in rows],
+            "as_of": datetime.utcnow().isoformat(),
+        }
+
+    try:
+        return await _cached(f"rollups:{dimension}:{sort}:{limit}:{days}", load, response)
+    except Exception as e:
+        logger.error(f"Failed to load {dimension} rollups: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/summary", response_model=SummaryResponse)
+async def get_summary(response: Response, days: int = Query(30, ge=1, le=366)):
+    """
+    Totals and a per-day series for the last `days` days, from the day rollups
+    """
+    def load() -> Dict:
+        rows = get_supabase_client().table("email_rollups").select("*").eq(
+            "dimension", "day"
+        ).gte("value", _since(days)).order("value").execute().data
+        totals = {"value": "total"}
+        for field in COUNTER_FIELDS + SUM_FIELDS:
+            totals[field] = sum(row.get(field) or 0 for row in rows)
+        return {
+            "days": days,
+            "totals": summarize(totals),
+            "by_day": [summarize(row) for row in rows],
+            "as_of": datetime.utcnow().isoformat(),
+        }
+
+    try:
+        return await _cached(f"summary:{days}", load, response)
+    except Exception as e:
+        logger.error(f"Failed to load analytics summary: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
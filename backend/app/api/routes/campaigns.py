@@ -0,0 +1,213 @@
+"""
+Campaign API Routes
+"""
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional
+from uuid import NAMESPACE_URL, uuid5
+from app.api.routes.email_discovery import client_key
+from app.core.config import settings
+from app.core.metrics import span
+from app.core.supabase_client import get_supabase_client
+from app.models.email import Campaign, Email
+from app.tasks.campaigns import CampaignNotFound, campaign_engine
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+# Request Models
+class CampaignRecipient(BaseModel):
+    first_name: str
+    last_name: Optional[str] = None
+    email: Optional[str] = Field(None, description="Known address; skips discovery")
+    company: Optional[str] = None
+    company_domain: Optional[str] = Field(None, description="Used to discover the address when email is missing")
+    title: Optional[str] = None
+
+    @model_validator(mode="after")
+    def needs_email_or_domain(self):
+        if not self.email and not self.company_domain:
+            raise ValueError("Each recipient needs an email or a company_domain")
+        if not self.company and not self.company_domain:
+            raise ValueError("Each recipient needs a company or a company_domain")
+        return self
+
+
+class CampaignTemplate(BaseModel):
+    """Generation settings shared by every recipient (see CompleteEmailRequest); unset fields use its defaults"""
+    sender_name: Optional[str] = None
+    sender_email: Optional[str] = None
+    sender_phone: Optional[str] = None
+    sender_background: Optional[str] = None
+    sender_skills: Optional[List[str]] = None
+    sender_portfolio: Optional[str] = None
+    sender_linkedin: Optional[str] = None
+    sender_calendar: Optional[str] = None
+    purpose: Optional[str] = None
+    role_interested_in: Optional[str] = None
+    role_url: Optional[str] = None
+    job_description: Optional[str] = None
+    company_mission: Optional[str] = None
+    company_tech_stack: Optional[List[str]] = None
+    company_notable_clients: Optional[List[str]] = None
+    specific_passion_point: Optional[str] = None
+    technical_hook: Optional[str] = None
+    tone: Optional[str] = None
+    candidates: Optional[int] = Field(None, ge=1, le=4)
+
+
+class CampaignCreateRequest(BaseModel):
+    name: str
+    description: Optional[str] = None
+    recipients: List[CampaignRecipient] = Field(..., min_length=1, max_length=settings.CAMPAIGN_MAX_RECIPIENTS)
+    template: CampaignTemplate = Field(default_factory=CampaignTemplate)
+    start: bool = Field(True, description="Start the run right away")
+
+
+# Response Models
+class CampaignProgress(BaseModel):
+    status: str
+    total: int
+    generated: int
+    failed: int
+    remaining: int
+    running: bool
+    error: Optional[str] = None
+
+
+class CampaignResponse(BaseModel):
+    campaign: Campaign
+    progress: CampaignProgress
+
+
+class CampaignEmailsResponse(BaseModel):
+    emails: List[Email]
+    total_count: int
+
+
+def _user_id(http_request: Request) -> str:
+    """Campaign owner: a stable UUID for the caller (see client_key)"""
+    return str(uuid5(NAMESPACE_URL, client_key(http_request)))
+
+
+def _campaign_response(campaign_id: str, campaign: Optional[dict] = None) -> CampaignResponse:
+    try:
+        progress = campaign_engine.progress(campaign_id)
+    except CampaignNotFound:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    campaign = campaign or campaign_engine.get(campaign_id)["campaign"]
+    return CampaignResponse(campaign=Campaign(**campaign), progress=CampaignProgress(**progress))
+
+
+@router.post("", response_model=CampaignResponse)
+async def create_campaign(request: CampaignCreateRequest, http_request: Request):
+    """
+    Create a campaign from a recipient list and (by default) start it
+
+    The run discovers each recipient's address (unless given), generates
+    an email with the shared template and saves it to `emails` with the
+    campaign_id. Poll GET /api/campaigns/{id} for progress.
+    """
+    try:
+        with span("campaign_create"):
+            campaign = await run_in_threadpool(
+                campaign_engine.create,
+                request.name,
+                [r.model_dump() for r in request.recipients],
+                request.template.model_dump(exclude_none=True),
+                _user_id(http_request),
+                request.description
+            )
+    except Exception as e:
+        logger.error(f"Failed to create campaign: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if request.start:
+        campaign_engine.start(campaign["id"])
+    return _campaign_response(campaign["id"], campaign)
+
+
+@router.post("/{campaign_id}/run", response_model=CampaignResponse)
+async def run_campaign(campaign_id: str):
+    """
+    Start a draft campaign, or resume an interrupted one from its checkpoint
+
+    Recipients that already have an email (or failed) are not redone.
+    409 if the campaign is running on any worker.
+    """
+    try:
+        started = campaign_engine.start(campaign_id)
+    except CampaignNotFound:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    if not started:
+        raise HTTPException(status_code=409, detail="Campaign is already running")
+    return _campaign_response(campaign_id)
+
+
+@router.get("/{campaign_id}", response_model=CampaignResponse)
+async def get_campaign(campaign_id: str):
+    """
+    Campaign row and run progress
+
+    Progress comes from the run's checkpoint; counters update every
+    CAMPAIGN_COUNTER_FLUSH_EVERY recipients.
+    """
+    try:
+        with span("supabase_campaign"):
+            result = await run_in_threadpool(
+                lambda: get_supabase_client().table("campaigns").select("*").eq("id", campaign_id).execute()
+            )
+    except Exception as e:
+        logger.error(f"Failed to fetch campaign {campaign_id}: {str(e)}")
+        result = None
+    return _campaign_response(campaign_id, result.data[0] if result and result.data else None)
+
+
+@router.get("/{campaign_id}/emails", response_model=CampaignEmailsResponse)
+async def get_campaign_emails(campaign_id: str, limit: int = 50, offset: int = 0):
+    """
+    Emails generated by a campaign
+    """
+    if campaign_engine.get(campaign_id) is None:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    try:
+        query = get_supabase_client().table("emails").select("*", count="exact").eq(
+            "campaign_id", campaign_id
+        ).order("created_at").range(offset, offset + limit - 1)
+
+        with span("supabase_campaign_emails"):
+            result = await run_in_threadpool(query.execute)
+
+        emails = []
+        for row in result.data:
+            first_name, _, last_name = (row.get("recipient_name") or "").partition(" ")
+            emails.append(Email(
+                id=row["id"],
+                campaign_id=row["campaign_id"],
+                recipient_email=row["recipient_email"],
+                recipient_first_name=first_name or None,
+                recipient_last_name=last_name or None,
+                recipient_company=row.get("recipient_company"),
+                recipient_title=row.get("recipient_title"),
+                subject_line=row.get("subject_line"),
+                email_body=row.get("body"),
+                status=row.get("status", "generated"),
+                email_source=row.get("email_source"),
+                confidence_score=row.get("confidence_score"),
+                verified=bool(row.get("verified")),
+                created_at=row["created_at"],
+                updated_at=row.get("updated_at") or row["created_at"]
+            ))
+
+        return CampaignEmailsResponse(
+            emails=emails,
+            total_count=result.count if result.count else len(emails)
+        )
+
+    except Exception as e:
+        logger.error(f"Failed to retrieve campaign emails: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
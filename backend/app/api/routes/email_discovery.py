@@ -1,11 +1,19 @@
 """
 Email Discovery API Routes
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from app.services.email_discovery import EmailDiscoveryService
 from app.core.supabase_client import get_supabase_client
+from app.core.metrics import span
+from app.core.idempotency import coalescer
+from app.core.responses import conditional_json
+from app.services.discovery.domain_patterns import domain_patterns
+from app.services.discovery.names import UnsupportedName
+from app.services.discovery.pipeline import normalize_domain
+from app.tasks.reverification import reverification_queue
 from datetime import datetime
 import logging
 
@@ -32,43 +40,108 @@ class EmailDiscoveryRequest(BaseModel):
 class EmailCandidate(BaseModel):
     email: str
     pattern: str
+    prior: Optional[float] = Field(None, description="Estimated probability before verification")
     valid: Optional[bool]
     confidence: float
     reason: str
+    verification_id: Optional[str] = Field(
+        None, description="Set when greylisted; poll /verifications/{id} for the retried result"
+    )
 
 
 class EmailDiscoveryResponse(BaseModel):
     candidates: List[EmailCandidate]
     best_match: Optional[EmailCandidate]
     total_found: int
+    company_pattern: Optional[str] = Field(
+        None, description="Address pattern known for the domain (from its website or earlier verifications)"
+    )
+    partial: bool = Field(
+        False, description="The request deadline cut verification short; some candidates are unverified"
+    )
+
+
+def client_key(http_request: Request) -> str:
+    """Identify the caller for per-user fairness (X-User-Id header, else client IP)"""
+    user_id = http_request.headers.get("x-user-id")
+    if user_id:
+        return f"user:{user_id}"
+    return f"ip:{http_request.client.host if http_request.client else 'unknown'}"
 
 
 @router.post("/discover", response_model=EmailDiscoveryResponse)
-async def discover_email(request: EmailDiscoveryRequest):
+async def discover_email(
+    request: EmailDiscoveryRequest,
+    http_request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None)
+):
     """
     Discover email addresses for a person at a company
 
-    Uses pattern generation + SMTP verification (no paid APIs)
+    Uses pattern generation + SMTP verification (no paid APIs). The
+    company's address pattern, learned from its website or an earlier
+    verified lookup, is probed first and caps the number of SMTP probes.
+
+    Verification stops when the request deadline (X-Request-Timeout
+    header, default REQUEST_TIMEOUT) runs out; the candidates so far come
+    back with partial=true.
+
+    Greylisted candidates get a verification_id and are re-probed in the
+    background; poll GET /verifications/{verification_id} for the outcome.
+    A name with no Latin letters (e.g. written in Cyrillic or Han) gets a
+    422 asking for a romanized spelling. Identical requests already in flight share one SMTP run; an
+    Idempotency-Key header also replays the result on later retries.
     """
+    return await coalescer.run(
+        "discover",
+        request,
+        lambda: _discover_email(request, client_key(http_request)),
+        idempotency_key=idempotency_key,
+        response=response
+    )
+
+
+async def _discover_email(request: EmailDiscoveryRequest, user_key: str) -> EmailDiscoveryResponse:
     try:
         logger.info(f"Discovering email for {request.first_name} {request.last_name} at {request.company_domain}")
 
-        # Discover emails
-        results = email_discovery.discover_email(
-            first_name=request.first_name,
-            last_name=request.last_name,
-            company_domain=request.company_domain,
-            verify=request.verify
-        )
+        domain = normalize_domain(request.company_domain)
+        with span("pattern_lookup"):
+            pattern_hint = await domain_patterns.lookup(domain)
+
+        # Discover emails (blocking DNS/SMTP, so off the event loop)
+        with span("discovery"):
+            results = await run_in_threadpool(
+                email_discovery.discover_email,
+                first_name=request.first_name,
+                last_name=request.last_name,
+                company_domain=request.company_domain,
+                verify=request.verify,
+                user_key=user_key,
+                pattern_hint=pattern_hint
+            )
+
+        # A 250 from a domain that rejects random mailboxes confirms its pattern
+        verified = next((r for r in results if r["confidence"] >= 0.9), None)
+        if verified:
+            domain_patterns.record_verified(domain, verified["pattern"])
+
+        # Retry greylisted candidates later instead of trusting the 451/452
+        for r in results:
+            if r.get("greylisted"):
+                r["verification_id"] = reverification_queue.schedule(r["email"], user_key=user_key)["id"]
 
         # Convert to response model
         candidates = [
             EmailCandidate(
                 email=r["email"],
                 pattern=r["pattern"],
+                prior=r.get("prior"),
                 valid=r.get("valid"),
                 confidence=r["confidence"],
-                reason=r["reason"]
+                reason=r["reason"],
+                verification_id=r.get("verification_id")
             )
             for r in results
         ]
@@ -94,10 +167,11 @@ async def discover_email(request: EmailDiscoveryRequest):
                 }
 
                 # Use upsert to avoid duplicates
-                result = supabase.table("contacts").upsert(
-                    insert_data,
-                    on_conflict="email"
-                ).execute()
+                with span("supabase_upsert"):
+                    result = supabase.table("contacts").upsert(
+                        insert_data,
+                        on_conflict="email"
+                    ).execute()
 
                 if result.data:
                     logger.info(f"✅ Saved contact to database: {best_match.email}")
@@ -107,22 +181,44 @@ async def discover_email(request: EmailDiscoveryRequest):
         return EmailDiscoveryResponse(
             candidates=candidates,
             best_match=best_match,
-            total_found=len(candidates)
+            total_found=len(candidates),
+            company_pattern=verified["pattern"] if verified else (pattern_hint or {}).get("pattern"),
+            partial=any(r.get("deadline") for r in results)
         )
 
+    except UnsupportedName as e:
+        logger.info(f"Email discovery skipped: {e}")
+        raise HTTPException(status_code=422, detail=str(e))
     except Exception as e:
         logger.error(f"Email discovery failed: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/verifications/{verification_id}", response_model=dict)
+async def get_verification(verification_id: str):
+    """
+    Status of a deferred re-verification
+
+    status is "pending" until the retry resolves, then "verified",
+    "rejected" or "unresolved" (still greylisted after the last attempt).
+    """
+    job = reverification_queue.get(verification_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Verification not found")
+    return job
+
+
 @router.get("/contacts", response_model=dict)
 async def get_contacts(
+    request: Request,
     limit: int = 50,
     offset: int = 0,
     company: Optional[str] = None
 ):
     """
     Retrieve saved contacts from database
+
+    Sends an ETag; a request with a matching If-None-Match gets 304.
     """
     try:
         supabase = get_supabase_client()  # Get client only when needed
@@ -134,12 +230,14 @@ async def get_contacts(
 
         query = query.order("created_at", desc=True).range(offset, offset + limit - 1)
 
-        result = query.execute()
+        with span("supabase_contacts"):
+            result = query.execute()
 
-        return {
-            "contacts": result.data,
-            "total_count": result.count if result.count else len(result.data)
-        }
+        with span("encode"):
+            return conditional_json(request, {
+                "contacts": result.data,
+                "total_count": result.count if result.count else len(result.data)
+            })
 
     except Exception as e:
         logger.error(f"Failed to retrieve contacts: {str(e)}", exc_info=True)
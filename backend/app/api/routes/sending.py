@@ -0,0 +1,63 @@
+"""
+Sending API Routes
+"""
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+from app.core.metrics import span
+from app.tasks.outbox import send_queue
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+# Request Models
+class SendRequest(BaseModel):
+    email_ids: Optional[List[str]] = Field(None, description="Emails to send (rows of the emails table)")
+    campaign_id: Optional[str] = Field(None, description="Send every generated email of this campaign")
+    send_at: Optional[datetime] = Field(None, description="Not before this time (UTC); default now")
+
+
+# Response Models
+class SendResponse(BaseModel):
+    queued: int
+    email_ids: List[str]
+
+
+@router.post("/queue", response_model=SendResponse)
+async def queue_emails(request: SendRequest):
+    """
+    Queue generated emails for sending through the SMTP relay
+
+    Emails go out in batches, paced per recipient domain. Their status
+    moves from "queued" to "sent" or "failed" (temporary failures are
+    retried). Already sent emails are skipped.
+    """
+    if not request.email_ids and not request.campaign_id:
+        raise HTTPException(status_code=422, detail="Give email_ids or a campaign_id")
+    if not send_queue.enabled:
+        raise HTTPException(status_code=503, detail="Sending is not configured (SMTP_RELAY_HOST)")
+    try:
+        with span("send_enqueue"):
+            queued = await run_in_threadpool(
+                send_queue.enqueue,
+                request.email_ids,
+                request.campaign_id,
+                request.send_at
+            )
+        return SendResponse(queued=len(queued), email_ids=queued)
+    except Exception as e:
+        logger.error(f"Failed to queue emails: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/stats", response_model=dict)
+async def sending_stats():
+    """
+    Send outcomes and relay connection reuse for this worker
+    """
+    return send_queue.stats()
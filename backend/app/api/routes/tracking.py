@@ -0,0 +1,58 @@
+"""
+Tracking API Routes
+"""
+import base64
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import RedirectResponse, Response
+from app.core.metrics import record_tracking_event
+from app.services.email.tracking import CLICK, OPEN, verify_click, verify_open
+from app.tasks.tracking import tracking_buffer
+
+router = APIRouter()
+
+# 1x1 transparent GIF
+PIXEL = base64.b64decode("R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7")
+NO_STORE = {"Cache-Control": "no-store, no-cache, must-revalidate, private", "Pragma": "no-cache"}
+
+
+@router.get("/o/{token}.gif", include_in_schema=False)
+async def track_open(token: str):
+    """
+    Open pixel
+
+    Always answers with the pixel, even for a bad token, so a mangled link
+    never shows a broken image. Hits are buffered (app.tasks.tracking).
+    """
+    email_id = verify_open(token)
+    if email_id:
+        tracking_buffer.record(OPEN, email_id)
+    else:
+        record_tracking_event(OPEN, "invalid")
+    return Response(content=PIXEL, media_type="image/gif", headers=NO_STORE)
+
+
+@router.get("/c/{token}", include_in_schema=False)
+async def track_click(token: str, u: str = Query(..., description="Target URL")):
+    """
+    Click redirect
+
+    Redirects only to the URL the token was signed for, so this can't be
+    used as an open redirect. A click also counts as an open: most clients
+    block the pixel until images are allowed.
+    """
+    email_id = verify_click(token, u)
+    if not email_id:
+        record_tracking_event(CLICK, "invalid")
+        raise HTTPException(status_code=404, detail="Unknown link")
+    tracking_buffer.record(CLICK, email_id)
+    tracking_buffer.record(OPEN, email_id)
+    return RedirectResponse(u, status_code=302, headers=NO_STORE)
+
+
+@router.get("/stats", response_model=dict)
+async def tracking_stats():
+    """
+    First-time opens/clicks/replies written by this worker and hits still pending
+    """
+    return tracking_buffer.stats()
@@ -0,0 +1,125 @@
+"""
+Response compression with brotli/gzip negotiation
+
+Compresses complete responses of at least COMPRESSION_MIN_BYTES whose
+content type is text-like (JSON, text, HTML, JS, XML). The client picks the
+encoding through Accept-Encoding q-values. Brotli wins ties when the
+optional `brotli` package is installed; otherwise gzip is used. Streamed
+responses, already-encoded ones and images pass through untouched. Bodies
+above OFFLOAD_BYTES are compressed in a worker thread so they don't stall
+the event loop.
+
+ETags are computed on the uncompressed body and sent weak (W/"..."), so
+they stay valid whatever encoding a client negotiates (app.core.responses).
+"""
+import asyncio
+import gzip
+import logging
+from typing import Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+OFFLOAD_BYTES = 256 * 1024
+
+
+def available_encodings() -> List[str]:
+    """Encodings we can produce, preferred first"""
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """The encoding to use for an Accept-Encoding header, or None for identity"""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding:
+            weights[coding] = quality
+    best, best_quality = None, 0.0
+    for coding in available_encodings():
+        quality = weights.get(coding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Usage:
+        app.add_middleware(CompressionMiddleware)  # sizes/levels from settings
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_BYTES if minimum_size is None else minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message  # Held until we see the body
+                return
+            if passthrough or start is None:
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start["headers"])
+            body = message.get("body", b"")
+            if message.get("more_body") or not self._compressible(headers, body):
+                # Streamed or not worth it: send as is
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            if len(body) >= OFFLOAD_BYTES:
+                body = await asyncio.to_thread(compress, body, encoding)
+            else:
+                body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _compressible(self, headers: MutableHeaders, body: bytes) -> bool:
+        if len(body) < self.minimum_size or "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE)
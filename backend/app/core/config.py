@@ -1,14 +1,162 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 
 class Settings(BaseSettings):
     APP_NAME: str = "ReachCraft"
     APP_ENV: str = "development"
     DEBUG: bool = True
     
-    # We'll add more config later as needed
+    # Local persistent cache (SQLite file, shared by all workers on a host)
+    CACHE_DB_PATH: str = "reachcraft_cache.sqlite3"
+    
+    # Shared DNS/SMTP result caches (seconds); MX TTLs are capped by the record's own
+    MX_CACHE_TTL: int = 3600
+    MX_NEGATIVE_TTL: int = 300
+    SMTP_VERDICT_TTL: int = 7 * 24 * 3600
+    
+    # LinkedIn profile lookup cache TTLs (seconds)
+    PROFILE_SEARCH_TTL: int = 30 * 24 * 3600
+    PROFILE_INFO_TTL: int = 14 * 24 * 3600
+    PROFILE_NEGATIVE_TTL: int = 24 * 3600
+    
+    # Per-request time budget (seconds); clients may ask for another with the
+    # X-Request-Timeout header, up to REQUEST_TIMEOUT_MAX
+    REQUEST_TIMEOUT: float = 25.0
+    REQUEST_TIMEOUT_MAX: float = 60.0
+    # Caps for single downstream calls (the request budget may cut them shorter)
+    LLM_TIMEOUT: float = 60.0
+    SUPABASE_TIMEOUT: float = 10.0
+    DNS_TIMEOUT: float = 5.0
+    
+    # SMTP probing politeness, per MX host
+    SMTP_MAX_SESSIONS_PER_HOST: int = 2
+    SMTP_PROBES_PER_MINUTE: int = 30
+    SMTP_BACKOFF_SECONDS: float = 30.0
+    SMTP_QUEUE_TIMEOUT: float = 20.0
+    
+    # MX connection strategy: race the top hosts (IPv6/IPv4 interleaved),
+    # starting a new attempt every SMTP_CONNECT_STAGGER seconds; park hosts
+    # that keep failing, and sort slow ones last
+    SMTP_RACE_HOSTS: int = 2
+    SMTP_CONNECT_STAGGER: float = 0.25
+    SMTP_HOST_DOWN_SECONDS: float = 60.0
+    SMTP_SLOW_HOST_SECONDS: float = 3.0
+    
+    # Email discovery: cap on generated candidates (highest prior first)
+    DISCOVERY_MAX_CANDIDATES: int = 12
+    
+    # Company website crawl for the domain's address pattern; a discovery
+    # waits DISCOVERY_CRAWL_WAIT seconds for it, then goes on without
+    DISCOVERY_CRAWL_ENABLED: bool = True
+    DISCOVERY_CRAWL_MAX_PAGES: int = 6
+    DISCOVERY_CRAWL_TIMEOUT: float = 5.0
+    DISCOVERY_CRAWL_WAIT: float = 2.0
+    DISCOVERY_PATTERN_MIN_CONFIDENCE: float = 0.6
+    DOMAIN_PATTERN_TTL: int = 30 * 24 * 3600
+    DOMAIN_PATTERN_NEGATIVE_TTL: int = 24 * 3600
+    
+    # Deferred re-verification of greylisted (451/452) candidates
+    GREYLIST_RETRY_DELAY: float = 300.0
+    GREYLIST_MAX_ATTEMPTS: int = 3
+    # Retries after a busy/backing-off server or a timeout, which don't use
+    # up a greylist attempt; the job is given up as unresolved after these
+    GREYLIST_MAX_DEFERRALS: int = 20
+    REVERIFY_RESULT_TTL: int = 7 * 24 * 3600
+    
+    # Campaign runs: workers per pipeline stage, queue depth between stages,
+    # counter flush interval (recipients) and run lease (seconds)
+    CAMPAIGN_DISCOVER_CONCURRENCY: int = 4
+    CAMPAIGN_GENERATE_CONCURRENCY: int = 3
+    CAMPAIGN_PERSIST_CONCURRENCY: int = 2
+    CAMPAIGN_QUEUE_SIZE: int = 8
+    CAMPAIGN_COUNTER_FLUSH_EVERY: int = 10
+    CAMPAIGN_LEASE_SECONDS: float = 120.0
+    CAMPAIGN_MAX_RECIPIENTS: int = 500
+    CAMPAIGN_MIN_CONFIDENCE: float = 0.5
+    CAMPAIGN_TTL: int = 90 * 24 * 3600
+    
+    # Outbound sending through an SMTP relay (Gmail, SES, Postmark, a local
+    # Postfix...); sending is off while SMTP_RELAY_HOST is empty.
+    # SMTP_RELAY_TLS: "starttls", "ssl" (implicit TLS, port 465) or "none"
+    SMTP_RELAY_HOST: str = ""
+    SMTP_RELAY_PORT: int = 587
+    SMTP_RELAY_USERNAME: str = ""
+    SMTP_RELAY_PASSWORD: str = ""
+    SMTP_RELAY_TLS: str = "starttls"
+    SMTP_RELAY_TIMEOUT: float = 30.0
+    # Persistent relay connections: pool size, messages per connection, idle close (s)
+    SMTP_RELAY_POOL_SIZE: int = 2
+    SMTP_RELAY_MAX_MESSAGES: int = 100
+    SMTP_RELAY_IDLE_TIMEOUT: float = 60.0
+    SEND_FROM_ADDRESS: str = ""
+    SEND_FROM_NAME: str = ""
+    
+    # Send queue: batch size and poll interval, pacing per recipient domain,
+    # retries of temporary failures (delay doubles per attempt)
+    SEND_BATCH_SIZE: int = 20
+    SEND_POLL_INTERVAL: float = 5.0
+    SEND_PER_DOMAIN_CONCURRENCY: int = 2
+    SEND_PER_DOMAIN_PER_MINUTE: int = 20
+    SEND_DOMAIN_WAIT: float = 2.0
+    SEND_MAX_ATTEMPTS: int = 3
+    SEND_RETRY_DELAY: float = 300.0
+    
+    # Open/click tracking: public URL of this API for pixel and link
+    # redirects (tracking is off while empty) and the HMAC key for them.
+    # Hits are buffered and written every TRACKING_FLUSH_INTERVAL seconds,
+    # or sooner once TRACKING_FLUSH_SIZE emails are pending.
+    TRACKING_BASE_URL: str = ""
+    TRACKING_SECRET: str = ""
+    TRACKING_FLUSH_INTERVAL: float = 2.0
+    TRACKING_FLUSH_SIZE: int = 500
+    TRACKING_SEEN_SIZE: int = 50000
+    
+    # Reply detection: the IMAP mailbox replies arrive in (off while IMAP_HOST is empty)
+    IMAP_HOST: str = ""
+    IMAP_PORT: int = 993
+    IMAP_USERNAME: str = ""
+    IMAP_PASSWORD: str = ""
+    IMAP_MAILBOX: str = "INBOX"
+    IMAP_POLL_INTERVAL: float = 120.0
+    
+    # Analytics rollups: how often buffered deltas are written (seconds) and
+    # how long /api/analytics responses are cached (seconds)
+    ANALYTICS_FLUSH_INTERVAL: float = 5.0
+    ANALYTICS_CACHE_TTL: int = 60
+    
+    # Response compression: smallest body worth compressing (bytes) and the
+    # gzip level / brotli quality (brotli needs the optional `brotli` package)
+    COMPRESSION_MIN_BYTES: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 5
+    COMPRESSION_BROTLI_QUALITY: int = 5
+    
+    # LLM model routing: per-task targets (seconds, USD per 1M output tokens,
+    # quality tier) and optional pins, e.g. LLM_TASK_MODELS='{"body": "gemini-2.5-pro"}'
+    LLM_TASK_TARGETS: Dict[str, Dict[str, float]] = {
+        "subject": {"max_latency": 1.5, "max_cost": 1.0, "min_quality": 1},
+        "body": {"max_latency": 8.0, "max_cost": 3.0, "min_quality": 2},
+        "jd_analysis": {"max_latency": 2.0, "max_cost": 1.0, "min_quality": 1},
+    }
+    LLM_TASK_MODELS: Dict[str, str] = {}
+    LLM_MAX_ATTEMPTS: int = 3
+    LLM_QUOTA_COOLDOWN: float = 60.0
+    
+    # LLM backend: "gemini", "local" (OpenAI-compatible server, e.g. llama.cpp
+    # or Ollama at http://localhost:11434/v1) or "fake" (deterministic, offline)
+    LLM_BACKEND: str = "gemini"
+    LLM_LOCAL_URL: str = "http://localhost:8080/v1"
+    LLM_LOCAL_MODEL: str = "local-model"
+    LLM_LOCAL_TIMEOUT: float = 300.0
+    
+    # How long Idempotency-Key responses are replayed (seconds)
+    IDEMPOTENCY_TTL: int = 24 * 3600
+    
+    # Estimated prompt size above which a prompt is flagged as over budget
+    PROMPT_MAX_TOKENS: int = 2500
     
     class Config:
         env_file = ".env"
+        # .env also holds keys read via os.getenv (SUPABASE_URL, ...)
+        extra = "ignore"
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
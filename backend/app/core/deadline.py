@@ -0,0 +1,78 @@
+"""
+Per-request deadlines
+
+The HTTP middleware gives every request an absolute deadline: the client's
+X-Request-Timeout header (seconds), else settings.REQUEST_TIMEOUT, capped at
+REQUEST_TIMEOUT_MAX. It lives in a ContextVar, so it follows the request
+into run_in_threadpool workers and copy_context() threads.
+
+Downstream calls size their own timeouts with time_left(cap) instead of
+fixed constants, and skip work that can't finish once expired(). Routes
+then return what they have with partial=True instead of hanging.
+Code running outside a request (background workers) has no deadline:
+time_left() returns the cap and expired() is always False.
+"""
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from app.core.config import settings
+
+DEADLINE_HEADER = "X-Request-Timeout"
+
+# Floor for derived timeouts, so a nearly spent budget still gets one try
+MIN_TIMEOUT = 0.05
+
+_deadline: ContextVar[Optional[float]] = ContextVar("reachcraft_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request's time budget ran out before a required step"""
+
+
+def parse_timeout(value: Optional[str]) -> float:
+    """Header value -> budget in seconds (default when missing or invalid)"""
+    try:
+        seconds = float(value) if value else settings.REQUEST_TIMEOUT
+    except ValueError:
+        seconds = settings.REQUEST_TIMEOUT
+    if seconds <= 0:
+        seconds = settings.REQUEST_TIMEOUT
+    return min(seconds, settings.REQUEST_TIMEOUT_MAX)
+
+
+def set_deadline(seconds: float) -> float:
+    """Start a budget of `seconds` for the current context; returns the deadline"""
+    deadline = time.monotonic() + seconds
+    _deadline.set(deadline)
+    return deadline
+
+
+def clear_deadline() -> None:
+    """Drop the budget, e.g. in a background task started from a request"""
+    _deadline.set(None)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left (may be negative), None outside a request"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def time_left(cap: float) -> float:
+    """Timeout for the next call: `cap`, or less if the budget is smaller"""
+    left = remaining()
+    if left is None:
+        return cap
+    return max(MIN_TIMEOUT, min(cap, left))
+
+
+def check(step: str) -> None:
+    """Raise DeadlineExceeded if the budget is spent before `step`"""
+    if expired():
+        raise DeadlineExceeded(f"Request deadline exceeded before {step}")
@@ -0,0 +1,159 @@
+"""
+Request coalescing and idempotency keys
+
+Identical requests that arrive at the same worker while the first is still
+running (double clicks, client retries) share its result instead of
+repeating the Gemini call, the SMTP run and the database insert. Requests
+are identified by a canonical hash of the parsed body. Without an
+Idempotency-Key, requests on different workers are not coalesced.
+
+Clients that retry after the first call finished can send an
+Idempotency-Key header: the first successful response for that key is
+stored in the SQLite cache and replayed for IDEMPOTENCY_TTL. The key's body
+hash is recorded as pending when the first request starts, so reusing a key
+with a different body is rejected with 422 even while that request is still
+running. A retry that lands on another worker while the first request is
+still running polls the cache for its response until the request deadline,
+then gives up with 409. The pending claim expires after
+REQUEST_TIMEOUT_MAX, so a worker that dies mid-request doesn't hold the key.
+Responses marked partial (cut short by the request deadline) are not
+stored, and a failed or partial request releases its key, so a retry does
+the work.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import uuid
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import HTTPException, Response
+from pydantic import BaseModel
+
+from app.core import deadline
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.singleflight import SingleFlight
+from app.db.cache_store import SQLiteCache
+
+logger = logging.getLogger(__name__)
+
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+_CLAIMED = object()
+
+
+def canonical_hash(payload: Any) -> str:
+    """SHA-256 of the payload as sorted, whitespace-free JSON"""
+    if isinstance(payload, BaseModel):
+        payload = payload.model_dump(mode="json")
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+class RequestCoalescer:
+    """
+    Usage:
+        @router.post("/generate-complete")
+        async def generate(request: Req, response: Response, idempotency_key: Optional[str] = Header(None)):
+            return await coalescer.run("generate-complete", request, lambda: _generate(request),
+                                       idempotency_key=idempotency_key, response=response)
+    """
+
+    def __init__(
+        self,
+        store: Optional[SQLiteCache] = None,
+        ttl: Optional[int] = None,
+        pending_ttl: Optional[float] = None,
+        poll_interval: float = 0.1,
+    ):
+        self.store = store or SQLiteCache(settings.CACHE_DB_PATH, "idempotency")
+        self.ttl = ttl or settings.IDEMPOTENCY_TTL
+        self.pending_ttl = pending_ttl or settings.REQUEST_TIMEOUT_MAX
+        self.poll_interval = poll_interval
+        # Marks this process's pending claims; others wait for their response
+        self._owner = f"{os.getpid()}:{uuid.uuid4().hex}"
+        self._flights = SingleFlight()
+
+    async def run(
+        self,
+        scope: str,
+        payload: Any,
+        fn: Callable[[], Awaitable[Any]],
+        idempotency_key: Optional[str] = None,
+        response: Optional[Response] = None,
+    ) -> Any:
+        body_hash = canonical_hash(payload)
+        store_key = f"{scope}:{idempotency_key}"
+
+        if idempotency_key:
+            stored = await self._claim(scope, store_key, body_hash, response)
+            if stored is not _CLAIMED:
+                return stored
+
+        key = (scope, idempotency_key, body_hash)
+        if self._flights.in_flight(key):
+            self._mark_replayed(scope, "in_flight", response)
+
+        async def call() -> Any:
+            try:
+                result = await fn()
+            except BaseException:
+                if idempotency_key:
+                    self.store.delete(store_key)
+                raise
+            if idempotency_key:
+                serialized = result.model_dump(mode="json") if isinstance(result, BaseModel) else result
+                if isinstance(serialized, dict) and serialized.get("partial"):
+                    self.store.delete(store_key)
+                    return result
+                self.store.set(store_key, {"hash": body_hash, "response": serialized}, ttl=self.ttl)
+            return result
+
+        return await self._flights.do(key, call)
+
+    async def _claim(self, scope: str, store_key: str, body_hash: str, response: Optional[Response]) -> Any:
+        """
+        Claim the key, or return the response stored for it
+
+        Returns _CLAIMED when this process should run the request (or join
+        its own flight). Waits while another worker holds the key.
+        """
+        while True:
+            stored = self.store.get(store_key)
+            if stored is None:
+                claim = {"hash": body_hash, "pending": True, "owner": self._owner}
+                if self.store.add(store_key, claim, ttl=self.pending_ttl):
+                    return _CLAIMED
+                continue  # Another request claimed the key just now
+            if stored["hash"] != body_hash:
+                raise HTTPException(
+                    status_code=422,
+                    detail="Idempotency-Key was already used with a different request body",
+                )
+            if not stored.get("pending"):
+                self._mark_replayed(scope, "stored", response)
+                return stored["response"]
+            if stored.get("owner") == self._owner:
+                return _CLAIMED
+
+            # Running on another worker: wait for its response
+            left = deadline.remaining()
+            wait = self.poll_interval if left is None else min(self.poll_interval, left)
+            if wait <= 0:
+                raise HTTPException(
+                    status_code=409,
+                    detail="A request with this Idempotency-Key is still in progress; retry later",
+                )
+            await asyncio.sleep(wait)
+
+    @staticmethod
+    def _mark_replayed(scope: str, source: str, response: Optional[Response]) -> None:
+        logger.info(f"Coalesced duplicate {scope} request ({source})")
+        metrics.inc("reachcraft_coalesced_requests_total", route=scope, source=source)
+        if response is not None:
+            response.headers[REPLAYED_HEADER] = "true"
+
+
+coalescer = RequestCoalescer()
@@ -0,0 +1,235 @@
+"""
+Request tracing and Prometheus-format metrics
+
+Every request gets a RequestTrace (stored in a context variable) that
+collects per-stage timings. Stages are timed with the `span()` context
+manager, which feeds both the current trace (for the Server-Timing header)
+and the process-wide histograms exposed on /metrics.
+
+No prometheus_client dependency: the registry below renders the text
+exposition format directly.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Histogram buckets in seconds (Gemini calls and SMTP probes run to 10s+)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# name -> (type, help)
+METRICS = {
+    "reachcraft_http_requests_total": (
+        "counter", "HTTP requests by method, route and status"),
+    "reachcraft_http_request_duration_seconds": (
+        "histogram", "End-to-end HTTP request latency"),
+    "reachcraft_stage_duration_seconds": (
+        "histogram", "Latency of individual request stages (DB, LLM, DNS, SMTP)"),
+    "reachcraft_llm_requests_total": (
+        "counter", "LLM calls by model and outcome"),
+    "reachcraft_llm_tokens_total": (
+        "counter", "LLM tokens by model and kind (prompt/completion)"),
+    "reachcraft_smtp_responses_total": (
+        "counter", "SMTP RCPT responses by status code"),
+    "reachcraft_reverifications_total": (
+        "counter", "Deferred SMTP re-verification attempts by outcome"),
+    "reachcraft_campaign_recipients_total": (
+        "counter", "Campaign recipients processed by outcome (generated/failed)"),
+    "reachcraft_relay_connections_total": (
+        "counter", "Connections opened to the outbound SMTP relay (new or TLS-resumed)"),
+    "reachcraft_emails_sent_total": (
+        "counter", "Outbound emails by outcome (sent/failed/retry)"),
+    "reachcraft_tracking_events_total": (
+        "counter", "Open/click/reply hits by result (recorded/repeat/invalid)"),
+    "reachcraft_coalesced_requests_total": (
+        "counter", "Duplicate requests served from an in-flight or stored result"),
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+    return "{" + body + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms rendered as Prometheus text"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        # name -> labels -> [bucket counts..., sum, count]
+        self._histograms: Dict[str, Dict[LabelKey, List[float]]] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            state = series.get(key)
+            if state is None:
+                state = series[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    state[i] += 1
+            state[-2] += seconds
+            state[-1] += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def render(self) -> str:
+        """Render all series in the Prometheus text exposition format"""
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                self._header(lines, name, "counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(key)} {value:g}")
+
+            for name, series in sorted(self._histograms.items()):
+                self._header(lines, name, "histogram")
+                for key, state in sorted(series.items()):
+                    for i, bound in enumerate(self.buckets):
+                        lines.append(
+                            f"{name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {state[i]:g}"
+                        )
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {state[-1]:g}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {state[-2]:.6f}")
+                    lines.append(f"{name}_count{_format_labels(key)} {state[-1]:g}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _header(lines: List[str], name: str, default_type: str) -> None:
+        metric_type, help_text = METRICS.get(name, (default_type, name))
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+
+
+metrics = MetricsRegistry()
+
+
+class RequestTrace:
+    """Per-request collection of stage timings"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        # stage -> [total seconds, calls]
+        self.stages: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.stages.setdefault(stage, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """
+        Format stages as a Server-Timing header value, e.g.
+        'gemini_body;dur=812.4, smtp_rcpt;dur=340.1;desc="7 calls", total;dur=1201.7'
+        """
+        parts = []
+        with self._lock:
+            for stage, (seconds, calls) in self.stages.items():
+                part = f"{stage};dur={seconds * 1000:.1f}"
+                if calls > 1:
+                    part += f';desc="{calls} calls"'
+                parts.append(part)
+        parts.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("reachcraft_trace", default=None)
+
+
+def start_trace() -> RequestTrace:
+    """Begin a trace for the current request context"""
+    trace = RequestTrace()
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """
+    Time a stage of the current request
+
+    Usage:
+        with span("gemini_body"):
+            email_data = gemini.generate_json(prompt)
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.observe("reachcraft_stage_duration_seconds", elapsed, stage=stage)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.record(stage, elapsed)
+
+
+def record_http_request(method: str, route: str, status: int, seconds: float) -> None:
+    metrics.inc("reachcraft_http_requests_total", method=method, route=route, status=status)
+    metrics.observe("reachcraft_http_request_duration_seconds", seconds, method=method, route=route)
+
+
+def record_llm_call(model: str, outcome: str, prompt_tokens: int = 0, completion_tokens: int = 0) -> None:
+    metrics.inc("reachcraft_llm_requests_total", model=model, outcome=outcome)
+    if prompt_tokens:
+        metrics.inc("reachcraft_llm_tokens_total", prompt_tokens, model=model, kind="prompt")
+    if completion_tokens:
+        metrics.inc("reachcraft_llm_tokens_total", completion_tokens, model=model, kind="completion")
+
+
+def record_smtp_response(code: object) -> None:
+    metrics.inc("reachcraft_smtp_responses_total", code=code)
+
+
+def record_reverification(outcome: str) -> None:
+    metrics.inc("reachcraft_reverifications_total", outcome=outcome)
+
+
+def record_campaign_recipient(outcome: str, stage: str) -> None:
+    metrics.inc("reachcraft_campaign_recipients_total", outcome=outcome, stage=stage)
+
+
+def record_relay_connection(kind: str) -> None:
+    metrics.inc("reachcraft_relay_connections_total", kind=kind)
+
+
+def record_email_send(outcome: str) -> None:
+    metrics.inc("reachcraft_emails_sent_total", outcome=outcome)
+
+
+def record_tracking_event(kind: str, result: str) -> None:
+    metrics.inc("reachcraft_tracking_events_total", kind=kind, result=result)
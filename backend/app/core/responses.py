@@ -0,0 +1,49 @@
+"""
+Fast JSON responses with ETag / conditional GET
+
+The app's default response class is ORJSONResponse, so every JSON endpoint
+is encoded with orjson instead of json.dumps. Large list endpoints
+(/history, /contacts) go further with conditional_json(). It encodes the
+payload once, tags it with a weak ETag (a hash of the uncompressed body)
+and answers 304 Not Modified, with no body, when the client's
+If-None-Match already has that version. Clients that poll these lists get
+the full body only when it changed. Compression is applied afterwards by
+app.core.compression.
+"""
+import hashlib
+from typing import Any, Optional
+
+import orjson
+from fastapi import Request, Response
+
+# Revalidate every time, but let the client keep its copy for 304s
+CACHE_CONTROL = "private, no-cache"
+
+
+def encode(content: Any) -> bytes:
+    """orjson with the options ORJSONResponse uses (datetimes, non-str keys)"""
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def etag_for(body: bytes) -> str:
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def not_modified(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against our ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def conditional_json(request: Request, content: Any, status_code: int = 200) -> Response:
+    """JSON response with an ETag; 304 without a body if the client has this version"""
+    body = encode(content)
+    etag = etag_for(body)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if not_modified(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, status_code=status_code, media_type="application/json", headers=headers)
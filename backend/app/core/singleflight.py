@@ -0,0 +1,34 @@
+"""
+Single-flight de-duplication for async calls
+
+Concurrent callers asking for the same key share one execution: the first
+caller starts the work, later callers await the same task. The work runs
+as its own task, so a caller that is cancelled (client disconnect) doesn't
+cancel it for everyone else.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Usage:
+        flights = SingleFlight()
+        url = await flights.do(("search", key), lambda: pool.search_profile(name, company))
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t, key=key: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
@@ -1,18 +1,27 @@
 """
 Supabase client initialization
 """
-from supabase import create_client, Client
 import os
 from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 
 @lru_cache()
-def get_supabase_client() -> Client:
+def get_supabase_client() -> "Client":
     """
     Get Supabase client instance (singleton pattern)
     Uses environment variables:
     - SUPABASE_URL
     - SUPABASE_KEY
+
+    The supabase SDK is imported here rather than at module load so that
+    importing the API routes stays cheap on cold start.
+
+    PostgREST calls time out after SUPABASE_TIMEOUT seconds rather than the
+    SDK's 120, so a stuck query can't outlive the request that made it.
     """
     supabase_url = os.getenv("SUPABASE_URL")
     supabase_key = os.getenv("SUPABASE_KEY")
@@ -23,4 +32,9 @@ def get_supabase_client() -> Client:
             "Please set SUPABASE_URL and SUPABASE_KEY in your .env file"
         )
 
-    return create_client(supabase_url, supabase_key)
\ No newline at end of file
+    from supabase import ClientOptions, create_client
+
+    from app.core.config import settings
+
+    options = ClientOptions(postgrest_client_timeout=settings.SUPABASE_TIMEOUT)
+    return create_client(supabase_url, supabase_key, options=options)
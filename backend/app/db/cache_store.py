@@ -0,0 +1,141 @@
+"""
+Persistent TTL cache backed by SQLite
+
+One SQLite file holds every cache; each SQLiteCache instance works in its
+own namespace. Values are stored as JSON. WAL mode lets readers and a
+writer work concurrently, including from several worker processes.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Iterator, Tuple
+
+_MISSING = object()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+)
+"""
+
+
+class SQLiteCache:
+    """
+    Namespaced key/value cache with per-entry TTL
+
+    Usage:
+        cache = SQLiteCache("reachcraft_cache.sqlite3", "profile_search")
+        cache.set("jane doe|acme", "https://www.linkedin.com/in/janedoe", ttl=3600)
+        cache.get("jane doe|acme")
+    """
+
+    def __init__(self, path: str, namespace: str):
+        self.path = path
+        self.namespace = namespace
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; sqlite3 connections aren't thread-safe"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the cached value, or `default` if missing or expired"""
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        ).fetchone()
+        if row is None or row[1] < time.time():
+            return default
+        return json.loads(row[0])
+
+    def contains(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (self.namespace, key, json.dumps(value), time.time() + ttl),
+        )
+
+    def add(self, key: str, value: Any, ttl: float) -> bool:
+        """
+        Set `key` only if it is missing or expired; True if this call set it
+
+        Atomic across threads and processes, so it doubles as a lease: the
+        one worker whose add() succeeds does the job.
+        """
+        conn = self._connection()
+        now = time.time()
+        conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at < ?",
+            (self.namespace, key, now),
+        )
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO cache_entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+            (self.namespace, key, json.dumps(value), now + ttl),
+        )
+        return cursor.rowcount == 1
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        """Yield every unexpired (key, value) in this namespace"""
+        rows = self._connection().execute(
+            "SELECT key, value FROM cache_entries WHERE namespace = ? AND expires_at >= ?",
+            (self.namespace, time.time()),
+        ).fetchall()
+        for key, value in rows:
+            yield key, json.loads(value)
+
+    def delete(self, key: str) -> None:
+        self._connection().execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        )
+
+    def replace_if(self, key: str, expected: Any, value: Any, ttl: float) -> bool:
+        """
+        Set `key` only while it holds `expected` and hasn't expired; True if it did
+
+        Compare-and-set for leases: a holder renews its lease only if no one
+        else has taken it over since.
+        """
+        now = time.time()
+        cursor = self._connection().execute(
+            "UPDATE cache_entries SET value = ?, expires_at = ? "
+            "WHERE namespace = ? AND key = ? AND value = ? AND expires_at >= ?",
+            (json.dumps(value), now + ttl, self.namespace, key, json.dumps(expected), now),
+        )
+        return cursor.rowcount == 1
+
+    def delete_if(self, key: str, expected: Any) -> bool:
+        """Delete `key` only while it still holds `expected`; True if it did"""
+        cursor = self._connection().execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND key = ? AND value = ?",
+            (self.namespace, key, json.dumps(expected)),
+        )
+        return cursor.rowcount == 1
+
+    def purge_expired(self) -> int:
+        """Drop expired rows in this namespace; returns how many were removed"""
+        cursor = self._connection().execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND expires_at < ?",
+            (self.namespace, time.time()),
+        )
+        return cursor.rowcount
+
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
@@ -0,0 +1,91 @@
+"""
+Incremental campaign counters
+
+Campaign counters (generated, sent, opened, ...) are never recounted from
+the emails table. Writers send deltas to the increment_campaign_counters
+Postgres function (see the README's SQL). It adds them in a single UPDATE
+and records the batch id, so a retried batch is applied only once.
+
+CounterBuffer collects deltas from many events (sends, opens, clicks) and
+writes one batch per campaign per flush instead of one UPDATE per event.
+"""
+import logging
+import threading
+import uuid
+from collections import Counter
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = (
+    "generated_count",
+    "sent_count",
+    "opened_count",
+    "clicked_count",
+    "replied_count",
+    "failed_count",
+)
+
+
+def increment_counters(campaign_id: str, deltas: Dict[str, int], batch_id: str) -> bool:
+    """
+    Add `deltas` to the campaign's counters; True once the database has them
+
+    Blocking (PostgREST), so call it from a worker thread. Retrying with the
+    same `batch_id` after a failure or a crash can't double-count.
+    """
+    unknown = set(deltas) - set(COUNTER_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown campaign counters: {', '.join(sorted(unknown))}")
+    deltas = {field: n for field, n in deltas.items() if n}
+    if not deltas:
+        return True
+    try:
+        from app.core.supabase_client import get_supabase_client
+
+        get_supabase_client().rpc("increment_campaign_counters", {
+            "p_campaign_id": campaign_id,
+            "p_deltas": deltas,
+            "p_batch_id": batch_id,
+        }).execute()
+        return True
+    except Exception as e:
+        logger.error(f"Failed to update counters of campaign {campaign_id}: {e}")
+        return False
+
+
+class CounterBuffer:
+    """
+    Usage:
+        campaign_counters.add(campaign_id, "sent_count")
+        campaign_counters.flush()  # blocking; from a worker thread
+    """
+
+    def __init__(self):
+        self._pending: Dict[str, Counter] = {}
+        # batch id -> (campaign id, deltas); kept until the database has them
+        self._unsent: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def add(self, campaign_id: str, field: str, n: int = 1) -> None:
+        if field not in COUNTER_FIELDS:
+            raise ValueError(f"Unknown campaign counter: {field}")
+        with self._lock:
+            self._pending.setdefault(campaign_id, Counter())[field] += n
+
+    def flush(self) -> int:
+        """Send every pending batch; returns how many are still unsent (retried next flush)"""
+        with self._lock:
+            for campaign_id, deltas in self._pending.items():
+                self._unsent[uuid.uuid4().hex] = (campaign_id, dict(deltas))
+            self._pending.clear()
+            batches = list(self._unsent.items())
+        for batch_id, (campaign_id, deltas) in batches:
+            if increment_counters(campaign_id, deltas, batch_id):
+                with self._lock:
+                    self._unsent.pop(batch_id, None)
+        with self._lock:
+            return len(self._unsent)
+
+
+campaign_counters = CounterBuffer()
@@ -0,0 +1,157 @@
+"""
+Incremental outreach rollups
+
+Dashboards ask questions like "which companies reply?" or "does the casual
+tone get more opens?". The email_rollups table answers them without
+scanning emails. It has one row per (dimension, value), e.g. ("company",
+"acme") or ("day", "2025-03-03"), holding event counts plus confidence and
+generation-time sums for averages.
+
+Writers call email_rollups.add(row, "sent_count") as things happen:
+generation, sending and tracking. Every event is attributed to the email's
+own attributes. So "day" is the day the email was generated, and a day's
+reply rate compares replies to that day's sends. A background task
+flushes every ANALYTICS_FLUSH_INTERVAL seconds. Each flush is one call to
+the increment_email_rollups Postgres function (see the README's SQL),
+carrying every changed row. It is deduplicated by batch id like the
+campaign counters (app.db.campaign_counters).
+"""
+import asyncio
+import logging
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.db.campaign_counters import COUNTER_FIELDS
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ("day", "company", "role", "tone", "model")
+# Summed on generation, for averages
+SUM_FIELDS = ("confidence_sum", "confidence_n", "generation_ms_sum", "generation_ms_n")
+NONE = "(none)"
+
+
+def dimension_values(row: Dict) -> Dict[str, str]:
+    """The rollup each dimension of an emails row falls into"""
+    return {
+        "day": (row.get("created_at") or datetime.utcnow().isoformat())[:10],
+        "company": (row.get("recipient_company") or "").strip().lower() or NONE,
+        "role": (row.get("role_name") or "").strip() or NONE,
+        "tone": row.get("tone") or NONE,
+        "model": row.get("model") or NONE,
+    }
+
+
+def summarize(rollup: Dict) -> Dict:
+    """Counts, rates (per sent email) and averages of an email_rollups row"""
+    counts = {field[:-len("_count")]: rollup.get(field) or 0 for field in COUNTER_FIELDS}
+    sent = counts["sent"]
+
+    def rate(n: int) -> Optional[float]:
+        return round(n / sent, 4) if sent else None
+
+    def average(total: str, n: str, digits: int) -> Optional[float]:
+        return round(rollup[total] / rollup[n], digits) if rollup.get(n) else None
+
+    return {
+        "value": rollup["value"],
+        **counts,
+        "open_rate": rate(counts["opened"]),
+        "click_rate": rate(counts["clicked"]),
+        "reply_rate": rate(counts["replied"]),
+        "avg_confidence": average("confidence_sum", "confidence_n", 3),
+        "avg_generation_ms": average("generation_ms_sum", "generation_ms_n", 0),
+    }
+
+
+def increment_rollups(rows: List[Dict], batch_id: str) -> bool:
+    """Add per-(dimension, value) deltas; True once the database has them. Blocking."""
+    try:
+        from app.core.supabase_client import get_supabase_client
+
+        get_supabase_client().rpc("increment_email_rollups", {
+            "p_rows": rows,
+            "p_batch_id": batch_id,
+        }).execute()
+        return True
+    except Exception as e:
+        logger.error(f"Failed to update {len(rows)} email rollups: {e}")
+        return False
+
+
+class RollupBuffer:
+    """
+    Usage:
+        email_rollups.add(row, "generated_count")  # row of the emails table; no I/O
+        email_rollups.flush()  # blocking; the background task calls it
+    """
+
+    def __init__(self, flush_interval: Optional[float] = None):
+        self.flush_interval = settings.ANALYTICS_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self._pending: Dict[tuple, Counter] = {}
+        # batch id -> rows; kept until the database has them
+        self._unsent: Dict[str, List[Dict]] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, row: Dict, field: str, n: int = 1) -> None:
+        """Count an event of an emails row; generation also adds its confidence and latency"""
+        if field not in COUNTER_FIELDS:
+            raise ValueError(f"Unknown rollup counter: {field}")
+        deltas = {field: n}
+        if field == "generated_count":
+            if row.get("confidence_score") is not None:
+                deltas.update(confidence_sum=row["confidence_score"], confidence_n=1)
+            if row.get("generation_ms") is not None:
+                deltas.update(generation_ms_sum=row["generation_ms"], generation_ms_n=1)
+        with self._lock:
+            for key in dimension_values(row).items():
+                self._pending.setdefault(key, Counter()).update(deltas)
+
+    def flush(self) -> int:
+        """Send pending deltas as one batch; returns how many batches are still unsent"""
+        with self._lock:
+            if self._pending:
+                self._unsent[uuid.uuid4().hex] = [
+                    {"dimension": dimension, "value": value, **deltas}
+                    for (dimension, value), deltas in self._pending.items()
+                ]
+                self._pending.clear()
+            batches = list(self._unsent.items())
+        for batch_id, rows in batches:
+            if increment_rollups(rows, batch_id):
+                with self._lock:
+                    self._unsent.pop(batch_id, None)
+        with self._lock:
+            return len(self._unsent)
+
+    def start(self) -> None:
+        """Start the background flusher (call from the event loop)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(), name="rollup-flush")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await asyncio.to_thread(self.flush)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.error(f"Rollup flush failed: {e}", exc_info=True)
+
+
+email_rollups = RollupBuffer()
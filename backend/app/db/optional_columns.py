@@ -0,0 +1,69 @@
+"""
+Inserts that survive columns the database doesn't have yet
+
+New emails columns (model, tone, generation_ms, ...) ship with an ALTER in
+the README. Until it is applied, PostgREST rejects every insert that names
+one of them (PGRST204, or Postgres 42703), and history silently stopped
+saving. save_row() drops the unknown column, remembers it for the rest of
+the process so later writes skip it up front, and retries. Each dropped
+column is logged once as a warning, so the missing migration stays visible.
+"""
+import logging
+import re
+import threading
+from typing import Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+_UNKNOWN_COLUMN_RES = (
+    re.compile(r"Could not find the '([^']+)' column"),               # PGRST204
+    re.compile(r'column "?(?:\w+\.)?([^".\s]+)"? (?:of relation "?\w+"? )?does not exist'),  # 42703
+)
+
+# table -> columns the database turned down
+_missing: Dict[str, Set[str]] = {}
+_lock = threading.Lock()
+
+
+def unknown_column(error: Exception) -> Optional[str]:
+    """The column a PostgREST error says doesn't exist, if that is the error"""
+    message = " ".join(str(part) for part in (getattr(error, "message", None), error) if part)
+    for pattern in _UNKNOWN_COLUMN_RES:
+        match = pattern.search(message)
+        if match:
+            return match.group(1)
+    return None
+
+
+def missing_columns(table: str) -> Set[str]:
+    with _lock:
+        return set(_missing.get(table, ()))
+
+
+def save_row(table: str, row: Dict, on_conflict: Optional[str] = None) -> List[Dict]:
+    """
+    Insert (or upsert on `on_conflict`) one row; returns the rows PostgREST sent back
+
+    Blocking. Columns the table doesn't have are dropped; any other error is
+    raised as before.
+    """
+    from app.core.supabase_client import get_supabase_client
+
+    skipped = missing_columns(table)
+    data = {column: value for column, value in row.items() if column not in skipped}
+    while True:
+        query = get_supabase_client().table(table)
+        try:
+            if on_conflict:
+                return query.upsert(data, on_conflict=on_conflict).execute().data
+            return query.insert(data).execute().data
+        except Exception as e:
+            column = unknown_column(e)
+            if column is None or column not in data:
+                raise
+            del data[column]
+            with _lock:
+                _missing.setdefault(table, set()).add(column)
+            logger.warning(
+                f"{table}.{column} does not exist; saving without it until the README's ALTER TABLE is applied"
+            )
@@ -1,12 +1,89 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from app.core.compression import CompressionMiddleware
+from app.core.deadline import DEADLINE_HEADER, parse_timeout, set_deadline
+from app.core.metrics import metrics, record_http_request, start_trace
 from app.api.routes.email_discovery import router as email_discovery_router
 from app.api.routes.ai_generation import router as ai_generation_router
+from app.api.routes.analytics import router as analytics_router
+from app.api.routes.campaigns import router as campaigns_router
+from app.api.routes.sending import router as sending_router
+from app.api.routes.tracking import router as tracking_router
+from app.db.email_rollups import email_rollups
+from app.tasks.campaigns import campaign_engine
+from app.tasks.outbox import send_queue
+from app.tasks.replies import reply_poller
+from app.tasks.reverification import reverification_queue
+from app.tasks.tracking import tracking_buffer
+from app.services.discovery.domain_patterns import domain_patterns
+
+logger = logging.getLogger(__name__)
+
+
+async def warm_up_clients():
+    """
+    Create the Gemini and Supabase clients in the background so the first
+    request doesn't pay for SDK imports. Failures are logged, not raised:
+    the routes create the clients again on first use and report errors there.
+    """
+    from app.core.supabase_client import get_supabase_client
+    from app.services.ai.gemini_service import get_gemini_service
+
+    for name, warm in (
+        ('gemini', lambda: get_gemini_service().warm_up()),
+        ('supabase', get_supabase_client),
+    ):
+        try:
+            await asyncio.to_thread(warm)
+            logger.info(f"Warmed up {name} client")
+        except Exception as e:
+            logger.warning(f"Skipping {name} warm-up: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    load_dotenv()
+    warm_up_task = asyncio.create_task(warm_up_clients())
+    reverification_queue.start()
+    campaign_engine.start_watchdog()
+    send_queue.start()
+    tracking_buffer.start()
+    reply_poller.start()
+    email_rollups.start()
+    yield
+    if not warm_up_task.done():
+        warm_up_task.cancel()
+    await reverification_queue.stop()
+    await campaign_engine.stop()
+    await send_queue.stop()
+    await reply_poller.stop()
+    await tracking_buffer.stop()
+    await email_rollups.stop()  # Last: the stops above may add deltas
+    await domain_patterns.crawler.aclose()
+    await close_scraper_pool()
+
+
+async def close_scraper_pool():
+    """Close the shared Playwright pool, if scraping is installed and was used"""
+    try:
+        from app.services.scraping.scraper_pool import close_scraper_pool as close_pool
+    except ImportError:  # playwright/bs4 are optional
+        return
+    await close_pool()
+
 
 app = FastAPI(
     title='ReachCraft',
     description='AI-powered job application automation',
     version='0.1.0',
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS
@@ -18,6 +95,29 @@ app.add_middleware(
     allow_headers=['*'],
 )
 
+# br/gzip for large JSON/text bodies; inside trace_requests, so its timing counts
+app.add_middleware(CompressionMiddleware)
+
+@app.middleware('http')
+async def trace_requests(request: Request, call_next):
+    """
+    Time every request and report its stages in a Server-Timing header;
+    start its deadline from X-Request-Timeout (see app.core.deadline)
+    """
+    trace = start_trace()
+    set_deadline(parse_timeout(request.headers.get(DEADLINE_HEADER)))
+    response = await call_next(request)
+
+    route = request.scope.get('route')
+    record_http_request(
+        method=request.method,
+        route=getattr(route, 'path', 'unmatched'),
+        status=response.status_code,
+        seconds=trace.elapsed(),
+    )
+    response.headers['Server-Timing'] = trace.server_timing()
+    return response
+
 # Include routers
 app.include_router(
     email_discovery_router,
@@ -31,6 +131,31 @@ app.include_router(
     tags=['AI Generation']
 )
 
+app.include_router(
+    analytics_router,
+    prefix='/api/analytics',
+    tags=['Analytics']
+)
+
+app.include_router(
+    campaigns_router,
+    prefix='/api/campaigns',
+    tags=['Campaigns']
+)
+
+app.include_router(
+    sending_router,
+    prefix='/api/sending',
+    tags=['Sending']
+)
+
+# Short prefix: these URLs end up in every sent email
+app.include_router(
+    tracking_router,
+    prefix='/t',
+    tags=['Tracking']
+)
+
 @app.get('/')
 async def root():
     return {
@@ -40,6 +165,10 @@ async def root():
         'endpoints': {
             'email_discovery': '/api/email-discovery',
             'ai_generation': '/api/ai-generation',
+            'analytics': '/api/analytics',
+            'campaigns': '/api/campaigns',
+            'sending': '/api/sending',
+            'tracking': '/t',
             'docs': '/docs'
         }
     }
@@ -47,3 +176,7 @@ async def root():
 @app.get('/health')
 async def health():
     return {'status': 'healthy'}
+
+@app.get('/metrics', response_class=PlainTextResponse, include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type='text/plain; version=0.0.4')
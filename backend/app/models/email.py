@@ -17,6 +17,7 @@ class Campaign(CampaignBase):
     user_id: UUID
     status: str = "draft"
     total_emails: int = 0
+    generated_count: int = 0
     sent_count: int = 0
     opened_count: int = 0
     clicked_count: int = 0
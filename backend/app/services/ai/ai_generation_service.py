@@ -1,5 +1,7 @@
 ﻿from typing import List, Dict, Any
-from app.services.ai.gemini_service import GeminiService
+from app.services.ai.gemini_service import get_gemini_service
+from app.services.ai.model_router import model_router
+from app.services.ai.draft_quality import draft_quality
 from app.services.ai.prompts import (
     get_subject_prompt,
     get_body_prompt,
@@ -18,7 +20,7 @@ class AIGenerationService:
     '''Service for AI-powered email generation'''
     
     def __init__(self):
-        self.gemini = GeminiService()
+        self.gemini = get_gemini_service()
     
     async def generate_subject_lines(
         self,
@@ -38,7 +40,9 @@ class AIGenerationService:
         )
         
         # Generate
-        subject_lines = self.gemini.generate_subject_lines(prompt)
+        subject_lines, model = model_router.run(
+            'subject', lambda gemini: gemini.generate_subject_lines(prompt, raise_errors=True)
+        )
         
         # Pick primary (first one)
         primary = subject_lines[0] if subject_lines else 'Following up on our conversation'
@@ -47,7 +51,7 @@ class AIGenerationService:
             subject_lines=subject_lines,
             primary=primary,
             metadata={
-                'model': 'gemini-1.5-flash',
+                'model': model,
                 'purpose': request.purpose
             }
         )
@@ -74,7 +78,7 @@ class AIGenerationService:
         )
         
         # Generate
-        body = self.gemini.generate(prompt)
+        body, model = model_router.run('body', lambda gemini: gemini.generate(prompt))
         
         # Calculate metrics
         word_count = len(body.split())
@@ -85,7 +89,7 @@ class AIGenerationService:
             word_count=word_count,
             estimated_read_time=estimated_read_time,
             metadata={
-                'model': 'gemini-1.5-flash',
+                'model': model,
                 'tone': request.tone,
                 'purpose': request.purpose
             }
@@ -115,7 +119,7 @@ class AIGenerationService:
         )
         
         # Generate
-        result = self.gemini.generate_json(prompt)
+        result, model = model_router.run('body', lambda gemini: gemini.generate_json(prompt))
         
         subject = result.get('subject', 'Following up')
         body = result.get('body', '').strip()
@@ -137,7 +141,7 @@ class AIGenerationService:
         word_count = len(body.split())
         estimated_read_time = int((word_count / 200) * 60)
         preview_text = body[:50] + '...' if len(body) > 50 else body
-        confidence = self.gemini.calculate_confidence(body)
+        quality = draft_quality.analyze(body, request.recipient_first_name, request.recipient_company)
         
         return CompleteEmailResponse(
             subject_line=subject,
@@ -146,10 +150,11 @@ class AIGenerationService:
             preview_text=preview_text,
             word_count=word_count,
             estimated_read_time=estimated_read_time,
-            confidence_score=confidence,
+            confidence_score=quality['score'],
             metadata={
-                'model': 'gemini-1.5-flash',
+                'model': model,
                 'tone': request.tone,
-                'purpose': request.purpose
+                'purpose': request.purpose,
+                'quality': quality
             }
         )
@@ -0,0 +1,191 @@
+"""
+Draft quality analysis for generated emails
+
+Scores email bodies on:
+- clichés and spam-trigger phrases (one compiled alternation, not a scan per phrase)
+- length and paragraph structure
+- readability (Flesch reading ease)
+- personalization density (mentions of the recipient and their company)
+
+analyze_batch() joins all bodies into one string and runs the phrase
+matchers once over the whole batch, bucketing matches back to their body by
+offset. Each body is lowercased before the offsets are taken, since
+lowercasing can change a string's length ('İ' becomes two code points).
+Word/sentence/syllable counts use findall per body so the counting stays in
+C rather than a Python loop per token. Words are Unicode letters and digits,
+so non-English drafts are counted too.
+"""
+import re
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Pattern
+
+CLICHES = (
+    "passionate", "rockstar", "ninja", "guru",
+    "fast-paced environment", "team player",
+    "think outside the box", "hit the ground running",
+    "hope this email finds you well",
+    "would love the opportunity",
+    "i am writing to express my interest",
+    "synergy", "self-starter", "go-getter",
+    "to whom it may concern",
+)
+
+SPAM_TRIGGERS = (
+    "act now", "limited time", "urgent", "guarantee", "guaranteed",
+    "risk-free", "no obligation", "click here", "100%", "free",
+    "winner", "once in a lifetime", "$$$", "!!!",
+)
+
+# Phrases that are harmless right after these words ("feel free to reach out")
+NOT_AFTER = {
+    "free": ("feel ",),
+}
+
+# A blank line plus NUL: no phrase, sentence or paragraph match can span two drafts
+_SEPARATOR = "\n\n\x00\n\n"
+
+
+def _phrase(phrase: str) -> str:
+    return "".join(f"(?<!{re.escape(word)})" for word in NOT_AFTER.get(phrase, ())) + re.escape(phrase)
+
+
+def _alternation(phrases: Iterable[str]) -> str:
+    # Longest first so "guaranteed" wins over "guarantee"
+    return "|".join(_phrase(p) for p in sorted(set(phrases), key=len, reverse=True))
+
+
+def _is_word(phrase: str) -> bool:
+    return phrase[0].isalnum() and phrase[-1].isalnum()
+
+
+# Matched against lowercased text. Word phrases share one \b...\b wrapper;
+# symbol phrases ("!!!", "100%") have no word boundaries to anchor on.
+_PHRASE_RE = re.compile(
+    r"\b(?:(?P<cliche>" + _alternation(p for p in CLICHES if _is_word(p)) + r")"
+    r"|(?P<spam>" + _alternation(p for p in SPAM_TRIGGERS if _is_word(p)) + r"))\b"
+    r"|(?P<spam_symbol>" + _alternation(p for p in SPAM_TRIGGERS if not _is_word(p)) + r")"
+)
+_WORD_RE = re.compile(r"[^\W_][\w'’-]*")
+_SYLLABLE_RE = re.compile(r"[aeiouyàáâãäåæèéêëìíîïòóôõöøœùúûüýÿ]+", re.IGNORECASE)
+_SENTENCE_END_RE = re.compile(r"[.!?]+(?=\s|$)")
+_PARAGRAPH_RE = re.compile(r"[^\s\x00](?:[^\n]|\n(?!\s*\n))*")
+
+
+@lru_cache(maxsize=256)
+def _mention_pattern(recipient_name: str, company: str) -> Optional[Pattern]:
+    groups = []
+    if recipient_name:
+        groups.append(f"(?P<recipient>\\b{re.escape(recipient_name.lower())}\\b)")
+    if company:
+        groups.append(f"(?P<company>\\b{re.escape(company.lower())}\\b)")
+    return re.compile("|".join(groups)) if groups else None
+
+
+def flesch_reading_ease(words: int, sentences: int, syllables: int) -> float:
+    """206.835 - 1.015 (words/sentence) - 84.6 (syllables/word); higher reads easier"""
+    if not words:
+        return 0.0
+    return 206.835 - 1.015 * (words / max(1, sentences)) - 84.6 * (syllables / words)
+
+
+class DraftQualityAnalyzer:
+    """
+    Usage:
+        analyzer = DraftQualityAnalyzer()
+        quality = analyzer.analyze(body, recipient_name="Sarah", company="Globex")
+        quality["score"]  # 0.0 - 1.0
+    """
+
+    MIN_WORDS = 50
+    MAX_WORDS = 200
+    MIN_PARAGRAPHS = 2
+    MIN_READABILITY = 30.0
+
+    def analyze(self, body: str, recipient_name: Optional[str] = None,
+                company: Optional[str] = None) -> Dict:
+        return self.analyze_batch([body], recipient_name, company)[0]
+
+    def analyze_batch(self, bodies: List[str], recipient_name: Optional[str] = None,
+                      company: Optional[str] = None) -> List[Dict]:
+        """Analyze drafts written for the same recipient; one result per body, in order"""
+        if not bodies:
+            return []
+
+        bodies = [body or "" for body in bodies]
+        lowered = [body.lower() for body in bodies]
+        starts = []
+        offset = 0
+        for body in lowered:
+            starts.append(offset)
+            offset += len(body) + len(_SEPARATOR)
+        text = _SEPARATOR.join(lowered)
+
+        def owner(position: int) -> int:
+            return bisect_right(starts, position) - 1
+
+        stats = [
+            {
+                "cliches": [], "spam_triggers": [],
+                "words": len(_WORD_RE.findall(body)),
+                "syllables": len(_SYLLABLE_RE.findall(body)),
+                "sentences": len(_SENTENCE_END_RE.findall(body)),
+                "paragraphs": len(_PARAGRAPH_RE.findall(body)),
+                "exclamations": body.count("!"),
+                "recipient_mentions": 0, "company_mentions": 0,
+            }
+            for body in bodies
+        ]
+
+        for match in _PHRASE_RE.finditer(text):
+            found = stats[owner(match.start())]["cliches" if match.lastgroup == "cliche" else "spam_triggers"]
+            phrase = match.group()
+            if phrase not in found:
+                found.append(phrase)
+
+        mentions = _mention_pattern((recipient_name or "").strip(), (company or "").strip())
+        if mentions is not None:
+            for match in mentions.finditer(text):
+                stats[owner(match.start())][f"{match.lastgroup}_mentions"] += 1
+
+        return [self._score(s, mentions is not None) for s in stats]
+
+    def _score(self, s: Dict, personalized: bool) -> Dict:
+        words = s["words"]
+        # A body that ends without punctuation is still one sentence
+        sentences = max(s["sentences"], 1 if words else 0)
+        readability = flesch_reading_ease(words, sentences, max(s["syllables"], words))
+        mention_count = s["recipient_mentions"] + s["company_mentions"]
+        density = 100.0 * mention_count / words if words else 0.0
+
+        score = 1.0
+        score -= 0.1 * len(s["cliches"])
+        if words > self.MAX_WORDS:
+            score -= 0.2
+        elif words < self.MIN_WORDS:
+            score -= 0.3
+        if s["paragraphs"] < self.MIN_PARAGRAPHS:
+            score -= 0.1
+        score -= min(0.2, 0.05 * len(s["spam_triggers"]))
+        if s["exclamations"] > 2:
+            score -= 0.05
+        if words and readability < self.MIN_READABILITY:
+            score -= 0.1
+        if personalized and mention_count == 0:
+            score -= 0.1
+
+        return {
+            "score": round(max(0.0, min(1.0, score)), 3),
+            "word_count": words,
+            "sentence_count": sentences,
+            "paragraph_count": s["paragraphs"],
+            "readability": round(readability, 1),
+            "cliches": s["cliches"],
+            "spam_triggers": s["spam_triggers"],
+            "recipient_mentions": s["recipient_mentions"],
+            "company_mentions": s["company_mentions"],
+            "personalization_density": round(density, 2),
+        }
+
+
+draft_quality = DraftQualityAnalyzer()
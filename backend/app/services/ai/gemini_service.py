@@ -1,19 +1,49 @@
 ﻿import os
 import json
-import google.generativeai as genai
-from typing import List, Tuple, Dict, Any
-from dotenv import load_dotenv
+import contextvars
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Tuple, Dict, Any, Optional
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded, check, expired, time_left
+from app.core.metrics import record_llm_call, span
+from app.services.ai.draft_quality import draft_quality
+from app.services.ai.llm_backends import create_model
 
-load_dotenv()
+logger = logging.getLogger(__name__)
+
+_genai = None
+_genai_lock = threading.Lock()
+
+
+def _get_genai():
+    '''
+    Import and configure the Gemini SDK on first use.
+    google.generativeai pulls in grpc/protobuf, so importing it at module
+    load time dominates cold start.
+    '''
+    global _genai
+    if _genai is None:
+        with _genai_lock:
+            if _genai is None:
+                import google.generativeai as genai
+                genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
+                _genai = genai
+    return _genai
+
+
+DEFAULT_MODEL = 'gemini-2.5-flash'
+FALLBACK_SUBJECT_LINES = ('Following up on our conversation', 'Question about your team', 'Brief introduction')
 
-# Configure Gemini
-genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
 
 class GeminiService:
     '''Service for interacting with Google Gemini Flash'''
     
-    def __init__(self, model_name: str = 'gemini-2.5-flash'):
-        self.model = genai.GenerativeModel(model_name)
+    def __init__(self, model_name: str = DEFAULT_MODEL):
+        self.model_name = model_name
+        self._model = None
         
         # Generation config for better control
         self.generation_config = {
@@ -43,52 +73,152 @@ class GeminiService:
             },
         ]
     
+    @property
+    def model(self):
+        '''
+        Model from the configured LLM_BACKEND, created on first use
+        (a genai GenerativeModel unless settings say local/fake)
+        '''
+        if self._model is None:
+            self._model = create_model(self.model_name)
+        return self._model
+    
+    @property
+    def display_name(self) -> str:
+        '''Model that actually answers: e.g. gemini-2.5-flash or local:llama3.1:8b'''
+        if settings.LLM_BACKEND == 'gemini':
+            return self.model_name
+        served = getattr(self._model, 'served_model', None) or self.model_name
+        return f'{settings.LLM_BACKEND}:{served}'
+    
+    def warm_up(self) -> None:
+        '''Import the SDK and build the model ahead of the first request'''
+        _ = self.model
+    
+    def _generate_content(self, prompt: str, generation_config: Dict[str, Any]):
+        '''
+        Call the model once, recording latency and token usage
+        
+        The call times out with the request deadline (LLM_TIMEOUT at most);
+        raises DeadlineExceeded when there is no time left to make it.
+        '''
+        check('llm_call')
+        cap = settings.LLM_LOCAL_TIMEOUT if settings.LLM_BACKEND == 'local' else settings.LLM_TIMEOUT
+        try:
+            with span('llm_call'):
+                response = self.model.generate_content(
+                    prompt,
+                    generation_config=generation_config,
+                    safety_settings=self.safety_settings,
+                    request_options={'timeout': time_left(cap)}
+                )
+            usage = getattr(response, 'usage_metadata', None)
+            record_llm_call(
+                self.display_name,
+                'success',
+                prompt_tokens=getattr(usage, 'prompt_token_count', 0) or 0,
+                completion_tokens=getattr(usage, 'candidates_token_count', 0) or 0,
+            )
+            return response
+        except Exception as e:
+            record_llm_call(self.display_name, 'error')
+            if expired():
+                raise DeadlineExceeded(f'Request deadline exceeded during llm_call: {e}') from e
+            raise Exception(f'Gemini generation error: {str(e)}')
+    
     def generate(self, prompt: str) -> str:
         '''Generate text from prompt'''
+        return self._generate_content(prompt, self.generation_config).text
+    
+    def generate_candidates(self, prompt: str, count: int) -> List[str]:
+        '''
+        Generate `count` independent completions for one prompt
+        
+        Asks for them in a single request (candidate_count); models or
+        prompts that refuse multiple candidates fall back to parallel calls.
+        '''
+        if count <= 1:
+            return [self.generate(prompt)]
         try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=self.generation_config,
-                safety_settings=self.safety_settings
+            response = self._generate_content(
+                prompt, {**self.generation_config, 'candidate_count': count}
             )
-            return response.text
+            texts = [
+                ''.join(part.text for part in candidate.content.parts)
+                for candidate in response.candidates
+            ]
+            if len(texts) >= count:
+                return texts
+            logger.warning(f'Got {len(texts)} of {count} candidates, topping up with parallel calls')
         except Exception as e:
-            raise Exception(f'Gemini generation error: {str(e)}')
+            logger.warning(f'candidate_count={count} failed, using parallel calls: {e}')
+            texts = []
+        
+        missing = count - len(texts)
+        with ThreadPoolExecutor(max_workers=missing) as pool:
+            # Copy the context so each call still lands in the request trace
+            futures = [
+                pool.submit(contextvars.copy_context().run, self.generate, prompt)
+                for _ in range(missing)
+            ]
+            texts += [future.result() for future in futures]
+        return texts
+    
+    @staticmethod
+    def _parse_json(response_text: str) -> Dict[str, Any]:
+        '''Parse JSON from a response, unwrapping ```json fences'''
+        # Sometimes Gemini adds markdown code blocks
+        if '```json' in response_text:
+            # Extract JSON from markdown
+            parts = response_text.split('```json')
+            if len(parts) > 1:
+                json_str = parts[1].split('```')[0].strip()
+            else:
+                json_str = response_text.strip()
+        elif '```' in response_text:
+            parts = response_text.split('```')
+            if len(parts) > 1:
+                json_str = parts[1].strip()
+            else:
+                json_str = response_text.strip()
+        else:
+            json_str = response_text.strip()
+        
+        return json.loads(json_str)
     
     def generate_json(self, prompt: str) -> Dict[str, Any]:
         '''Generate JSON response from prompt'''
         response_text = None
         try:
             response_text = self.generate(prompt)
-            
-            # Try to parse JSON from response
-            # Sometimes Gemini adds markdown code blocks
-            if '```json' in response_text:
-                # Extract JSON from markdown
-                parts = response_text.split('```json')
-                if len(parts) > 1:
-                    json_str = parts[1].split('```')[0].strip()
-                else:
-                    json_str = response_text.strip()
-            elif '```' in response_text:
-                parts = response_text.split('```')
-                if len(parts) > 1:
-                    json_str = parts[1].strip()
-                else:
-                    json_str = response_text.strip()
-            else:
-                json_str = response_text.strip()
-            
-            return json.loads(json_str)
+            return self._parse_json(response_text)
         
         except json.JSONDecodeError as e:
             raise Exception(f'Failed to parse JSON from Gemini: {str(e)}. Response: {response_text}')
         except Exception as e:
             raise Exception(f'Gemini JSON generation error: {str(e)}')
+    
+    def generate_json_candidates(self, prompt: str, count: int) -> List[Dict[str, Any]]:
+        '''Generate several JSON responses; candidates that don't parse are dropped'''
+        parsed = []
+        for text in self.generate_candidates(prompt, count):
+            try:
+                parsed.append(self._parse_json(text))
+            except json.JSONDecodeError as e:
+                logger.warning(f'Dropping unparseable candidate: {e}')
+        if not parsed:
+            raise Exception('Gemini JSON generation error: no candidate parsed as JSON')
+        return parsed
 
     
-    def generate_subject_lines(self, prompt: str) -> List[str]:
-        '''Generate multiple subject line variations'''
+    def generate_subject_lines(self, prompt: str, raise_errors: bool = False) -> List[str]:
+        '''
+        Generate multiple subject line variations
+        
+        Unparseable output falls back to line splitting. If the model call
+        itself fails, canned subject lines are returned unless raise_errors
+        is set (so the model router can try another model).
+        '''
         response_text = None
         try:
             response_text = self.generate(prompt)
@@ -122,6 +252,8 @@ class GeminiService:
             return subject_lines
         
         except Exception as e:
+            if response_text is None and raise_errors:
+                raise
             # Fallback: split by newlines if we have response_text
             if response_text:
                 lines = response_text.strip().split('\n')
@@ -135,39 +267,35 @@ class GeminiService:
                 
                 return cleaned[:3] if cleaned else ['Following up on our conversation']
             else:
-                return ['Following up on our conversation', 'Question about your team', 'Brief introduction']
+                return list(FALLBACK_SUBJECT_LINES)
     
-    def calculate_confidence(self, email_body: str) -> float:
+    def calculate_confidence(
+        self,
+        email_body: str,
+        recipient_name: Optional[str] = None,
+        company: Optional[str] = None
+    ) -> float:
         '''
         Calculate confidence score based on email quality
-        Checks for cliches, length, structure
+        Checks for cliches, spam triggers, length, structure, readability
+        and personalization (see draft_quality.py)
         '''
-        score = 1.0
-        
-        # Cliche detection (reduce score)
-        cliches = [
-            'passionate', 'rockstar', 'ninja', 'guru',
-            'fast-paced environment', 'team player',
-            'think outside the box', 'hit the ground running',
-            'hope this email finds you well',
-            'would love the opportunity'
-        ]
-        
-        lower_body = email_body.lower()
-        for cliche in cliches:
-            if cliche in lower_body:
-                score -= 0.1
-        
-        # Length check
-        word_count = len(email_body.split())
-        if word_count > 200:
-            score -= 0.2
-        elif word_count < 50:
-            score -= 0.3
-        
-        # Structure check (paragraphs)
-        paragraphs = [p for p in email_body.split('\n\n') if p.strip()]
-        if len(paragraphs) < 2:
-            score -= 0.1
-        
-        return max(0.0, min(1.0, score))
+        return draft_quality.analyze(email_body, recipient_name, company)['score']
+    
+    def calculate_confidence_batch(
+        self,
+        email_bodies: List[str],
+        recipient_name: Optional[str] = None,
+        company: Optional[str] = None
+    ) -> List[float]:
+        '''Confidence for several drafts to the same recipient in one pass'''
+        return [q['score'] for q in draft_quality.analyze_batch(email_bodies, recipient_name, company)]
+
+
+@lru_cache()
+def get_gemini_service(model_name: str = DEFAULT_MODEL) -> GeminiService:
+    '''
+    Get GeminiService instance for a model (one per model name)
+    Construction is cheap; the SDK is only loaded when the model is first used.
+    '''
+    return GeminiService(model_name)
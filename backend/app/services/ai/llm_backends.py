@@ -0,0 +1,168 @@
+"""
+LLM backends behind GeminiService
+
+GeminiService only needs an object with the GenerativeModel call shape:
+
+    model.generate_content(prompt, generation_config=..., safety_settings=...)
+    -> response with .text, .candidates[i].content.parts and .usage_metadata
+
+settings.LLM_BACKEND picks who provides it:
+- "gemini": google.generativeai (default)
+- "local":  an OpenAI-compatible /chat/completions server on LLM_LOCAL_URL
+            (llama.cpp `llama-server`, Ollama, vLLM, LM Studio, ...)
+- "fake":   deterministic canned output, no network, no latency
+
+Other backends (e.g. the load-test harness) can be added with
+register_backend().
+"""
+import hashlib
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import settings
+
+
+class _Part:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _Content:
+    def __init__(self, text: str):
+        self.parts = [_Part(text)]
+
+
+class _Candidate:
+    def __init__(self, text: str):
+        self.content = _Content(text)
+
+
+class _Usage:
+    def __init__(self, prompt_tokens: int, completion_tokens: int):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = completion_tokens
+
+
+class LLMResponse:
+    """Response with the attributes GeminiService reads from genai responses"""
+
+    def __init__(self, texts: List[str], prompt_tokens: int = 0, completion_tokens: int = 0):
+        if not texts:
+            raise ValueError("LLM returned no candidates")
+        self.text = texts[0]
+        self.candidates = [_Candidate(text) for text in texts]
+        self.usage_metadata = _Usage(prompt_tokens, completion_tokens)
+
+
+class LocalChatModel:
+    """
+    OpenAI-compatible chat completions client (llama.cpp server, Ollama, ...)
+
+    Every routed model name maps to LLM_LOCAL_MODEL: the router's Gemini
+    names mean nothing to a local server.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, model: Optional[str] = None,
+                 timeout: Optional[float] = None):
+        import httpx  # installed with supabase
+
+        self.base_url = (base_url or settings.LLM_LOCAL_URL).rstrip("/")
+        self.served_model = model or settings.LLM_LOCAL_MODEL
+        self._client = httpx.Client(timeout=timeout or settings.LLM_LOCAL_TIMEOUT)
+
+    def generate_content(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None,
+                         safety_settings=None, **kwargs) -> LLMResponse:
+        config = generation_config or {}
+        payload = {
+            "model": self.served_model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": config.get("temperature", 0.7),
+            "top_p": config.get("top_p", 0.9),
+            "max_tokens": config.get("max_output_tokens", 4096),
+            # Servers that ignore n return one choice; GeminiService tops up
+            "n": config.get("candidate_count", 1),
+        }
+        # Per-call timeout from the request deadline, as genai's request_options
+        timeout = (kwargs.get("request_options") or {}).get("timeout", self._client.timeout)
+        response = self._client.post(f"{self.base_url}/chat/completions", json=payload, timeout=timeout)
+        if response.status_code >= 400:
+            raise Exception(f"Local LLM error {response.status_code}: {response.text[:200]}")
+        data = response.json()
+        usage = data.get("usage") or {}
+        return LLMResponse(
+            [choice["message"]["content"] for choice in data.get("choices", [])],
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            completion_tokens=usage.get("completion_tokens", 0),
+        )
+
+
+class FakeModel:
+    """
+    Deterministic offline model: same prompt, same output
+
+    Subject-line prompts get a JSON array, everything else a JSON email
+    addressed to the RECIPIENT in the prompt.
+    """
+
+    def generate_content(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None,
+                         safety_settings=None, **kwargs) -> LLMResponse:
+        count = max(1, int((generation_config or {}).get("candidate_count", 1)))
+        name = _search(r"RECIPIENT: (\w+)", prompt) or _search(r"outreach to (\w+)", prompt) or "there"
+        company = _search(r" at ([^\n,]+)", prompt) or "your company"
+        seed = int(hashlib.sha1(prompt.encode()).hexdigest()[:8], 16)
+
+        if "JSON array of 3 subject lines" in prompt:
+            texts = [json.dumps([
+                f"I Know What You're Building at {company}",
+                f"{name}, a quick note on {company}'s roadmap",
+                "Not another resume blast ;) reaching out with intent",
+            ])] * count
+        else:
+            texts = [
+                json.dumps({
+                    "subject": f"I Know What You're Building at {company}",
+                    "body": (
+                        f"Hi {name},\n\nReaching out because what {company} is building genuinely clicked "
+                        f"(draft {(seed + i) % 97}).\n\nI've shipped production services across backend, "
+                        "cloud and AI systems, and I'd like to bring that to your team.\n\n"
+                        "Would a 15 minute chat next week work?\n\nWarmly,\nReachCraft"
+                    ),
+                    "key_hook": f"Connects shipped systems work to {company}'s roadmap",
+                })
+                for i in range(count)
+            ]
+        return LLMResponse(texts, prompt_tokens=len(prompt) // 4,
+                           completion_tokens=sum(len(t) for t in texts) // 4)
+
+
+def _search(pattern: str, text: str) -> Optional[str]:
+    found = re.search(pattern, text)
+    return found.group(1).strip() if found else None
+
+
+def _gemini_model(model_name: str):
+    from app.services.ai.gemini_service import _get_genai
+    return _get_genai().GenerativeModel(model_name)
+
+
+_BACKENDS: Dict[str, Callable[[str], Any]] = {
+    "gemini": _gemini_model,
+    "local": lambda model_name: LocalChatModel(),
+    "fake": lambda model_name: FakeModel(),
+}
+
+
+def register_backend(name: str, factory: Callable[[str], Any]) -> None:
+    """Add a backend: factory(model_name) -> object with generate_content()"""
+    _BACKENDS[name] = factory
+
+
+def create_model(model_name: str, backend: Optional[str] = None):
+    """Model object for `model_name` from the configured (or given) backend"""
+    backend = backend or settings.LLM_BACKEND
+    try:
+        factory = _BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown LLM_BACKEND {backend!r}; expected one of {', '.join(_BACKENDS)}")
+    return factory(model_name)
@@ -0,0 +1,160 @@
+"""
+Per-task Gemini model routing
+
+Each task (subject lines, email body, JD analysis) has latency/cost/quality
+targets in settings.LLM_TASK_TARGETS. The router orders the models in
+MODEL_CATALOG for a task:
+1. a model pinned in settings.LLM_TASK_MODELS, if any
+2. models that meet every target, cheapest first
+3. the rest as fallbacks, preferring ones still within the cost target
+
+Latency estimates start from the catalog and follow observed call times.
+A model that fails is skipped for the next try; one that hits a quota limit
+(429 / ResourceExhausted) is also put on cooldown so other requests route
+around it. Cooldowns live in the SQLite cache, so every worker process
+routes around the quota another one hit; latency estimates stay per
+process. Fallbacks stop once the request deadline has passed: the
+DeadlineExceeded goes to the caller instead of starting another model.
+"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+
+from app.core.config import settings
+from app.core.deadline import DeadlineExceeded, check
+from app.db.cache_store import SQLiteCache
+from app.services.ai.gemini_service import GeminiService, get_gemini_service
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# p50 latency is for a ~300 token completion; cost is USD per 1M output tokens
+MODEL_CATALOG: Dict[str, Dict[str, float]] = {
+    "gemini-2.5-flash-lite": {"p50_latency": 0.8, "cost_per_mtok": 0.40, "quality": 1},
+    "gemini-2.0-flash": {"p50_latency": 1.0, "cost_per_mtok": 0.40, "quality": 1},
+    "gemini-2.5-flash": {"p50_latency": 2.5, "cost_per_mtok": 2.50, "quality": 2},
+    "gemini-2.5-pro": {"p50_latency": 6.0, "cost_per_mtok": 10.00, "quality": 3},
+}
+
+QUOTA_MARKERS = ("429", "quota", "resourceexhausted", "resource_exhausted", "rate limit")
+
+# Weight of the newest observation in the latency moving average
+LATENCY_ALPHA = 0.2
+
+
+def is_quota_error(error: Exception) -> bool:
+    message = str(error).lower()
+    return any(marker in message for marker in QUOTA_MARKERS)
+
+
+class ModelRouter:
+    """
+    Usage:
+        subject_lines, model = model_router.run("subject", lambda g: g.generate_subject_lines(prompt))
+    """
+
+    def __init__(
+        self,
+        catalog: Optional[Dict[str, Dict[str, float]]] = None,
+        targets: Optional[Dict[str, Dict[str, float]]] = None,
+        pinned: Optional[Dict[str, str]] = None,
+        max_attempts: Optional[int] = None,
+        quota_cooldown: Optional[float] = None,
+        cooldowns: Optional[SQLiteCache] = None,
+    ):
+        self.catalog = catalog or MODEL_CATALOG
+        self.targets = targets or settings.LLM_TASK_TARGETS
+        self.pinned = pinned if pinned is not None else settings.LLM_TASK_MODELS
+        self.max_attempts = max_attempts or settings.LLM_MAX_ATTEMPTS
+        self.quota_cooldown = settings.LLM_QUOTA_COOLDOWN if quota_cooldown is None else quota_cooldown
+        self._lock = threading.Lock()
+        # (task, model) -> smoothed latency; model -> cooldown deadline (shared)
+        self._latency: Dict[Tuple[str, str], float] = {}
+        self.cooldowns = cooldowns or SQLiteCache(settings.CACHE_DB_PATH, "llm_cooldowns")
+
+    def expected_latency(self, task: str, model: str) -> float:
+        with self._lock:
+            return self._latency.get((task, model), self.catalog[model]["p50_latency"])
+
+    def candidates(self, task: str) -> List[str]:
+        """Models to try for `task`, in order"""
+        target = self.targets.get(task, {})
+        max_latency = target.get("max_latency", float("inf"))
+        max_cost = target.get("max_cost", float("inf"))
+        min_quality = target.get("min_quality", 0)
+
+        def fits(model: str) -> bool:
+            spec = self.catalog[model]
+            return (
+                spec["quality"] >= min_quality
+                and spec["cost_per_mtok"] <= max_cost
+                and self.expected_latency(task, model) <= max_latency
+            )
+
+        def cost_then_latency(model: str) -> Tuple[float, float]:
+            return self.catalog[model]["cost_per_mtok"], self.expected_latency(task, model)
+
+        preferred = sorted((m for m in self.catalog if fits(m)), key=cost_then_latency)
+        fallbacks = sorted(
+            (m for m in self.catalog if not fits(m)),
+            key=lambda m: (
+                self.catalog[m]["cost_per_mtok"] > max_cost,
+                self.catalog[m]["quality"] < min_quality,
+                cost_then_latency(m),
+            ),
+        )
+        ordered = preferred + fallbacks
+
+        pinned = self.pinned.get(task)
+        if pinned:
+            ordered = [pinned] + [m for m in ordered if m != pinned]
+
+        # Models on quota cooldown go last rather than disappearing
+        cooling = {m for m, _ in self.cooldowns.items()}
+        return [m for m in ordered if m not in cooling] + [m for m in ordered if m in cooling]
+
+    def record_success(self, task: str, model: str, seconds: float) -> None:
+        with self._lock:
+            previous = self._latency.get((task, model))
+            self._latency[(task, model)] = (
+                seconds if previous is None
+                else (1 - LATENCY_ALPHA) * previous + LATENCY_ALPHA * seconds
+            )
+        if self.cooldowns.contains(model):
+            self.cooldowns.delete(model)
+
+    def record_failure(self, model: str, error: Exception) -> None:
+        if is_quota_error(error):
+            self.cooldowns.set(model, time.time() + self.quota_cooldown, ttl=self.quota_cooldown)
+            logger.warning(f"{model} hit a quota limit; cooling down for {self.quota_cooldown:g}s")
+
+    def run(self, task: str, fn: Callable[[GeminiService], T]) -> Tuple[T, str]:
+        """
+        Call fn with a GeminiService for the best model, falling back on errors
+
+        Returns (result, model actually used; backend-prefixed when
+        LLM_BACKEND isn't gemini). Raises the last error when every attempt
+        fails, and DeadlineExceeded when the request runs out of time.
+        """
+        last_error: Optional[Exception] = None
+        for model in self.candidates(task)[:self.max_attempts]:
+            check(task)
+            service = get_gemini_service(model)
+            started = time.perf_counter()
+            try:
+                result = fn(service)
+            except DeadlineExceeded:
+                raise
+            except Exception as e:
+                last_error = e
+                self.record_failure(model, e)
+                logger.warning(f"{task} on {model} failed, trying next model: {e}")
+                continue
+            self.record_success(task, model, time.perf_counter() - started)
+            return result, service.display_name
+        raise last_error or Exception(f"No model configured for task {task}")
+
+
+model_router = ModelRouter()
@@ -0,0 +1,157 @@
+"""
+Prompt token budgeting
+
+Every user-supplied section of a prompt (company mission, passion point,
+tech stack, ...) gets a token cap, and long job descriptions are reduced
+to the sentences that mention the role and the tech stack. PromptBudget
+records what was trimmed so the route can report prompt size.
+
+Token counts are estimated at ~4 characters per token (close enough for
+Gemini on English text, and free: no count_tokens round trip).
+"""
+import re
+from typing import Dict, Iterable, List, Optional
+
+from app.core.config import settings
+
+CHARS_PER_TOKEN = 4
+
+# Token caps per prompt section; list sections are capped by item count
+SECTION_TOKEN_CAPS: Dict[str, int] = {
+    "recipient_title": 20,
+    "role_name": 20,
+    "company_mission": 160,
+    "specific_passion_point": 120,
+    "technical_hook": 120,
+}
+SECTION_ITEM_CAPS: Dict[str, int] = {
+    "company_tech_stack": 15,
+    "company_notable_clients": 10,
+    "sender_skills": 8,
+}
+
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD_RE = re.compile(r"[a-z0-9+#./-]+")
+_ROLE_STOPWORDS = {"senior", "junior", "staff", "lead", "principal", "the", "and", "of", "i", "ii", "iii"}
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to about max_tokens, preferring a sentence or word boundary"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    limit = max_tokens * CHARS_PER_TOKEN
+    cut = text[:limit]
+    sentence_end = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "))
+    if sentence_end >= limit // 2:
+        return cut[:sentence_end + 1]
+    space = cut.rfind(" ")
+    return (cut[:space] if space > 0 else cut).rstrip(",;:-") + "…"
+
+
+def role_keywords(role_name: Optional[str]) -> List[str]:
+    """'Senior Backend Engineer' -> ['backend', 'engineer']"""
+    return [w for w in _WORD_RE.findall((role_name or "").lower()) if w not in _ROLE_STOPWORDS]
+
+
+def relevant_sentences(text: str, keywords: Iterable[str], max_tokens: int) -> Dict:
+    """
+    Pick the JD sentences that best match `keywords`, within max_tokens
+
+    Sentences score one point per distinct keyword they mention, plus a small
+    bonus for appearing early (JDs open with what the company does). The
+    chosen sentences are returned in their original order.
+
+    Returns {"text": str, "kept": int, "total": int}
+    """
+    sentences = [s.strip() for s in _SENTENCE_SPLIT_RE.split(text or "") if s.strip()]
+    if not sentences:
+        return {"text": "", "kept": 0, "total": 0}
+
+    terms = {k.lower() for k in keywords if k}
+    scored = []
+    for index, sentence in enumerate(sentences):
+        lowered = sentence.lower()
+        hits = sum(1 for term in terms if term in lowered)
+        scored.append((hits + 1.0 / (index + 2), index))
+
+    chosen = []
+    used = 0
+    for _, index in sorted(scored, reverse=True):
+        cost = estimate_tokens(sentences[index] + " ")
+        if used + cost > max_tokens:
+            continue
+        chosen.append(index)
+        used += cost
+    if not chosen:
+        # Even the best sentence is over budget: keep a truncated copy
+        best = max(scored)[1]
+        return {"text": truncate_tokens(sentences[best], max_tokens), "kept": 1, "total": len(sentences)}
+
+    return {
+        "text": " ".join(sentences[i] for i in sorted(chosen)),
+        "kept": len(chosen),
+        "total": len(sentences),
+    }
+
+
+class PromptBudget:
+    """
+    Caps prompt sections and records what was trimmed
+
+    Usage:
+        budget = PromptBudget()
+        mission = budget.cap("company_mission", mission)
+        prompt = ...
+        stats = budget.report(prompt)  # {"tokens": 1830, "trimmed": {...}, ...}
+    """
+
+    def __init__(self, max_prompt_tokens: Optional[int] = None):
+        self.max_prompt_tokens = max_prompt_tokens or settings.PROMPT_MAX_TOKENS
+        self.trimmed: Dict[str, Dict[str, int]] = {}
+        self.job_description: Optional[Dict[str, int]] = None
+
+    def cap(self, section: str, text: Optional[str]) -> Optional[str]:
+        if not text or section not in SECTION_TOKEN_CAPS:
+            return text
+        limit = SECTION_TOKEN_CAPS[section]
+        before = estimate_tokens(text)
+        if before <= limit:
+            return text
+        text = truncate_tokens(text, limit)
+        self.trimmed[section] = {"from_tokens": before, "to_tokens": estimate_tokens(text)}
+        return text
+
+    def cap_list(self, section: str, items: Optional[List[str]]) -> Optional[List[str]]:
+        if not items or section not in SECTION_ITEM_CAPS:
+            return items
+        limit = SECTION_ITEM_CAPS[section]
+        if len(items) <= limit:
+            return items
+        self.trimmed[section] = {"from_items": len(items), "to_items": limit}
+        return items[:limit]
+
+    def condense_job_description(self, job_description: str, keywords: Iterable[str]) -> str:
+        """Relevant JD sentences, within the company_mission cap"""
+        picked = relevant_sentences(job_description, keywords, SECTION_TOKEN_CAPS["company_mission"])
+        self.job_description = {
+            "tokens": estimate_tokens(job_description),
+            "kept_tokens": estimate_tokens(picked["text"]),
+            "sentences": picked["total"],
+            "kept_sentences": picked["kept"],
+        }
+        return picked["text"]
+
+    def report(self, prompt: str) -> Dict:
+        tokens = estimate_tokens(prompt)
+        stats = {"tokens": tokens, "chars": len(prompt), "trimmed": self.trimmed}
+        if self.job_description:
+            stats["job_description"] = self.job_description
+        if tokens > self.max_prompt_tokens:
+            stats["over_budget"] = True
+        return stats
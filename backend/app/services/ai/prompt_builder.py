@@ -1,5 +1,7 @@
 from typing import Optional, List
 
+from app.services.ai.prompt_budget import PromptBudget
+
 
 # Resume-driven profile for Varad
 VARAD_PROFILE = {
@@ -294,15 +296,17 @@ class PromptBuilder:
         sender_role: Optional[str] = None,
         purpose: str = "job_inquiry",
         company_mission: Optional[str] = None,
-        role_name: Optional[str] = None
+        role_name: Optional[str] = None,
+        budget: Optional[PromptBudget] = None
     ) -> str:
         """Use Varad's killer style for subject lines."""
+        budget = budget or PromptBudget()
         return VaradStylePromptBuilder.build_killer_subject_line_prompt(
             recipient_name=recipient_name,
             recipient_company=recipient_company,
-            recipient_title=recipient_title,
-            company_mission=company_mission,
-            role_name=role_name
+            recipient_title=budget.cap("recipient_title", recipient_title),
+            company_mission=budget.cap("company_mission", company_mission),
+            role_name=budget.cap("role_name", role_name)
         )
 
     @staticmethod
@@ -329,25 +333,32 @@ class PromptBuilder:
         sender_calendar: Optional[str] = None,
         specific_passion_point: Optional[str] = None,
         technical_hook: Optional[str] = None,
+        budget: Optional[PromptBudget] = None,
     ) -> str:
-        """Use Varad's winning style for complete emails."""
+        """
+        Use Varad's winning style for complete emails.
+
+        Every free-text section is capped by `budget`; pass your own
+        PromptBudget to read back what was trimmed via budget.report(prompt).
+        """
+        budget = budget or PromptBudget()
         return VaradStylePromptBuilder.build_varad_style_email_prompt(
             recipient_first_name=recipient_first_name,
             recipient_company=recipient_company,
-            recipient_title=recipient_title,
-            role_name=role_interested_in,
+            recipient_title=budget.cap("recipient_title", recipient_title),
+            role_name=budget.cap("role_name", role_interested_in),
             role_url=role_url,
-            company_mission=company_mission,
-            company_tech_stack=company_tech_stack,
-            company_notable_clients=company_notable_clients,
+            company_mission=budget.cap("company_mission", company_mission),
+            company_tech_stack=budget.cap_list("company_tech_stack", company_tech_stack),
+            company_notable_clients=budget.cap_list("company_notable_clients", company_notable_clients),
             sender_name=sender_name,
             sender_email=sender_email or "vnairusa30@gmail.com",
             sender_phone=sender_phone or "+1 (657)-767-9035",
             sender_years_exp="4+",
-            sender_core_skills=sender_skills,
+            sender_core_skills=budget.cap_list("sender_skills", sender_skills),
             sender_portfolio=sender_portfolio or "https://varadnair30.github.io/my_portfolio/",
             sender_linkedin=sender_linkedin or "https://linkedin.com/in/varad-nair",
             sender_calendar=sender_calendar or "https://calendar.app.google/uLbvFdAuXgt4m41EA",
-            specific_passion_point=specific_passion_point,
-            technical_hook=technical_hook,
+            specific_passion_point=budget.cap("specific_passion_point", specific_passion_point),
+            technical_hook=budget.cap("technical_hook", technical_hook),
         )
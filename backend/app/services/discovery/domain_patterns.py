@@ -0,0 +1,159 @@
+"""
+Per-domain address pattern cache
+
+The pattern a company uses (first.last, flast, ...) is inferred from
+addresses harvested off its website, or learned from an earlier SMTP-
+verified discovery, and kept in the SQLite cache. Discovery passes it to
+the pipeline as a hint, so lookups at a known company probe the likely
+address first and skip most of the remaining RCPTs.
+
+A crawl runs once per domain at a time. A lookup waits up to
+DISCOVERY_CRAWL_WAIT (or what is left of the request deadline) for it;
+a slower crawl keeps running in the background and serves later lookups.
+"""
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Sequence
+
+from app.core.config import settings
+from app.core.deadline import time_left
+from app.core.singleflight import SingleFlight
+from app.db.cache_store import SQLiteCache
+from app.services.discovery.names import first_name_variants, last_name_variants
+from app.services.discovery.pipeline import PATTERNS, format_pattern, template_parts
+from app.services.discovery.website_crawler import WebsiteCrawler
+
+logger = logging.getLogger(__name__)
+
+# Shared mailboxes say nothing about how people's addresses are built
+ROLE_MAILBOXES = frozenset({
+    "admin", "billing", "careers", "contact", "enquiries", "hello", "help", "hr", "info",
+    "jobs", "legal", "marketing", "media", "news", "noreply", "no-reply", "office", "press",
+    "privacy", "sales", "security", "support", "team", "webmaster",
+})
+
+
+def _local_parts_by_pattern(names: Iterable[Sequence[str]]) -> Dict[str, str]:
+    """local part -> pattern, for every pattern applied to every (first, last)"""
+    lookup: Dict[str, str] = {}
+    for name in names:
+        first = first_name_variants(name[0])
+        last = last_name_variants(name[1]) if len(name) > 1 else []
+        if not first or not last:
+            continue
+        parts = template_parts(first[0][0], last[0][0], "x")
+        for pattern, template in PATTERNS.items():
+            email = format_pattern(template, parts)
+            if email:
+                lookup.setdefault(email[:-2], pattern)
+    return lookup
+
+
+def classify_local_part(local: str, known: Dict[str, str]) -> Optional[str]:
+    """Pattern of one local part: matched against page names, else by shape"""
+    if local in known:
+        return known[local]
+    for separator, pattern in ((".", "first.last"), ("_", "first_last")):
+        if separator in local:
+            head, _, tail = local.partition(separator)
+            if len(tail) == 1:
+                return "first.l" if separator == "." else None
+            if len(head) == 1:
+                return "f.last" if separator == "." else None
+            return pattern
+    return None
+
+
+def infer_pattern(emails: Iterable[str], names: Iterable[Sequence[str]] = ()) -> Optional[Dict]:
+    """
+    Most common pattern among the personal addresses
+
+    Returns {"pattern", "confidence" (share of classified addresses),
+    "samples"} or None when no address could be classified.
+    """
+    known = _local_parts_by_pattern(names)
+    votes: Counter = Counter()
+    for email in emails:
+        local = email.lower().partition("@")[0]
+        if local in ROLE_MAILBOXES:
+            continue
+        pattern = classify_local_part(local, known)
+        if pattern:
+            votes[pattern] += 1
+    if not votes:
+        return None
+    pattern, count = votes.most_common(1)[0]
+    total = sum(votes.values())
+    return {"pattern": pattern, "confidence": round(count / total, 3), "samples": total}
+
+
+class DomainPatternCache:
+    """
+    Usage:
+        hint = await domain_patterns.lookup("acme.com")   # {"pattern": "first.last", ...} or None
+        domain_patterns.record_verified("acme.com", "first.last")
+    """
+
+    def __init__(self, crawler: Optional[WebsiteCrawler] = None, store: Optional[SQLiteCache] = None):
+        self.crawler = crawler or WebsiteCrawler()
+        self.store = store or SQLiteCache(settings.CACHE_DB_PATH, "domain_patterns")
+        self._flights = SingleFlight()
+
+    def get(self, domain: str) -> Optional[Dict]:
+        """Cached pattern, None if unknown or cached as not found"""
+        entry = self.store.get(domain)
+        return entry if entry and entry.get("pattern") else None
+
+    async def lookup(self, domain: str, wait: Optional[float] = None) -> Optional[Dict]:
+        entry = self.store.get(domain)
+        if entry is not None:
+            return entry if entry.get("pattern") else None
+        if not settings.DISCOVERY_CRAWL_ENABLED:
+            return None
+
+        crawl = asyncio.ensure_future(self._flights.do(domain, lambda: self._crawl(domain)))
+        wait = time_left(settings.DISCOVERY_CRAWL_WAIT) if wait is None else wait
+        try:
+            return await asyncio.wait_for(asyncio.shield(crawl), timeout=wait)
+        except asyncio.TimeoutError:
+            logger.info(f"Crawl of {domain} still running after {wait:g}s; continuing without a pattern")
+            return None
+
+    async def _crawl(self, domain: str) -> Optional[Dict]:
+        try:
+            harvest = await self.crawler.crawl(domain)
+        except Exception as e:
+            logger.warning(f"Crawling {domain} failed: {e}")
+            harvest = {"emails": [], "names": []}
+
+        inferred = infer_pattern(harvest["emails"], harvest["names"])
+        if not inferred:
+            self.store.set(domain, {"pattern": None}, ttl=settings.DOMAIN_PATTERN_NEGATIVE_TTL)
+            return None
+        entry = {
+            **inferred,
+            "source": "website",
+            "examples": harvest["emails"][:5],
+            "updated_at": datetime.utcnow().isoformat(),
+        }
+        self.store.set(domain, entry, ttl=settings.DOMAIN_PATTERN_TTL)
+        logger.info(f"{domain} uses {entry['pattern']} ({entry['samples']} addresses)")
+        return entry
+
+    def record_verified(self, domain: str, pattern: str) -> None:
+        """An SMTP 250 for `pattern` at a non-catch-all domain"""
+        entry = self.get(domain)
+        if entry and entry["pattern"] == pattern and entry["confidence"] >= 0.9:
+            return
+        self.store.set(domain, {
+            "pattern": pattern,
+            "confidence": 0.9,
+            "samples": (entry or {}).get("samples", 0) + 1,
+            "source": "smtp",
+            "updated_at": datetime.utcnow().isoformat(),
+        }, ttl=settings.DOMAIN_PATTERN_TTL)
+
+
+domain_patterns = DomainPatternCache()
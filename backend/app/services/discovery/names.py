@@ -0,0 +1,150 @@
+"""
+Person-name normalization for address generation
+
+Turns what the user typed into the spellings a mail admin would have used
+for the local part, each with a weight (1.0 = the most likely spelling):
+
+    name_variants("José", "van der Berg")
+    -> {"first": [("jose", 1.0), ("joe", 0.25)],
+        "last": [("vanderberg", 1.0), ("berg", 0.6), ("van-der-berg", 0.3)]}
+
+Handles accents and non-decomposable letters (ß, ø, ł, ...), apostrophes
+(O'Brien -> obrien), hyphenated and multi-word names, surname particles
+(van, de, al, ...) and common nicknames in both directions.
+
+Names written only in non-Latin scripts (李, Дмитрий, محمد) have no ASCII
+spelling to build a local part from. Rather than generating nothing and
+reporting "no address found", callers check has_spelling() and raise
+UnsupportedName, which the API turns into a 422.
+"""
+import re
+import unicodedata
+from typing import Dict, List, Tuple
+
+Variants = List[Tuple[str, float]]
+
+# Letters NFKD does not decompose to ASCII
+_TRANSLITERATIONS = str.maketrans({
+    "ß": "ss", "æ": "ae", "œ": "oe", "ø": "o", "ł": "l", "đ": "d", "ð": "d",
+    "þ": "th", "ı": "i", "ŀ": "l", "ħ": "h",
+})
+_APOSTROPHE_RE = re.compile(r"['’‘`´ʼ]")
+_SEPARATOR_RE = re.compile(r"[\s._]+")
+_NON_LOCAL_RE = re.compile(r"[^a-z0-9-]")
+
+SURNAME_PARTICLES = frozenset({
+    "van", "von", "der", "den", "de", "del", "della", "da", "di", "dos", "das", "du",
+    "la", "le", "ter", "ten", "op", "al", "el", "bin", "ibn", "st",
+})
+
+# Formal name -> nicknames; looked up in both directions
+NICKNAMES: Dict[str, Tuple[str, ...]] = {
+    "abigail": ("abby",), "alexander": ("alex",), "alexandra": ("alex",),
+    "andrew": ("andy", "drew"), "anthony": ("tony",), "benjamin": ("ben",),
+    "charles": ("charlie", "chuck"), "christopher": ("chris",), "daniel": ("dan", "danny"),
+    "david": ("dave",), "donald": ("don",), "edward": ("ed", "ted"),
+    "elizabeth": ("liz", "beth"), "gregory": ("greg",), "james": ("jim", "jamie"),
+    "jeffrey": ("jeff",), "jennifer": ("jen", "jenny"), "jessica": ("jess",),
+    "jonathan": ("jon",), "jose": ("joe",), "joseph": ("joe",), "katherine": ("kate", "katie"),
+    "kenneth": ("ken",), "margaret": ("maggie", "meg"), "matthew": ("matt",),
+    "michael": ("mike",), "nathaniel": ("nate",), "nicholas": ("nick",),
+    "patricia": ("pat", "trish"), "rebecca": ("becky",), "richard": ("rick", "rich"),
+    "robert": ("rob", "bob"), "ronald": ("ron",), "samuel": ("sam",),
+    "stephen": ("steve",), "steven": ("steve",), "susan": ("sue",), "thomas": ("tom",),
+    "timothy": ("tim",), "victoria": ("vicky", "tori"), "william": ("will", "bill"),
+    "zachary": ("zach",),
+}
+_FORMAL_NAMES: Dict[str, List[str]] = {}
+for _formal, _nicks in NICKNAMES.items():
+    for _nick in _nicks:
+        _FORMAL_NAMES.setdefault(_nick, []).append(_formal)
+
+NICKNAME_WEIGHT = 0.25
+
+
+class UnsupportedName(ValueError):
+    """Neither name has letters that map to an address local part"""
+
+    def __init__(self, first_name: str, last_name: str):
+        name = f"{first_name} {last_name}".strip()
+        super().__init__(
+            f"Cannot build email addresses from '{name}': it has no Latin letters. "
+            f"Enter a romanized spelling (e.g. as on their LinkedIn profile)."
+        )
+
+
+def transliterate(text: str) -> str:
+    """'José Ñúñez' -> 'jose nunez'; lowercases and drops apostrophes"""
+    text = unicodedata.normalize("NFKD", (text or "").strip().lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _APOSTROPHE_RE.sub("", text.translate(_TRANSLITERATIONS))
+
+
+def name_tokens(text: str) -> List[List[str]]:
+    """Words, each split on hyphens: 'Mary-Kate Ann' -> [['mary', 'kate'], ['ann']]"""
+    words = []
+    for word in _SEPARATOR_RE.split(transliterate(text)):
+        parts = [_NON_LOCAL_RE.sub("", p) for p in word.split("-")]
+        parts = [p for p in parts if p]
+        if parts:
+            words.append(parts)
+    return words
+
+
+def _add(variants: Dict[str, float], spelling: str, weight: float) -> None:
+    if spelling and weight > variants.get(spelling, 0.0):
+        variants[spelling] = weight
+
+
+def _ranked(variants: Dict[str, float]) -> Variants:
+    return sorted(variants.items(), key=lambda item: -item[1])
+
+
+def first_name_variants(first_name: str) -> Variants:
+    words = name_tokens(first_name)
+    if not words:
+        return []
+    variants: Dict[str, float] = {}
+    parts = [p for word in words for p in word]
+    _add(variants, "".join(parts), 1.0)                    # marykate / maryann
+    if len(parts) > 1:
+        _add(variants, parts[0], 0.5)                      # mary
+        if len(words) == 1:
+            _add(variants, "-".join(parts), 0.5)           # mary-kate
+    primary = "".join(parts)
+    for nick in NICKNAMES.get(primary, ()):
+        _add(variants, nick, NICKNAME_WEIGHT)
+    for formal in _FORMAL_NAMES.get(primary, ()):
+        _add(variants, formal, NICKNAME_WEIGHT)
+    return _ranked(variants)
+
+
+def last_name_variants(last_name: str) -> Variants:
+    words = name_tokens(last_name)
+    if not words:
+        return []
+    variants: Dict[str, float] = {}
+    parts = [p for word in words for p in word]
+    _add(variants, "".join(parts), 1.0)                    # vanderberg / smithjones
+
+    core = [p for p in parts if p not in SURNAME_PARTICLES]
+    if core and len(core) < len(parts):
+        _add(variants, "".join(core), 0.6)                 # berg
+    if len(parts) > 1:
+        _add(variants, "-".join(parts), 0.3)               # van-der-berg / smith-jones
+        if len(core) > 1:
+            _add(variants, core[0], 0.4)                   # smith
+            _add(variants, core[-1], 0.4)                  # jones
+    return _ranked(variants)
+
+
+def has_spelling(names: Dict[str, Variants]) -> bool:
+    """Whether name_variants() found any local-part spelling at all"""
+    return any(spelling for variants in names.values() for spelling, _ in variants)
+
+
+def name_variants(first_name: str, last_name: str) -> Dict[str, Variants]:
+    return {
+        "first": first_name_variants(first_name),
+        "last": last_name_variants(last_name) or [("", 1.0)],
+    }
@@ -0,0 +1,653 @@
+"""
+Staged email discovery pipeline
+
+One code path for finding and checking addresses:
+
+    normalize -> pattern_hint -> generate -> syntax -> dns_mx -> catch_all
+              -> smtp_rcpt -> score
+
+Each stage is an object with a `name` and `run(ctx)` that reads and updates
+a DiscoveryContext; stages can be swapped, dropped or added per call.
+A stage that settles every candidate (no MX, server busy, catch-all domain)
+sets ctx.stopped and only the remaining `always_run` stages (score) run.
+Every stage is timed with span(stage.name) and into ctx.timings.
+
+Candidates come out of generate ranked by prior probability. Verification
+opens one SMTP session per domain (through smtp_scheduler), sends the
+catch-all probe and then RCPT TO in rank order over it, and stops at the
+first accepted address.
+
+MX answers and definitive RCPT verdicts (250, 5xx, catch-all or not) go
+to SQLite caches shared by every worker process, so a repeat lookup skips
+DNS and, when every answer it needs is cached, the SMTP session.
+
+Network stages honour the request deadline (app.core.deadline): DNS and
+SMTP timeouts shrink to the time left, and once it has run out the
+remaining candidates are settled as DEADLINE_REACHED and ctx.partial is
+set, instead of the request waiting on a slow mail server.
+
+EmailDiscoveryService, EmailPatternDetector and EmailVerifier are thin
+adapters over this module.
+"""
+import logging
+import re
+import secrets
+import smtplib
+import time
+from contextlib import ExitStack
+from functools import lru_cache
+from string import Formatter
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+import dns.resolver
+
+from app.core.config import settings
+from app.core.deadline import expired, time_left
+from app.core.metrics import record_smtp_response, span
+from app.db.cache_store import SQLiteCache
+from app.services.discovery.names import Variants, has_spelling, name_variants
+from app.services.verification.mx_strategy import RacedSMTP, mx_health
+from app.services.verification.smtp_scheduler import SchedulerBusy, smtp_scheduler
+
+logger = logging.getLogger(__name__)
+
+# Pattern name -> address template, most common first
+PATTERNS: Dict[str, str] = {
+    "first.last": "{first}.{last}@{domain}",     # john.doe@company.com
+    "first": "{first}@{domain}",                 # john@company.com
+    "firstlast": "{first}{last}@{domain}",       # johndoe@company.com
+    "flast": "{f}{last}@{domain}",               # jdoe@company.com
+    "first.l": "{first}.{l}@{domain}",           # john.d@company.com
+    "first_last": "{first}_{last}@{domain}",     # john_doe@company.com
+    "last.first": "{last}.{first}@{domain}",     # doe.john@company.com
+    "f.last": "{f}.{last}@{domain}",             # j.doe@company.com
+    "firstl": "{first}{l}@{domain}",             # johnd@company.com
+    "last": "{last}@{domain}",                   # doe@company.com
+    "lastf": "{last}{f}@{domain}",               # doej@company.com
+}
+
+# Rough share of companies using each pattern; unknown patterns get DEFAULT_PRIOR
+PATTERN_PRIORS: Dict[str, float] = {
+    "first.last": 0.38,
+    "first": 0.16,
+    "flast": 0.14,
+    "firstlast": 0.08,
+    "f.last": 0.05,
+    "first_last": 0.04,
+    "first.l": 0.03,
+    "firstl": 0.03,
+    "last.first": 0.02,
+    "last": 0.02,
+    "lastf": 0.02,
+}
+DEFAULT_PRIOR = 0.01
+# Even a confident website harvest can miss a second pattern
+MAX_HINT_PRIOR = 0.95
+PATTERN_NAMES: Dict[str, str] = {template: name for name, template in PATTERNS.items()}
+
+EMAIL_RE = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
+EMAIL_IN_TEXT_RE = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
+_DOMAIN_PREFIX_RE = re.compile(r"^(?:[a-z][a-z0-9+.-]*://)?(?:www\.)?")
+
+SMTP_PORT = 25
+MAIL_FROM = "verify@example.com"
+
+# domain -> {"records", "error"}; email or "catch-all:<domain>" -> RCPT verdict
+mx_cache = SQLiteCache(settings.CACHE_DB_PATH, "mx_records")
+verdict_cache = SQLiteCache(settings.CACHE_DB_PATH, "smtp_verdicts")
+
+
+def normalize_domain(domain: str) -> str:
+    """'https://www.Company.com/about' -> 'company.com'"""
+    domain = _DOMAIN_PREFIX_RE.sub("", (domain or "").strip().lower())
+    return domain.split("/", 1)[0].split("?", 1)[0].rstrip(".")
+
+
+def is_valid_email(email: str) -> bool:
+    return EMAIL_RE.match(email) is not None
+
+
+@lru_cache(maxsize=256)
+def _template_fields(template: str) -> FrozenSet[str]:
+    return frozenset(field for _, field, _, _ in Formatter().parse(template) if field)
+
+
+def format_pattern(template: str, parts: Dict[str, str]) -> Optional[str]:
+    """Fill a template, or None if it needs a name part that is empty"""
+    if any(not parts.get(field) for field in _template_fields(template)):
+        return None
+    return template.format(**parts)
+
+
+def _candidate(email: str, pattern: str, prior: Optional[float] = None) -> Dict:
+    return {
+        "email": email,
+        "pattern": pattern,
+        "prior": prior,
+        "valid": None,
+        "confidence": 0.5,  # Default for unverified
+        "reason": "Pattern generated",
+    }
+
+
+class DiscoveryContext:
+    """State handed from stage to stage"""
+
+    def __init__(
+        self,
+        first_name: str = "",
+        last_name: str = "",
+        domain: str = "",
+        verify: bool = True,
+        user_key: str = "anonymous",
+        emails: Optional[Iterable[str]] = None,
+        pattern_hint: Optional[Dict] = None,
+    ):
+        self.first_name = first_name or ""
+        self.last_name = last_name or ""
+        self.domain = domain or ""
+        self.verify = verify
+        self.user_key = user_key
+        # Spellings of each name with weights, and the top spelling's
+        # template parts (first, last, f, l, domain)
+        self.names: Dict[str, Variants] = {}
+        self.parts: Dict[str, str] = {}
+        # Known company pattern ({"pattern", "confidence", ...}, see
+        # domain_patterns.py), the priors it implies and the RCPT budget
+        self.pattern_hint = pattern_hint
+        self.pattern_priors: Optional[Dict[str, float]] = None
+        self.max_probes: Optional[int] = None
+        self.candidates: List[Dict] = [
+            _candidate(email.strip().lower(), "given") for email in (emails or [])
+        ]
+        self.mx_hosts: List[str] = []
+        self.mx_preferences: Dict[str, int] = {}
+        self.catch_all: Optional[bool] = None
+        self.session: Optional["ProbeSession"] = None
+        self.timings: Dict[str, float] = {}
+        self.stopped = False
+        # Set when the request deadline cut verification short
+        self.partial = False
+        # Set when the name has no Latin letters to generate addresses from
+        self.unsupported_name = False
+
+    def settle(self, outcome: Dict, candidates: Optional[List[Dict]] = None) -> None:
+        """Apply one outcome to the given (default: all) candidates"""
+        for candidate in self.candidates if candidates is None else candidates:
+            candidate.update(outcome)
+
+    def out_of_time(self, candidates: Optional[List[Dict]] = None) -> None:
+        """Settle the given (default: all) candidates as cut off by the deadline"""
+        self.settle(DEADLINE_REACHED, candidates)
+        self.partial = True
+        self.stopped = True
+
+
+def template_parts(first: str, last: str, domain: str) -> Dict[str, str]:
+    return {"first": first, "last": last, "f": first[:1], "l": last[:1], "domain": domain}
+
+
+class NormalizeStage:
+    """Transliterate names (see names.py) and strip the domain to a hostname"""
+
+    name = "normalize"
+    always_run = False
+
+    def run(self, ctx: DiscoveryContext) -> None:
+        if ctx.candidates and not ctx.domain:
+            ctx.domain = ctx.candidates[0]["email"].rpartition("@")[2]
+        ctx.domain = normalize_domain(ctx.domain)
+        ctx.names = name_variants(ctx.first_name, ctx.last_name)
+        if not ctx.candidates and not has_spelling(ctx.names):
+            ctx.unsupported_name = True
+            ctx.stopped = True
+        first = ctx.names["first"][0][0] if ctx.names["first"] else ""
+        ctx.parts = template_parts(first, ctx.names["last"][0][0], ctx.domain)
+
+
+class PatternHintStage:
+    """
+    Shift prior mass to the company's known pattern and cap RCPTs
+
+    The hinted pattern gets the hint's confidence (at most MAX_HINT_PRIOR)
+    as its prior; the other patterns share the rest in proportion to
+    PATTERN_PRIORS.
+    """
+
+    name = "pattern_hint"
+    always_run = False
+
+    def __init__(self, min_confidence: Optional[float] = None, max_probes: int = 3):
+        self.min_confidence = (
+            settings.DISCOVERY_PATTERN_MIN_CONFIDENCE if min_confidence is None else min_confidence
+        )
+        self.max_probes = max_probes
+
+    def run(self, ctx: DiscoveryContext) -> None:
+        hint = ctx.pattern_hint or {}
+        pattern = hint.get("pattern")
+        confidence = min(hint.get("confidence", 0.0), MAX_HINT_PRIOR)
+        if pattern not in PATTERNS or confidence < self.min_confidence:
+            return
+        others = sum(p for name, p in PATTERN_PRIORS.items() if name != pattern) or 1.0
+        ctx.pattern_priors = {
+            name: confidence if name == pattern else (1 - confidence) * prior / others
+            for name, prior in PATTERN_PRIORS.items()
+        }
+        ctx.max_probes = self.max_probes
+
+
+class GenerateStage:
+    """
+    Fill every pattern with every name spelling, ranked by prior
+
+    A candidate's prior is pattern prior x first-name weight x last-name
+    weight; addresses reachable several ways add up, and the kept set is
+    renormalized to sum to 1. Skipped when the caller passed addresses.
+    """
+
+    name = "generate"
+    always_run = False
+
+    def __init__(self, patterns: Optional[Dict[str, str]] = None,
+                 priors: Optional[Dict[str, float]] = None, max_candidates: Optional[int] = None):
+        self.patterns = PATTERNS if patterns is None else patterns
+        self.priors = PATTERN_PRIORS if priors is None else priors
+        self.max_candidates = max_candidates or settings.DISCOVERY_MAX_CANDIDATES
+
+    def run(self, ctx: DiscoveryContext) -> None:
+        if ctx.candidates:
+            return
+        priors = ctx.pattern_priors or self.priors
+        scores: Dict[str, float] = {}
+        patterns: Dict[str, str] = {}
+        for first, first_weight in ctx.names.get("first", []):
+            for last, last_weight in ctx.names.get("last", []):
+                parts = template_parts(first, last, ctx.domain)
+                for pattern, template in self.patterns.items():
+                    email = format_pattern(template, parts)
+                    if not email:
+                        continue
+                    score = priors.get(pattern, DEFAULT_PRIOR) * first_weight * last_weight
+                    scores[email] = scores.get(email, 0.0) + score
+                    patterns.setdefault(email, pattern)
+
+        ranked = sorted(scores, key=lambda email: -scores[email])[:self.max_candidates]
+        total = sum(scores[email] for email in ranked) or 1.0
+        ctx.candidates = [_candidate(email, patterns[email], round(scores[email] / total, 4))
+                          for email in ranked]
+
+
+class SyntaxStage:
+    name = "syntax"
+    always_run = False
+
+    def run(self, ctx: DiscoveryContext) -> None:
+        ctx.candidates = [c for c in ctx.candidates if is_valid_email(c["email"])]
+        if not ctx.candidates:
+            ctx.stopped = True
+
+
+def _cache_mx(domain: str, records: List[Tuple[int, str]], error: Optional[str],
+              ttl: float) -> Tuple[List[Tuple[int, str]], Optional[str]]:
+    mx_cache.set(domain, {"records": records, "error": error}, ttl=ttl)
+    return records, error
+
+
+def resolve_mx_records(domain: str) -> Tuple[List[Tuple[int, str]], Optional[str]]:
+    """
+    ([(preference, host), ...] lowest preference first, None) or ([], reason)
+
+    Answers are cached for their TTL (at most MX_CACHE_TTL), NXDOMAIN and
+    empty answers for MX_NEGATIVE_TTL; timeouts and other errors are not.
+    """
+    cached = mx_cache.get(domain)
+    if cached is not None:
+        return [tuple(record) for record in cached["records"]], cached["error"]
+    try:
+        answer = dns.resolver.resolve(domain, "MX", lifetime=time_left(settings.DNS_TIMEOUT))
+    except dns.resolver.NXDOMAIN:
+        return _cache_mx(domain, [], "Domain does not exist", settings.MX_NEGATIVE_TTL)
+    except dns.resolver.NoAnswer:
+        return _cache_mx(domain, [], "No MX records found", settings.MX_NEGATIVE_TTL)
+    except Exception as e:
+        logger.warning(f"No MX records for {domain}: {e}")
+        return [], "No MX records found"
+    # Resolver order is arbitrary; preference is what the domain asked for
+    records = sorted(
+        ((int(record.preference), str(record.exchange)) for record in answer),
+        key=lambda record: record[0],
+    )
+    if not records:
+        return _cache_mx(domain, [], "No MX records found", settings.MX_NEGATIVE_TTL)
+    return _cache_mx(domain, records, None, min(answer.rrset.ttl, settings.MX_CACHE_TTL))
+
+
+def resolve_mx(domain: str) -> Tuple[List[str], Optional[str]]:
+    """(MX hosts by preference, None) or ([], reason)"""
+    records, error = resolve_mx_records(domain)
+    return [host for _, host in records], error
+
+
+class MxStage:
+    name = "dns_mx"
+    always_run = False
+    network = True
+
+    def run(self, ctx: DiscoveryContext) -> None:
+        if not ctx.verify:
+            return
+        records, error = resolve_mx_records(ctx.domain)
+        if error and expired():
+            # A lookup cut short by the deadline says nothing about the domain
+            ctx.out_of_time()
+            return
+        if error:
+            ctx.settle({"valid": False, "confidence": 0.0, "reason": error})
+            ctx.stopped = True
+            return
+        ctx.mx_hosts = [host for _, host in records]
+        ctx.mx_preferences = {host: preference for preference, host in records}
+
+
+class MailServerBusy(Exception):
+    """The MX host answered the connection with 421"""
+
+
+class ProbeSession:
+    """
+    One SMTP conversation with a domain's mail servers: HELO, MAIL FROM, RCPTs
+
+    The connection is raced across the top MX hosts (see mx_strategy.py),
+    healthiest and fastest first, leaving out hosts that are backing off
+    after a 421/451. The smtp_scheduler slot and the per-minute probe budget
+    (one unit per RCPT) belong to the domain's most preferred MX, which
+    stands in for its mail provider. Unlike the health order, that doesn't
+    change from one probe to the next, so every session for the provider
+    counts against the same limits. close() reports the most telling reply
+    code for the host that actually answered.
+    """
+
+    def __init__(self, mx_hosts: Sequence[str], user_key: str, port: int = SMTP_PORT,
+                 timeout: float = 10, preferences: Optional[Dict[str, int]] = None):
+        preferences = preferences or {}
+        self.mx_hosts = mx_health.order(mx_hosts, preferences)
+        # min() keeps the first of equals, and mx_hosts come in preference order
+        self.slot_host = min(mx_hosts, key=lambda host: preferences.get(host, 0))
+        self.connected_host: Optional[str] = None
+        self.user_key = user_key
+        self.port = port
+        self.timeout = timeout
+        self.codes: List[int] = []
+        self._server: Optional[smtplib.SMTP] = None
+        self._stack = ExitStack()
+
+    def open(self) -> None:
+        hosts = [host for host in self.mx_hosts if not smtp_scheduler.backoff_remaining(host)]
+        if not hosts:
+            wait = min(smtp_scheduler.backoff_remaining(host) for host in self.mx_hosts)
+            raise SchedulerBusy(f"Every MX for {self.slot_host} is backing off ({wait:.0f}s left)")
+        self._stack.enter_context(
+            smtp_scheduler.slot(self.slot_host, self.user_key, timeout=time_left(settings.SMTP_QUEUE_TIMEOUT),
+                                charge=False, wait_backoff=False)
+        )
+        try:
+            server = RacedSMTP(hosts[:settings.SMTP_RACE_HOSTS], self.port, time_left(self.timeout))
+            try:
+                with span("smtp_connect"):
+                    code, _ = server.connect(hosts[0], self.port)
+            except (OSError, smtplib.SMTPServerDisconnected):
+                # Connected but no greeting: as unhealthy as a refused connect
+                if server.connected_host:
+                    mx_health.record_failure(server.connected_host)
+                raise
+            self.connected_host = server.connected_host
+            if code == 421:
+                # Too many connections: don't bother saying HELO
+                server.close()
+                self._record(code)
+                raise MailServerBusy()
+            self._server = server
+            server.helo(server.local_hostname)
+            server.mail(MAIL_FROM)
+        except BaseException:
+            self.close(quit=False)
+            raise
+
+    def rcpt(self, email: str) -> int:
+        # One unit of the per-minute budget per RCPT, not per session
+        smtp_scheduler.charge(self.slot_host, timeout=time_left(settings.SMTP_QUEUE_TIMEOUT), wait_backoff=False)
+        if self._server.sock is not None:
+            self._server.sock.settimeout(time_left(self.timeout))
+        code, _ = self._server.rcpt(email)
+        self._record(code)
+        return code
+
+    def _record(self, code: int) -> None:
+        self.codes.append(code)
+        record_smtp_response(code)
+
+    def close(self, quit: bool = True) -> None:
+        if self._server is not None:
+            try:
+                if quit:
+                    self._server.quit()
+                else:
+                    self._server.close()
+            except Exception:
+                self._server.close()
+            self._server = None
+        self._stack.close()
+        if self.codes and self.connected_host:
+            backoff = [c for c in self.codes if c in (421, 451)]
+            smtp_scheduler.report(self.connected_host, backoff[0] if backoff else self.codes[-1])
+
+
+def session_failure(error: Exception, mx_host: str) -> Dict:
+    """Outcome for candidates that never got an RCPT answer"""
+    if isinstance(error, SchedulerBusy):
+        return {"valid": None, "confidence": 0.5,
+                "reason": f"Rate limited for {mx_host.rstrip('.')}, not verified"}
+    if isinstance(error, MailServerBusy):
+        return {"valid": None, "confidence": 0.5, "reason": "Mail server busy (421), not verified"}
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        # Some servers disconnect immediately (anti-spam)
+        return {"valid": True, "confidence": 0.3, "reason": "Server disconnected (likely exists)"}
+    if isinstance(error, smtplib.SMTPConnectError):
+        return {"valid": False, "confidence": 0.0, "reason": "Cannot connect to mail server"}
+    logger.warning(f"SMTP verification failed on {mx_host}: {error}")
+    return {"valid": True, "confidence": 0.2, "reason": f"SMTP error: {str(error)[:50]}"}
+
+
+def rcpt_outcome(code: int) -> Dict:
+    """
+    SMTP response codes:
+    250 = Email exists
+    550 = Email doesn't exist
+    451/452 = Greylisted (might exist)
+    """
+    if code == 250:
+        return {"valid": True, "confidence": 0.9, "reason": "SMTP verified (250)"}
+    if code in (451, 452):
+        # Provisional: the route queues a deferred retry
+        return {"valid": True, "confidence": 0.5, "reason": f"Greylisted ({code})", "greylisted": True}
+    if code == 421:
+        return {"valid": None, "confidence": 0.5, "reason": "Mail server busy (421), not verified"}
+    return {"valid": False, "confidence": 0.1, "reason": f"SMTP rejected ({code})"}
+
+
+def cache_verdict(key: str, code: int, verdict) -> None:
+    """Keep definitive answers (250, 5xx) for SMTP_VERDICT_TTL; 4xx may change"""
+    if code == 250 or 500 <= code < 600:
+        verdict_cache.set(key, verdict, ttl=settings.SMTP_VERDICT_TTL)
+
+
+NOT_PROBED = {"valid": None, "confidence": 0.2, "reason": "Not probed (a higher-ranked address verified)"}
+PATTERN_KNOWN = {"valid": None, "confidence": 0.2, "reason": "Not probed (company pattern known)"}
+DEADLINE_REACHED = {"valid": None, "confidence": 0.5, "reason": "Not verified (request deadline reached)",
+                    "deadline": True}
+
+
+class _SmtpStage:
+    always_run = False
+    network = True
+
+    def __init__(self, port: int = SMTP_PORT, timeout: float = 10):
+        self.port = port
+        self.timeout = timeout
+
+    def session(self, ctx: DiscoveryContext) -> ProbeSession:
+        """The run's SMTP session, opened on first use (pipeline closes it)"""
+        if ctx.session is None:
+            session = ProbeSession(ctx.mx_hosts, ctx.user_key, port=self.port, timeout=self.timeout,
+                                   preferences=ctx.mx_preferences)
+            session.open()
+            ctx.session = session
+        return ctx.session
+
+    def fail(self, ctx: DiscoveryContext, error: Exception, candidates: Optional[List[Dict]] = None) -> None:
+        """Settle candidates that never got an RCPT answer"""
+        if expired():
+            # Queue or socket timeouts shrunk by the deadline, not a server verdict
+            ctx.out_of_time(candidates)
+            return
+        ctx.settle(session_failure(error, ctx.mx_hosts[0]), candidates)
+        ctx.stopped = True
+
+
+class CatchAllStage(_SmtpStage):
+    """
+    RCPT a random mailbox first: a domain that accepts it accepts anything,
+    so per-candidate 250s would mean nothing
+    """
+
+    name = "catch_all"
+
+    def run(self, ctx: DiscoveryContext) -> None:
+        if not ctx.verify or not ctx.mx_hosts:
+            return
+        key = f"catch-all:{ctx.domain}"
+        ctx.catch_all = verdict_cache.get(key)
+        if ctx.catch_all is None:
+            try:
+                code = self.session(ctx).rcpt(f"reachcraft-probe-{secrets.token_hex(6)}@{ctx.domain}")
+            except Exception as e:
+                self.fail(ctx, e)
+                return
+            if code == 421:
+                # Too busy to answer anything on this session
+                ctx.settle(rcpt_outcome(code))
+                ctx.stopped = True
+                return
+            ctx.catch_all = code == 250
+            cache_verdict(key, code, ctx.catch_all)
+        if ctx.catch_all:
+            ctx.settle({"valid": None, "confidence": 0.5,
+                        "reason": "Catch-all domain (accepts any address), not verified"})
+            ctx.stopped = True
+
+
+class RcptStage(_SmtpStage):
+    """
+    RCPT each candidate in rank order
+
+    With stop_on_match, the first 250 ends probing: companies use one
+    pattern, so lower-ranked candidates are left unprobed. A known company
+    pattern (ctx.max_probes) caps the number of RCPTs.
+    """
+
+    name = "smtp_rcpt"
+
+    def __init__(self, port: int = SMTP_PORT, timeout: float = 10, stop_on_match: bool = True):
+        super().__init__(port=port, timeout=timeout)
+        self.stop_on_match = stop_on_match
+
+    def run(self, ctx: DiscoveryContext) -> None:
+        if not ctx.verify or not ctx.mx_hosts:
+            return
+        for index, candidate in enumerate(ctx.candidates):
+            if ctx.max_probes is not None and index >= ctx.max_probes:
+                ctx.settle(PATTERN_KNOWN, ctx.candidates[index:])
+                return
+            code = verdict_cache.get(candidate["email"])
+            if code is None:
+                if expired():
+                    ctx.out_of_time(ctx.candidates[index:])
+                    return
+                try:
+                    code = self.session(ctx).rcpt(candidate["email"])
+                except Exception as e:
+                    self.fail(ctx, e, ctx.candidates[index:])
+                    return
+                cache_verdict(candidate["email"], code, code)
+            candidate.update(rcpt_outcome(code))
+            if code == 421:
+                ctx.settle(rcpt_outcome(code), ctx.candidates[index + 1:])
+                return
+            if code == 250 and self.stop_on_match:
+                ctx.settle(NOT_PROBED, ctx.candidates[index + 1:])
+                return
+
+
+class ScoreStage:
+    """Highest confidence first; ties keep prior order"""
+
+    name = "score"
+    always_run = True
+
+    def run(self, ctx: DiscoveryContext) -> None:
+        ctx.candidates.sort(key=lambda c: c["confidence"], reverse=True)
+
+
+def default_stages(port: int = SMTP_PORT, timeout: float = 10) -> List:
+    return [
+        NormalizeStage(),
+        PatternHintStage(),
+        GenerateStage(),
+        SyntaxStage(),
+        MxStage(),
+        CatchAllStage(port=port, timeout=timeout),
+        RcptStage(port=port, timeout=timeout),
+        ScoreStage(),
+    ]
+
+
+def verification_stages(port: int = SMTP_PORT, timeout: float = 10) -> List:
+    """For addresses the caller already has: no generation, no catch-all probe"""
+    return [
+        NormalizeStage(),
+        SyntaxStage(),
+        MxStage(),
+        RcptStage(port=port, timeout=timeout),
+        ScoreStage(),
+    ]
+
+
+class DiscoveryPipeline:
+    """
+    Usage:
+        ctx = DiscoveryPipeline().run(DiscoveryContext("Jane", "Doe", "acme.com"))
+        ctx.candidates  # [{"email", "pattern", "prior", "valid", "confidence", "reason"}, ...]
+        ctx.timings     # {"normalize": 0.00001, ..., "smtp_rcpt": 0.21}
+    """
+
+    def __init__(self, stages: Optional[List] = None):
+        self.stages = default_stages() if stages is None else stages
+
+    def run(self, ctx: DiscoveryContext) -> DiscoveryContext:
+        try:
+            for stage in self.stages:
+                if ctx.stopped and not stage.always_run:
+                    continue
+                if ctx.verify and getattr(stage, "network", False) and expired():
+                    ctx.out_of_time()
+                    continue
+                started = time.perf_counter()
+                with span(stage.name):
+                    stage.run(ctx)
+                ctx.timings[stage.name] = ctx.timings.get(stage.name, 0.0) + time.perf_counter() - started
+        finally:
+            if ctx.session is not None:
+                ctx.session.close()
+                ctx.session = None
+        return ctx
@@ -0,0 +1,210 @@
+"""
+Company website harvesting
+
+Fetches a bounded set of pages for a company domain (home, plus contact /
+team / about / press pages linked from it or at common paths) over one
+pooled httpx.AsyncClient, and pulls out on-domain addresses and
+person-looking names for pattern inference (see domain_patterns.py).
+
+The domain comes from API callers, so the crawler only fetches public
+hosts. Domains that are IP literals, carry a port or aren't hostnames are
+not crawled. Before every request, including each redirect hop, the host
+is resolved, and it is refused if any address is private, loopback,
+link-local or otherwise not global (10.x, 127.0.0.1, 169.254.169.254, ...).
+"""
+import asyncio
+import html
+import ipaddress
+import logging
+import re
+import socket
+from typing import Dict, List, Optional, Set
+from urllib.parse import urljoin, urlsplit
+
+from app.core.config import settings
+from app.services.discovery.pipeline import EMAIL_IN_TEXT_RE
+
+logger = logging.getLogger(__name__)
+
+# Tried when the home page doesn't link to enough interesting pages
+FALLBACK_PATHS = ("/contact", "/about", "/team", "/press", "/contact-us", "/about-us", "/people")
+_INTERESTING_LINK_RE = re.compile(r"contact|team|about|press|people|leadership|staff|media|impressum", re.I)
+_HREF_RE = re.compile(r"""href\s*=\s*["']([^"'#]+)""", re.I)
+_TAG_RE = re.compile(r"<script\b.*?</script>|<style\b.*?</style>|<[^>]+>", re.I | re.S)
+# "jane [at] acme [dot] com" and "jane (at) acme.com"
+_OBFUSCATED_AT_RE = re.compile(r"\s*[\[(]\s*at\s*[\])]\s*", re.I)
+_OBFUSCATED_DOT_RE = re.compile(r"\s*[\[(]\s*dot\s*[\])]\s*", re.I)
+_PERSON_RE = re.compile(r"\b([A-ZÀ-Ý][a-zà-ÿ'’]+(?:-[A-ZÀ-Ý][a-zà-ÿ'’]+)?)\s+([A-ZÀ-Ý][a-zà-ÿ'’]+(?:-[A-ZÀ-Ý][a-zà-ÿ'’]+)?)\b")
+
+_HOSTNAME_RE = re.compile(r"^(?=.{1,253}$)(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z][a-z0-9-]{0,61}[a-z0-9]$")
+
+USER_AGENT = "Mozilla/5.0 (compatible; ReachCraftBot/0.1)"
+MAX_NAMES = 500
+
+
+class BlockedHost(Exception):
+    """The crawler won't fetch from this host (not a public internet host)"""
+
+
+def is_crawlable_domain(domain: str) -> bool:
+    """A dotted hostname: no IP literal, port, credentials or path"""
+    domain = (domain or "").lower()
+    try:
+        ipaddress.ip_address(domain)
+        return False
+    except ValueError:
+        pass
+    return _HOSTNAME_RE.match(domain) is not None
+
+
+def _is_public_address(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+async def _resolve(host: str) -> List[str]:
+    infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    return [info[4][0] for info in infos]
+
+
+def extract_addresses(page: str, domain: str) -> Set[str]:
+    """Addresses at `domain` (or its subdomains), including [at]/[dot] spellings"""
+    text = html.unescape(page)
+    text = _OBFUSCATED_DOT_RE.sub(".", _OBFUSCATED_AT_RE.sub("@", text))
+    found = set()
+    for email in EMAIL_IN_TEXT_RE.findall(text):
+        email = email.lower()
+        host = email.rpartition("@")[2]
+        if host == domain or host.endswith("." + domain):
+            found.add(email)
+    return found
+
+
+def extract_person_names(page: str) -> Set[tuple]:
+    """Capitalized word pairs from the visible text: {("Jane", "Doe"), ...}"""
+    text = html.unescape(_TAG_RE.sub(" ", page))
+    return set(_PERSON_RE.findall(text))
+
+
+def interesting_links(page: str, base_url: str, domain: str) -> List[str]:
+    links = []
+    for href in _HREF_RE.findall(page):
+        url = urljoin(base_url, href.strip())
+        host = (urlsplit(url).hostname or "").lower()
+        if (host == domain or host.endswith("." + domain)) and _INTERESTING_LINK_RE.search(urlsplit(url).path):
+            links.append(url)
+    return links
+
+
+class WebsiteCrawler:
+    """
+    Usage:
+        crawler = WebsiteCrawler()
+        harvest = await crawler.crawl("acme.com")
+        # {"emails": ["jane.doe@acme.com", ...], "names": [["Jane", "Doe"], ...], "pages": 5}
+        await crawler.aclose()
+    """
+
+    # Overridable so benchmarks can serve company sites from local fixtures
+    # (which live on 127.0.0.1, so they also turn off the public-host check)
+    url_template = "https://{domain}{path}"
+    allow_private_hosts = False
+
+    def __init__(self, max_pages: Optional[int] = None, timeout: Optional[float] = None,
+                 max_bytes: int = 512 * 1024, concurrency: int = 4, transport=None):
+        self.max_pages = max_pages or settings.DISCOVERY_CRAWL_MAX_PAGES
+        self.timeout = timeout or settings.DISCOVERY_CRAWL_TIMEOUT
+        self.max_bytes = max_bytes
+        self.concurrency = concurrency
+        self.transport = transport
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import httpx  # installed with supabase
+
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                headers={"User-Agent": USER_AGENT},
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+                event_hooks={"request": [self._check_host]},
+                transport=self.transport,
+            )
+        return self._client
+
+    async def _check_host(self, request) -> None:
+        """httpx request hook: runs before the first request and every redirect hop"""
+        if self.allow_private_hosts:
+            return
+        host = request.url.host
+        if request.url.port is not None or not is_crawlable_domain(host):
+            raise BlockedHost(f"Not crawling {request.url.netloc.decode(errors='replace')}: not a public hostname")
+        for address in await _resolve(host):
+            if not _is_public_address(address):
+                raise BlockedHost(f"Not crawling {host}: it resolves to non-public address {address}")
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def fetch(self, url: str) -> Optional[str]:
+        """HTML of the page, at most max_bytes; None on errors and non-HTML"""
+        try:
+            async with self.client.stream("GET", url) as response:
+                if response.status_code >= 400:
+                    return None
+                if "html" not in response.headers.get("content-type", "html"):
+                    return None
+                body = bytearray()
+                async for chunk in response.aiter_bytes():
+                    body += chunk
+                    if len(body) >= self.max_bytes:
+                        break
+                return body.decode(response.encoding or "utf-8", errors="replace")
+        except BlockedHost as e:
+            logger.warning(str(e))
+            return None
+        except Exception as e:
+            logger.debug(f"Crawl fetch failed for {url}: {e}")
+            return None
+
+    async def crawl(self, domain: str) -> Dict:
+        if not is_crawlable_domain(domain):
+            logger.warning(f"Not crawling {domain!r}: not a public hostname")
+            return {"emails": [], "names": [], "pages": 0}
+        home_url = self.url_template.format(domain=domain, path="/")
+        home = await self.fetch(home_url)
+        pages = [home] if home else []
+
+        urls: List[str] = []
+        if home:
+            urls.extend(interesting_links(home, home_url, domain))
+        urls.extend(self.url_template.format(domain=domain, path=path) for path in FALLBACK_PATHS)
+        seen = {home_url}
+        queue = [u for u in urls if not (u in seen or seen.add(u))][:max(0, self.max_pages - 1)]
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(url: str) -> Optional[str]:
+            async with semaphore:
+                return await self.fetch(url)
+
+        pages.extend(p for p in await asyncio.gather(*(bounded(u) for u in queue)) if p)
+
+        emails: Set[str] = set()
+        names: Set[tuple] = set()
+        for page in pages:
+            emails |= extract_addresses(page, domain)
+            if len(names) < MAX_NAMES:
+                names |= extract_person_names(page)
+        logger.info(f"Crawled {len(pages)} pages on {domain}: {len(emails)} addresses")
+        return {
+            "emails": sorted(emails),
+            "names": [list(n) for n in sorted(names)[:MAX_NAMES]],
+            "pages": len(pages),
+        }
@@ -0,0 +1,241 @@
+"""
+Pooled connections to the outbound SMTP relay
+
+Opening a relay connection costs a TCP handshake, the greeting, EHLO, a
+TLS handshake and AUTH, several round trips before the first message.
+RelayPool keeps up to SMTP_RELAY_POOL_SIZE authenticated connections open
+and sends message after message over them:
+
+- Idle connections are reused most-recent first. Ones idle longer than
+  SMTP_RELAY_IDLE_TIMEOUT are closed, since relays drop idle clients.
+- A connection is retired after SMTP_RELAY_MAX_MESSAGES messages.
+- A reused connection that turns out to be closed is replaced and the
+  message is sent again. That is safe because the relay had not accepted
+  it yet.
+- One SSLContext serves every connection, so the CA bundle loads once.
+  New connections offer the last TLS session, so the relay can resume it
+  instead of doing a full handshake.
+
+smtplib is blocking, so senders call this from worker threads.
+"""
+import logging
+import smtplib
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from email.message import EmailMessage
+from typing import Dict, Iterator, List, Optional
+
+from app.core.config import settings
+from app.core.metrics import record_relay_connection, span
+
+logger = logging.getLogger(__name__)
+
+TLS_MODES = ("starttls", "ssl", "none")
+
+
+class RelayNotConfigured(Exception):
+    """SMTP_RELAY_HOST is not set"""
+
+
+class RelayBusy(Exception):
+    """No pooled connection came free in time"""
+
+
+class _ResumingContext:
+    """SSLContext stand-in for smtplib that offers the pool's last TLS session"""
+
+    def __init__(self, pool: "RelayPool"):
+        self.pool = pool
+
+    def wrap_socket(self, sock, server_hostname=None, **kwargs):
+        context = self.pool.ssl_context
+        session = self.pool.tls_session
+        try:
+            return context.wrap_socket(sock, server_hostname=server_hostname, session=session, **kwargs)
+        except ValueError:
+            # Session no longer usable with this context; do a full handshake
+            return context.wrap_socket(sock, server_hostname=server_hostname, **kwargs)
+
+
+class _Connection:
+    def __init__(self, smtp: smtplib.SMTP):
+        self.smtp = smtp
+        self.sent = 0
+        self.last_used = time.monotonic()
+
+
+class RelayPool:
+    """
+    Usage:
+        relay_pool.send(message)  # {} or the refused recipients, like smtplib.sendmail
+        relay_pool.close()
+    """
+
+    def __init__(
+        self,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        tls: Optional[str] = None,
+        size: Optional[int] = None,
+        max_messages: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+        timeout: Optional[float] = None,
+        ssl_context: Optional[ssl.SSLContext] = None,
+    ):
+        self.host = settings.SMTP_RELAY_HOST if host is None else host
+        self.port = port or settings.SMTP_RELAY_PORT
+        self.username = settings.SMTP_RELAY_USERNAME if username is None else username
+        self.password = settings.SMTP_RELAY_PASSWORD if password is None else password
+        self.tls = (tls or settings.SMTP_RELAY_TLS).lower()
+        if self.tls not in TLS_MODES:
+            raise ValueError(f"SMTP_RELAY_TLS must be one of {', '.join(TLS_MODES)}")
+        self.size = size or settings.SMTP_RELAY_POOL_SIZE
+        self.max_messages = max_messages or settings.SMTP_RELAY_MAX_MESSAGES
+        self.idle_timeout = settings.SMTP_RELAY_IDLE_TIMEOUT if idle_timeout is None else idle_timeout
+        self.timeout = timeout or settings.SMTP_RELAY_TIMEOUT
+        self._ssl_context = ssl_context
+        self.tls_session: Optional[ssl.SSLSession] = None
+        self._idle: List[_Connection] = []
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self.stats = {"connects": 0, "resumed": 0, "reused": 0, "retired": 0, "dropped": 0}
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.host)
+
+    @property
+    def ssl_context(self) -> ssl.SSLContext:
+        if self._ssl_context is None:
+            self._ssl_context = ssl.create_default_context()
+        return self._ssl_context
+
+    def _connect(self) -> _Connection:
+        if not self.configured:
+            raise RelayNotConfigured("Set SMTP_RELAY_HOST to send email")
+        with span("relay_connect"):
+            context = _ResumingContext(self)
+            if self.tls == "ssl":
+                smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout, context=context)
+            else:
+                smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            try:
+                if self.tls == "starttls":
+                    smtp.starttls(context=context)
+                if self.username:
+                    smtp.login(self.username, self.password)
+            except Exception:
+                smtp.close()
+                raise
+
+        resumed = isinstance(smtp.sock, ssl.SSLSocket) and smtp.sock.session_reused
+        with self._lock:
+            self.stats["connects"] += 1
+            self.stats["resumed"] += int(resumed)
+        record_relay_connection("resumed" if resumed else "new")
+        return _Connection(smtp)
+
+    def _checkout(self) -> Optional[_Connection]:
+        """Most recently used idle connection, closing the stale ones"""
+        now = time.monotonic()
+        stale = []
+        connection = None
+        with self._lock:
+            while self._idle:
+                candidate = self._idle.pop()
+                if now - candidate.last_used > self.idle_timeout:
+                    stale.append(candidate)
+                    continue
+                connection = candidate
+                break
+        for candidate in stale:
+            self._quit(candidate)
+        return connection
+
+    def _checkin(self, connection: _Connection) -> None:
+        if connection.sent >= self.max_messages:
+            with self._lock:
+                self.stats["retired"] += 1
+            self._quit(connection)
+            return
+        connection.last_used = time.monotonic()
+        with self._lock:
+            self._idle.append(connection)
+
+    def _quit(self, connection: _Connection) -> None:
+        try:
+            connection.smtp.quit()
+        except Exception:
+            connection.smtp.close()
+
+    @contextmanager
+    def _slot(self) -> Iterator[None]:
+        with span("relay_queue"):
+            if not self._slots.acquire(timeout=self.timeout):
+                raise RelayBusy(f"No relay connection free within {self.timeout:g}s")
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    def send(self, message: EmailMessage) -> Dict[str, tuple]:
+        """
+        Send one message over a pooled connection
+
+        Returns the refused recipients ({} when all were accepted); raises
+        smtplib errors like SMTP.send_message.
+        """
+        with self._slot():
+            connection = self._checkout()
+            reused = connection is not None
+            while True:
+                if connection is None:
+                    connection = self._connect()
+                try:
+                    with span("relay_send"):
+                        refused = connection.smtp.send_message(message)
+                except smtplib.SMTPServerDisconnected:
+                    connection.smtp.close()
+                    connection = None
+                    if not reused:
+                        raise
+                    # The relay closed an idle connection; it has not seen this message
+                    with self._lock:
+                        self.stats["dropped"] += 1
+                    reused = False
+                    continue
+                except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                    # The session is still usable; smtplib has sent RSET
+                    self._checkin(connection)
+                    raise
+                except Exception:
+                    connection.smtp.close()
+                    raise
+                break
+
+            connection.sent += 1
+            # TLS 1.3 tickets arrive after the handshake, so take the session once the relay has replied
+            if isinstance(connection.smtp.sock, ssl.SSLSocket) and connection.smtp.sock.session is not None:
+                self.tls_session = connection.smtp.sock.session
+            if reused:
+                with self._lock:
+                    self.stats["reused"] += 1
+            self._checkin(connection)
+            return refused
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            self._quit(connection)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {**self.stats, "idle": len(self._idle), "size": self.size}
+
+
+relay_pool = RelayPool()
@@ -0,0 +1,134 @@
+"""
+Send one stored email through the relay, paced per recipient domain
+
+Messages to the same domain go through a HostScheduler (the one SMTP
+probing uses). It is keyed by recipient domain instead of MX host, so a
+batch can't flood one company's mail server. When the relay answers
+421/451 the domain backs off. Outcomes are classified for the send queue:
+
+- sent: the relay accepted the message
+- failed: permanent rejection (5xx) or a malformed row
+- retry: temporary trouble (4xx, relay unreachable or busy)
+- deferred: the domain is at its pace limit; try again shortly, no attempt used
+
+The Message-ID is derived from the email's id, so if a crash resends a
+message that the relay already accepted, receivers see the same Message-ID
+and can drop the duplicate. Replies quote it in In-Reply-To, which is how
+the reply poller matches them (app.tasks.replies).
+
+With TRACKING_BASE_URL set, messages also get an HTML part with signed
+click links and an open pixel (app.services.email.tracking).
+"""
+import logging
+import re
+import smtplib
+from datetime import datetime
+from email.message import EmailMessage
+from email.utils import format_datetime, formataddr
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.core.metrics import record_email_send
+from app.db.cache_store import SQLiteCache
+from app.services.email.relay import RelayBusy, RelayPool, relay_pool
+from app.services.email.tracking import tracked_html
+from app.services.verification.smtp_scheduler import HostScheduler, SchedulerBusy
+
+logger = logging.getLogger(__name__)
+
+SENT = "sent"
+FAILED = "failed"
+RETRY = "retry"
+DEFERRED = "deferred"
+
+_UUID = r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+
+
+class EmailSender:
+    """
+    Usage:
+        result = email_sender.send(row)  # {"outcome": "sent", "code": 250, "message_id": "<...>"}
+    """
+
+    def __init__(self, pool: Optional[RelayPool] = None, scheduler: Optional[HostScheduler] = None):
+        self.pool = pool or relay_pool
+        self.scheduler = scheduler or send_scheduler
+
+    @property
+    def from_address(self) -> str:
+        return settings.SEND_FROM_ADDRESS or self.pool.username
+
+    def message_id(self, email_id: str) -> str:
+        domain = self.from_address.rpartition("@")[2] or "reachcraft.local"
+        return f"<{email_id}@{domain}>"
+
+    def email_ids_in(self, header: str) -> List[str]:
+        """Ids of our emails referenced by an In-Reply-To/References header"""
+        domain = self.from_address.rpartition("@")[2] or "reachcraft.local"
+        pattern = rf"<({_UUID})@{re.escape(domain)}>"
+        return list(dict.fromkeys(re.findall(pattern, header, re.IGNORECASE)))
+
+    def build_message(self, row: Dict) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = formataddr((settings.SEND_FROM_NAME, self.from_address))
+        message["To"] = formataddr((row.get("recipient_name") or "", row["recipient_email"]))
+        message["Subject"] = row["subject_line"]
+        message["Date"] = format_datetime(datetime.now().astimezone())
+        message["Message-ID"] = self.message_id(row["id"])
+        message.set_content(row["body"])
+        if settings.TRACKING_BASE_URL:
+            message.add_alternative(tracked_html(row["id"], row["body"]), subtype="html")
+        return message
+
+    def send(self, row: Dict, user_key: str = "direct") -> Dict:
+        """Send a row of the emails table; never raises"""
+        result = self._send(row, user_key)
+        record_email_send(result["outcome"])
+        return result
+
+    def _send(self, row: Dict, user_key: str) -> Dict:
+        if not row.get("recipient_email") or "@" not in row["recipient_email"]:
+            return {"outcome": FAILED, "code": None, "error": "No recipient address"}
+        try:
+            message = self.build_message(row)
+        except (KeyError, ValueError) as e:
+            return {"outcome": FAILED, "code": None, "error": f"Malformed email: {e}"}
+
+        domain = row["recipient_email"].rpartition("@")[2].lower()
+        try:
+            with self.scheduler.slot(domain, user_key=user_key, timeout=settings.SEND_DOMAIN_WAIT):
+                refused = self.pool.send(message)
+        except SchedulerBusy:
+            return {"outcome": DEFERRED, "code": None, "error": f"Pacing sends to {domain}"}
+        except smtplib.SMTPRecipientsRefused as e:
+            code, reply = next(iter(e.recipients.values()))
+            return self._rejected(domain, code, reply)
+        except smtplib.SMTPResponseException as e:
+            return self._rejected(domain, e.smtp_code, e.smtp_error)
+        except (RelayBusy, smtplib.SMTPException, OSError) as e:
+            logger.warning(f"Relay error sending {row['id']}: {e}")
+            return {"outcome": RETRY, "code": None, "error": f"Relay error: {e}"}
+
+        if refused:
+            code, reply = next(iter(refused.values()))
+            return self._rejected(domain, code, reply)
+        self.scheduler.report(domain, 250)
+        return {"outcome": SENT, "code": 250, "message_id": message["Message-ID"]}
+
+    def _rejected(self, domain: str, code: int, reply) -> Dict:
+        self.scheduler.report(domain, code)
+        if isinstance(reply, bytes):
+            reply = reply.decode(errors="replace")
+        outcome = RETRY if 400 <= code < 500 else FAILED
+        return {"outcome": outcome, "code": code, "error": f"{code} {reply}"}
+
+
+send_scheduler = HostScheduler(
+    max_concurrent=settings.SEND_PER_DOMAIN_CONCURRENCY,
+    probes_per_minute=settings.SEND_PER_DOMAIN_PER_MINUTE,
+    base_backoff=settings.SMTP_BACKOFF_SECONDS,
+    backoffs=SQLiteCache(settings.CACHE_DB_PATH, "send_backoff"),
+    leases=SQLiteCache(settings.CACHE_DB_PATH, "send_domain_leases"),
+)
+
+email_sender = EmailSender()
@@ -2,6 +2,19 @@
 import re
 from typing import Optional, List, Tuple
 from urllib.parse import urlparse
+from app.services.discovery.domain_patterns import infer_pattern
+from app.services.discovery.pipeline import (
+    EMAIL_IN_TEXT_RE,
+    PATTERN_NAMES,
+    PATTERNS,
+    DiscoveryContext,
+    DiscoveryPipeline,
+    GenerateStage,
+    NormalizeStage,
+    format_pattern,
+)
+
+_WWW_RE = re.compile(r'^www\.')
 
 class EmailPatternDetector:
     '''Detect email patterns from company websites'''
@@ -19,8 +32,7 @@ class EmailPatternDetector:
     @staticmethod
     def extract_emails_from_text(text: str) -> List[str]:
         '''Extract all email addresses from text'''
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        return re.findall(email_pattern, text)
+        return EMAIL_IN_TEXT_RE.findall(text)
     
     @staticmethod
     def detect_pattern(known_emails: List[str], domain: str) -> Optional[str]:
@@ -28,21 +40,8 @@ class EmailPatternDetector:
         Detect email pattern from known emails
         Returns pattern like '{first}.{last}@{domain}'
         '''
-        if not known_emails:
-            return None
-        
-        # Analyze first known email
-        email = known_emails[0]
-        local_part = email.split('@')[0]
-        
-        # Try to identify pattern
-        if '.' in local_part:
-            return '{first}.{last}@{domain}'
-        elif '_' in local_part:
-            return '{first}_{last}@{domain}'
-        else:
-            # Could be firstname or firstnamelastname
-            return '{first}{last}@{domain}'
+        inferred = infer_pattern(known_emails)
+        return PATTERNS[inferred['pattern']] if inferred else None
     
     @staticmethod
     def generate_email(
@@ -55,39 +54,19 @@ class EmailPatternDetector:
         Generate possible emails based on pattern
         Returns list of (email, pattern) tuples
         '''
-        first = first_name.lower().strip()
-        last = last_name.lower().strip()
-        f = first[0] if first else ''
-        l = last[0] if last else ''
-        
-        results = []
+        normalize = NormalizeStage()
+        ctx = DiscoveryContext(first_name, last_name, domain, verify=False)
         
         if pattern:
             # Use specific pattern
-            email = pattern.format(
-                first=first,
-                last=last,
-                f=f,
-                l=l,
-                domain=domain
-            )
-            results.append((email, pattern))
-        else:
-            # Try all common patterns
-            for p in EmailPatternDetector.PATTERNS:
-                try:
-                    email = p.format(
-                        first=first,
-                        last=last,
-                        f=f,
-                        l=l,
-                        domain=domain
-                    )
-                    results.append((email, p))
-                except:
-                    continue
+            normalize.run(ctx)
+            email = format_pattern(pattern, ctx.parts)
+            return [(email, pattern)] if email else []
         
-        return results
+        # Try all common patterns
+        templates = {PATTERN_NAMES.get(p, p): p for p in EmailPatternDetector.PATTERNS}
+        DiscoveryPipeline([normalize, GenerateStage(templates)]).run(ctx)
+        return [(c['email'], templates[c['pattern']]) for c in ctx.candidates]
     
     @staticmethod
     def extract_domain_from_url(url: str) -> str:
@@ -95,5 +74,5 @@ class EmailPatternDetector:
         parsed = urlparse(url)
         domain = parsed.netloc or parsed.path
         # Remove www.
-        domain = re.sub(r'^www\.', '', domain)
+        domain = _WWW_RE.sub('', domain)
         return domain
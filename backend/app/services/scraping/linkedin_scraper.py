@@ -1,9 +1,96 @@
-from playwright.sync_api import sync_playwright, Page, Browser
-from bs4 import BeautifulSoup
-import time
-from typing import Optional, Dict
+from typing import TYPE_CHECKING, Optional, Dict, List
+from urllib.parse import urlsplit
 import re
 
+# Playwright and BeautifulSoup are imported where they are used, so the
+# pure helpers below (and scraper_pool) import without them installed
+if TYPE_CHECKING:
+    from playwright.sync_api import Page, Browser, Playwright
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+# Selectors that signal the page has rendered what we read
+SEARCH_RESULTS_SELECTOR = 'a[href*="linkedin.com/in/"]'
+PROFILE_READY_SELECTOR = 'h1, main, title'
+SELECTOR_TIMEOUT_MS = 8000
+
+PROFILE_URL_RE = re.compile(r'https://[a-z]{2,3}\.linkedin\.com/in/[^/&?]+')
+
+GOOGLE_SEARCH_URL = 'https://www.google.com/search?q={query}'
+
+# Fast mode: we only read <title> and <a href>, so everything that isn't
+# markup or script is dead weight
+BLOCKED_RESOURCE_TYPES = {'image', 'media', 'font', 'stylesheet', 'texttrack', 'eventsource', 'manifest', 'other'}
+TRACKER_HOSTS = (
+    'doubleclick.net', 'google-analytics.com', 'googletagmanager.com',
+    'googlesyndication.com', 'ads.linkedin.com', 'px.ads.linkedin.com',
+    'snap.licdn.com', 'facebook.net', 'bat.bing.com', 'scorecardresearch.com',
+)
+
+# DOM queries used in fast mode instead of re-parsing page.content()
+LINK_HREFS_JS = 'els => els.map(e => e.href)'
+
+
+def should_block_request(resource_type: str, url: str) -> bool:
+    '''Decide whether fast mode aborts a subresource request'''
+    if resource_type == 'document':
+        return False
+    if resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    host = urlsplit(url).hostname or ''
+    return any(host == t or host.endswith('.' + t) for t in TRACKER_HOSTS)
+
+
+def first_profile_url(hrefs: List[str]) -> Optional[str]:
+    '''Return the first clean LinkedIn profile URL from a list of hrefs'''
+    for href in hrefs:
+        match = PROFILE_URL_RE.search(href or '')
+        if match:
+            return match.group(0)
+    return None
+
+
+def name_from_title(page_title: str) -> Optional[str]:
+    '''Profile titles look like "Name | LinkedIn"'''
+    name = (page_title or '').split('|')[0].strip()
+    return name or None
+
+
+def parse_search_results(html: str) -> Optional[str]:
+    '''Return the first LinkedIn profile URL linked from a search results page'''
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    hrefs = [link['href'] for link in soup.find_all('a', href=True) if 'linkedin.com/in/' in link['href']]
+    return first_profile_url(hrefs)
+
+
+def parse_profile_page(html: str, profile_url: str) -> Dict[str, Optional[str]]:
+    '''Extract name/title/company from a public profile page'''
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    # Try to extract name, title, company
+    # This will only work for public profiles
+    name = None
+    title = None
+    company = None
+    
+    # Look for name in title or h1
+    title_tag = soup.find('title')
+    if title_tag:
+        # Format: "Name | LinkedIn"
+        name = name_from_title(title_tag.text)
+    
+    return {
+        'name': name,
+        'title': title,
+        'company': company,
+        'linkedin_url': profile_url
+    }
+
+
 class LinkedInScraper:
     '''
     Basic LinkedIn profile scraper
@@ -11,26 +98,68 @@ class LinkedInScraper:
     This is a simple implementation for educational purposes
     '''
     
-    def __init__(self, headless: bool = True):
+    # Overridable so benchmarks can point searches at local fixtures
+    search_url_template = GOOGLE_SEARCH_URL
+    
+    def __init__(self, headless: bool = True, fast_mode: bool = True):
+        '''
+        Args:
+            headless: Run Chromium without a window
+            fast_mode: Block non-document resources, stop at DOMContentLoaded
+                and read fields with DOM queries instead of parsing HTML
+        '''
         self.headless = headless
-        self.browser: Optional[Browser] = None
-        self.page: Optional[Page] = None
+        self.fast_mode = fast_mode
+        self.playwright: Optional['Playwright'] = None
+        self.browser: Optional['Browser'] = None
+        self.page: Optional['Page'] = None
     
     def start(self):
         '''Start browser'''
-        playwright = sync_playwright().start()
-        self.browser = playwright.chromium.launch(headless=self.headless)
+        from playwright.sync_api import sync_playwright
+
+        self.playwright = sync_playwright().start()
+        self.browser = self.playwright.chromium.launch(headless=self.headless)
         self.page = self.browser.new_page()
         
         # Set realistic user agent
         self.page.set_extra_http_headers({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+            'User-Agent': USER_AGENT
         })
+        
+        if self.fast_mode:
+            self.page.route('**/*', self._route_request)
+    
+    @staticmethod
+    def _route_request(route):
+        request = route.request
+        if should_block_request(request.resource_type, request.url):
+            route.abort()
+        else:
+            route.continue_()
+    
+    @property
+    def wait_until(self) -> str:
+        return 'domcontentloaded' if self.fast_mode else 'networkidle'
     
     def close(self):
-        '''Close browser'''
+        '''Close browser and stop the Playwright driver'''
         if self.browser:
             self.browser.close()
+            self.browser = None
+            self.page = None
+        if self.playwright:
+            self.playwright.stop()
+            self.playwright = None
+    
+    def _wait_for(self, selector: str):
+        '''Wait for a selector instead of sleeping; a miss just means less content'''
+        from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+        try:
+            self.page.wait_for_selector(selector, state='attached', timeout=SELECTOR_TIMEOUT_MS)
+        except PlaywrightTimeoutError:
+            pass
     
     def search_profile(self, name: str, company: str) -> Optional[str]:
         '''
@@ -43,26 +172,17 @@ class LinkedInScraper:
         try:
             # Use Google to find LinkedIn profile
             query = f'site:linkedin.com/in {name} {company}'
-            search_url = f'https://www.google.com/search?q={query}'
+            search_url = self.search_url_template.format(query=query)
             
-            self.page.goto(search_url, wait_until='networkidle')
-            time.sleep(2)
+            self.page.goto(search_url, wait_until=self.wait_until)
+            self._wait_for(SEARCH_RESULTS_SELECTOR)
             
             # Extract LinkedIn URLs from results
-            content = self.page.content()
-            soup = BeautifulSoup(content, 'html.parser')
-            
-            # Find LinkedIn profile links
-            links = soup.find_all('a', href=True)
-            for link in links:
-                href = link['href']
-                if 'linkedin.com/in/' in href:
-                    # Extract clean LinkedIn URL
-                    match = re.search(r'https://[a-z]{2,3}\.linkedin\.com/in/[^/&?]+', href)
-                    if match:
-                        return match.group(0)
-            
-            return None
+            if self.fast_mode:
+                return first_profile_url(
+                    self.page.eval_on_selector_all(SEARCH_RESULTS_SELECTOR, LINK_HREFS_JS)
+                )
+            return parse_search_results(self.page.content())
         
         except Exception as e:
             print(f'LinkedIn search error: {e}')
@@ -77,30 +197,17 @@ class LinkedInScraper:
             self.start()
         
         try:
-            self.page.goto(profile_url, wait_until='networkidle')
-            time.sleep(2)
-            
-            content = self.page.content()
-            soup = BeautifulSoup(content, 'html.parser')
-            
-            # Try to extract name, title, company
-            # This will only work for public profiles
-            name = None
-            title = None
-            company = None
-            
-            # Look for name in title or h1
-            title_tag = soup.find('title')
-            if title_tag:
-                # Format: "Name | LinkedIn"
-                name = title_tag.text.split('|')[0].strip()
+            self.page.goto(profile_url, wait_until=self.wait_until)
+            self._wait_for(PROFILE_READY_SELECTOR)
             
-            return {
-                'name': name,
-                'title': title,
-                'company': company,
-                'linkedin_url': profile_url
-            }
+            if self.fast_mode:
+                return {
+                    'name': name_from_title(self.page.title()),
+                    'title': None,
+                    'company': None,
+                    'linkedin_url': profile_url
+                }
+            return parse_profile_page(self.page.content(), profile_url)
         
         except Exception as e:
             print(f'Profile extraction error: {e}')
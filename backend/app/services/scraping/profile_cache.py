@@ -0,0 +1,154 @@
+"""
+LinkedIn profile lookup cache
+
+Search results are keyed by a normalized (name, company) pair and profile
+details by normalized profile URL. Hits and misses are stored separately
+with their own TTLs, so a person we failed to find is retried sooner than
+a profile we already have. Concurrent lookups for the same person share a
+single browser navigation.
+"""
+import logging
+import re
+import unicodedata
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from app.core.config import settings
+from app.core.singleflight import SingleFlight
+from app.db.cache_store import SQLiteCache
+
+logger = logging.getLogger(__name__)
+
+COMPANY_SUFFIXES = re.compile(
+    r"\b(incorporated|inc|llc|ltd|limited|corp|corporation|co|company|gmbh|plc|sa|ag)\b\.?$"
+)
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def _fold(text: str) -> str:
+    """Lowercase, strip accents and collapse punctuation/whitespace"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def normalize_person_key(name: str, company: str) -> str:
+    """
+    Cache key for a (name, company) search
+
+    "José  Álvarez", "Acme, Inc." and "jose alvarez", "ACME" map to the same key.
+    """
+    company_key = _fold(company)
+    while True:
+        stripped = COMPANY_SUFFIXES.sub("", company_key).strip()
+        if stripped == company_key:
+            break
+        company_key = stripped
+    return f"{_fold(name)}|{company_key}"
+
+
+def normalize_profile_url(url: str) -> str:
+    """Canonical profile URL: https, www host, no query/fragment/trailing slash"""
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip("/").lower()
+    return f"https://www.linkedin.com{path}"
+
+
+class ProfileCache:
+    """Persistent store for search results and extracted profiles"""
+
+    def __init__(self, path: Optional[str] = None):
+        path = path or settings.CACHE_DB_PATH
+        self.searches = SQLiteCache(path, "profile_search")
+        self.search_misses = SQLiteCache(path, "profile_search_miss")
+        self.profiles = SQLiteCache(path, "profile_info")
+        self.profile_misses = SQLiteCache(path, "profile_info_miss")
+
+    def get_search(self, key: str) -> Tuple[bool, Optional[str]]:
+        """Returns (hit, url); a cached miss is (True, None)"""
+        url = self.searches.get(key)
+        if url:
+            return True, url
+        if self.search_misses.contains(key):
+            return True, None
+        return False, None
+
+    def set_search(self, key: str, url: Optional[str]) -> None:
+        if url:
+            self.searches.set(key, url, ttl=settings.PROFILE_SEARCH_TTL)
+            self.search_misses.delete(key)
+        else:
+            self.search_misses.set(key, True, ttl=settings.PROFILE_NEGATIVE_TTL)
+
+    def get_profile(self, url_key: str) -> Tuple[bool, Optional[Dict]]:
+        profile = self.profiles.get(url_key)
+        if profile:
+            return True, profile
+        if self.profile_misses.contains(url_key):
+            return True, None
+        return False, None
+
+    def set_profile(self, url_key: str, profile: Optional[Dict]) -> None:
+        if profile and profile.get("name"):
+            self.profiles.set(url_key, profile, ttl=settings.PROFILE_INFO_TTL)
+            self.profile_misses.delete(url_key)
+        else:
+            self.profile_misses.set(url_key, True, ttl=settings.PROFILE_NEGATIVE_TTL)
+
+
+class CachedProfileLookup:
+    """
+    Cache + single-flight in front of a LinkedInScraperPool
+
+    Usage:
+        lookup = CachedProfileLookup(get_scraper_pool())
+        profile = await lookup.lookup("Sarah Johnson", "Globex")
+    """
+
+    def __init__(self, pool, cache: Optional[ProfileCache] = None):
+        self.pool = pool
+        self.cache = cache or ProfileCache()
+        self._flights = SingleFlight()
+
+    async def search_profile(self, name: str, company: str) -> Optional[str]:
+        key = normalize_person_key(name, company)
+        hit, url = self.cache.get_search(key)
+        if hit:
+            logger.debug(f"Profile search cache hit for {key}")
+            return url
+
+        async def search() -> Optional[str]:
+            # Errors propagate instead of being cached as "not found"
+            url = await self.pool.search_profile(name, company, raise_errors=True)
+            self.cache.set_search(key, url)
+            return url
+
+        try:
+            return await self._flights.do(("search", key), search)
+        except Exception as e:
+            logger.warning(f"LinkedIn search error for {name} at {company}: {e}")
+            return None
+
+    async def extract_profile_info(self, profile_url: str) -> Dict[str, Optional[str]]:
+        url_key = normalize_profile_url(profile_url)
+        hit, profile = self.cache.get_profile(url_key)
+        if hit:
+            return profile or {}
+
+        async def extract() -> Dict[str, Optional[str]]:
+            profile = await self.pool.extract_profile_info(profile_url, raise_errors=True)
+            self.cache.set_profile(url_key, profile)
+            return profile
+
+        try:
+            return await self._flights.do(("profile", url_key), extract)
+        except Exception as e:
+            logger.warning(f"Profile extraction error for {profile_url}: {e}")
+            return {}
+
+    async def lookup(self, name: str, company: str) -> Optional[Dict[str, Optional[str]]]:
+        """Search for a person and extract their profile, both cached"""
+        url = await self.search_profile(name, company)
+        if not url:
+            return None
+        return await self.extract_profile_info(url)
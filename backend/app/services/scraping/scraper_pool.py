@@ -0,0 +1,270 @@
+"""
+Async LinkedIn scraper pool
+
+Keeps one warm Chromium with N isolated browser contexts (one page each)
+and runs profile lookups on them concurrently. Pages are reused between
+lookups and wait on specific selectors instead of fixed sleeps.
+
+Playwright is imported on start(), so importing this module is cheap and
+does not require the browser to be installed.
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from urllib.parse import quote_plus
+
+from app.services.scraping.linkedin_scraper import (
+    GOOGLE_SEARCH_URL,
+    LINK_HREFS_JS,
+    PROFILE_READY_SELECTOR,
+    SEARCH_RESULTS_SELECTOR,
+    SELECTOR_TIMEOUT_MS,
+    USER_AGENT,
+    first_profile_url,
+    name_from_title,
+    parse_profile_page,
+    parse_search_results,
+    should_block_request,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class LinkedInScraperPool:
+    """
+    Pool of reusable Playwright pages backed by a single browser
+
+    Usage:
+        async with LinkedInScraperPool(size=4) as pool:
+            profiles = await pool.extract_many(urls)
+
+    With fast_mode (the default) pages block images, fonts, stylesheets and
+    trackers, stop at DOMContentLoaded, and read the title and profile links
+    with DOM queries instead of parsing page.content().
+    """
+
+    # Overridable so benchmarks can point searches at local fixtures
+    search_url_template = GOOGLE_SEARCH_URL
+
+    def __init__(
+        self,
+        size: int = 4,
+        headless: bool = True,
+        navigation_timeout_ms: int = 20000,
+        selector_timeout_ms: int = SELECTOR_TIMEOUT_MS,
+        fast_mode: bool = True,
+    ):
+        self.size = size
+        self.headless = headless
+        self.fast_mode = fast_mode
+        self.blocked_requests = 0
+        self.navigation_timeout_ms = navigation_timeout_ms
+        self.selector_timeout_ms = selector_timeout_ms
+        self._playwright = None
+        self._browser = None
+        self._contexts: List = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._start_lock = asyncio.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._browser is not None
+
+    async def start(self) -> "LinkedInScraperPool":
+        """Launch the browser and open `size` contexts with one page each"""
+        async with self._start_lock:
+            if self.started:
+                return self
+
+            from playwright.async_api import async_playwright
+
+            self._playwright = await async_playwright().start()
+            try:
+                self._browser = await self._playwright.chromium.launch(headless=self.headless)
+                self._idle = asyncio.Queue()
+                for _ in range(self.size):
+                    await self._idle.put(await self._new_page())
+            except Exception:
+                await self.close()
+                raise
+
+            logger.info(f"LinkedIn scraper pool started with {self.size} pages")
+            return self
+
+    async def close(self) -> None:
+        """Close every context, the browser and the Playwright driver"""
+        for context in self._contexts:
+            try:
+                await context.close()
+            except Exception as e:
+                logger.debug(f"Ignoring context close error: {e}")
+        self._contexts = []
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            finally:
+                self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+        self._idle = None
+
+    async def __aenter__(self) -> "LinkedInScraperPool":
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    async def _new_page(self):
+        context = await self._browser.new_context(user_agent=USER_AGENT)
+        context.set_default_navigation_timeout(self.navigation_timeout_ms)
+        if self.fast_mode:
+            await context.route("**/*", self._route_request)
+        self._contexts.append(context)
+        return await context.new_page()
+
+    async def _replace_page(self, page) -> None:
+        """Swap a broken page (crash, hung navigation) for a fresh context"""
+        context = page.context
+        if context in self._contexts:
+            self._contexts.remove(context)
+        try:
+            await context.close()
+        except Exception:
+            pass
+        await self._idle.put(await self._new_page())
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator:
+        """Borrow an idle page; waits if all pages are busy"""
+        await self.start()
+        page = await self._idle.get()
+        healthy = True
+        try:
+            yield page
+        except Exception:
+            healthy = False
+            raise
+        finally:
+            if healthy and not page.is_closed():
+                await self._idle.put(page)
+            elif self._browser is not None:
+                await self._replace_page(page)
+
+    async def _route_request(self, route) -> None:
+        request = route.request
+        if should_block_request(request.resource_type, request.url):
+            self.blocked_requests += 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    @property
+    def wait_until(self) -> str:
+        return "domcontentloaded" if self.fast_mode else "networkidle"
+
+    async def _wait_for(self, page, selector: str) -> bool:
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+        try:
+            await page.wait_for_selector(selector, state="attached", timeout=self.selector_timeout_ms)
+            return True
+        except PlaywrightTimeoutError:
+            return False
+
+    async def search_profile(self, name: str, company: str, raise_errors: bool = False) -> Optional[str]:
+        """
+        Find a LinkedIn profile URL via Google search
+
+        Navigation errors are logged and reported as "not found" unless
+        raise_errors is set (callers that cache results need to tell them apart).
+        """
+        query = quote_plus(f"site:linkedin.com/in {name} {company}")
+        try:
+            async with self.page() as page:
+                await page.goto(self.search_url_template.format(query=query), wait_until=self.wait_until)
+                if not await self._wait_for(page, SEARCH_RESULTS_SELECTOR):
+                    return None
+                if self.fast_mode:
+                    return first_profile_url(
+                        await page.eval_on_selector_all(SEARCH_RESULTS_SELECTOR, LINK_HREFS_JS)
+                    )
+                return parse_search_results(await page.content())
+        except Exception as e:
+            if raise_errors:
+                raise
+            logger.warning(f"LinkedIn search error for {name} at {company}: {e}")
+            return None
+
+    async def extract_profile_info(self, profile_url: str, raise_errors: bool = False) -> Dict[str, Optional[str]]:
+        """Extract basic info from a public LinkedIn profile"""
+        try:
+            async with self.page() as page:
+                await page.goto(profile_url, wait_until=self.wait_until)
+                await self._wait_for(page, PROFILE_READY_SELECTOR)
+                if self.fast_mode:
+                    return {
+                        "name": name_from_title(await page.title()),
+                        "title": None,
+                        "company": None,
+                        "linkedin_url": profile_url,
+                    }
+                return parse_profile_page(await page.content(), profile_url)
+        except Exception as e:
+            if raise_errors:
+                raise
+            logger.warning(f"Profile extraction error for {profile_url}: {e}")
+            return {}
+
+    async def extract_many(self, profile_urls: List[str]) -> List[Dict[str, Optional[str]]]:
+        """
+        Process a queue of profile URLs on all pages concurrently
+
+        Returns results in the same order as `profile_urls`.
+        """
+        return await self._run_queue(profile_urls, self.extract_profile_info)
+
+    async def search_many(self, people: List[Tuple[str, str]]) -> List[Optional[str]]:
+        """Search (name, company) pairs concurrently; results keep input order"""
+        return await self._run_queue(people, lambda person: self.search_profile(*person))
+
+    async def _run_queue(self, items: List, handler) -> List:
+        await self.start()
+        queue: asyncio.Queue = asyncio.Queue()
+        for index, item in enumerate(items):
+            queue.put_nowait((index, item))
+        results: List = [None] * len(items)
+
+        async def worker():
+            while True:
+                try:
+                    index, item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                results[index] = await handler(item)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.size, len(items)))))
+        return results
+
+
+_pool: Optional[LinkedInScraperPool] = None
+
+
+def get_scraper_pool(size: int = 4) -> LinkedInScraperPool:
+    """
+    Get the shared scraper pool (singleton pattern)
+    The browser is launched on first use, not here.
+    """
+    global _pool
+    if _pool is None:
+        _pool = LinkedInScraperPool(size=size)
+    return _pool
+
+
+async def close_scraper_pool() -> None:
+    """Shut down the shared pool if it was ever started"""
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
@@ -1,30 +1,30 @@
 
-import re
-import dns.resolver
-import socket
 from typing import Tuple
+from app.services.discovery.pipeline import (
+    DiscoveryContext,
+    DiscoveryPipeline,
+    is_valid_email,
+    resolve_mx,
+    verification_stages,
+)
+from app.core.metrics import span
 
 class EmailVerifier:
-    '''Verify email addresses using DNS and SMTP checks'''
+    '''Verify email addresses using DNS and SMTP checks (adapter over the discovery pipeline)'''
     
     @staticmethod
     def validate_format(email: str) -> bool:
         '''Check if email format is valid'''
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return re.match(pattern, email) is not None
+        return is_valid_email(email)
     
     @staticmethod
     def check_mx_records(domain: str) -> Tuple[bool, str]:
         '''Check if domain has MX records'''
-        try:
-            mx_records = dns.resolver.resolve(domain, 'MX')
-            return True, str(mx_records[0].exchange)
-        except dns.resolver.NoAnswer:
-            return False, 'No MX records found'
-        except dns.resolver.NXDOMAIN:
-            return False, 'Domain does not exist'
-        except Exception as e:
-            return False, f'DNS error: {str(e)}'
+        with span('dns_mx'):
+            hosts, error = resolve_mx(domain)
+        if error:
+            return False, error
+        return True, hosts[0]
     
     @staticmethod
     def smtp_check(email: str, timeout: int = 10) -> Tuple[bool, str]:
@@ -32,52 +32,22 @@ class EmailVerifier:
         Perform SMTP check to verify if mailbox exists
         NOTE: Many servers block this, so not 100% reliable
         '''
-        try:
-            domain = email.split('@')[1]
-            has_mx, mx_host = EmailVerifier.check_mx_records(domain)
-            
-            if not has_mx:
-                return False, mx_host
-            
-            # Try SMTP connection (basic check only)
-            # Full SMTP verification often gets blocked
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(timeout)
-            try:
-                sock.connect((mx_host.rstrip('.'), 25))
-                sock.close()
-                return True, 'MX server reachable'
-            except:
-                return False, 'MX server not reachable'
-                
-        except Exception as e:
-            return False, f'SMTP check failed: {str(e)}'
+        pipeline = DiscoveryPipeline(verification_stages(timeout=timeout))
+        ctx = pipeline.run(DiscoveryContext(emails=[email]))
+        if not ctx.candidates:
+            return False, 'Invalid email format'
+        result = ctx.candidates[0]
+        return result['valid'] is not False, result['reason']
     
     @classmethod
-    def verify(cls, email: str) -> Tuple[bool, float, str]:
+    def verify(cls, email: str, timeout: int = 5) -> Tuple[bool, float, str]:
         '''
         Verify email and return (is_valid, confidence_score, message)
         Confidence: 0.0 - 1.0
         '''
-        # Check format
-        if not cls.validate_format(email):
+        pipeline = DiscoveryPipeline(verification_stages(timeout=timeout))
+        ctx = pipeline.run(DiscoveryContext(emails=[email]))
+        if not ctx.candidates:
             return False, 0.0, 'Invalid email format'
-        
-        # Check MX records
-        domain = email.split('@')[1]
-        has_mx, mx_message = cls.check_mx_records(domain)
-        
-        if not has_mx:
-            return False, 0.2, mx_message
-        
-        # MX records exist - medium confidence
-        confidence = 0.7
-        
-        # Try SMTP check (optional, often blocked)
-        smtp_valid, smtp_message = cls.smtp_check(email, timeout=5)
-        if smtp_valid:
-            confidence = 0.9
-            return True, confidence, 'Email verified via SMTP'
-        
-        # MX exists but SMTP failed - still likely valid
-        return True, confidence, f'MX records valid: {mx_message}'
+        result = ctx.candidates[0]
+        return result['valid'] is not False, result['confidence'], result['reason']
@@ -0,0 +1,231 @@
+"""
+MX host selection and connection racing for SMTP probes
+
+- MX records are tried in preference order, not resolver order.
+- MxHealth keeps a smoothed connect latency and a failure count per host.
+  Hosts that keep failing are parked for a while, and slow ones sort after
+  fast ones. Later probes then start with the fastest healthy host of the
+  best preference tier.
+- race_connect() connects "happy eyeballs" style (RFC 8305). It takes the
+  addresses of the top SMTP_RACE_HOSTS hosts, alternating IPv6 and IPv4,
+  and starts a new attempt every SMTP_CONNECT_STAGGER seconds until one
+  connects. The first socket to connect wins and the rest are closed; a
+  host that lost the race counts as a failed connect, so a slow primary
+  is parked and later probes go straight to the host that answered.
+
+Probes run in worker threads, so this uses non-blocking sockets and a
+selector rather than asyncio.
+"""
+import errno
+import logging
+import selectors
+import smtplib
+import socket
+import threading
+import time
+from itertools import chain, zip_longest
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Weight of the newest observation in the latency moving average
+LATENCY_ALPHA = 0.3
+# Consecutive connect failures before a host is parked
+FAILURES_BEFORE_DOWN = 2
+
+_IN_PROGRESS = {0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY}
+
+
+class _HostHealth:
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.failures = 0
+        self.down_until = 0.0
+
+
+class MxHealth:
+    """
+    Usage:
+        ordered = mx_health.order(["mx2.acme.com", "mx1.acme.com"], {"mx1.acme.com": 10, "mx2.acme.com": 20})
+        mx_health.record_success("mx1.acme.com", 0.042)
+        mx_health.record_failure("mx2.acme.com")
+    """
+
+    def __init__(self, down_seconds: Optional[float] = None, slow_seconds: Optional[float] = None):
+        self.down_seconds = settings.SMTP_HOST_DOWN_SECONDS if down_seconds is None else down_seconds
+        self.slow_seconds = settings.SMTP_SLOW_HOST_SECONDS if slow_seconds is None else slow_seconds
+        self._hosts: Dict[str, _HostHealth] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, host: str) -> _HostHealth:
+        key = host.rstrip(".").lower()
+        state = self._hosts.get(key)
+        if state is None:
+            state = self._hosts[key] = _HostHealth()
+        return state
+
+    def order(self, hosts: Sequence[str], preferences: Optional[Dict[str, int]] = None) -> List[str]:
+        """Healthy before parked, fast before slow, then MX preference, then latency"""
+        preferences = preferences or {}
+        now = time.time()
+        with self._lock:
+            def key(indexed: Tuple[int, str]):
+                index, host = indexed
+                state = self._state(host)
+                latency = state.latency if state.latency is not None else 0.0
+                return (
+                    state.down_until > now,
+                    latency > self.slow_seconds,
+                    preferences.get(host, index),
+                    latency,
+                    index,
+                )
+            return [host for _, host in sorted(enumerate(hosts), key=key)]
+
+    def record_success(self, host: str, seconds: float) -> None:
+        with self._lock:
+            state = self._state(host)
+            state.latency = seconds if state.latency is None else (
+                (1 - LATENCY_ALPHA) * state.latency + LATENCY_ALPHA * seconds
+            )
+            state.failures = 0
+            state.down_until = 0.0
+
+    def record_failure(self, host: str) -> None:
+        with self._lock:
+            state = self._state(host)
+            state.failures += 1
+            if state.failures >= FAILURES_BEFORE_DOWN:
+                delay = min(self.down_seconds * 2 ** (state.failures - FAILURES_BEFORE_DOWN), 3600.0)
+                state.down_until = time.time() + delay
+                logger.warning(f"MX {host} failed {state.failures} connects; parked for {delay:.0f}s")
+
+    def snapshot(self) -> Dict[str, Dict]:
+        now = time.time()
+        with self._lock:
+            return {
+                host: {
+                    "latency": state.latency,
+                    "failures": state.failures,
+                    "down_for": max(0.0, state.down_until - now),
+                }
+                for host, state in self._hosts.items()
+            }
+
+
+mx_health = MxHealth()
+
+
+def connect_targets(hosts: Sequence[str], port: int) -> List[Tuple[str, int, tuple]]:
+    """(host, family, sockaddr) per address, IPv6 and IPv4 interleaved within each host"""
+    targets = []
+    for host in hosts:
+        try:
+            infos = socket.getaddrinfo(host.rstrip("."), port, type=socket.SOCK_STREAM)
+        except OSError as e:
+            logger.debug(f"Cannot resolve MX {host}: {e}")
+            mx_health.record_failure(host)
+            continue
+        v6 = [(host, info[0], info[4]) for info in infos if info[0] == socket.AF_INET6]
+        v4 = [(host, info[0], info[4]) for info in infos if info[0] == socket.AF_INET]
+        targets.extend(t for t in chain.from_iterable(zip_longest(v6, v4)) if t is not None)
+    return targets
+
+
+def race_connect(
+    hosts: Sequence[str],
+    port: int,
+    timeout: float,
+    stagger: Optional[float] = None,
+) -> Tuple[socket.socket, str]:
+    """
+    Connected socket to the first host/address that answers, and its host
+
+    Raises smtplib.SMTPConnectError when nothing resolves, or the last
+    connect error (socket.timeout after `timeout`) when nothing connects.
+    """
+    stagger = settings.SMTP_CONNECT_STAGGER if stagger is None else stagger
+    targets = connect_targets(hosts, port)
+    if not targets:
+        raise smtplib.SMTPConnectError(-1, f"No address for {', '.join(hosts)}")
+
+    selector = selectors.DefaultSelector()
+    deadline = time.monotonic() + timeout
+    next_start = 0.0
+    attempts: Dict[socket.socket, Tuple[str, float]] = {}
+    failed_hosts = set()
+    winner: Optional[str] = None
+    last_error: Exception = socket.timeout(f"Connect to {', '.join(hosts)} timed out")
+    remaining = list(targets)
+
+    def start(target: Tuple[str, int, tuple]) -> None:
+        nonlocal last_error
+        host, family, sockaddr = target
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        error = sock.connect_ex(sockaddr)
+        if error not in _IN_PROGRESS:
+            last_error = OSError(error, f"Connect to {host} failed")
+            failed_hosts.add(host)
+            sock.close()
+            return
+        attempts[sock] = (host, time.monotonic())
+        selector.register(sock, selectors.EVENT_WRITE)
+
+    try:
+        while True:
+            now = time.monotonic()
+            if now >= deadline:
+                raise last_error
+            if remaining and (now >= next_start or not attempts):
+                start(remaining.pop(0))
+                next_start = now + stagger
+                continue
+            if not attempts:
+                raise last_error
+
+            wait = deadline - now
+            if remaining:
+                wait = min(wait, max(0.0, next_start - now))
+            for key, _ in selector.select(wait):
+                sock = key.fileobj
+                host, began = attempts.pop(sock)
+                selector.unregister(sock)
+                error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                if error:
+                    last_error = OSError(error, f"Connect to {host} failed")
+                    failed_hosts.add(host)
+                    sock.close()
+                    # Don't wait out the stagger after a hard failure
+                    next_start = 0.0
+                    continue
+                winner = host
+                mx_health.record_success(host, time.monotonic() - began)
+                sock.setblocking(True)
+                sock.settimeout(timeout)
+                return sock, host
+    finally:
+        # Hosts still connecting at the deadline, or when another host won,
+        # count as failed: they are what made this probe wait
+        failed_hosts.update(host for host, _ in attempts.values())
+        for sock in attempts:
+            sock.close()
+        selector.close()
+        for host in failed_hosts - {winner}:
+            mx_health.record_failure(host)
+
+
+class RacedSMTP(smtplib.SMTP):
+    """smtplib.SMTP that connects with race_connect() over several MX hosts"""
+
+    def __init__(self, hosts: Sequence[str], port: int, timeout: float):
+        self.hosts = list(hosts)
+        self.race_port = port
+        self.connected_host: Optional[str] = None
+        super().__init__(timeout=timeout)
+
+    def _get_socket(self, host, port, timeout):
+        sock, self.connected_host = race_connect(self.hosts, self.race_port, timeout)
+        return sock
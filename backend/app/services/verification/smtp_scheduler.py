@@ -0,0 +1,275 @@
+"""
+Per-host politeness scheduler for SMTP probing
+
+Every SMTP session with a mail host (e.g. aspmx.l.google.com) holds a
+HostScheduler.slot(), and every RCPT probe in it is charged with charge().
+For each host it enforces:
+- a cap on concurrent SMTP sessions
+- a cap on probes (RCPTs) per rolling minute, however many share a session
+- round-robin fairness across users waiting on the same host
+- exponential backoff after 421/451 replies (tempfail / throttling)
+
+Discovery runs in worker threads, so this is thread-based (one Condition).
+Given a `leases` cache, the caps also hold across server processes: a
+session takes one of max_concurrent lease rows in SQLite for the host, and
+a probe one of probes_per_minute rows that expire after the window. Every
+worker gets the full limits, and the lease rows keep them from adding up.
+A crashed worker's session rows expire after `session_ttl`. Backoff
+deadlines are shared through the SQLite cache too, so a 421 seen by one
+process pauses all.
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import span
+from app.db.cache_store import SQLiteCache
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_CODES = {421, 451}
+
+
+class SchedulerBusy(Exception):
+    """Raised when a probe could not get a slot within its wait timeout"""
+
+
+class _HostState:
+    def __init__(self):
+        self.active = 0
+        self.recent_probes: Deque[float] = deque()
+        self.backoff_until = 0.0
+        self.backoff_level = 0
+        # user -> queued tickets, plus the round-robin order of users
+        self.waiting: Dict[str, Deque[object]] = {}
+        self.turns: Deque[str] = deque()
+
+    def next_ticket(self) -> Optional[object]:
+        if not self.turns:
+            return None
+        return self.waiting[self.turns[0]][0]
+
+
+class HostScheduler:
+    """
+    Usage:
+        with smtp_scheduler.slot(mx_host, user_key=client_ip, charge=False):
+            for email in candidates:
+                smtp_scheduler.charge(mx_host)
+                code, _ = server.rcpt(email)
+        smtp_scheduler.report(mx_host, code)
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 2,
+        probes_per_minute: int = 30,
+        base_backoff: float = 30.0,
+        max_backoff: float = 600.0,
+        window: float = 60.0,
+        backoffs: Optional[SQLiteCache] = None,
+        leases: Optional[SQLiteCache] = None,
+        session_ttl: float = 300.0,
+        poll_interval: float = 0.1,
+    ):
+        self.max_concurrent = max_concurrent
+        self.probes_per_minute = probes_per_minute
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.window = window
+        self.backoffs = backoffs
+        self.leases = leases
+        self.session_ttl = session_ttl
+        self.poll_interval = poll_interval
+        self._hosts: Dict[str, _HostState] = {}
+        self._cond = threading.Condition()
+
+    @staticmethod
+    def _key(host: str) -> str:
+        return host.rstrip(".").lower()
+
+    def _state(self, host: str) -> _HostState:
+        key = self._key(host)
+        state = self._hosts.get(key)
+        if state is None:
+            state = self._hosts[key] = _HostState()
+        return state
+
+    def _wait_needed(self, state: _HostState, now: float, backoff: bool = True) -> float:
+        """Seconds until the host can take another probe (0 = now)"""
+        while state.recent_probes and state.recent_probes[0] <= now - self.window:
+            state.recent_probes.popleft()
+        waits = [0.0]
+        if backoff and state.backoff_until > now:
+            waits.append(state.backoff_until - now)
+        if len(state.recent_probes) >= self.probes_per_minute:
+            waits.append(state.recent_probes[0] + self.window - now)
+        return max(waits)
+
+    def _load_backoff(self, host: str, state: _HostState) -> None:
+        """Pick up a backoff another process recorded for `host`"""
+        if self.backoffs is not None:
+            state.backoff_until = max(state.backoff_until, self.backoffs.get(self._key(host), 0.0))
+
+    def _take_lease(self, host: str, kind: str, count: int, ttl: float) -> Optional[Tuple[str, str]]:
+        """Claim one of `count` shared lease rows for `host`; (key, token), or None if all are taken"""
+        token = uuid.uuid4().hex
+        for index in range(count):
+            key = f"{self._key(host)}|{kind}{index}"
+            if self.leases.add(key, token, ttl=ttl):
+                return key, token
+        return None
+
+    def _take_slot_leases(self, host: str, charge: bool) -> Optional[Tuple[str, str]]:
+        """The shared session lease (plus a probe lease if charging); None if another process holds them all"""
+        session = self._take_lease(host, "session", self.max_concurrent, self.session_ttl)
+        if session is None:
+            return None
+        if charge and self._take_lease(host, "probe", self.probes_per_minute, self.window) is None:
+            self.leases.delete_if(*session)
+            return None
+        return session
+
+    @contextmanager
+    def slot(self, host: str, user_key: str = "anonymous", timeout: Optional[float] = None,
+             charge: bool = True, wait_backoff: bool = True) -> Iterator[None]:
+        """
+        Hold one SMTP session slot for `host`
+
+        The slot counts as one probe against the per-minute cap unless
+        `charge` is False; sessions that send several RCPTs pass False and
+        call charge() before each one. With `wait_backoff` False the slot
+        ignores `host`'s own 421/451 backoff, for callers that key slots on a
+        provider and route around backed-off hosts themselves. Raises
+        SchedulerBusy if no slot frees up within `timeout` seconds.
+        """
+        ticket = object()
+        lease = None
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with span("smtp_queue"), self._cond:
+            state = self._state(host)
+            self._load_backoff(host, state)
+            queue = state.waiting.setdefault(user_key, deque())
+            queue.append(ticket)
+            if user_key not in state.turns:
+                state.turns.append(user_key)
+
+            try:
+                while True:
+                    now = time.monotonic()
+                    delay = self._wait_needed(state, time.time(), backoff=wait_backoff)
+                    if (
+                        state.next_ticket() is ticket
+                        and state.active < self.max_concurrent
+                        and delay == 0
+                    ):
+                        if self.leases is None:
+                            break
+                        lease = self._take_slot_leases(host, charge)
+                        if lease is not None:
+                            break
+                        # Other processes hold the host's capacity; poll the lease rows
+                        delay = self.poll_interval
+                    remaining = None if deadline is None else deadline - now
+                    if remaining is not None and remaining <= 0:
+                        raise SchedulerBusy(f"No SMTP slot for {host} within {timeout:g}s")
+                    wait_for = [w for w in (remaining, delay or None) if w is not None]
+                    self._cond.wait(min(wait_for) if wait_for else None)
+            except BaseException:
+                self._dequeue(state, user_key, ticket)
+                self._cond.notify_all()
+                raise
+
+            self._dequeue(state, user_key, ticket)
+            state.active += 1
+            if charge:
+                state.recent_probes.append(time.time())
+            # Let the next user in line re-check capacity
+            self._cond.notify_all()
+
+        try:
+            yield
+        finally:
+            if lease is not None:
+                self.leases.delete_if(*lease)
+            with self._cond:
+                state.active -= 1
+                self._cond.notify_all()
+
+    def charge(self, host: str, timeout: Optional[float] = None, wait_backoff: bool = True) -> None:
+        """
+        Count one probe against `host`'s per-minute cap, waiting for room
+
+        Also waits out a backoff unless `wait_backoff` is False. Raises
+        SchedulerBusy if the window has no room within `timeout` seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            state = self._state(host)
+            while True:
+                delay = self._wait_needed(state, time.time(), backoff=wait_backoff)
+                if delay == 0 and (
+                    self.leases is None
+                    or self._take_lease(host, "probe", self.probes_per_minute, self.window) is not None
+                ):
+                    state.recent_probes.append(time.time())
+                    return
+                delay = delay or self.poll_interval
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise SchedulerBusy(f"No SMTP probe budget for {host} within {timeout:g}s")
+                self._cond.wait(delay if remaining is None else min(delay, remaining))
+
+    @staticmethod
+    def _dequeue(state: _HostState, user_key: str, ticket: object) -> None:
+        queue = state.waiting.get(user_key)
+        if queue is None:
+            return
+        was_head = state.turns and state.turns[0] == user_key and queue[0] is ticket
+        try:
+            queue.remove(ticket)
+        except ValueError:
+            return
+        if not queue:
+            del state.waiting[user_key]
+            state.turns.remove(user_key)
+        elif was_head:
+            # Served: this user goes to the back of the line
+            state.turns.rotate(-1)
+
+    def report(self, host: str, code: Optional[int]) -> None:
+        """Feed back an SMTP reply code; 421/451 trigger exponential backoff"""
+        with self._cond:
+            state = self._state(host)
+            if code in BACKOFF_CODES:
+                state.backoff_level += 1
+                delay = min(self.max_backoff, self.base_backoff * 2 ** (state.backoff_level - 1))
+                state.backoff_until = max(state.backoff_until, time.time() + delay)
+                if self.backoffs is not None:
+                    self.backoffs.set(self._key(host), state.backoff_until, ttl=delay)
+                logger.warning(f"SMTP {code} from {host}; backing off {delay:.0f}s")
+            elif code is not None and (200 <= code < 300 or code in (550, 551, 553)):
+                state.backoff_level = 0
+            self._cond.notify_all()
+
+    def backoff_remaining(self, host: str) -> float:
+        """Seconds left of `host`'s backoff, as recorded by any process"""
+        with self._cond:
+            state = self._state(host)
+            self._load_backoff(host, state)
+            return max(0.0, state.backoff_until - time.time())
+
+
+smtp_scheduler = HostScheduler(
+    max_concurrent=settings.SMTP_MAX_SESSIONS_PER_HOST,
+    probes_per_minute=settings.SMTP_PROBES_PER_MINUTE,
+    base_backoff=settings.SMTP_BACKOFF_SECONDS,
+    backoffs=SQLiteCache(settings.CACHE_DB_PATH, "smtp_backoff"),
+    leases=SQLiteCache(settings.CACHE_DB_PATH, "smtp_leases"),
+)
@@ -0,0 +1,543 @@
+"""
+Campaign runs: discover, generate and persist one email per recipient
+
+A campaign is a recipient list plus a shared generation template. A run
+pushes every recipient through three stages connected by bounded queues:
+
+    discover (SMTP) -> generate (LLM) -> persist (Supabase)
+
+Each stage has its own worker count (CAMPAIGN_*_CONCURRENCY), so SMTP
+probing for later recipients overlaps with LLM calls for earlier ones, and
+the queues (CAMPAIGN_QUEUE_SIZE) keep a fast stage from running far ahead.
+
+Progress is checkpointed per recipient in the SQLite cache after every
+stage. A run that dies (crash, deploy, worker recycle) resumes where each
+recipient stopped: a run lease (SQLiteCache.add, renewed while running)
+expires and any worker's watchdog picks the campaign up again. The lease
+holds a token unique to the run; it is renewed and released only while it
+still holds that token, and a run that finds its lease taken over stops,
+leaving the campaign to the new owner. Emails are upserted with an id
+derived from the campaign and recipient index, so a replayed persist
+doesn't duplicate rows.
+
+Counters are updated incrementally: finished recipients add to pending
+deltas, which are journaled and sent in batches of
+CAMPAIGN_COUNTER_FLUSH_EVERY (see app.db.campaign_counters). A recipient
+is marked counted once its batch is stored, so resumed runs count each
+recipient exactly once and never recount the emails table. The
+generated email's rollups (app.db.email_rollups) are counted when the
+recipient is checkpointed as persisted, not when the upsert returns, so a
+replayed persist doesn't count them twice.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.deadline import clear_deadline
+from app.core.metrics import record_campaign_recipient, start_trace
+from app.db.campaign_counters import increment_counters
+from app.db.cache_store import SQLiteCache
+from app.db.email_rollups import email_rollups
+from app.db.optional_columns import save_row
+
+logger = logging.getLogger(__name__)
+
+# Campaign statuses
+DRAFT = "draft"
+RUNNING = "running"
+COMPLETED = "completed"
+INTERRUPTED = "interrupted"
+
+# Recipient stages, in order
+PENDING = "pending"
+DISCOVERED = "discovered"
+GENERATED = "generated"
+PERSISTED = "persisted"
+FAILED = "failed"
+FINISHED = (PERSISTED, FAILED)
+
+_DONE = object()
+
+
+class CampaignNotFound(Exception):
+    pass
+
+
+class RecipientFailed(Exception):
+    """This recipient can't get an email; the rest of the run goes on"""
+
+
+class LeaseLost(Exception):
+    """Another worker took over the campaign's run lease"""
+
+
+class _Run:
+    """State of one campaign run in this process"""
+
+    def __init__(self, campaign_id: str, spec: Dict, token: str):
+        self.id = campaign_id
+        self.spec = spec
+        self.token = token
+        self.recipients: List[Dict] = spec["recipients"]
+        self.template: Dict = spec["template"]
+        self.deltas: Counter = Counter()
+        self.uncounted: List[int] = []
+        self.flush_lock = asyncio.Lock()
+
+
+class CampaignEngine:
+    """
+    Usage:
+        campaign = campaign_engine.create("Infra roles", recipients, template, user_id)
+        campaign_engine.start(campaign["id"])
+        campaign_engine.progress(campaign["id"])  # {"status": "running", "generated": 12, ...}
+    """
+
+    def __init__(
+        self,
+        cache: Optional[SQLiteCache] = None,
+        discovery=None,
+        compose: Optional[Callable] = None,
+        concurrency: Optional[Dict[str, int]] = None,
+        queue_size: Optional[int] = None,
+        flush_every: Optional[int] = None,
+        lease_seconds: Optional[float] = None,
+    ):
+        self.campaigns = cache or SQLiteCache(settings.CACHE_DB_PATH, "campaigns")
+        self.items = SQLiteCache(self.campaigns.path, "campaign_items")
+        self.leases = SQLiteCache(self.campaigns.path, "campaign_leases")
+        self._discovery = discovery
+        self._compose = compose
+        self.concurrency = concurrency or {
+            "discover": settings.CAMPAIGN_DISCOVER_CONCURRENCY,
+            "generate": settings.CAMPAIGN_GENERATE_CONCURRENCY,
+            "persist": settings.CAMPAIGN_PERSIST_CONCURRENCY,
+        }
+        self.queue_size = queue_size or settings.CAMPAIGN_QUEUE_SIZE
+        self.flush_every = flush_every or settings.CAMPAIGN_COUNTER_FLUSH_EVERY
+        self.lease_seconds = lease_seconds or settings.CAMPAIGN_LEASE_SECONDS
+        self._runs: Dict[str, asyncio.Task] = {}
+        self._watchdog: Optional[asyncio.Task] = None
+
+    @property
+    def discovery(self):
+        if self._discovery is None:
+            from app.services.email_discovery import EmailDiscoveryService
+            self._discovery = EmailDiscoveryService()
+        return self._discovery
+
+    @property
+    def compose(self) -> Callable:
+        if self._compose is None:
+            from app.api.routes.ai_generation import compose_email
+            self._compose = compose_email
+        return self._compose
+
+    # Campaigns
+
+    def create(
+        self,
+        name: str,
+        recipients: List[Dict],
+        template: Dict,
+        user_id: str,
+        description: Optional[str] = None,
+    ) -> Dict:
+        """Store the campaign (Supabase row + local spec) as a draft; returns the row"""
+        now = datetime.utcnow().isoformat()
+        campaign = {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "name": name,
+            "description": description,
+            "status": DRAFT,
+            "total_emails": len(recipients),
+            "generated_count": 0,
+            "sent_count": 0,
+            "opened_count": 0,
+            "clicked_count": 0,
+            "replied_count": 0,
+            "failed_count": 0,
+            "created_at": now,
+            "updated_at": now,
+        }
+        from app.core.supabase_client import get_supabase_client
+
+        get_supabase_client().table("campaigns").insert(campaign).execute()
+        self._save_spec(campaign["id"], {
+            "campaign": campaign,
+            "recipients": recipients,
+            "template": template,
+            "status": DRAFT,
+            "counters": {"generated_count": 0, "failed_count": 0},
+            "error": None,
+        })
+        logger.info(f"Created campaign {campaign['id']} with {len(recipients)} recipients")
+        return campaign
+
+    def get(self, campaign_id: str) -> Optional[Dict]:
+        return self.campaigns.get(campaign_id)
+
+    def progress(self, campaign_id: str) -> Dict:
+        """Counters as of the last flush, from the local spec (no database call)"""
+        spec = self.campaigns.get(campaign_id)
+        if spec is None:
+            raise CampaignNotFound(campaign_id)
+        total = len(spec["recipients"])
+        generated = spec["counters"].get("generated_count", 0)
+        failed = spec["counters"].get("failed_count", 0)
+        return {
+            "status": spec["status"],
+            "total": total,
+            "generated": generated,
+            "failed": failed,
+            "remaining": max(0, total - generated - failed),
+            "running": self.leases.contains(campaign_id),
+            "error": spec.get("error"),
+        }
+
+    def start(self, campaign_id: str) -> bool:
+        """Run (or resume) the campaign in the background; False if it is already running"""
+        if self.campaigns.get(campaign_id) is None:
+            raise CampaignNotFound(campaign_id)
+        token = f"{os.getpid()}:{uuid.uuid4().hex}"
+        if not self.leases.add(campaign_id, token, ttl=self.lease_seconds):
+            return False
+        self._runs[campaign_id] = asyncio.create_task(
+            self._run(campaign_id, token), name=f"campaign:{campaign_id}"
+        )
+        return True
+
+    # Background watchdog
+
+    def start_watchdog(self) -> None:
+        """Resume runs whose worker died (call from the event loop)"""
+        if self._watchdog is None:
+            self._watchdog = asyncio.create_task(self._watch(), name="campaign-watchdog")
+
+    async def stop(self) -> None:
+        """Cancel this worker's runs; their leases are released so another worker resumes them"""
+        tasks = ([self._watchdog] if self._watchdog else []) + list(self._runs.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._watchdog = None
+
+    async def _watch(self) -> None:
+        while True:
+            try:
+                self.resume_orphaned()
+            except Exception as e:
+                logger.error(f"Campaign watchdog failed: {e}", exc_info=True)
+            await asyncio.sleep(self.lease_seconds / 2)
+
+    def resume_orphaned(self) -> List[str]:
+        """Start every running campaign whose lease has lapsed; returns their ids"""
+        resumed = []
+        for campaign_id, spec in self.campaigns.items():
+            if spec.get("status") == RUNNING and campaign_id not in self._runs and self.start(campaign_id):
+                logger.info(f"Resuming campaign {campaign_id}")
+                resumed.append(campaign_id)
+        return resumed
+
+    # Runs
+
+    async def _run(self, campaign_id: str, token: str) -> None:
+        # Started from a request: don't inherit its deadline or trace
+        clear_deadline()
+        start_trace()
+        run = _Run(campaign_id, self.campaigns.get(campaign_id), token)
+        heartbeat = asyncio.create_task(self._heartbeat(run, asyncio.current_task()))
+        try:
+            await self._set_status(run, RUNNING)
+            await self._pipeline(run)
+            if await self._flush(run):
+                await self._set_status(run, COMPLETED)
+                logger.info(f"Campaign {campaign_id} completed: {run.spec['counters']}")
+            else:
+                await self._set_status(run, INTERRUPTED, "Counter update failed; run again to retry")
+        except asyncio.CancelledError:
+            logger.info(f"Campaign {campaign_id} stopped; it resumes from its checkpoint")
+            raise
+        except LeaseLost:
+            logger.warning(f"Campaign {campaign_id} lost its run lease; leaving it to the new owner")
+        except Exception as e:
+            logger.error(f"Campaign {campaign_id} interrupted: {e}", exc_info=True)
+            await self._set_status(run, INTERRUPTED, str(e))
+        finally:
+            heartbeat.cancel()
+            self.leases.delete_if(campaign_id, token)
+            self._runs.pop(campaign_id, None)
+
+    async def _heartbeat(self, run: _Run, task: asyncio.Task) -> None:
+        """Renew the run lease; if another worker has taken it, stop the run"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not self.leases.replace_if(run.id, run.token, run.token, ttl=self.lease_seconds):
+                logger.warning(f"Campaign {run.id} lease was taken over; stopping this run")
+                task.cancel()
+                return
+
+    def _check_lease(self, run: _Run) -> None:
+        if self.leases.get(run.id) != run.token:
+            raise LeaseLost(run.id)
+
+    async def _pipeline(self, run: _Run) -> None:
+        """Feed unfinished recipients through the three stages"""
+        stages = [
+            ("discover", self._discover),
+            ("generate", self._generate),
+            ("persist", self._persist),
+        ]
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in stages]
+        tasks = [asyncio.create_task(self._feed(run, queues[0]))]
+        for i, (name, handler) in enumerate(stages):
+            outbox = queues[i + 1] if i + 1 < len(stages) else None
+            tasks.append(asyncio.create_task(
+                self._stage(run, name, handler, queues[i], outbox, self.concurrency[name])
+            ))
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _feed(self, run: _Run, inbox: asyncio.Queue) -> None:
+        journal = self.items.get(self._batch_key(run.id)) or {}
+        journaled = set(journal.get("indexes", []))
+        for index in range(len(run.recipients)):
+            item = self.items.get(self._item_key(run.id, index)) or {"stage": PENDING}
+            if item["stage"] in FINISHED:
+                # Finished before a crash but not yet in a stored counter batch
+                if not item.get("counted") and index not in journaled:
+                    run.deltas["generated_count" if item["stage"] == PERSISTED else "failed_count"] += 1
+                    run.uncounted.append(index)
+                continue
+            await inbox.put((index, item))
+        await inbox.put(_DONE)
+
+    async def _stage(
+        self,
+        run: _Run,
+        name: str,
+        handler: Callable,
+        inbox: asyncio.Queue,
+        outbox: Optional[asyncio.Queue],
+        workers: int,
+    ) -> None:
+        async def worker():
+            while True:
+                entry = await inbox.get()
+                if entry is _DONE:
+                    await inbox.put(_DONE)  # Let the sibling workers see it
+                    return
+                index, item = entry
+                try:
+                    item = await handler(run, index, item)
+                except RecipientFailed as e:
+                    await self._finish(run, index, {**item, "stage": FAILED, "failed_at": name, "error": str(e)})
+                    continue
+                if outbox is None:
+                    await self._finish(run, index, item)
+                else:
+                    self.items.set(self._item_key(run.id, index), item, ttl=settings.CAMPAIGN_TTL)
+                    await outbox.put((index, item))
+
+        await asyncio.gather(*(worker() for _ in range(workers)))
+        if outbox is not None:
+            await outbox.put(_DONE)
+
+    async def _discover(self, run: _Run, index: int, item: Dict) -> Dict:
+        if item["stage"] != PENDING:
+            return item
+        recipient = run.recipients[index]
+        if recipient.get("email"):
+            return {**item, "stage": DISCOVERED, "email": recipient["email"], "email_confidence": None,
+                    "email_source": "provided"}
+
+        from app.services.discovery.domain_patterns import domain_patterns
+        from app.services.discovery.pipeline import normalize_domain
+
+        domain = normalize_domain(recipient["company_domain"])
+        pattern_hint = await domain_patterns.lookup(domain)
+        try:
+            results = await asyncio.to_thread(
+                self.discovery.discover_email,
+                first_name=recipient["first_name"],
+                last_name=recipient.get("last_name") or "",
+                company_domain=domain,
+                verify=True,
+                user_key=f"campaign:{run.id}",
+                pattern_hint=pattern_hint,
+            )
+        except Exception as e:
+            raise RecipientFailed(f"Discovery failed: {e}")
+        best = results[0] if results else None
+        if best is None or best["confidence"] < settings.CAMPAIGN_MIN_CONFIDENCE:
+            raise RecipientFailed("No deliverable address found")
+        if best["confidence"] >= 0.9:
+            domain_patterns.record_verified(domain, best["pattern"])
+        return {**item, "stage": DISCOVERED, "email": best["email"], "email_confidence": best["confidence"],
+                "email_source": "pattern_smtp"}
+
+    async def _generate(self, run: _Run, index: int, item: Dict) -> Dict:
+        if item["stage"] != DISCOVERED:
+            return item
+        from app.api.routes.ai_generation import CompleteEmailRequest
+
+        recipient = run.recipients[index]
+        try:
+            request = CompleteEmailRequest(
+                **run.template,
+                recipient_first_name=recipient["first_name"],
+                recipient_last_name=recipient.get("last_name"),
+                recipient_company=recipient.get("company") or recipient.get("company_domain") or "",
+                recipient_title=recipient.get("title"),
+                recipient_email=item["email"],
+            )
+            draft = await self.compose(request)
+        except Exception as e:
+            raise RecipientFailed(f"Generation failed: {e}")
+        return {**item, "stage": GENERATED, "draft": {
+            "subject_line": draft["subject_line"],
+            "body": draft["body"],
+            "confidence_score": draft["confidence_score"],
+            "model": draft["body_model"],
+            "tone": request.tone,
+            "latency_ms": draft["latency_ms"],
+        }}
+
+    async def _persist(self, run: _Run, index: int, item: Dict) -> Dict:
+        """
+        Upsert the email row; database errors interrupt the run instead of
+        failing the recipient, and the resumed run persists it again
+        """
+        recipient = run.recipients[index]
+        draft = item["draft"]
+        now = datetime.utcnow().isoformat()
+        row = {
+            "id": self.email_id(run.id, index),
+            "campaign_id": run.id,
+            "recipient_name": f"{recipient['first_name']} {recipient.get('last_name') or ''}".strip(),
+            "recipient_email": item["email"],
+            "recipient_company": recipient.get("company") or recipient.get("company_domain") or "",
+            "recipient_title": recipient.get("title"),
+            "role_name": run.template.get("role_interested_in"),
+            "subject_line": draft["subject_line"],
+            "body": draft["body"],
+            "status": "generated",
+            "model": draft["model"],
+            "tone": draft.get("tone"),
+            "confidence_score": draft["confidence_score"],
+            "generation_ms": draft.get("latency_ms"),
+            "email_source": item.get("email_source"),
+            "verified": (item.get("email_confidence") or 0) >= 0.9,
+            "updated_at": now,
+        }
+
+        await asyncio.to_thread(save_row, "emails", row, on_conflict="id")
+        # What email_rollups needs of the row; counted by _finish, not checkpointed
+        rollup = {field: row[field] for field in (
+            "recipient_company", "role_name", "tone", "model", "confidence_score", "generation_ms",
+        )}
+        return {"stage": PERSISTED, "email": item["email"], "email_id": row["id"], "rollup": rollup}
+
+    async def _finish(self, run: _Run, index: int, item: Dict) -> None:
+        """Checkpoint a finished recipient and add it to the pending counter deltas"""
+        item = dict(item)
+        rollup = item.pop("rollup", None)
+        self.items.set(self._item_key(run.id, index), {**item, "counted": False}, ttl=settings.CAMPAIGN_TTL)
+        if item["stage"] == PERSISTED:
+            if rollup is not None:
+                email_rollups.add(rollup, "generated_count")
+            run.deltas["generated_count"] += 1
+            record_campaign_recipient("generated", "persist")
+        else:
+            run.deltas["failed_count"] += 1
+            record_campaign_recipient("failed", item.get("failed_at", "unknown"))
+            logger.warning(f"Campaign {run.id} recipient {index} failed at {item.get('failed_at')}: {item.get('error')}")
+        run.uncounted.append(index)
+        if len(run.uncounted) >= self.flush_every and not run.flush_lock.locked():
+            await self._flush(run)
+
+    async def _flush(self, run: _Run) -> bool:
+        """
+        Send pending counter deltas; True when nothing is left to send
+
+        The batch is journaled before it is sent, and its recipients are
+        marked counted after, so a crash in between resends the same batch
+        id (which the database ignores) rather than counting again. Raises
+        LeaseLost if another worker has taken the run over, so two runs never
+        send the same recipients in different batches.
+        """
+        async with run.flush_lock:
+            batch_key = self._batch_key(run.id)
+            while True:
+                self._check_lease(run)
+                batch = self.items.get(batch_key)
+                if batch is None:
+                    if not run.uncounted:
+                        return True
+                    batch = {"id": uuid.uuid4().hex, "deltas": dict(run.deltas), "indexes": run.uncounted}
+                    run.deltas, run.uncounted = Counter(), []
+                    self.items.set(batch_key, batch, ttl=settings.CAMPAIGN_TTL)
+
+                if not await asyncio.to_thread(increment_counters, run.id, batch["deltas"], batch["id"]):
+                    return False
+
+                for index in batch["indexes"]:
+                    key = self._item_key(run.id, index)
+                    item = self.items.get(key)
+                    if item is not None:
+                        self.items.set(key, {**item, "counted": True}, ttl=settings.CAMPAIGN_TTL)
+                counters = run.spec["counters"]
+                for field, n in batch["deltas"].items():
+                    counters[field] = counters.get(field, 0) + n
+                self._save_spec(run.id, run.spec)
+                self.items.delete(batch_key)
+
+    async def _set_status(self, run: _Run, status: str, error: Optional[str] = None) -> None:
+        run.spec["status"] = status
+        run.spec["error"] = error
+        run.spec["campaign"]["status"] = status
+        self._save_spec(run.id, run.spec)
+
+        def update():
+            from app.core.supabase_client import get_supabase_client
+
+            get_supabase_client().table("campaigns").update({
+                "status": status,
+                "updated_at": datetime.utcnow().isoformat(),
+            }).eq("id", run.id).execute()
+
+        try:
+            await asyncio.to_thread(update)
+        except Exception as e:
+            logger.error(f"Failed to set campaign {run.id} status to {status}: {e}")
+
+    def _save_spec(self, campaign_id: str, spec: Dict[str, Any]) -> None:
+        self.campaigns.set(campaign_id, spec, ttl=settings.CAMPAIGN_TTL)
+
+    @staticmethod
+    def email_id(campaign_id: str, index: int) -> str:
+        """Stable emails.id for a recipient, so persisting twice updates one row"""
+        return str(uuid.uuid5(uuid.UUID(campaign_id), str(index)))
+
+    @staticmethod
+    def _item_key(campaign_id: str, index: int) -> str:
+        return f"{campaign_id}:{index}"
+
+    @staticmethod
+    def _batch_key(campaign_id: str) -> str:
+        return f"{campaign_id}:counter-batch"
+
+
+campaign_engine = CampaignEngine()
@@ -0,0 +1,290 @@
+"""
+Outbound send queue: generated -> queued -> sent / failed
+
+POST /api/sending/queue marks emails rows "queued", optionally with a
+send_at time. A background task started in the app lifespan polls for due
+rows, SEND_BATCH_SIZE at a time. It sends them through email_sender
+(pooled relay connections, per-domain pacing) and writes the outcomes back
+with one PATCH per outcome, not one per row:
+
+- sent: status "sent" and sent_at
+- failed: status "failed" with the relay's reply in send_error
+- temporary failures stay queued with send_attempts + 1 and a later
+  scheduled_at (SEND_RETRY_DELAY, doubling), up to SEND_MAX_ATTEMPTS
+- rows held back by domain pacing stay queued a little longer and use
+  no attempt
+
+Every worker polls. A lease per row (SQLiteCache.add) makes sure only one
+of them sends it, and the poll skips rows other workers are sending, so a
+slow batch doesn't hide the rows behind it. Campaign sent/failed counters
+go through the shared CounterBuffer.
+
+A message the relay accepted must never be sent again, even if the PATCH
+that marks it sent fails. Its outcome is journaled in SQLite as soon as
+the relay accepts it and cleared once the row is written. Journaled rows
+are never claimed, and each batch first replays the journal's outcomes.
+"""
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.db.cache_store import SQLiteCache
+from app.db.campaign_counters import campaign_counters
+from app.db.email_rollups import email_rollups
+from app.services.email.sender import DEFERRED, FAILED, RETRY, SENT
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+# Statuses enqueue() accepts: never resend what was sent
+QUEUEABLE = ("generated", "failed")
+# How long a sent row stays claimed, so a worker with a stale read can't resend it
+CLAIM_TTL = 3600.0
+# Lease value of a row whose outcome is recorded (anything else is in flight)
+RECORDED = "recorded"
+# How long an outcome the database hasn't taken yet is kept for replay
+JOURNAL_TTL = 7 * 24 * 3600.0
+
+
+class SendQueue:
+    """
+    Usage:
+        ids = send_queue.enqueue(campaign_id=campaign_id, send_at=datetime(2025, 3, 3, 9))
+        send_queue.stats()  # {"sent": 12, "failed": 1, "relay": {...}} for this worker
+    """
+
+    def __init__(
+        self,
+        sender=None,
+        leases: Optional[SQLiteCache] = None,
+        journal: Optional[SQLiteCache] = None,
+        batch_size: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        retry_delay: Optional[float] = None,
+        concurrency: Optional[int] = None,
+    ):
+        self._sender = sender
+        self.leases = leases or SQLiteCache(settings.CACHE_DB_PATH, "send_leases")
+        self.journal = journal or SQLiteCache(self.leases.path, "send_journal")
+        self.batch_size = batch_size or settings.SEND_BATCH_SIZE
+        self.poll_interval = settings.SEND_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.max_attempts = max_attempts or settings.SEND_MAX_ATTEMPTS
+        self.retry_delay = settings.SEND_RETRY_DELAY if retry_delay is None else retry_delay
+        self._concurrency = concurrency
+        self.counts: Dict[str, int] = defaultdict(int)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def sender(self):
+        if self._sender is None:
+            from app.services.email.sender import email_sender
+            self._sender = email_sender
+        return self._sender
+
+    @property
+    def concurrency(self) -> int:
+        """Sends in flight: enough to keep every relay connection busy while others wait on pacing"""
+        return self._concurrency or self.sender.pool.size * 2
+
+    @property
+    def enabled(self) -> bool:
+        return self.sender.pool.configured
+
+    def enqueue(
+        self,
+        email_ids: Optional[List[str]] = None,
+        campaign_id: Optional[str] = None,
+        send_at: Optional[datetime] = None,
+    ) -> List[str]:
+        """Queue generated (or failed) emails by id and/or campaign; returns the queued ids"""
+        if not email_ids and not campaign_id:
+            return []
+        from app.core.supabase_client import get_supabase_client
+
+        query = get_supabase_client().table("emails").update({
+            "status": QUEUED,
+            "scheduled_at": (send_at or datetime.utcnow()).isoformat(),
+            "send_attempts": 0,
+            "send_error": None,
+            "updated_at": datetime.utcnow().isoformat(),
+        }).in_("status", list(QUEUEABLE))
+        if email_ids:
+            query = query.in_("id", email_ids)
+        if campaign_id:
+            query = query.eq("campaign_id", campaign_id)
+        queued = [row["id"] for row in query.execute().data]
+        for email_id in queued:
+            self.leases.delete(email_id)  # Requeued failures were claimed before
+        logger.info(f"Queued {len(queued)} emails for sending")
+        if queued and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return queued
+
+    def stats(self) -> Dict:
+        return {**self.counts, "relay": self.sender.pool.snapshot()}
+
+    def start(self) -> None:
+        """Start the background sender (call from the event loop); no-op without a relay"""
+        if self._task is not None or not self.enabled:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="send-queue")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await asyncio.to_thread(self.sender.pool.close)
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                done = await self.process_batch()
+            except Exception as e:
+                logger.error(f"Send batch failed: {e}", exc_info=True)
+                done = 0
+            if done:
+                continue  # More may be due right away
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def process_batch(self) -> int:
+        """Send one batch of due rows; returns how many got a final or retry outcome"""
+        await asyncio.to_thread(self._replay_journal)
+        rows = await asyncio.to_thread(self._due_rows)
+        claimed = [
+            row for row in rows
+            if not self.journal.contains(row["id"]) and self.leases.add(row["id"], os.getpid(), ttl=CLAIM_TTL)
+        ]
+        if not claimed:
+            return 0
+
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def send(row: Dict) -> Dict:
+            async with limit:
+                result = await asyncio.to_thread(self.sender.send, row, row.get("campaign_id") or "direct")
+            if result["outcome"] == SENT:
+                # The relay has it: journal before anything else can fail
+                self.journal.set(row["id"], self._sent_update(), ttl=JOURNAL_TTL)
+            return result
+
+        results = await asyncio.gather(*(send(row) for row in claimed))
+        await asyncio.to_thread(self._record, claimed, results)
+        return sum(1 for r in results if r["outcome"] != DEFERRED)
+
+    def _due_rows(self) -> List[Dict]:
+        """The next due rows that no worker is sending and no journaled outcome covers"""
+        from app.core.supabase_client import get_supabase_client
+
+        busy = [email_id for email_id, owner in self.leases.items() if owner != RECORDED]
+        busy += [email_id for email_id, _ in self.journal.items()]
+        query = get_supabase_client().table("emails").select("*").eq("status", QUEUED).lte(
+            "scheduled_at", datetime.utcnow().isoformat()
+        )
+        if busy:
+            query = query.not_.in_("id", busy)
+        return query.order("scheduled_at").limit(self.batch_size).execute().data
+
+    @staticmethod
+    def _sent_update() -> Dict:
+        return {"status": SENT, "sent_at": datetime.utcnow().isoformat(), "send_error": None}
+
+    def _replay_journal(self) -> None:
+        """Write outcomes whose PATCH failed before; their rows stay unclaimable until it lands"""
+        from app.core.supabase_client import get_supabase_client
+
+        pending: Dict[tuple, List[str]] = defaultdict(list)
+        for email_id, update in self.journal.items():
+            pending[tuple(sorted(update.items()))].append(email_id)
+        if not pending:
+            return
+        table = get_supabase_client().table("emails")
+        for update, ids in pending.items():
+            try:
+                table.update({**dict(update), "updated_at": datetime.utcnow().isoformat()}).in_("id", ids).execute()
+            except Exception as e:
+                logger.error(f"Still can't record send outcome for {len(ids)} emails: {e}")
+                continue
+            for email_id in ids:
+                self.journal.delete(email_id)
+            logger.info(f"Recorded {len(ids)} journaled send outcomes")
+
+    def _record(self, rows: List[Dict], results: List[Dict]) -> None:
+        """Write outcomes back, grouped so each distinct update is one PATCH"""
+        from app.core.supabase_client import get_supabase_client
+
+        now = datetime.utcnow()
+        updates: Dict[tuple, List[str]] = defaultdict(list)
+        release = []
+        for row, result in zip(rows, results):
+            outcome = result["outcome"]
+            attempts = (row.get("send_attempts") or 0) + (outcome == RETRY)
+            if outcome == RETRY and attempts >= self.max_attempts:
+                outcome = FAILED
+            if outcome == SENT:
+                update = {"status": SENT, "sent_at": now.isoformat(), "send_error": None}
+            elif outcome == FAILED:
+                update = {"status": FAILED, "send_error": result.get("error"), "send_attempts": attempts}
+            elif outcome == RETRY:
+                delay = self.retry_delay * 2 ** (attempts - 1)
+                update = {
+                    "send_attempts": attempts,
+                    "send_error": result.get("error"),
+                    "scheduled_at": (now + timedelta(seconds=delay)).isoformat(),
+                }
+                release.append(row["id"])
+            else:
+                # Paced: come back after roughly one send slot for the domain
+                delay = 60.0 / max(1, settings.SEND_PER_DOMAIN_PER_MINUTE)
+                update = {"scheduled_at": (now + timedelta(seconds=delay)).isoformat()}
+                release.append(row["id"])
+            update["updated_at"] = now.isoformat()
+            updates[tuple(sorted(update.items()))].append(row["id"])
+            self.counts[outcome] += 1
+            if outcome in (SENT, FAILED):
+                counter = "sent_count" if outcome == SENT else "failed_count"
+                email_rollups.add(row, counter)
+                if row.get("campaign_id"):
+                    campaign_counters.add(row["campaign_id"], counter)
+
+        table = get_supabase_client().table("emails")
+        for update, ids in updates.items():
+            update = dict(update)
+            final = update.get("status") in (SENT, FAILED)
+            try:
+                table.update(update).in_("id", ids).execute()
+            except Exception as e:
+                logger.error(f"Failed to record send outcome for {len(ids)} emails: {e}")
+                if final:
+                    # Keep the rows from being claimed again; the next batch retries the write
+                    outcome = {k: v for k, v in update.items() if k != "updated_at"}
+                    for email_id in ids:
+                        self.journal.set(email_id, outcome, ttl=JOURNAL_TTL)
+                continue
+            if final:
+                for email_id in ids:
+                    self.journal.delete(email_id)
+                    self.leases.set(email_id, RECORDED, ttl=CLAIM_TTL)
+        for email_id in release:
+            self.leases.delete(email_id)
+        campaign_counters.flush()
+
+
+send_queue = SendQueue()
@@ -0,0 +1,154 @@
+"""
+Reply detection by polling the sending mailbox over IMAP
+
+This stands in for an inbound-mail webhook. Every IMAP_POLL_INTERVAL
+seconds one worker (the one holding a SQLiteCache lease) logs in to
+IMAP_HOST. It fetches only the In-Reply-To/References/Auto-Submitted
+headers of messages that arrived since the last poll, and records a reply
+for each of our Message-IDs they quote (EmailSender.message_id). Replies
+go through the tracking buffer, so they are written and counted the same
+way as opens and clicks. Auto-replies (out of office etc.) are skipped.
+
+The cursor (mailbox UIDVALIDITY + last UID seen) is kept in the SQLite
+cache, so a restart resumes where it stopped. Without a cursor the first
+poll looks back REPLY_LOOKBACK_DAYS.
+"""
+import asyncio
+import email
+import imaplib
+import logging
+import os
+import re
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.db.cache_store import SQLiteCache
+from app.services.email.tracking import REPLY
+
+logger = logging.getLogger(__name__)
+
+REPLY_LOOKBACK_DAYS = 14
+FETCH_CHUNK = 200
+CURSOR_TTL = 365 * 24 * 3600
+HEADERS = "(UID BODY.PEEK[HEADER.FIELDS (IN-REPLY-TO REFERENCES AUTO-SUBMITTED X-AUTOREPLY)])"
+
+
+class ReplyPoller:
+    """
+    Usage:
+        reply_poller.start()  # from the app lifespan; no-op without IMAP_HOST
+        reply_poller.poll_once()  # blocking; returns replies recorded
+    """
+
+    def __init__(
+        self,
+        buffer=None,
+        sender=None,
+        state: Optional[SQLiteCache] = None,
+        poll_interval: Optional[float] = None,
+    ):
+        self._buffer = buffer
+        self._sender = sender
+        self.state = state or SQLiteCache(settings.CACHE_DB_PATH, "reply_poll")
+        self.poll_interval = poll_interval or settings.IMAP_POLL_INTERVAL
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def buffer(self):
+        if self._buffer is None:
+            from app.tasks.tracking import tracking_buffer
+            self._buffer = tracking_buffer
+        return self._buffer
+
+    @property
+    def sender(self):
+        if self._sender is None:
+            from app.services.email.sender import email_sender
+            self._sender = email_sender
+        return self._sender
+
+    @property
+    def enabled(self) -> bool:
+        return bool(settings.IMAP_HOST)
+
+    def start(self) -> None:
+        """Start polling (call from the event loop); no-op without IMAP_HOST"""
+        if self._task is not None or not self.enabled:
+            return
+        self._task = asyncio.create_task(self._run(), name="reply-poller")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            # One worker per interval; the lease expires before the next round
+            if self.state.add("lease", os.getpid(), ttl=self.poll_interval * 0.9):
+                try:
+                    await asyncio.to_thread(self.poll_once)
+                except Exception as e:
+                    logger.error(f"Reply poll failed: {e}", exc_info=True)
+            await asyncio.sleep(self.poll_interval)
+
+    def poll_once(self) -> int:
+        """Scan new messages in IMAP_MAILBOX for replies; returns how many were recorded"""
+        with imaplib.IMAP4_SSL(settings.IMAP_HOST, settings.IMAP_PORT) as imap:
+            imap.login(settings.IMAP_USERNAME, settings.IMAP_PASSWORD)
+            imap.select(settings.IMAP_MAILBOX, readonly=True)
+            return self.scan(imap)
+
+    def scan(self, imap: imaplib.IMAP4) -> int:
+        """Process new messages of the selected mailbox and advance the cursor"""
+        validity = self._uidvalidity(imap)
+        cursor = self.state.get("cursor") or {}
+        if cursor.get("uidvalidity") == validity:
+            last_uid = cursor["last_uid"]
+            _, data = imap.uid("SEARCH", None, f"UID {last_uid + 1}:*")
+        else:
+            last_uid = 0
+            since = (datetime.utcnow() - timedelta(days=REPLY_LOOKBACK_DAYS)).strftime("%d-%b-%Y")
+            _, data = imap.uid("SEARCH", None, f"SINCE {since}")
+        # "n:*" always matches the newest message, even when its UID is below n
+        uids = sorted(uid for uid in map(int, data[0].split()) if uid > last_uid)
+
+        recorded = 0
+        for start in range(0, len(uids), FETCH_CHUNK):
+            chunk = uids[start:start + FETCH_CHUNK]
+            _, fetched = imap.uid("FETCH", ",".join(map(str, chunk)), HEADERS)
+            for headers in self._headers(fetched):
+                recorded += sum(self.buffer.record(REPLY, email_id) for email_id in self.reply_to(headers))
+            self.state.set("cursor", {"uidvalidity": validity, "last_uid": chunk[-1]}, ttl=CURSOR_TTL)
+        if uids:
+            logger.info(f"Scanned {len(uids)} new messages, {recorded} replies")
+        return recorded
+
+    def reply_to(self, headers: Dict[str, str]) -> List[str]:
+        """Ids of our emails a message answers; none for auto-replies"""
+        if headers.get("auto-submitted", "no").lower() != "no" or headers.get("x-autoreply"):
+            return []
+        return self.sender.email_ids_in(f"{headers.get('in-reply-to', '')} {headers.get('references', '')}")
+
+    @staticmethod
+    def _uidvalidity(imap: imaplib.IMAP4) -> int:
+        _, data = imap.response("UIDVALIDITY")
+        return int(data[0]) if data and data[0] else 0
+
+    @staticmethod
+    def _headers(fetched) -> List[Dict[str, str]]:
+        parsed = []
+        for part in fetched or []:
+            if isinstance(part, tuple) and re.search(rb"\bUID \d+", part[0]):
+                message = email.message_from_bytes(part[1])
+                parsed.append({key.lower(): str(value) for key, value in message.items()})
+        return parsed
+
+
+reply_poller = ReplyPoller()
@@ -0,0 +1,249 @@
+"""
+Deferred re-verification of greylisted email candidates
+
+Greylisting servers answer the first RCPT from an unknown sender with
+451/452 and accept the same probe a few minutes later. Instead of keeping
+the provisional "valid, 0.5" answer forever, /discover queues a retry here
+and returns straight away with a verification_id. A background task started
+in the app lifespan re-probes after the greylist window (doubling the delay
+on each further 451/452), updates the stored contact's confidence when the
+answer is final, and keeps the job for GET /verifications/{id} polling.
+
+Only a real 451/452 counts as an attempt. When the domain's mail hosts are
+all backing off (smtp_scheduler), a job waits out the backoff instead of
+probing. A probe that gets no verdict (rate limited, 421, timeout) is
+rescheduled for after the backoff without using up an attempt.
+
+Jobs live in the SQLite cache, so pending retries survive a restart and any
+worker can answer a poll. Every worker loads the pending jobs at startup;
+a per-attempt lease (SQLiteCache.add) makes sure only one of them probes.
+"""
+import asyncio
+import heapq
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import record_reverification
+from app.db.cache_store import SQLiteCache
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+VERIFIED = "verified"
+REJECTED = "rejected"
+UNRESOLVED = "unresolved"
+
+
+class ReverificationQueue:
+    """
+    Usage:
+        job = reverification_queue.schedule("jane.doe@acme.com", user_key="ip:1.2.3.4")
+        ...
+        reverification_queue.get(job["id"])  # {"status": "verified", "confidence": 0.9, ...}
+    """
+
+    def __init__(
+        self,
+        verifier=None,
+        cache: Optional[SQLiteCache] = None,
+        retry_delay: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        transient_delay: Optional[float] = None,
+        max_deferrals: Optional[int] = None,
+    ):
+        self._verifier = verifier
+        self.jobs = cache or SQLiteCache(settings.CACHE_DB_PATH, "reverify_jobs")
+        self.leases = SQLiteCache(self.jobs.path, "reverify_leases")
+        self.retry_delay = settings.GREYLIST_RETRY_DELAY if retry_delay is None else retry_delay
+        self.max_attempts = max_attempts or settings.GREYLIST_MAX_ATTEMPTS
+        # Minimum wait after a probe that got no verdict
+        self.transient_delay = settings.SMTP_BACKOFF_SECONDS if transient_delay is None else transient_delay
+        self.max_deferrals = max_deferrals or settings.GREYLIST_MAX_DEFERRALS
+        self._heap: List[Tuple[float, str]] = []
+        self._pending_by_email: Dict[str, str] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def verifier(self):
+        if self._verifier is None:
+            from app.services.email_discovery import EmailDiscoveryService
+            self._verifier = EmailDiscoveryService()
+        return self._verifier
+
+    def schedule(self, email: str, user_key: str = "anonymous") -> Dict:
+        """
+        Queue a retry for a greylisted address; the first probe counts as attempt 1
+
+        An address that already has a pending job reuses it.
+        """
+        email = email.lower()
+        existing_id = self._pending_by_email.get(email)
+        if existing_id:
+            existing = self.jobs.get(existing_id)
+            if existing and existing["status"] == PENDING:
+                return existing
+
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex,
+            "email": email,
+            "user_key": user_key,
+            "status": PENDING,
+            "attempts": 1,
+            "deferrals": 0,
+            "valid": True,
+            "confidence": 0.5,
+            "reason": "Greylisted, retry scheduled",
+            "created_at": datetime.utcnow().isoformat(),
+            "next_attempt_at": now + self.retry_delay,
+            "resolved_at": None,
+        }
+        self._save(job)
+        self._push(job)
+        logger.info(f"Scheduled re-verification of {email} in {self.retry_delay:g}s")
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self.jobs.get(job_id)
+
+    def start(self) -> None:
+        """Load pending jobs and start the background worker (call from the event loop)"""
+        if self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        for _, job in self.jobs.items():
+            if job.get("status") == PENDING and job["email"] not in self._pending_by_email:
+                self._push(job)
+        self._task = asyncio.create_task(self._run(), name="reverification")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def _save(self, job: Dict) -> None:
+        self.jobs.set(job["id"], job, ttl=settings.REVERIFY_RESULT_TTL)
+
+    def _push(self, job: Dict) -> None:
+        heapq.heappush(self._heap, (job["next_attempt_at"], job["id"]))
+        self._pending_by_email[job["email"]] = job["id"]
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+            due, job_id = self._heap[0]
+            delay = due - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._heap)
+            try:
+                await self._attempt(job_id)
+            except Exception as e:
+                logger.error(f"Re-verification job {job_id} failed: {e}", exc_info=True)
+
+    @staticmethod
+    def _backoff_remaining(email: str) -> float:
+        """Seconds until one of the domain's MX hosts takes probes again (0 = now)"""
+        from app.services.discovery.pipeline import resolve_mx
+        from app.services.verification.smtp_scheduler import smtp_scheduler
+
+        hosts, _ = resolve_mx(email.rpartition("@")[2])
+        if not hosts:
+            return 0.0
+        return min(smtp_scheduler.backoff_remaining(host) for host in hosts)
+
+    def _defer(self, job: Dict, delay: float, reason: str) -> None:
+        """Try again after `delay` seconds without using up an attempt"""
+        job["deferrals"] = job.get("deferrals", 0) + 1
+        job["next_attempt_at"] = time.time() + delay
+        job["reason"] = f"{reason}, retry in {delay:.0f}s"
+        self._save(job)
+        self._push(job)
+        record_reverification("deferred")
+
+    async def _attempt(self, job_id: str) -> None:
+        job = self.jobs.get(job_id)
+        if not job or job["status"] != PENDING:
+            return
+        if job["next_attempt_at"] > time.time():
+            # Another worker made the attempt this heap entry was for and rescheduled the job
+            self._push(job)
+            return
+        backoff = await asyncio.to_thread(self._backoff_remaining, job["email"])
+        if backoff > 0 and job.get("deferrals", 0) < self.max_deferrals:
+            # Probing now would only queue behind the backoff and time out
+            self._defer(job, backoff, "Mail server backing off")
+            return
+        lease = f"{job_id}:{job['attempts']}:{job.get('deferrals', 0)}"
+        if not self.leases.add(lease, os.getpid(), ttl=max(self.retry_delay, 60.0)):
+            return  # Another worker is making this attempt
+
+        result = await asyncio.to_thread(
+            self.verifier.verify_email_smtp, job["email"], user_key=job["user_key"]
+        )
+        if result.get("valid") is None and job.get("deferrals", 0) < self.max_deferrals:
+            # Rate limited, 421, queue or deadline timeout: no verdict either way
+            delay = max(self.transient_delay, await asyncio.to_thread(self._backoff_remaining, job["email"]))
+            self._defer(job, delay, result.get("reason", "Not verified"))
+            return
+        job["attempts"] += 1
+
+        if result.get("greylisted") and job["attempts"] < self.max_attempts:
+            job["next_attempt_at"] = time.time() + self.retry_delay * 2 ** (job["attempts"] - 1)
+            job["reason"] = f"{result['reason']}, retry {job['attempts']} scheduled"
+            self._save(job)
+            self._push(job)
+            record_reverification("deferred")
+            return
+
+        if result.get("greylisted") or result.get("valid") is None:
+            job["status"] = UNRESOLVED
+        else:
+            job["status"] = VERIFIED if result.get("valid") else REJECTED
+        job["valid"] = result.get("valid")
+        job["confidence"] = result.get("confidence", job["confidence"])
+        job["reason"] = result.get("reason", job["reason"])
+        job["resolved_at"] = datetime.utcnow().isoformat()
+        self._save(job)
+        self._pending_by_email.pop(job["email"], None)
+        record_reverification(job["status"])
+        logger.info(f"Re-verified {job['email']}: {job['status']} ({job['reason']})")
+
+        if job["status"] != UNRESOLVED:
+            await asyncio.to_thread(self._update_contact, job)
+
+    @staticmethod
+    def _update_contact(job: Dict) -> None:
+        """Write the final confidence onto the saved contact, if there is one"""
+        try:
+            from app.core.supabase_client import get_supabase_client
+
+            get_supabase_client().table("contacts").update({
+                "confidence_score": job["confidence"],
+                "verified": job["status"] == VERIFIED,
+            }).eq("email", job["email"]).execute()
+        except Exception as e:
+            logger.error(f"Failed to update contact {job['email']}: {e}")
+
+
+reverification_queue = ReverificationQueue()
@@ -0,0 +1,173 @@
+"""
+Buffered open/click/reply tracking
+
+A pixel load or a link click should cost the request an HMAC check and a
+dict insert, nothing more. TrackingBuffer.record() notes the email id in
+memory. A background task started in the app lifespan flushes every
+TRACKING_FLUSH_INTERVAL seconds, or sooner once TRACKING_FLUSH_SIZE emails
+are pending. Each flush does:
+
+- one PATCH per kind, per 200 emails: set opened_at/clicked_at/replied_at
+  on the rows where it is still null. The rows PATCH returns are the
+  first-time hits, so a campaign counts each email at most once per kind,
+  however many workers or hosts see the hits.
+- one increment_campaign_counters call per campaign (CounterBuffer).
+  The analytics rollups get the same first-time hits (app.db.email_rollups).
+
+Repeat hits (image proxies, reloads, forwarded mails) are dropped in memory:
+an email is skipped once it is pending or was already written by this
+worker. The timestamps written are flush times, so they are accurate to
+within the flush interval.
+"""
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.core.metrics import record_tracking_event
+from app.db.campaign_counters import campaign_counters
+from app.db.email_rollups import email_rollups
+from app.services.email.tracking import CLICK, OPEN, REPLY
+
+logger = logging.getLogger(__name__)
+
+# kind -> (emails column, campaign counter)
+KIND_COLUMNS = {
+    OPEN: ("opened_at", "opened_count"),
+    CLICK: ("clicked_at", "clicked_count"),
+    REPLY: ("replied_at", "replied_count"),
+}
+# Ids per PATCH, to keep the in.(...) filter well under URL length limits
+UPDATE_CHUNK = 200
+
+
+class TrackingBuffer:
+    """
+    Usage:
+        tracking_buffer.record("open", email_id)  # from a request; no I/O
+        tracking_buffer.flush()  # blocking; the background task calls it
+    """
+
+    def __init__(
+        self,
+        flush_interval: Optional[float] = None,
+        flush_size: Optional[int] = None,
+        seen_size: Optional[int] = None,
+    ):
+        self.flush_interval = settings.TRACKING_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.flush_size = flush_size or settings.TRACKING_FLUSH_SIZE
+        self.seen_size = seen_size or settings.TRACKING_SEEN_SIZE
+        self._pending: Dict[str, Set[str]] = {kind: set() for kind in KIND_COLUMNS}
+        # Ids this worker has written, most recent last; bounded
+        self._seen: Dict[str, OrderedDict] = {kind: OrderedDict() for kind in KIND_COLUMNS}
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = defaultdict(int)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, kind: str, email_id: str) -> bool:
+        """Note a hit; False if it repeats one already pending or written"""
+        full = False
+        with self._lock:
+            pending = self._pending[kind]
+            if email_id in pending or email_id in self._seen[kind]:
+                new = False
+            else:
+                pending.add(email_id)
+                new = True
+                # Only on crossing the limit: after a failed flush puts ids back,
+                # retries wait for the interval instead of following every hit
+                full = sum(len(ids) for ids in self._pending.values()) == self.flush_size
+        record_tracking_event(kind, "recorded" if new else "repeat")
+        if new and full and self._loop is not None and not self._wakeup.is_set():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return new
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(len(ids) for ids in self._pending.values())
+
+    def stats(self) -> Dict:
+        return {**self.counts, "pending": self.pending()}
+
+    def start(self) -> None:
+        """Start the background flusher (call from the event loop)"""
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="tracking-flush")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await asyncio.to_thread(self.flush)  # Don't lose the last interval's hits
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.error(f"Tracking flush failed: {e}", exc_info=True)
+
+    def flush(self) -> int:
+        """Write pending hits and their campaign counters; returns first-time hits written"""
+        with self._lock:
+            pending = self._pending
+            self._pending = {kind: set() for kind in KIND_COLUMNS}
+        if not any(pending.values()):
+            return 0
+
+        written = 0
+        for kind, ids in pending.items():
+            ids = list(ids)
+            for start in range(0, len(ids), UPDATE_CHUNK):
+                written += self._write(kind, ids[start:start + UPDATE_CHUNK])
+        campaign_counters.flush()
+        return written
+
+    def _write(self, kind: str, ids: List[str]) -> int:
+        from app.core.supabase_client import get_supabase_client
+
+        column, counter = KIND_COLUMNS[kind]
+        try:
+            rows = get_supabase_client().table("emails").update({
+                column: datetime.utcnow().isoformat(),
+            }).in_("id", ids).is_(column, "null").execute().data
+        except Exception as e:
+            logger.error(f"Failed to record {len(ids)} {kind} events, retrying next flush: {e}")
+            with self._lock:
+                self._pending[kind].update(ids)
+            return 0
+
+        for row in rows:
+            email_rollups.add(row, counter)
+            if row.get("campaign_id"):
+                campaign_counters.add(row["campaign_id"], counter)
+        with self._lock:
+            seen = self._seen[kind]
+            for email_id in ids:
+                seen[email_id] = None
+                seen.move_to_end(email_id)
+            while len(seen) > self.seen_size:
+                seen.popitem(last=False)
+        self.counts[kind] += len(rows)
+        return len(rows)
+
+
+tracking_buffer = TrackingBuffer()
@@ -0,0 +1,233 @@
+"""
+Analytics from precomputed rollups vs. scanning the emails table
+
+Seeds N emails with sends, opens, clicks and replies in the fake
+PostgREST. Each email's events go through email_rollups.add() the way the
+generation, send and tracking paths record them, then flush. Then it
+answers "reply rate and average confidence per company" two ways:
+
+- scan: page through the emails table (1000 rows per request) and
+  aggregate client-side, which is what a dashboard has to do without
+  rollups
+- rollups: GET /api/analytics/rollups/company, first uncached, then
+  served from the analytics cache
+
+It reports wall time, database calls and bytes moved, and checks that both
+give the same numbers for every company (and that /summary counts every
+email).
+
+Usage (from backend/):
+    python -m benchmarks.analytics_rollups
+    python -m benchmarks.analytics_rollups --emails 20000 --companies 500 --db-latency 0.02
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.fakes import FakePostgREST
+from benchmarks.load_test import _free_port, percentile, start_app
+
+PAGE = 1000
+
+
+def seed(postgrest: FakePostgREST, args) -> List[Dict]:
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+    rows = []
+    for i in range(args.emails):
+        sent = rng.random() < 0.8
+        opened = sent and rng.random() < 0.5
+        rows.append({
+            "id": str(uuid.uuid4()),
+            "recipient_name": f"Person {i}",
+            "recipient_email": f"person{i}@company{i % args.companies}.example",
+            "recipient_company": f"Company {rng.randrange(args.companies)}",
+            "role_name": rng.choice(["Backend Engineer", "Data Scientist", "ML Engineer", "SRE"]),
+            "tone": rng.choice(["professional", "casual", "enthusiastic"]),
+            "model": rng.choice(["gemini-2.5-flash", "gemini-2.5-pro"]),
+            "subject_line": f"Quick question #{i}",
+            "body": "Hi,\n\n" + "I'd love to hear how your team approaches this. " * 8 + "\n\nBest",
+            "status": "sent" if sent else "failed",
+            "confidence_score": round(rng.uniform(0.4, 0.95), 3),
+            "generation_ms": rng.randint(1500, 9000),
+            "created_at": (now - timedelta(days=rng.randrange(30))).replace(hour=rng.randrange(24)).isoformat(),
+            "opened_at": now.isoformat() if opened else None,
+            "clicked_at": now.isoformat() if opened and rng.random() < 0.3 else None,
+            "replied_at": now.isoformat() if opened and rng.random() < 0.2 else None,
+        })
+    postgrest.tables["emails"] = rows
+    return rows
+
+
+def record_events(rows: List[Dict]) -> None:
+    """The rollup updates generation, sending and tracking make for these rows"""
+    from app.db.email_rollups import email_rollups
+
+    for row in rows:
+        email_rollups.add(row, "generated_count")
+        email_rollups.add(row, "sent_count" if row["status"] == "sent" else "failed_count")
+        for column, counter in (("opened_at", "opened_count"), ("clicked_at", "clicked_count"),
+                                ("replied_at", "replied_count")):
+            if row.get(column):
+                email_rollups.add(row, counter)
+    email_rollups.flush()
+
+
+def scan() -> Dict:
+    """Per-company stats by paging through every emails row"""
+    from app.core.supabase_client import get_supabase_client
+    from app.db.email_rollups import dimension_values
+
+    table = get_supabase_client().table("emails")
+    stats: Dict[str, Dict] = defaultdict(lambda: defaultdict(float))
+    calls = size = 0
+    offset = 0
+    while True:
+        page = table.select("*").range(offset, offset + PAGE - 1).execute().data
+        calls += 1
+        size += len(json.dumps(page))
+        for row in page:
+            s = stats[dimension_values(row)["company"]]
+            s["sent"] += row["status"] == "sent"
+            s["replied"] += bool(row.get("replied_at"))
+            s["confidence_sum"] += row["confidence_score"]
+            s["n"] += 1
+        if len(page) < PAGE:
+            break
+        offset += PAGE
+    return {
+        "calls": calls,
+        "bytes": size,
+        "companies": {
+            company: {
+                "reply_rate": round(s["replied"] / s["sent"], 4) if s["sent"] else None,
+                "avg_confidence": round(s["confidence_sum"] / s["n"], 3),
+            }
+            for company, s in stats.items()
+        },
+    }
+
+
+async def fetch_rollups(base_url: str, repeat: int, postgrest: FakePostgREST) -> Dict:
+    from app.api.routes import analytics
+
+    path = "/api/analytics/rollups/company?sort=replies&limit=500"
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        for key in list(analytics.analytics_cache.items()):
+            analytics.analytics_cache.delete(key[0])
+        calls = postgrest.requests
+        started = time.perf_counter()
+        cold = await client.get(path)
+        cold_seconds = time.perf_counter() - started
+        cold_calls = postgrest.requests - calls
+        summary = (await client.get("/api/analytics/summary?days=30")).json()
+        warm = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = await client.get(path)
+            warm.append(time.perf_counter() - started)
+    return {
+        "cold_seconds": cold_seconds,
+        "cold_calls": cold_calls,
+        "warm_p50": statistics.median(warm),
+        "warm_p95": percentile(warm, 95),
+        "bytes": len(cold.content),
+        "cache_control": response.headers.get("cache-control"),
+        "companies": {item["value"]: item for item in cold.json()["items"]},
+        "summary": summary,
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Rollup endpoints vs scanning the emails table")
+    parser.add_argument("--emails", type=int, default=5000)
+    parser.add_argument("--companies", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=50, help="Cached rollup requests")
+    parser.add_argument("--db-latency", type=float, default=0.01, help="Delay per PostgREST call (s)")
+    parser.add_argument("--seed", type=int, default=11)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    postgrest = FakePostgREST(latency=args.db_latency).start()
+    cache_dir = tempfile.mkdtemp(prefix="reachcraft-analytics-")
+    os.environ["SUPABASE_URL"] = postgrest.url
+    os.environ["SUPABASE_KEY"] = FakePostgREST.API_KEY
+
+    from app.core.config import settings
+    from app.core.supabase_client import get_supabase_client
+
+    settings.CACHE_DB_PATH = os.path.join(cache_dir, "cache.sqlite3")
+    get_supabase_client.cache_clear()
+    port = _free_port()
+    server, thread = start_app(port)
+
+    try:
+        rows = seed(postgrest, args)
+        calls = postgrest.requests
+        started = time.perf_counter()
+        record_events(rows)
+        flush_seconds = time.perf_counter() - started
+        flush_calls = postgrest.requests - calls
+
+        started = time.perf_counter()
+        scanned = scan()
+        scan_seconds = time.perf_counter() - started
+
+        rolled = asyncio.run(fetch_rollups(f"http://127.0.0.1:{port}", args.repeat, postgrest))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+        postgrest.stop()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print(f"\nrollup writes: {len(rows)} emails -> {flush_calls} RPC call(s) in {flush_seconds * 1000:.0f} ms, "
+          f"{len(postgrest.tables.get('email_rollups', []))} rollup rows")
+    print(f"\n{'per-company stats':<20}{'ms':>10}{'db calls':>10}{'KB':>10}")
+    print(f"{'scan emails':<20}{scan_seconds * 1000:>10.1f}{scanned['calls']:>10}{scanned['bytes'] / 1024:>10.0f}")
+    print(f"{'rollups (cold)':<20}{rolled['cold_seconds'] * 1000:>10.1f}{rolled['cold_calls']:>10}{rolled['bytes'] / 1024:>10.0f}")
+    print(f"{'rollups (cached)':<20}{rolled['warm_p50'] * 1000:>10.1f}{0:>10}{rolled['bytes'] / 1024:>10.0f}"
+          f"   p95 {rolled['warm_p95'] * 1000:.1f} ms, Cache-Control: {rolled['cache_control']}")
+
+    problems = []
+    totals = rolled["summary"]["totals"]
+    if totals["generated"] != len(rows) or len(rolled["summary"]["by_day"]) != 30:
+        problems.append(f"summary: {totals['generated']} generated over {len(rolled['summary']['by_day'])} days")
+    for company, expected in scanned["companies"].items():
+        got = rolled["companies"].get(company)
+        if got is None:
+            problems.append(f"{company}: missing from rollups")
+            continue
+        for field in ("reply_rate", "avg_confidence"):
+            if got[field] is None or expected[field] is None:
+                mismatch = got[field] != expected[field]
+            else:
+                mismatch = abs(got[field] - expected[field]) > 0.001
+            if mismatch:
+                problems.append(f"{company}: {field} {got[field]} != {expected[field]}")
+    for problem in problems[:10]:
+        print(f"❌ {problem}")
+    if not problems:
+        print(f"\n✅ rollups match the scan for all {len(scanned['companies'])} companies")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
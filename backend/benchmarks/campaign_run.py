@@ -0,0 +1,153 @@
+"""
+Campaign run throughput: pipelined stages vs. one recipient at a time
+
+Creates a campaign through the API against the load-test fakes and polls
+it to completion, once with the configured stage concurrency and once with
+a single worker per stage (the old one-email-per-call flow). Reports
+recipients/s, checks that every recipient got exactly one email and that
+the campaign counters match. With --interrupt-after N the pipelined run is
+stopped after N recipients and resumed from its checkpoint.
+
+Usage (from backend/):
+    python -m benchmarks.campaign_run
+    python -m benchmarks.campaign_run --recipients 60 --discover-workers 8 --generate-workers 4
+    python -m benchmarks.campaign_run --interrupt-after 10
+"""
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.fakes import random_person
+from benchmarks.load_test import FakeEnvironment, _free_port, build_parser as load_test_parser, start_app
+
+
+def recipients(count: int, seed: int) -> List[Dict]:
+    rng = random.Random(seed)
+    people = []
+    for _ in range(count):
+        person = random_person(rng)
+        people.append({
+            "first_name": person["first"],
+            "last_name": person["last"],
+            "company": person["company"],
+            "company_domain": person["domain"],
+        })
+    return people
+
+
+async def run_campaign(base_url: str, people: List[Dict], interrupt_after: int = 0) -> Dict:
+    from app.tasks.campaigns import campaign_engine
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60.0) as client:
+        started = time.perf_counter()
+        response = await client.post("/api/campaigns", json={
+            "name": "Benchmark campaign",
+            "recipients": people,
+            "template": {
+                "role_interested_in": "Backend Engineer",
+                "job_description": "We build developer tools. You will own Python and Kubernetes services.",
+            },
+        })
+        response.raise_for_status()
+        campaign_id = response.json()["campaign"]["id"]
+
+        interrupted = False
+        while True:
+            await asyncio.sleep(0.05)
+            body = (await client.get(f"/api/campaigns/{campaign_id}")).json()
+            progress = body["progress"]
+            if interrupt_after and not interrupted and progress["generated"] + progress["failed"] >= interrupt_after:
+                # Simulate a dying worker: stop its runs (on the app's loop), then resume from the checkpoint
+                app_loop = campaign_engine._runs[campaign_id].get_loop()
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(campaign_engine.stop(), app_loop))
+                interrupted = True
+                (await client.post(f"/api/campaigns/{campaign_id}/run")).raise_for_status()
+                continue
+            if not progress["running"] and progress["status"] != "running":
+                break
+        wall = time.perf_counter() - started
+
+        emails = (await client.get(f"/api/campaigns/{campaign_id}/emails?limit=1000")).json()
+    return {
+        "wall_seconds": wall,
+        "rps": len(people) / wall if wall else 0.0,
+        "status": progress["status"],
+        "generated": body["campaign"]["generated_count"],
+        "failed": body["campaign"]["failed_count"],
+        "emails": emails["total_count"],
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = load_test_parser()
+    parser.description = "Campaign run throughput on the fake backends"
+    parser.add_argument("--recipients", type=int, default=40, help="Recipients per campaign")
+    parser.add_argument("--discover-workers", type=int, default=None, help="Default: CAMPAIGN_DISCOVER_CONCURRENCY")
+    parser.add_argument("--generate-workers", type=int, default=None, help="Default: CAMPAIGN_GENERATE_CONCURRENCY")
+    parser.add_argument("--persist-workers", type=int, default=None, help="Default: CAMPAIGN_PERSIST_CONCURRENCY")
+    parser.add_argument("--interrupt-after", type=int, default=0,
+                        help="Stop the pipelined run after N recipients and resume it")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    env = FakeEnvironment(args)
+    env.start()
+    port = _free_port()
+    server, thread = start_app(port)
+
+    from app.core.config import settings
+    from app.tasks.campaigns import campaign_engine
+
+    pipelined = {
+        "discover": args.discover_workers or settings.CAMPAIGN_DISCOVER_CONCURRENCY,
+        "generate": args.generate_workers or settings.CAMPAIGN_GENERATE_CONCURRENCY,
+        "persist": args.persist_workers or settings.CAMPAIGN_PERSIST_CONCURRENCY,
+    }
+    sequential = {"discover": 1, "generate": 1, "persist": 1}
+    people = recipients(args.recipients, args.seed)
+
+    rows = []
+    try:
+        for name, concurrency in (("sequential", sequential), ("pipelined", pipelined)):
+            campaign_engine.concurrency = concurrency
+            interrupt = args.interrupt_after if name == "pipelined" else 0
+            result = asyncio.run(run_campaign(f"http://127.0.0.1:{port}", people, interrupt))
+            rows.append((name, concurrency, result))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+        env.stop()
+
+    print(f"\n{'run':<12}{'workers d/g/p':>15}{'recips/s':>10}{'wall s':>9}{'gen':>6}{'fail':>6}{'emails':>8}")
+    for name, concurrency, r in rows:
+        workers = f"{concurrency['discover']}/{concurrency['generate']}/{concurrency['persist']}"
+        print(f"{name:<12}{workers:>15}{r['rps']:>10.2f}{r['wall_seconds']:>9.2f}"
+              f"{r['generated']:>6}{r['failed']:>6}{r['emails']:>8}")
+    if rows[0][2]["rps"]:
+        print(f"\nspeedup: {rows[-1][2]['rps'] / rows[0][2]['rps']:.2f}x on {args.recipients} recipients")
+
+    problems = []
+    for name, _, r in rows:
+        if r["status"] != "completed":
+            problems.append(f"{name}: status {r['status']}")
+        if r["generated"] + r["failed"] != args.recipients:
+            problems.append(f"{name}: counters {r['generated']}+{r['failed']} != {args.recipients}")
+        if r["emails"] != r["generated"]:
+            problems.append(f"{name}: {r['emails']} email rows for {r['generated']} generated")
+    for problem in problems:
+        print(f"❌ {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Draft scoring throughput: per-phrase substring scans vs the batch analyzer
+
+The legacy scorer lowercases each body and runs one `in` scan per cliché.
+DraftQualityAnalyzer.analyze_batch scores more features (spam triggers,
+readability, personalization) with one regex pass per feature over the
+whole batch.
+
+Usage (from backend/):
+    python -m benchmarks.draft_quality
+    python -m benchmarks.draft_quality --drafts 2000 --batch 8
+"""
+import argparse
+import random
+import sys
+import time
+
+from app.services.ai.draft_quality import CLICHES, DraftQualityAnalyzer
+
+SENTENCES = [
+    "I read about the billing platform rewrite at {company}.",
+    "I've shipped Python services on Kubernetes that handle similar load.",
+    "Would a 15 minute call next week work, {name}?",
+    "I hope this email finds you well.",
+    "I'm passionate about developer tooling and would love the opportunity to help.",
+    "Our team cut p95 latency by 40% after moving to async workers.",
+    "Act now, this is a limited time chance!!!",
+    "The RAG assistant I built reduced hallucinations with BM25 and FAISS.",
+]
+
+
+def make_draft(rng: random.Random, name: str, company: str) -> str:
+    paragraphs = []
+    for _ in range(rng.randint(2, 4)):
+        paragraphs.append(" ".join(rng.choice(SENTENCES) for _ in range(rng.randint(2, 4))))
+    return f"Hi {name},\n\n" + "\n\n".join(paragraphs).format(name=name, company=company) + "\n\nBest,\nVarad"
+
+
+def legacy_confidence(email_body: str) -> float:
+    """The original GeminiService.calculate_confidence"""
+    score = 1.0
+    lower_body = email_body.lower()
+    for cliche in CLICHES[:10]:
+        if cliche in lower_body:
+            score -= 0.1
+    word_count = len(email_body.split())
+    if word_count > 200:
+        score -= 0.2
+    elif word_count < 50:
+        score -= 0.3
+    paragraphs = [p for p in email_body.split('\n\n') if p.strip()]
+    if len(paragraphs) < 2:
+        score -= 0.1
+    return max(0.0, min(1.0, score))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--drafts", type=int, default=4000)
+    parser.add_argument("--batch", type=int, default=4, help="Drafts scored together (best-of-N size)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    drafts = [make_draft(rng, "Sarah", "Globex") for _ in range(args.drafts)]
+    analyzer = DraftQualityAnalyzer()
+
+    start = time.perf_counter()
+    for draft in drafts:
+        legacy_confidence(draft)
+    legacy = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for draft in drafts:
+        analyzer.analyze(draft, "Sarah", "Globex")
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(0, len(drafts), args.batch):
+        analyzer.analyze_batch(drafts[i:i + args.batch], "Sarah", "Globex")
+    batched = time.perf_counter() - start
+
+    print(f"{'scorer':<28}{'drafts/s':>12}{'us/draft':>12}")
+    for label, seconds in (
+        ("legacy substring scan", legacy),
+        ("analyzer, one at a time", single),
+        (f"analyzer, batches of {args.batch}", batched),
+    ):
+        print(f"{label:<28}{len(drafts) / seconds:>12.0f}{seconds / len(drafts) * 1e6:>12.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
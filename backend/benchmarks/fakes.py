@@ -0,0 +1,687 @@
+"""
+In-process fakes for offline benchmarking
+
+- FakeSMTPServer: local SMTP responder with scriptable RCPT codes and latency
+- FakeRelay: outbound SMTP relay (aiosmtpd) with optional STARTTLS
+- FakeResolver: stands in for dns.resolver.resolve, pointing MX at localhost
+- FakeGenerativeModel: Gemini stand-in with realistic per-token latency
+  (served through LLM_BACKEND, see app/services/ai/llm_backends.py)
+- FakePostgREST: minimal PostgREST (Supabase REST) server backed by dicts
+- FakeCompanySite: company websites whose team pages list staff addresses
+
+None of these touch the network beyond 127.0.0.1.
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import socket
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Set
+from urllib.parse import parse_qsl, urlsplit
+
+from app.services.ai.llm_backends import LLMResponse
+
+
+class FakeSMTPServer:
+    """
+    SMTP server on 127.0.0.1 that answers RCPT TO with scripted codes
+
+    `script` maps a regex (matched against the full address) to a reply code,
+    checked in order; unmatched addresses get `default_code`. `latency` is
+    added before every reply, so a probe of N commands costs ~N * latency.
+
+        smtp = FakeSMTPServer(script={r"^john\\.doe@": 250, r"^j": 451}, default_code=550)
+    """
+
+    REPLIES = {
+        250: "2.1.5 OK",
+        451: "4.7.1 Greylisted, try again later",
+        452: "4.2.2 Mailbox full",
+        550: "5.1.1 User unknown",
+        421: "4.7.0 Too many connections",
+    }
+
+    def __init__(self, script: Optional[Dict[str, int]] = None, default_code: int = 550,
+                 latency: float = 0.0):
+        self.script = [(re.compile(p, re.IGNORECASE), code) for p, code in (script or {}).items()]
+        self.default_code = default_code
+        self.latency = latency
+        self.port: Optional[int] = None
+        self.sessions = 0
+        self.rcpt_count = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._server = None
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    def code_for(self, address: str) -> int:
+        for pattern, code in self.script:
+            if pattern.search(address):
+                return code
+        return self.default_code
+
+    async def _reply(self, writer: asyncio.StreamWriter, code: int, text: str) -> None:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        writer.write(f"{code} {text}\r\n".encode())
+        await writer.drain()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.sessions += 1
+        try:
+            await self._reply(writer, 220, "fake.smtp ESMTP ready")
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode(errors="replace").strip()
+                verb = command.split(" ", 1)[0].upper()
+                if verb in ("HELO", "EHLO"):
+                    await self._reply(writer, 250, "fake.smtp")
+                elif verb == "MAIL":
+                    await self._reply(writer, 250, "2.1.0 OK")
+                elif verb == "RCPT":
+                    self.rcpt_count += 1
+                    match = re.search(r"<([^>]*)>", command)
+                    address = match.group(1) if match else command
+                    code = self.code_for(address)
+                    await self._reply(writer, code, self.REPLIES.get(code, "Scripted reply"))
+                elif verb in ("RSET", "NOOP"):
+                    await self._reply(writer, 250, "2.0.0 OK")
+                elif verb == "QUIT":
+                    await self._reply(writer, 221, "2.0.0 Bye")
+                    break
+                else:
+                    await self._reply(writer, 502, "5.5.2 Command not implemented")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, "127.0.0.1", 0)
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    def start(self) -> "FakeSMTPServer":
+        self._thread = threading.Thread(target=self._run, name="fake-smtp", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self) -> None:
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._server.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread:
+            self._thread.join(timeout=5)
+
+
+class FakeRelay:
+    """
+    Outbound SMTP relay on 127.0.0.1, built on aiosmtpd (pip install aiosmtpd)
+
+    Accepts mail for every recipient except those matched by `script`
+    (regex -> reply code, e.g. {r"^bounce": 550, r"^later": 451}). It keeps
+    the delivered messages and counts connections. `latency` is added to
+    EHLO, RCPT and DATA, like a relay a few milliseconds away. With tls=True
+    it offers STARTTLS with a throwaway self-signed certificate for
+    "localhost"; trust it with client_ssl_context().
+
+        relay = FakeRelay(tls=True).start()
+        pool = RelayPool(host="localhost", port=relay.port, ssl_context=relay.client_ssl_context())
+    """
+
+    def __init__(self, script: Optional[Dict[str, int]] = None, latency: float = 0.0, tls: bool = False):
+        self.script = [(re.compile(p, re.IGNORECASE), code) for p, code in (script or {}).items()]
+        self.latency = latency
+        self.tls = tls
+        self.port: Optional[int] = None
+        self.connections = 0
+        self.messages: List[tuple] = []
+        self._controller = None
+        self._cert_dir: Optional[str] = None
+
+    def code_for(self, address: str) -> int:
+        for pattern, code in self.script:
+            if pattern.search(address):
+                return code
+        return 250
+
+    @property
+    def cert_path(self) -> str:
+        return os.path.join(self._cert_dir, "cert.pem")
+
+    def _make_certificate(self) -> ssl.SSLContext:
+        self._cert_dir = tempfile.mkdtemp(prefix="reachcraft-relay-")
+        key_path = os.path.join(self._cert_dir, "key.pem")
+        subprocess.run(
+            ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+             "-keyout", key_path, "-out", self.cert_path,
+             "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost"],
+            check=True, capture_output=True,
+        )
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(self.cert_path, key_path)
+        return context
+
+    def client_ssl_context(self) -> ssl.SSLContext:
+        return ssl.create_default_context(cafile=self.cert_path)
+
+    def start(self) -> "FakeRelay":
+        from aiosmtpd.controller import Controller
+        from aiosmtpd.smtp import SMTP
+
+        fake = self
+
+        class Handler:
+            async def handle_EHLO(self, server, session, envelope, hostname, responses):
+                if fake.latency:
+                    await asyncio.sleep(fake.latency)
+                session.host_name = hostname
+                return responses
+
+            async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+                if fake.latency:
+                    await asyncio.sleep(fake.latency)
+                code = fake.code_for(address)
+                if code != 250:
+                    return f"{code} {FakeSMTPServer.REPLIES.get(code, 'Scripted reply')}"
+                envelope.rcpt_tos.append(address)
+                return "250 2.1.5 OK"
+
+            async def handle_DATA(self, server, session, envelope):
+                if fake.latency:
+                    await asyncio.sleep(fake.latency)
+                fake.messages.append((envelope.mail_from, list(envelope.rcpt_tos), envelope.content))
+                return "250 2.0.0 Queued"
+
+        class CountingController(Controller):
+            def factory(self):
+                fake.connections += 1
+                return SMTP(self.handler, **self.SMTP_kwargs)
+
+        if self.port is None:
+            # Kept across stop()/start(), so a restarted relay is reachable where it was
+            with socket.socket() as sock:
+                sock.bind(("127.0.0.1", 0))
+                self.port = sock.getsockname()[1]
+        kwargs = {"tls_context": self._make_certificate(), "require_starttls": False} if self.tls else {}
+        self._controller = CountingController(Handler(), hostname="127.0.0.1", port=self.port, **kwargs)
+        self._controller.start()
+        return self
+
+    def stop(self) -> None:
+        if self._controller:
+            self._controller.stop()
+        if self._cert_dir:
+            shutil.rmtree(self._cert_dir, ignore_errors=True)
+
+
+class _FakeMX:
+    def __init__(self, exchange: str, preference: int):
+        self.exchange = exchange
+        self.preference = preference
+
+    def __str__(self) -> str:
+        return f"{self.preference} {self.exchange}"
+
+
+class _FakeRRset:
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+
+
+class _FakeAnswer(list):
+    """List of records with the rrset.ttl of a dns.resolver.Answer"""
+
+    def __init__(self, records: list, ttl: int = 300):
+        super().__init__(records)
+        self.rrset = _FakeRRset(ttl)
+
+
+class FakeResolver:
+    """
+    Drop-in for dns.resolver.resolve
+
+    Every domain resolves to MX records pointing at `mx_hosts` (127.0.0.1 by
+    default) unless listed in `nxdomains`. `latency` simulates resolver RTT.
+    """
+
+    def __init__(self, mx_hosts: Optional[List[str]] = None, latency: float = 0.0,
+                 nxdomains: Optional[List[str]] = None):
+        self.mx_hosts = mx_hosts or ["127.0.0.1"]
+        self.latency = latency
+        self.nxdomains = set(nxdomains or [])
+        self.queries = 0
+        self._original = None
+
+    def resolve(self, qname, rdtype="A", *args, **kwargs):
+        import dns.resolver
+
+        self.queries += 1
+        if self.latency:
+            time.sleep(self.latency)
+        name = str(qname).rstrip(".").lower()
+        if name in self.nxdomains:
+            raise dns.resolver.NXDOMAIN()
+        if str(rdtype).upper() == "MX":
+            return _FakeAnswer([_FakeMX(host, 10 * (i + 1)) for i, host in enumerate(self.mx_hosts)])
+        if str(rdtype).upper() in ("A", "AAAA"):
+            return _FakeAnswer(["127.0.0.1"])
+        raise dns.resolver.NoAnswer()
+
+    def install(self) -> "FakeResolver":
+        import dns.resolver
+
+        self._original = dns.resolver.resolve
+        dns.resolver.resolve = self.resolve
+        return self
+
+    def uninstall(self) -> None:
+        import dns.resolver
+
+        if self._original is not None:
+            dns.resolver.resolve = self._original
+
+
+class FakeGenerativeModel:
+    """
+    Stand-in for genai.GenerativeModel
+
+    Latency = time_to_first_token + completion_tokens * per_token_latency,
+    with tokens approximated as 4 characters. Subject-line prompts get a JSON
+    array, everything else a JSON email. candidate_count in generation_config
+    returns that many differently-worded drafts from one call (decoded in
+    parallel, so latency follows the longest one). A request_options
+    timeout shorter than that raises TimeoutError after the timeout, as the
+    SDK would.
+    """
+
+    OPENERS = (
+        "Reaching out because what {company} is building genuinely clicked.",
+        "I've been following {company} for a while and I'm passionate about the space.",
+        "I hope this email finds you well! Huge fan of {company}!!!",
+        "{name}, your team's work at {company} maps closely to what I've shipped.",
+    )
+
+    BODY = (
+        "Hi {name},\n\n{opener} "
+        "And here's my website, one click: https://example.com\n\n"
+        "I'm a software engineer with 4+ years across full-stack, cloud, and AI systems. "
+        "I've shipped RAG assistants, Kubernetes services and TB-scale data pipelines.\n\n"
+        "I KNOW WHAT YOU WANT! You want someone who owns the whole path from infra to UI "
+        "and keeps it observable in production. That's the environment where I do my best work :)\n\n"
+        "Would you be open to a 15 minute chat? You can grab any slot that works for you.\n\n"
+        "Warmly,\nBenchmark Sender"
+    )
+
+    def __init__(self, time_to_first_token: float = 0.3, per_token_latency: float = 0.004):
+        self.time_to_first_token = time_to_first_token
+        self.per_token_latency = per_token_latency
+        self.calls = 0
+
+    def generate_content(self, prompt: str, generation_config=None, safety_settings=None, **kwargs):
+        self.calls += 1
+        name = _match(r"Hi (\w+),", prompt) or _match(r"RECIPIENT: (\w+)", prompt) or "there"
+        company = _match(r" at ([^\n,]+)", prompt) or "your company"
+
+        count = max(1, int((generation_config or {}).get("candidate_count", 1)))
+        if "JSON array of 3 subject lines" in prompt:
+            texts = [json.dumps([
+                f"I Know What You're Building at {company}",
+                f"{name}, a systems engineer for {company}",
+                "Not another resume blast ;) reaching out with intent",
+            ])] * count
+        else:
+            texts = []
+            for i in range(count):
+                opener = self.OPENERS[i % len(self.OPENERS)].format(name=name, company=company)
+                texts.append(json.dumps({
+                    "subject": f"I Know What You're Building at {company}",
+                    "body": self.BODY.format(name=name, company=company, opener=opener),
+                    "key_hook": f"Ties {company}'s stack to shipped production systems",
+                }))
+
+        prompt_tokens = len(prompt) // 4
+        completion_tokens = sum(len(text) for text in texts) // 4
+        longest = max(len(text) for text in texts) // 4
+        latency = self.time_to_first_token + longest * self.per_token_latency
+        timeout = (kwargs.get("request_options") or {}).get("timeout")
+        if timeout is not None and timeout < latency:
+            time.sleep(timeout)
+            raise TimeoutError(f"Deadline of {timeout:.2f}s exceeded")
+        time.sleep(latency)
+        return LLMResponse(texts, prompt_tokens, completion_tokens)
+
+
+def _match(pattern: str, text: str) -> Optional[str]:
+    found = re.search(pattern, text)
+    return found.group(1).strip() if found else None
+
+
+class FakePostgREST:
+    """
+    Minimal PostgREST server (the REST API behind supabase-py)
+
+    Supports select with eq/gte/lte/in/is/ilike filters (and not.), order, limit/offset,
+    count=exact, insert, upsert (on_conflict) and PATCH updates on
+    in-memory tables, plus the increment_campaign_counters and
+    increment_email_rollups functions. Good enough for the queries the
+    routes issue. `requests` counts calls. A table listed in `columns`
+    rejects writes naming any other column with PostgREST's PGRST204, like
+    a database whose migrations haven't been applied. The next
+    `failing_writes` table writes fail with a 503, like a database blip.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.tables: Dict[str, List[dict]] = {}
+        self.columns: Dict[str, Set[str]] = {}
+        self.failing_writes = 0
+        self.lock = threading.Lock()
+        self.requests = 0
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    # A JWT-shaped key; supabase-py validates the format, not the signature
+    API_KEY = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.benchmark"
+
+    def start(self) -> "FakePostgREST":
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _body(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return json.loads(self.rfile.read(length)) if length else None
+
+            def _send(self, status: int, payload, headers: Optional[dict] = None):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _dispatch(self, method: str):
+                with fake.lock:
+                    fake.requests += 1
+                if fake.latency:
+                    time.sleep(fake.latency)
+                parts = urlsplit(self.path)
+                prefix, _, name = parts.path.rpartition("/")
+                if prefix.endswith("/rpc"):
+                    status, payload, headers = fake.call(name, self._body() or {})
+                    self._send(status, payload, headers)
+                    return
+                params = parse_qsl(parts.query, keep_blank_values=True)
+                status, payload, headers = fake.handle(
+                    method, name, params, self._body(), self.headers.get("Prefer", "")
+                )
+                self._send(status, payload, headers)
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def do_PATCH(self):
+                self._dispatch("PATCH")
+
+            def do_DELETE(self):
+                self._dispatch("DELETE")
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-postgrest", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def call(self, function: str, params: dict):
+        """POST /rpc/<function>"""
+        if function == "increment_email_rollups":
+            return self._increment_rollups(params)
+        if function != "increment_campaign_counters":
+            return 404, {"message": f"Function {function} not found"}, {}
+        with self.lock:
+            batches = self.tables.setdefault("campaign_counter_batches", [])
+            if any(b["batch_id"] == params["p_batch_id"] for b in batches):
+                return 200, None, {}
+            batches.append({"batch_id": params["p_batch_id"], "campaign_id": params["p_campaign_id"]})
+            for row in self.tables.setdefault("campaigns", []):
+                if row.get("id") == params["p_campaign_id"]:
+                    for field, n in params["p_deltas"].items():
+                        row[field] = (row.get(field) or 0) + n
+        return 200, None, {}
+
+    def _increment_rollups(self, params: dict):
+        with self.lock:
+            batches = self.tables.setdefault("email_rollup_batches", [])
+            if any(b["batch_id"] == params["p_batch_id"] for b in batches):
+                return 200, None, {}
+            batches.append({"batch_id": params["p_batch_id"]})
+            rollups = self.tables.setdefault("email_rollups", [])
+            for delta in params["p_rows"]:
+                row = next((r for r in rollups
+                            if r["dimension"] == delta["dimension"] and r["value"] == delta["value"]), None)
+                if row is None:
+                    row = {"dimension": delta["dimension"], "value": delta["value"]}
+                    rollups.append(row)
+                for field, n in delta.items():
+                    if field not in ("dimension", "value"):
+                        row[field] = (row.get(field) or 0) + n
+        return 200, None, {}
+
+    def handle(self, method: str, table: str, params, body, prefer: str):
+        filters = [(k, v) for k, v in params if k not in ("select", "order", "limit", "offset", "on_conflict", "columns")]
+        options = dict(params)
+
+        with self.lock:
+            if self.failing_writes and method in ("POST", "PATCH", "DELETE"):
+                self.failing_writes -= 1
+                return 503, {"code": "PGRST000", "details": None, "hint": None,
+                             "message": "Could not connect to the database"}, {}
+            rows = self.tables.setdefault(table, [])
+            if table in self.columns and method in ("POST", "PATCH"):
+                for row in body if isinstance(body, list) else [body or {}]:
+                    unknown = sorted(set(row) - self.columns[table] - {"id", "created_at"})
+                    if unknown:
+                        return 400, {
+                            "code": "PGRST204", "details": None, "hint": None,
+                            "message": f"Could not find the '{unknown[0]}' column of '{table}' in the schema cache",
+                        }, {}
+
+            if method == "POST":
+                new_rows = body if isinstance(body, list) else [body]
+                conflict = options.get("on_conflict")
+                saved = []
+                for row in new_rows:
+                    row = dict(row)
+                    row.setdefault("id", str(uuid.uuid4()))
+                    row.setdefault("created_at", datetime.utcnow().isoformat())
+                    existing = None
+                    if conflict:
+                        existing = next((r for r in rows if r.get(conflict) == row.get(conflict)), None)
+                    if existing is not None:
+                        row["id"] = existing["id"]
+                        existing.update(row)
+                        saved.append(dict(existing))
+                    else:
+                        rows.append(row)
+                        saved.append(dict(row))
+                return 201, saved, {}
+
+            matched = [r for r in rows if all(_matches(r, k, v) for k, v in filters)]
+
+            if method == "PATCH":
+                for row in matched:
+                    row.update(body or {})
+                return 200, [dict(r) for r in matched], {}
+
+            if method == "DELETE":
+                self.tables[table] = [r for r in rows if r not in matched]
+                return 200, [dict(r) for r in matched], {}
+
+            if "order" in options:
+                column, _, direction = options["order"].partition(".")
+                matched.sort(key=lambda r: _sort_key(r.get(column)), reverse=direction.startswith("desc"))
+            total = len(matched)
+            offset = int(options.get("offset", 0))
+            limit = int(options.get("limit", total or 1))
+            page = [dict(r) for r in matched[offset:offset + limit]]
+
+        headers = {}
+        if "count=" in prefer:
+            end = offset + len(page) - 1
+            headers["Content-Range"] = f"{offset}-{end}/{total}" if page else f"*/{total}"
+        return 200, page, headers
+
+
+def _sort_key(value) -> tuple:
+    """Numbers by value, everything else as text"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, value, "")
+    return (1, 0, str(value or ""))
+
+
+def _matches(row: dict, column: str, expression: str) -> bool:
+    op, _, value = expression.partition(".")
+    if op == "not":
+        return not _matches(row, column, value)
+    actual = row.get(column)
+    if op == "eq":
+        return str(actual) == value
+    if op == "neq":
+        return str(actual) != value
+    if op == "gte":
+        return actual is not None and str(actual) >= value
+    if op == "lte":
+        return actual is not None and str(actual) <= value
+    if op == "is":
+        return actual is None if value == "null" else str(actual).lower() == value
+    if op == "in":
+        return str(actual) in value.strip("()").split(",")
+    if op == "ilike":
+        regex = "^" + re.escape(value).replace("%", ".*").replace("\\*", ".*") + "$"
+        return actual is not None and re.match(regex, str(actual), re.IGNORECASE) is not None
+    return True
+
+
+class FakeCompanySite:
+    """
+    Serves /<domain>/, /<domain>/team and /<domain>/contact for any domain
+
+    The team page lists STAFF with addresses built from `pattern`, so the
+    crawler can infer it; other paths 404. Point the crawler here with
+        WebsiteCrawler.url_template = site.url + "/{domain}{path}"
+        WebsiteCrawler.allow_private_hosts = True
+    """
+
+    STAFF = [("Ana", "Lopez"), ("Ben", "Carter"), ("Chloe", "Nguyen"), ("Dev", "Rao")]
+
+    def __init__(self, pattern: str = "{first}.{last}", latency: float = 0.0):
+        self.pattern = pattern
+        self.latency = latency
+        self.requests = 0
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def page(self, domain: str, path: str) -> Optional[str]:
+        if path in ("", "/"):
+            return '<html><body><a href="/team">Team</a> <a href="/contact">Contact</a></body></html>'
+        if path == "/team":
+            rows = "".join(
+                f"<li>{first} {last} &mdash; <a href=\"mailto:{self.address(first, last, domain)}\">"
+                f"{self.address(first, last, domain)}</a></li>"
+                for first, last in self.STAFF
+            )
+            return f"<html><body><h1>Our Team</h1><ul>{rows}</ul></body></html>"
+        if path == "/contact":
+            return f"<html><body>Write to info [at] {domain.replace('.', ' [dot] ')}</body></html>"
+        return None
+
+    def address(self, first: str, last: str, domain: str) -> str:
+        local = self.pattern.format(first=first.lower(), last=last.lower(), f=first[0].lower())
+        return f"{local}@{domain}"
+
+    def start(self) -> "FakeCompanySite":
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # One write per response; separate header/body writes stall on delayed ACKs
+            wbufsize = 64 * 1024
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                site.requests += 1
+                if site.latency:
+                    time.sleep(site.latency)
+                domain, _, path = urlsplit(self.path).path.lstrip("/").partition("/")
+                body = site.page(domain, "/" + path.rstrip("/"))
+                data = (body or "Not found").encode()
+                self.send_response(200 if body else 404)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="fake-site", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+def random_person(rng: random.Random) -> Dict[str, str]:
+    """Random recipient so repeated requests don't hit identical payloads"""
+    first = rng.choice(["Sarah", "John", "Priya", "Wei", "Maria", "David", "Aisha", "Lucas"])
+    last = rng.choice(["Johnson", "Doe", "Patel", "Chen", "Garcia", "Smith", "Khan", "Silva"])
+    company = rng.choice(["Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark"])
+    return {
+        "first": first,
+        "last": last,
+        "company": company,
+        "domain": f"{company.lower()}-{rng.randint(1, 50)}.example",
+    }
@@ -0,0 +1,73 @@
+"""
+Import-time budget for app.main
+
+Render's free plan sleeps idle instances, so every wake-up pays for
+importing the app. This benchmark imports app.main in fresh interpreters,
+fails if the median exceeds the budget, and checks that the heavy SDKs
+(Gemini, Supabase) are not imported until they are actually used.
+
+Usage (from backend/):
+    python -m benchmarks.import_time
+    python -m benchmarks.import_time --budget 0.8 --runs 7
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Modules that must stay out of the import path of app.main
+LAZY_MODULES = ["google.generativeai", "supabase", "grpc"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "seconds": elapsed,
+    "loaded": [m for m in %r if m in sys.modules],
+}))
+""" % (LAZY_MODULES,)
+
+
+def measure_once() -> dict:
+    """Import app.main in a clean interpreter and report timing"""
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget", type=float, default=1.0, help="Max median import time in seconds")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreters to sample")
+    args = parser.parse_args()
+
+    samples = [measure_once() for _ in range(args.runs)]
+    timings = [s["seconds"] for s in samples]
+    loaded = sorted({m for s in samples for m in s["loaded"]})
+    median = statistics.median(timings)
+
+    print(f"import app.main: median {median * 1000:.0f} ms, "
+          f"min {min(timings) * 1000:.0f} ms, max {max(timings) * 1000:.0f} ms "
+          f"({args.runs} runs, budget {args.budget * 1000:.0f} ms)")
+
+    failed = False
+    if loaded:
+        print(f"❌ Heavy SDKs imported eagerly: {', '.join(loaded)}")
+        failed = True
+    if median > args.budget:
+        print(f"❌ Import time over budget by {(median - args.budget) * 1000:.0f} ms")
+        failed = True
+    if not failed:
+        print("✅ Within cold-start budget")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""
+Generation throughput on the configured LLM backend
+
+Builds real /generate-complete prompts with PromptBuilder and pushes them
+through GeminiService at a given concurrency, reporting requests/s, prompt
+and completion tokens/s and latency percentiles. Point it at a local
+llama.cpp/Ollama server to measure prompt processing on CPU-only machines,
+or use the fake backend to measure the pipeline's own overhead.
+
+Usage (from backend/):
+    python -m benchmarks.llm_throughput --backend fake --requests 200
+    python -m benchmarks.llm_throughput --backend local --url http://localhost:11434/v1 \\
+        --model llama3.1:8b --requests 20 --concurrency 2
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fakes import random_person
+from benchmarks.load_test import percentile
+
+JOB_DESCRIPTION = (
+    "We build developer tools used by thousands of teams. "
+    "You will own Python and Kubernetes services behind our billing platform. "
+    "Experience with Kafka, PostgreSQL and Terraform is a plus. "
+    "We offer competitive pay, remote work and a learning budget. "
+) * 8
+
+
+def build_prompts(count: int, seed: int, budget: bool):
+    from app.api.routes.ai_generation import parse_job_description
+    from app.services.ai.prompt_budget import PromptBudget
+    from app.services.ai.prompt_builder import PromptBuilder
+
+    rng = random.Random(seed)
+    prompts = []
+    for _ in range(count):
+        person = random_person(rng)
+        parsed = parse_job_description(JOB_DESCRIPTION, "Backend Engineer")
+        prompts.append(PromptBuilder.build_complete_email_prompt(
+            recipient_first_name=person["first"],
+            recipient_company=person["company"],
+            sender_name="Benchmark Sender",
+            role_interested_in="Backend Engineer",
+            company_mission=parsed["company_mission"] if budget else JOB_DESCRIPTION,
+            company_tech_stack=parsed["company_tech_stack"],
+            budget=PromptBudget() if budget else _NoBudget(),
+        ))
+    return prompts
+
+
+class _NoBudget:
+    """Pass-through budget, to compare against uncapped prompts"""
+
+    def cap(self, section, text):
+        return text
+
+    def cap_list(self, section, items):
+        return items
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", default="fake", help="LLM_BACKEND to use (gemini, local, fake)")
+    parser.add_argument("--url", help="LLM_LOCAL_URL for --backend local")
+    parser.add_argument("--model", help="LLM_LOCAL_MODEL for --backend local")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--max-output-tokens", type=int, default=512)
+    parser.add_argument("--no-budget", action="store_true", help="Send the whole JD instead of the condensed one")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    from app.core.config import settings
+    from app.services.ai.gemini_service import GeminiService
+
+    settings.LLM_BACKEND = args.backend
+    if args.url:
+        settings.LLM_LOCAL_URL = args.url
+    if args.model:
+        settings.LLM_LOCAL_MODEL = args.model
+
+    prompts = build_prompts(args.requests, args.seed, budget=not args.no_budget)
+    service = GeminiService()
+    service.generation_config = {**service.generation_config, "max_output_tokens": args.max_output_tokens}
+
+    def run(prompt: str):
+        start = time.perf_counter()
+        response = service._generate_content(prompt, service.generation_config)
+        usage = response.usage_metadata
+        return time.perf_counter() - start, usage.prompt_token_count, usage.candidates_token_count
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(run, prompts))
+    wall = time.perf_counter() - started
+
+    latencies = [r[0] for r in results]
+    prompt_tokens = sum(r[1] for r in results)
+    completion_tokens = sum(r[2] for r in results)
+    print(f"backend {service.display_name}: {len(results)} requests, concurrency {args.concurrency}, "
+          f"{'uncapped' if args.no_budget else 'budgeted'} prompts (~{prompt_tokens // len(results)} tokens each)")
+    print(f"  {len(results) / wall:.2f} req/s, {prompt_tokens / wall:.0f} prompt tok/s, "
+          f"{completion_tokens / wall:.0f} completion tok/s")
+    print(f"  latency p50 {percentile(latencies, 50) * 1000:.0f} ms, p95 {percentile(latencies, 95) * 1000:.0f} ms, "
+          f"mean {statistics.fmean(latencies) * 1000:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,352 @@
+"""
+Offline load test for the ReachCraft API
+
+Starts app.main:app under uvicorn with every external dependency replaced by
+the in-process fakes in benchmarks/fakes.py, drives concurrent load and
+reports p50/p95/p99 latency and requests/sec per endpoint.
+
+Usage (from backend/):
+    python -m benchmarks.load_test
+    python -m benchmarks.load_test --concurrency 16 --requests 400 --endpoints discover,generate
+    python -m benchmarks.load_test --save baseline.json
+    python -m benchmarks.load_test --compare baseline.json --tolerance 0.15
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import shutil
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks.fakes import (
+    FakeCompanySite,
+    FakeGenerativeModel,
+    FakePostgREST,
+    FakeResolver,
+    FakeSMTPServer,
+    random_person,
+)
+
+
+def _discover(rng: random.Random) -> tuple:
+    person = random_person(rng)
+    return "POST", "/api/email-discovery/discover", {
+        "first_name": person["first"],
+        "last_name": person["last"],
+        "company_domain": person["domain"],
+        "company_name": person["company"],
+        "verify": True,
+        "save_to_db": True,
+    }
+
+
+def _generate(rng: random.Random) -> tuple:
+    person = random_person(rng)
+    return "POST", "/api/ai-generation/generate-complete", {
+        "recipient_first_name": person["first"],
+        "recipient_last_name": person["last"],
+        "recipient_company": person["company"],
+        "recipient_email": f"{person['first'].lower()}@{person['domain']}",
+        "role_interested_in": "Backend Engineer",
+        "job_description": "We build developer tools. You will own Python and Kubernetes services.",
+    }
+
+
+def _best_of(rng: random.Random) -> tuple:
+    method, path, payload = _generate(rng)
+    return method, path, {**payload, "candidates": 3}
+
+
+def _subject(rng: random.Random) -> tuple:
+    person = random_person(rng)
+    return "POST", "/api/ai-generation/generate-subject", {
+        "recipient_first_name": person["first"],
+        "recipient_company": person["company"],
+        "sender_name": "Benchmark Sender",
+    }
+
+
+def _history(rng: random.Random) -> tuple:
+    return "GET", "/api/ai-generation/history?limit=20", None
+
+
+def _contacts(rng: random.Random) -> tuple:
+    return "GET", "/api/email-discovery/contacts?limit=50", None
+
+
+SCENARIOS: Dict[str, Callable[[random.Random], tuple]] = {
+    "discover": _discover,
+    "generate": _generate,
+    "best_of": _best_of,
+    "subject": _subject,
+    "history": _history,
+    "contacts": _contacts,
+}
+
+
+def configure_app(args: argparse.Namespace, smtp_port: int, postgrest_url: str, site_url: str,
+                  cache_path: str, resolver: FakeResolver, model: FakeGenerativeModel) -> None:
+    """
+    Point this process's app clients at the fakes
+
+    Called in the load test process, and in each gunicorn worker by
+    benchmarks.worker_app. Every run starts from an empty SQLite cache.
+    """
+    from app.core.config import settings
+
+    settings.CACHE_DB_PATH = cache_path
+
+    from app.api.routes import analytics
+    from app.core.supabase_client import get_supabase_client
+    from app.db.cache_store import SQLiteCache
+    from app.services.ai import gemini_service, llm_backends
+    from app.services.ai.model_router import model_router
+    from app.services.discovery import pipeline
+    from app.services.discovery.domain_patterns import domain_patterns
+    from app.services.discovery.website_crawler import WebsiteCrawler
+    from app.services.email_discovery import EmailDiscoveryService
+    from app.services.verification.smtp_scheduler import smtp_scheduler
+    from app.tasks.campaigns import campaign_engine
+
+    resolver.install()
+    EmailDiscoveryService.SMTP_PORT = smtp_port
+    # Every fake domain shares one MX host, so loosen per-host politeness
+    smtp_scheduler.max_concurrent = args.smtp_sessions_per_host
+    smtp_scheduler.probes_per_minute = args.smtp_probes_per_minute
+    smtp_scheduler.base_backoff = args.smtp_backoff
+    # Caches created at import time still point at the default file
+    smtp_scheduler.backoffs = SQLiteCache(cache_path, "smtp_backoff")
+    pipeline.mx_cache = SQLiteCache(cache_path, "mx_records")
+    pipeline.verdict_cache = SQLiteCache(cache_path, "smtp_verdicts")
+    model_router.cooldowns = SQLiteCache(cache_path, "llm_cooldowns")
+    domain_patterns.store = SQLiteCache(cache_path, "domain_patterns")
+    campaign_engine.campaigns = SQLiteCache(cache_path, "campaigns")
+    campaign_engine.items = SQLiteCache(cache_path, "campaign_items")
+    campaign_engine.leases = SQLiteCache(cache_path, "campaign_leases")
+    analytics.analytics_cache = SQLiteCache(cache_path, "analytics")
+    # Company sites come from the fake; every run starts with no known patterns
+    WebsiteCrawler.url_template = site_url + "/{domain}{path}"
+    WebsiteCrawler.allow_private_hosts = True
+    settings.DISCOVERY_CRAWL_ENABLED = not args.no_crawl
+    os.environ["SUPABASE_URL"] = postgrest_url
+    os.environ["SUPABASE_KEY"] = FakePostgREST.API_KEY
+    get_supabase_client.cache_clear()
+    # Every routed model name gets the same fake
+    llm_backends.register_backend("loadtest", lambda model_name: model)
+    settings.LLM_BACKEND = "loadtest"
+    gemini_service.get_gemini_service.cache_clear()
+
+
+class FakeEnvironment:
+    """Starts the fakes and points the app's clients at them"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.smtp = FakeSMTPServer(
+            script={r"^[a-z]+\.[a-z]+@": 250, r"^[a-z]@": 451},
+            default_code=550,
+            latency=args.smtp_latency,
+        )
+        self.resolver = FakeResolver(latency=args.dns_latency)
+        self.postgrest = FakePostgREST(latency=args.db_latency)
+        self.site = FakeCompanySite(latency=args.site_latency)
+        self.model = FakeGenerativeModel(
+            time_to_first_token=args.llm_ttft,
+            per_token_latency=args.llm_token_latency,
+        )
+
+    def start(self) -> None:
+        self.smtp.start()
+        self.postgrest.start()
+        self.site.start()
+        self._cache_dir = tempfile.mkdtemp(prefix="reachcraft-loadtest-")
+        configure_app(self.args, self.smtp.port, self.postgrest.url, self.site.url,
+                      os.path.join(self._cache_dir, "cache.sqlite3"), self.resolver, self.model)
+
+    def stop(self) -> None:
+        self.resolver.uninstall()
+        self.smtp.stop()
+        self.postgrest.stop()
+        self.site.stop()
+        shutil.rmtree(self._cache_dir, ignore_errors=True)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_app(port: int):
+    """Run app.main:app under uvicorn in a background thread"""
+    import uvicorn
+    from app.main import app
+
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, name="uvicorn", daemon=True)
+    thread.start()
+    deadline = time.time() + 15
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("uvicorn did not start")
+        time.sleep(0.05)
+    return server, thread
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def run_load(base_url: str, endpoints: List[str], total: int, concurrency: int,
+                   seed: int, timeout: float) -> Dict[str, dict]:
+    """Send `total` requests spread round-robin over `endpoints` with `concurrency` workers"""
+    rng = random.Random(seed)
+    plan = [SCENARIOS[endpoints[i % len(endpoints)]](rng) + (endpoints[i % len(endpoints)],)
+            for i in range(total)]
+    latencies: Dict[str, List[float]] = {name: [] for name in endpoints}
+    errors: Dict[str, int] = {name: 0 for name in endpoints}
+    cursor = iter(plan)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+
+        async def worker():
+            for method, path, payload, name in cursor:
+                start = time.perf_counter()
+                try:
+                    response = await client.request(method, path, json=payload)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                latencies[name].append(time.perf_counter() - start)
+                if not ok:
+                    errors[name] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - started
+
+    return {
+        name: {
+            "requests": len(samples),
+            "errors": errors[name],
+            "rps": len(samples) / wall if wall else 0.0,
+            "p50_ms": percentile(samples, 50) * 1000,
+            "p95_ms": percentile(samples, 95) * 1000,
+            "p99_ms": percentile(samples, 99) * 1000,
+            "mean_ms": statistics.fmean(samples) * 1000 if samples else 0.0,
+        }
+        for name, samples in latencies.items()
+    } | {"_total": {"requests": total, "wall_seconds": wall, "rps": total / wall if wall else 0.0}}
+
+
+def print_report(results: Dict[str, dict]) -> None:
+    print(f"\n{'endpoint':<12}{'reqs':>7}{'errs':>6}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, r in results.items():
+        if name.startswith("_"):
+            continue
+        print(f"{name:<12}{r['requests']:>7}{r['errors']:>6}{r['rps']:>9.1f}"
+              f"{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}")
+    total = results["_total"]
+    print(f"\n{total['requests']} requests in {total['wall_seconds']:.2f}s ({total['rps']:.1f} req/s overall)")
+
+
+def compare(results: Dict[str, dict], baseline_path: str, tolerance: float) -> List[str]:
+    """Return regressions where p95 grew or req/s dropped by more than `tolerance`"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if name.startswith("_") or not before:
+            continue
+        if before["p95_ms"] and current["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']:.1f} -> {current['p95_ms']:.1f} ms")
+        if before["rps"] and current["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: req/s {before['rps']:.1f} -> {current['rps']:.1f}")
+    return regressions
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Offline load test with stubbed Gemini, SMTP, DNS and Supabase")
+    parser.add_argument("--endpoints", default="discover,generate,history",
+                        help=f"Comma-separated scenarios: {', '.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=120, help="Total requests to send")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent client connections")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request client timeout (s)")
+    parser.add_argument("--smtp-latency", type=float, default=0.02, help="Delay before each SMTP reply (s)")
+    parser.add_argument("--smtp-sessions-per-host", type=int, default=16, help="Scheduler cap on concurrent sessions")
+    parser.add_argument("--smtp-probes-per-minute", type=int, default=100000, help="Scheduler cap on probes/minute")
+    parser.add_argument("--smtp-backoff", type=float, default=0.5, help="Scheduler backoff after 421/451 (s)")
+    parser.add_argument("--dns-latency", type=float, default=0.005, help="Delay per DNS query (s)")
+    parser.add_argument("--site-latency", type=float, default=0.02, help="Delay per company web page (s)")
+    parser.add_argument("--no-crawl", action="store_true", help="Skip company website crawls during discovery")
+    parser.add_argument("--db-latency", type=float, default=0.01, help="Delay per PostgREST call (s)")
+    parser.add_argument("--llm-ttft", type=float, default=0.3, help="Gemini time to first token (s)")
+    parser.add_argument("--llm-token-latency", type=float, default=0.004, help="Gemini delay per output token (s)")
+    parser.add_argument("--save", help="Write results as JSON to this path")
+    parser.add_argument("--compare", help="Baseline JSON to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed regression ratio for --compare")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    unknown = [e for e in endpoints if e not in SCENARIOS]
+    if unknown:
+        print(f"Unknown endpoints: {', '.join(unknown)}")
+        return 2
+
+    logging.basicConfig(level=logging.WARNING)
+    env = FakeEnvironment(args)
+    env.start()
+    port = _free_port()
+    server, thread = start_app(port)
+    try:
+        results = asyncio.run(run_load(
+            f"http://127.0.0.1:{port}", endpoints, args.requests, args.concurrency, args.seed, args.timeout
+        ))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+        env.stop()
+
+    print_report(results)
+    print(f"fakes: {env.smtp.sessions} SMTP sessions, {env.smtp.rcpt_count} RCPTs, "
+          f"{env.resolver.queries} DNS queries, {env.site.requests} web pages, {env.model.calls} LLM calls")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results to {args.save}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        if regressions:
+            print("❌ Regressions vs baseline:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print("✅ No regressions vs baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
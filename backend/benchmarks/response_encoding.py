@@ -0,0 +1,182 @@
+"""
+Payload size and encode time of the JSON response layer
+
+Part 1 (in-process) takes a /history-shaped payload of N emails with
+realistic bodies. It encodes it the way Starlette's JSONResponse does
+(json.dumps) and with orjson (app.core.responses.encode), then compresses
+it with gzip and brotli at the configured levels. It reports the median
+time and bytes for each.
+
+Part 2 (through the app) seeds the fake PostgREST and calls
+/api/ai-generation/history with Accept-Encoding identity, gzip and br, then
+again with If-None-Match. It reports bytes on the wire and p50 latency.
+
+Usage (from backend/):
+    python -m benchmarks.response_encoding
+    python -m benchmarks.response_encoding --rows 500 --repeat 50
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from benchmarks.fakes import FakePostgREST
+from benchmarks.load_test import _free_port, start_app
+
+WORDS = ("team pipeline latency platform shipped scaling customers onboarding reliability "
+         "migration dashboards models inference roadmap hiring curious question portfolio").split()
+
+
+def history_rows(count: int, seed: int) -> List[Dict]:
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    rows = []
+    for i in range(count):
+        paragraphs = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(30, 60))).capitalize() + "."
+                      for _ in range(4)]
+        rows.append({
+            "id": str(uuid.uuid4()),
+            "recipient_name": f"Person {i}",
+            "recipient_email": f"person{i}@company{i % 40}.example",
+            "recipient_company": f"Company {i % 40}",
+            "role_name": rng.choice(["Backend Engineer", "Data Scientist", "ML Engineer"]),
+            "subject_line": f"Quick question about {rng.choice(WORDS)} at Company {i % 40}",
+            "body": f"Hi Person {i},\n\n" + "\n\n".join(paragraphs) + "\n\nBest,\nBenchmark",
+            "status": "generated",
+            "created_at": (now - timedelta(minutes=i)).isoformat(),
+        })
+    return rows
+
+
+def timed(fn: Callable[[], bytes], repeat: int) -> tuple:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        out = fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000, out
+
+
+def encode_report(rows: List[Dict], repeat: int) -> List[tuple]:
+    from app.api.routes.ai_generation import EmailHistoryItem, EmailHistoryResponse
+    from app.core import compression
+    from app.core.responses import encode
+
+    model = EmailHistoryResponse(emails=[EmailHistoryItem(**row) for row in rows], total_count=len(rows))
+
+    def stdlib() -> bytes:
+        # Starlette JSONResponse.render after FastAPI's serialization
+        return json.dumps(model.model_dump(mode="json"), ensure_ascii=False, allow_nan=False,
+                          indent=None, separators=(",", ":")).encode("utf-8")
+
+    def fast() -> bytes:
+        return encode(model.model_dump())
+
+    report = []
+    ms, body = timed(stdlib, repeat)
+    report.append(("json.dumps", ms, len(body)))
+    ms, body = timed(fast, repeat)
+    report.append(("orjson", ms, len(body)))
+    ms, out = timed(lambda: compression.compress(body, "gzip"), repeat)
+    report.append(("  + gzip", ms, len(out)))
+    if compression.brotli is not None:
+        ms, out = timed(lambda: compression.compress(body, "br"), repeat)
+        report.append(("  + brotli", ms, len(out)))
+    return report
+
+
+async def wire_report(base_url: str, limit: int, repeat: int) -> List[tuple]:
+    from app.core import compression
+
+    path = f"/api/ai-generation/history?limit={limit}"
+    report = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        await client.get(path)  # Warm up
+        etag = None
+        for encoding in ["identity", "gzip"] + (["br"] if compression.brotli else []) + ["if-none-match"]:
+            headers = {"Accept-Encoding": "gzip, br" if encoding == "if-none-match" else encoding}
+            if encoding == "if-none-match":
+                headers["If-None-Match"] = etag
+            samples, size, status = [], 0, 0
+            for _ in range(repeat):
+                started = time.perf_counter()
+                async with client.stream("GET", path, headers=headers) as response:
+                    raw = b"".join([chunk async for chunk in response.aiter_raw()])
+                samples.append(time.perf_counter() - started)
+                size, status = len(raw), response.status_code
+                etag = response.headers.get("etag", etag)
+            report.append((encoding, status, statistics.median(samples) * 1000, size))
+    return report
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="JSON encode time and payload size, raw and compressed")
+    parser.add_argument("--rows", type=int, default=100, help="Emails per /history page")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--db-latency", type=float, default=0.0, help="Delay per PostgREST call (s)")
+    parser.add_argument("--seed", type=int, default=5)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    rows = history_rows(args.rows, args.seed)
+
+    postgrest = FakePostgREST(latency=args.db_latency).start()
+    postgrest.tables["emails"] = rows
+    cache_dir = tempfile.mkdtemp(prefix="reachcraft-encoding-")
+    os.environ["SUPABASE_URL"] = postgrest.url
+    os.environ["SUPABASE_KEY"] = FakePostgREST.API_KEY
+
+    from app.core.config import settings
+    from app.core.supabase_client import get_supabase_client
+
+    settings.CACHE_DB_PATH = os.path.join(cache_dir, "cache.sqlite3")
+    get_supabase_client.cache_clear()
+    port = _free_port()
+    server, thread = start_app(port)
+    try:
+        encoded = encode_report(rows, args.repeat)
+        wire = asyncio.run(wire_report(f"http://127.0.0.1:{port}", args.rows, args.repeat))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+        postgrest.stop()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print(f"\n/history payload, {args.rows} emails (median of {args.repeat})")
+    print(f"{'encoder':<14}{'ms':>8}{'KB':>9}")
+    for name, ms, size in encoded:
+        print(f"{name:<14}{ms:>8.2f}{size / 1024:>9.1f}")
+    print(f"\nGET /history?limit={args.rows} through the app")
+    print(f"{'request':<16}{'status':>7}{'p50 ms':>9}{'wire KB':>10}")
+    for name, status, ms, size in wire:
+        print(f"{name:<16}{status:>7}{ms:>9.2f}{size / 1024:>10.1f}")
+
+    problems = []
+    if encoded[0][2] != encoded[1][2]:
+        problems.append(f"orjson body is {encoded[1][2]} bytes, json.dumps {encoded[0][2]}")
+    if wire[-1][1] != 304:
+        problems.append(f"conditional GET returned {wire[-1][1]}, expected 304")
+    if any(size >= wire[0][3] for _, _, _, size in wire[1:-1]):
+        problems.append("a compressed response was not smaller than identity")
+    for problem in problems:
+        print(f"❌ {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
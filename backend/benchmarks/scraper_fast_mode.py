@@ -0,0 +1,155 @@
+"""
+Scraper fast mode vs full page loads, against saved HTML fixtures
+
+Serves benchmarks/fixtures/scraper/ from a local HTTP server where every
+image, stylesheet, font and script is delayed (like a slow CDN), then runs
+the same search/profile lookups through LinkedInScraperPool with
+fast_mode off and on.
+
+Also times the HTML-parsing step alone (BeautifulSoup vs. title/href
+extraction), which runs without a browser.
+
+Usage (from backend/):
+    python -m benchmarks.scraper_fast_mode
+    python -m benchmarks.scraper_fast_mode --lookups 40 --pages 4 --asset-delay 0.15
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+FIXTURES = Path(__file__).parent / "fixtures" / "scraper"
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    """Serve fixture pages; fabricate delayed subresources under /assets/"""
+
+    asset_delay = 0.1
+    asset_bytes = 40_000
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path.startswith("/assets/"):
+            time.sleep(self.asset_delay)
+            body = b"\0" * self.asset_bytes
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        self.path = path
+        super().do_GET()
+
+
+def serve_fixtures(asset_delay: float) -> ThreadingHTTPServer:
+    FixtureHandler.asset_delay = asset_delay
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(FixtureHandler, directory=str(FIXTURES)))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fixtures", daemon=True).start()
+    return server
+
+
+def bench_parsing(rounds: int) -> None:
+    """Parse cost alone: full-document BeautifulSoup vs. reading only what we need"""
+    from app.services.scraping.linkedin_scraper import (
+        PROFILE_URL_RE,
+        first_profile_url,
+        name_from_title,
+        parse_profile_page,
+        parse_search_results,
+    )
+
+    search_html = (FIXTURES / "search.html").read_text()
+    profile_html = (FIXTURES / "profile.html").read_text()
+    # What the DOM queries hand back in fast mode
+    hrefs = [m.group(0) for m in PROFILE_URL_RE.finditer(search_html)]
+    title = "Sarah Johnson | LinkedIn"
+
+    def timed(fn) -> float:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            fn()
+        return (time.perf_counter() - start) / rounds * 1000
+
+    soup_ms = timed(lambda: (parse_search_results(search_html), parse_profile_page(profile_html, "u")))
+    direct_ms = timed(lambda: (first_profile_url(hrefs), name_from_title(title)))
+    print(f"parse per lookup pair: BeautifulSoup {soup_ms:.3f} ms, DOM-query results {direct_ms:.4f} ms")
+
+
+async def bench_browser(base_url: str, lookups: int, pages: int, fast_mode: bool) -> dict:
+    from app.services.scraping.scraper_pool import LinkedInScraperPool
+
+    pool = LinkedInScraperPool(size=pages, fast_mode=fast_mode)
+    pool.search_url_template = base_url + "/search.html?q={query}"
+    people = [("Sarah Johnson", "Globex")] * lookups
+    urls = [base_url + "/profile.html"] * lookups
+
+    async with pool:
+        latencies = []
+
+        async def timed(coro):
+            start = time.perf_counter()
+            result = await coro
+            latencies.append(time.perf_counter() - start)
+            return result
+
+        started = time.perf_counter()
+        found = await pool._run_queue(people, lambda p: timed(pool.search_profile(*p)))
+        profiles = await pool._run_queue(urls, lambda u: timed(pool.extract_profile_info(u)))
+        wall = time.perf_counter() - started
+
+    ok = sum(1 for f in found if f) + sum(1 for p in profiles if p.get("name"))
+    return {
+        "wall_s": wall,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": sorted(latencies)[int(0.95 * (len(latencies) - 1))] * 1000,
+        "ok": ok,
+        "total": len(latencies),
+        "blocked": pool.blocked_requests,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="LinkedIn scraper fast-mode benchmark")
+    parser.add_argument("--lookups", type=int, default=20, help="Searches and profile loads per mode")
+    parser.add_argument("--pages", type=int, default=4, help="Pages in the scraper pool")
+    parser.add_argument("--asset-delay", type=float, default=0.1, help="Delay per image/css/font/js (s)")
+    parser.add_argument("--parse-rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    bench_parsing(args.parse_rounds)
+
+    try:
+        import playwright  # noqa: F401
+    except ImportError:
+        print("playwright not installed; skipping browser benchmark")
+        return 0
+
+    server = serve_fixtures(args.asset_delay)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    try:
+        for fast_mode in (False, True):
+            try:
+                r = asyncio.run(bench_browser(base_url, args.lookups, args.pages, fast_mode))
+            except Exception as e:
+                print(f"browser benchmark unavailable: {str(e).splitlines()[0]}")
+                return 1
+            label = "fast" if fast_mode else "full"
+            print(f"{label}: {r['total']} lookups in {r['wall_s']:.2f}s, p50 {r['p50_ms']:.0f} ms, "
+                  f"p95 {r['p95_ms']:.0f} ms, {r['ok']}/{r['total']} parsed, {r['blocked']} requests blocked")
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""
+Outbound send throughput: a fresh relay connection per message vs. the pool
+
+Queues N generated emails in the fake PostgREST and drains them through
+the real SendQueue -> EmailSender -> RelayPool path into a local aiosmtpd
+relay (STARTTLS by default). Runs once with one connection per message,
+which is what sending from a mail client or a naive script does, and once
+with pooled persistent connections. Reports messages/s, relay connections,
+TLS session resumptions and the final status counts. Needs aiosmtpd and
+the openssl CLI (--no-tls skips the certificate).
+
+Usage (from backend/):
+    python -m benchmarks.send_throughput
+    python -m benchmarks.send_throughput --emails 400 --pool-size 4 --latency 0.01
+    python -m benchmarks.send_throughput --bounce-every 10 --domains 3 --per-domain-per-minute 600
+"""
+import argparse
+import asyncio
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from benchmarks.fakes import FakePostgREST, FakeRelay
+
+
+def seed_emails(postgrest: FakePostgREST, count: int, domains: int, bounce_every: int) -> List[str]:
+    rows = []
+    for i in range(count):
+        local = f"bounce{i}" if bounce_every and i % bounce_every == 0 else f"person{i}"
+        rows.append({
+            "id": str(uuid.uuid4()),
+            "recipient_name": f"Person {i}",
+            "recipient_email": f"{local}@company{i % domains}.example",
+            "recipient_company": f"Company {i % domains}",
+            "subject_line": f"Quick question #{i}",
+            "body": "Hi,\n\nI'd love to hear how your team approaches this.\n\nBest,\nBenchmark",
+            "status": "generated",
+            "created_at": datetime.utcnow().isoformat(),
+        })
+    postgrest.tables["emails"] = rows
+    return [row["id"] for row in rows]
+
+
+async def drain(queue) -> float:
+    """Process batches until nothing is queued; returns seconds taken"""
+    started = time.perf_counter()
+    while True:
+        if not await queue.process_batch():
+            if not await asyncio.to_thread(_queued):
+                break
+            await asyncio.sleep(0.05)  # Paced or retrying rows come due later
+    return time.perf_counter() - started
+
+
+def _queued() -> int:
+    from app.core.supabase_client import get_supabase_client
+    from app.tasks.outbox import QUEUED
+
+    return len(get_supabase_client().table("emails").select("id").eq("status", QUEUED).execute().data)
+
+
+def run(args, mode: str, postgrest: FakePostgREST, relay: FakeRelay, cache_dir: str) -> Dict:
+    from app.db.cache_store import SQLiteCache
+    from app.services.email.relay import RelayPool
+    from app.services.email.sender import EmailSender
+    from app.services.verification.smtp_scheduler import HostScheduler
+    from app.tasks.outbox import SendQueue
+
+    pool = RelayPool(
+        host="localhost",
+        port=relay.port,
+        username="",
+        tls="starttls" if relay.tls else "none",
+        size=args.pool_size,
+        max_messages=1 if mode == "per-message" else args.max_messages,
+        ssl_context=relay.client_ssl_context() if relay.tls else None,
+    )
+    scheduler = HostScheduler(
+        max_concurrent=args.per_domain_concurrency,
+        probes_per_minute=args.per_domain_per_minute,
+        base_backoff=1.0,
+    )
+    queue = SendQueue(
+        sender=EmailSender(pool=pool, scheduler=scheduler),
+        leases=SQLiteCache(os.path.join(cache_dir, f"{mode}.sqlite3"), "send_leases"),
+        batch_size=args.batch_size,
+        retry_delay=0.0,
+        max_attempts=1,
+    )
+
+    ids = seed_emails(postgrest, args.emails, args.domains, args.bounce_every)
+    connections_before = relay.connections
+    queue.enqueue(email_ids=ids)
+    wall = asyncio.run(drain(queue))
+    pool.close()
+
+    statuses: Dict[str, int] = {}
+    for row in postgrest.tables["emails"]:
+        statuses[row["status"]] = statuses.get(row["status"], 0) + 1
+    return {
+        "wall_seconds": wall,
+        "rate": args.emails / wall if wall else 0.0,
+        "connections": relay.connections - connections_before,
+        "resumed": pool.stats["resumed"],
+        "statuses": statuses,
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Send queue throughput against a local aiosmtpd relay")
+    parser.add_argument("--emails", type=int, default=200)
+    parser.add_argument("--domains", type=int, default=20, help="Distinct recipient domains")
+    parser.add_argument("--pool-size", type=int, default=2, help="Relay connections (SMTP_RELAY_POOL_SIZE)")
+    parser.add_argument("--max-messages", type=int, default=100, help="Messages per pooled connection")
+    parser.add_argument("--batch-size", type=int, default=20, help="Rows per send batch (SEND_BATCH_SIZE)")
+    parser.add_argument("--per-domain-concurrency", type=int, default=2)
+    parser.add_argument("--per-domain-per-minute", type=int, default=100000)
+    parser.add_argument("--bounce-every", type=int, default=0, help="Every Nth recipient is rejected with 550")
+    parser.add_argument("--latency", type=float, default=0.005, help="Relay delay per EHLO/RCPT/DATA (s)")
+    parser.add_argument("--db-latency", type=float, default=0.005, help="Delay per PostgREST call (s)")
+    parser.add_argument("--no-tls", action="store_true", help="Plain SMTP instead of STARTTLS")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    relay = FakeRelay(script={r"^bounce": 550}, latency=args.latency, tls=not args.no_tls).start()
+    postgrest = FakePostgREST(latency=args.db_latency).start()
+    cache_dir = tempfile.mkdtemp(prefix="reachcraft-send-")
+    os.environ["SUPABASE_URL"] = postgrest.url
+    os.environ["SUPABASE_KEY"] = FakePostgREST.API_KEY
+
+    from app.core.supabase_client import get_supabase_client
+
+    get_supabase_client.cache_clear()
+
+    rows = []
+    try:
+        for mode in ("per-message", "pooled"):
+            rows.append((mode, run(args, mode, postgrest, relay, cache_dir)))
+    finally:
+        relay.stop()
+        postgrest.stop()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print(f"\n{'mode':<13}{'msgs/s':>9}{'wall s':>9}{'conns':>7}{'resumed':>9}  statuses")
+    for mode, r in rows:
+        statuses = ", ".join(f"{k}={v}" for k, v in sorted(r["statuses"].items()))
+        print(f"{mode:<13}{r['rate']:>9.1f}{r['wall_seconds']:>9.2f}{r['connections']:>7}{r['resumed']:>9}  {statuses}")
+    if rows[0][1]["rate"]:
+        print(f"\nspeedup: {rows[1][1]['rate'] / rows[0][1]['rate']:.2f}x "
+              f"({'STARTTLS' if not args.no_tls else 'plain SMTP'}, pool of {args.pool_size})")
+
+    expected_failed = len([i for i in range(args.emails) if args.bounce_every and i % args.bounce_every == 0])
+    problems = [
+        f"{mode}: {r['statuses']}" for mode, r in rows
+        if r["statuses"].get("sent", 0) != args.emails - expected_failed
+        or r["statuses"].get("failed", 0) != expected_failed
+    ]
+    for problem in problems:
+        print(f"❌ unexpected statuses: {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
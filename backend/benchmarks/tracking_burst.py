@@ -0,0 +1,222 @@
+"""
+Open/click tracking under a burst of hits
+
+Seeds sent emails across a few campaigns in the fake PostgREST, starts the
+app under uvicorn and fires a burst of signed pixel and click hits, with
+each email opened several times the way image proxies and reloads do.
+While the burst runs, a probe keeps calling /api/ai-generation/history.
+Runs twice: "eager" flushes on every new hit (flush size 1), which comes
+close to one database write per event, and "buffered" uses the normal
+flush size and interval. Reports hits/s, hit latency, probe p95 idle vs.
+during the burst, and the PostgREST calls tracking made (probe calls
+excluded). Then checks that every campaign counted each opened/clicked
+email exactly once.
+
+Usage (from backend/):
+    python -m benchmarks.tracking_burst
+    python -m benchmarks.tracking_burst --emails 2000 --opens-per-email 4 --concurrency 64
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.fakes import FakePostgREST
+from benchmarks.load_test import _free_port, percentile, start_app
+
+
+def seed(postgrest: FakePostgREST, emails: int, campaigns: int) -> Dict[str, List[str]]:
+    """Fresh campaigns and sent emails; returns campaign id -> email ids"""
+    campaign_ids = [str(uuid.uuid4()) for _ in range(campaigns)]
+    postgrest.tables["campaigns"] = [
+        {"id": cid, "name": f"Burst {i}", "opened_count": 0, "clicked_count": 0, "replied_count": 0}
+        for i, cid in enumerate(campaign_ids)
+    ]
+    rows = []
+    for i in range(emails):
+        rows.append({
+            "id": str(uuid.uuid4()),
+            "campaign_id": campaign_ids[i % campaigns],
+            "recipient_name": f"Person {i}",
+            "recipient_email": f"person{i}@company{i % 50}.example",
+            "recipient_company": f"Company {i % 50}",
+            "subject_line": f"Quick question #{i}",
+            "body": "Hi, see https://example.com/portfolio",
+            "status": "sent",
+            "sent_at": datetime.utcnow().isoformat(),
+            "created_at": datetime.utcnow().isoformat(),
+        })
+    postgrest.tables["emails"] = rows
+    by_campaign: Dict[str, List[str]] = {cid: [] for cid in campaign_ids}
+    for row in rows:
+        by_campaign[row["campaign_id"]].append(row["id"])
+    return by_campaign
+
+
+def plan_hits(email_ids: List[str], opens_per_email: int, click_ratio: float, rng: random.Random):
+    """Shuffled (path, kind) hits, and the ids that get clicked"""
+    from app.services.email.tracking import click_url, pixel_url
+
+    clicked = set(rng.sample(email_ids, int(len(email_ids) * click_ratio)))
+    hits = []
+    for email_id in email_ids:
+        hits += [(pixel_url(email_id), "open")] * opens_per_email
+        if email_id in clicked:
+            hits.append((click_url(email_id, "https://example.com/portfolio"), "click"))
+    rng.shuffle(hits)
+    return hits, clicked
+
+
+async def probe(client: httpx.AsyncClient, stop: asyncio.Event, samples: List[float]) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/api/ai-generation/history?limit=20")
+        samples.append(time.perf_counter() - started)
+        await asyncio.sleep(0.01)
+
+
+async def burst(base_url: str, hits, concurrency: int) -> Dict:
+    idle: List[float] = []
+    busy: List[float] = []
+    latencies: List[float] = []
+    errors = 0
+    cursor = iter(hits)
+    limits = httpx.Limits(max_connections=concurrency + 1, max_keepalive_connections=concurrency + 1)
+    async with httpx.AsyncClient(base_url=base_url, timeout=30, limits=limits) as client:
+        await client.get("/api/ai-generation/history?limit=20")  # Warm up the Supabase client
+        stop = asyncio.Event()
+        probing = asyncio.create_task(probe(client, stop, idle))
+        await asyncio.sleep(1.0)
+        stop.set()
+        await probing
+
+        async def worker():
+            nonlocal errors
+            for url, _ in cursor:
+                started = time.perf_counter()
+                response = await client.get(url)
+                latencies.append(time.perf_counter() - started)
+                errors += response.status_code not in (200, 302)
+
+        stop = asyncio.Event()
+        probing = asyncio.create_task(probe(client, stop, busy))
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - started
+        stop.set()
+        await probing
+    return {
+        "rate": len(hits) / wall if wall else 0.0,
+        "wall": wall,
+        "errors": errors,
+        "hit_p50_ms": percentile(latencies, 50) * 1000,
+        "hit_p99_ms": percentile(latencies, 99) * 1000,
+        "probe_idle_ms": percentile(idle, 95) * 1000,
+        "probe_busy_ms": percentile(busy, 95) * 1000,
+        "probes": 1 + len(idle) + len(busy),
+    }
+
+
+def run(args, mode: str, postgrest: FakePostgREST, port: int) -> Dict:
+    from app.tasks.tracking import tracking_buffer
+
+    tracking_buffer.flush_size = 1 if mode == "eager" else args.flush_size
+    tracking_buffer.flush_interval = args.flush_interval
+    for seen in tracking_buffer._seen.values():
+        seen.clear()
+
+    by_campaign = seed(postgrest, args.emails, args.campaigns)
+    email_ids = [email_id for ids in by_campaign.values() for email_id in ids]
+    hits, clicked = plan_hits(email_ids, args.opens_per_email, args.click_ratio, random.Random(args.seed))
+
+    calls_before = postgrest.requests
+    result = asyncio.run(burst(f"http://127.0.0.1:{port}", hits, args.concurrency))
+    settle = time.time() + 30
+    while tracking_buffer.pending() and time.time() < settle:
+        time.sleep(0.1)
+    time.sleep(args.flush_interval + 0.5)  # Last flush and its counter batches
+
+    result["hits"] = len(hits)
+    result["db_calls"] = postgrest.requests - calls_before - result["probes"]
+    campaigns = {row["id"]: row for row in postgrest.tables["campaigns"]}
+    problems = []
+    for cid, ids in by_campaign.items():
+        expected = {"opened_count": len(ids), "clicked_count": len(clicked.intersection(ids))}
+        for field, n in expected.items():
+            if campaigns[cid].get(field) != n:
+                problems.append(f"{mode}: campaign {cid[:8]} {field} {campaigns[cid].get(field)} != {n}")
+    unopened = sum(1 for row in postgrest.tables["emails"] if not row.get("opened_at"))
+    if unopened:
+        problems.append(f"{mode}: {unopened} emails without opened_at")
+    result["problems"] = problems
+    return result
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Tracking pixel/click burst against the app")
+    parser.add_argument("--emails", type=int, default=1000)
+    parser.add_argument("--campaigns", type=int, default=5)
+    parser.add_argument("--opens-per-email", type=int, default=3, help="Pixel loads per email")
+    parser.add_argument("--click-ratio", type=float, default=0.3, help="Share of emails clicked once")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--flush-size", type=int, default=500, help="TRACKING_FLUSH_SIZE")
+    parser.add_argument("--flush-interval", type=float, default=1.0, help="TRACKING_FLUSH_INTERVAL (s)")
+    parser.add_argument("--db-latency", type=float, default=0.01, help="Delay per PostgREST call (s)")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    postgrest = FakePostgREST(latency=args.db_latency).start()
+    cache_dir = tempfile.mkdtemp(prefix="reachcraft-tracking-")
+    os.environ["SUPABASE_URL"] = postgrest.url
+    os.environ["SUPABASE_KEY"] = FakePostgREST.API_KEY
+    port = _free_port()
+
+    from app.core.config import settings
+    from app.core.supabase_client import get_supabase_client
+
+    settings.CACHE_DB_PATH = os.path.join(cache_dir, "cache.sqlite3")
+    settings.TRACKING_BASE_URL = f"http://127.0.0.1:{port}"
+    get_supabase_client.cache_clear()
+    server, thread = start_app(port)
+
+    rows = []
+    try:
+        for mode in ("eager", "buffered"):
+            rows.append((mode, run(args, mode, postgrest, port)))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+        postgrest.stop()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print(f"\n{'mode':<10}{'hits':>7}{'hits/s':>9}{'p50 ms':>8}{'p99 ms':>8}"
+          f"{'probe idle':>12}{'probe busy':>12}{'db calls':>10}")
+    for mode, r in rows:
+        print(f"{mode:<10}{r['hits']:>7}{r['rate']:>9.0f}{r['hit_p50_ms']:>8.1f}{r['hit_p99_ms']:>8.1f}"
+              f"{r['probe_idle_ms']:>10.1f}ms{r['probe_busy_ms']:>10.1f}ms{r['db_calls']:>10}")
+    print("\n(probe = p95 of GET /api/ai-generation/history)")
+
+    problems = [p for _, r in rows for p in r["problems"]]
+    problems += [f"{mode}: {r['errors']} failed hits" for mode, r in rows if r["errors"]]
+    for problem in problems:
+        print(f"❌ {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,30 @@
+"""
+app.main:app wired to the load-test fakes, for multi-process servers
+
+benchmarks.worker_scaling starts the fake SMTP/PostgREST/company-site
+servers in its own process and runs gunicorn with this module as the app.
+Each worker imports it, installs the in-process fakes (DNS resolver,
+Gemini model) and points its clients at the shared fake servers, using
+the JSON in REACHCRAFT_BENCH_CONFIG.
+"""
+import argparse
+import json
+import os
+
+from benchmarks.fakes import FakeGenerativeModel, FakeResolver
+from benchmarks.load_test import configure_app
+from benchmarks.worker_scaling import CONFIG_ENV
+
+_config = json.loads(os.environ[CONFIG_ENV])
+_args = argparse.Namespace(**_config["args"])
+configure_app(
+    _args,
+    _config["smtp_port"],
+    _config["postgrest_url"],
+    _config["site_url"],
+    _config["cache_path"],
+    FakeResolver(latency=_args.dns_latency),
+    FakeGenerativeModel(time_to_first_token=_args.llm_ttft, per_token_latency=_args.llm_token_latency),
+)
+
+from app.main import app  # noqa: E402
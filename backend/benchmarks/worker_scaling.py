@@ -0,0 +1,170 @@
+"""
+Throughput vs. worker count under gunicorn
+
+Runs the production gunicorn.conf.py with 1, 2, 4, ... uvicorn workers
+against the load-test fakes and drives the same load at each size. It
+reports req/s, p50/p95 and the speedup over one worker. Every size starts
+from an empty cache file that its workers share.
+
+Usage (from backend/):
+    python -m benchmarks.worker_scaling
+    python -m benchmarks.worker_scaling --workers 1,2,4,8 --concurrency 64 --requests 400
+    python -m benchmarks.worker_scaling --endpoints history,contacts --save scaling.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.fakes import FakeCompanySite, FakePostgREST, FakeSMTPServer
+from benchmarks.load_test import SCENARIOS, _free_port, build_parser as load_test_parser, run_load
+
+# JSON handed to benchmarks.worker_app in each gunicorn worker
+CONFIG_ENV = "REACHCRAFT_BENCH_CONFIG"
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_gunicorn(workers: int, port: int, config: Dict, show_logs: bool = False) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        CONFIG_ENV: json.dumps(config),
+        "WEB_CONCURRENCY": str(workers),
+        "LOG_LEVEL": "warning",
+        "PYTHONWARNINGS": "ignore",
+    }
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn", "benchmarks.worker_app:app",
+            "-c", "gunicorn.conf.py",
+            "--bind", f"127.0.0.1:{port}",
+            "--access-logfile", "/dev/null",
+        ],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=None if show_logs else subprocess.DEVNULL,
+        stderr=None if show_logs else subprocess.DEVNULL,
+    )
+
+
+def wait_ready(port: int, process: subprocess.Popen, timeout: float = 60.0) -> None:
+    """Wait until /health answers (every worker has booted by the time a few have)"""
+    deadline = time.time() + timeout
+    answered = 0
+    while answered < 3:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {process.returncode}")
+        if time.time() > deadline:
+            raise RuntimeError("gunicorn did not start")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health", timeout=1.0).raise_for_status()
+            answered += 1
+        except httpx.HTTPError:
+            time.sleep(0.2)
+
+
+def stop_gunicorn(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = load_test_parser()
+    parser.description = "Throughput scaling with gunicorn worker count on the fake backends"
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts to measure")
+    parser.add_argument("--warmup", type=int, default=16, help="Requests sent before measuring each size")
+    parser.add_argument("--server-logs", action="store_true", help="Show gunicorn and app logs")
+    parser.set_defaults(concurrency=32, requests=240)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    unknown = [e for e in endpoints if e not in SCENARIOS]
+    if unknown:
+        print(f"Unknown endpoints: {', '.join(unknown)}")
+        return 2
+    sizes = [int(n) for n in args.workers.split(",") if n.strip()]
+
+    logging.basicConfig(level=logging.WARNING)
+    smtp = FakeSMTPServer(
+        script={r"^[a-z]+\.[a-z]+@": 250, r"^[a-z]@": 451},
+        default_code=550,
+        latency=args.smtp_latency,
+    )
+    postgrest = FakePostgREST(latency=args.db_latency)
+    site = FakeCompanySite(latency=args.site_latency)
+    smtp.start()
+    postgrest.start()
+    site.start()
+
+    rows = []
+    try:
+        for workers in sizes:
+            cache_dir = tempfile.mkdtemp(prefix="reachcraft-scaling-")
+            config = {
+                "args": vars(args),
+                "smtp_port": smtp.port,
+                "postgrest_url": postgrest.url,
+                "site_url": site.url,
+                "cache_path": os.path.join(cache_dir, "cache.sqlite3"),
+            }
+            port = _free_port()
+            process = start_gunicorn(workers, port, config, show_logs=args.server_logs)
+            try:
+                wait_ready(port, process)
+                base_url = f"http://127.0.0.1:{port}"
+                if args.warmup:
+                    asyncio.run(run_load(base_url, endpoints, args.warmup, min(args.concurrency, args.warmup),
+                                         args.seed + 1, args.timeout))
+                results = asyncio.run(run_load(
+                    base_url, endpoints, args.requests, args.concurrency, args.seed, args.timeout
+                ))
+            finally:
+                stop_gunicorn(process)
+                shutil.rmtree(cache_dir, ignore_errors=True)
+
+            samples = {name: r for name, r in results.items() if not name.startswith("_")}
+            rows.append({
+                "workers": workers,
+                "rps": results["_total"]["rps"],
+                "errors": sum(r["errors"] for r in samples.values()),
+                "p50_ms": max(r["p50_ms"] for r in samples.values()),
+                "p95_ms": max(r["p95_ms"] for r in samples.values()),
+                "endpoints": samples,
+            })
+            print(f"{workers} worker(s): {results['_total']['rps']:.1f} req/s")
+    finally:
+        smtp.stop()
+        postgrest.stop()
+        site.stop()
+
+    base = rows[0]["rps"] if rows and rows[0]["rps"] else 1.0
+    print(f"\n{'workers':<9}{'req/s':>9}{'speedup':>9}{'errs':>6}{'p50 ms':>10}{'p95 ms':>10}")
+    for row in rows:
+        print(f"{row['workers']:<9}{row['rps']:>9.1f}{row['rps'] / base:>8.2f}x{row['errors']:>6}"
+              f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}")
+    print(f"\n{os.cpu_count()} CPU(s); p50/p95 are the slowest endpoint's; endpoints: {', '.join(endpoints)}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"Saved results to {args.save}")
+    return 1 if any(row["errors"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""
+Gunicorn settings for production serving
+
+    gunicorn app.main:app -c gunicorn.conf.py
+
+Runs uvicorn workers, sized to the machine unless WEB_CONCURRENCY says
+otherwise. Requests mostly wait on Gemini, SMTP and Supabase, with some CPU
+for JSON and draft scoring, so two workers per core (plus one) keep the
+cores busy. The cap keeps memory in check on small instances. Workers
+share the SQLite cache file (WAL mode), so caches are shared too: MX
+records, SMTP verdicts, LLM quota cooldowns, domain patterns,
+idempotency keys, and the per-host SMTP leases that keep all workers
+together within SMTP_MAX_SESSIONS_PER_HOST and the send pacing limits.
+"""
+import multiprocessing
+import os
+
+MAX_WORKERS = 8
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY") or min(multiprocessing.cpu_count() * 2 + 1, MAX_WORKERS))
+
+# Don't preload: each worker opens its own SQLite connections, SDK clients
+# and reverification task after the fork
+preload_app = False
+
+# Longer than REQUEST_TIMEOUT_MAX, so the request deadline fires first
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "90"))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to cap slow memory growth (Playwright, SDKs)
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
@@ -0,0 +1,48 @@
+"""
+Shared pytest setup
+
+Run from backend/:
+    python -m pytest -q
+
+Every test session gets its own SQLite cache file, so leases, backoffs and
+journals written by one run never leak into the next (or into the
+developer's reachcraft_cache.sqlite3). External services are the in-process
+fakes from benchmarks/fakes.py.
+"""
+import os
+import shutil
+import tempfile
+
+import pytest
+
+_CACHE_DIR = tempfile.mkdtemp(prefix="reachcraft-tests-")
+# Before any app module is imported: module-level caches read it at import
+os.environ["CACHE_DB_PATH"] = os.path.join(_CACHE_DIR, "cache.sqlite3")
+
+from benchmarks.fakes import FakePostgREST  # noqa: E402
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_CACHE_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def cache_path(tmp_path) -> str:
+    """A fresh SQLite file for tests that build their own SQLiteCache"""
+    return str(tmp_path / "cache.sqlite3")
+
+
+@pytest.fixture
+def postgrest(monkeypatch):
+    """A running FakePostgREST that get_supabase_client() talks to"""
+    from app.core.supabase_client import get_supabase_client
+
+    server = FakePostgREST().start()
+    monkeypatch.setenv("SUPABASE_URL", server.url)
+    monkeypatch.setenv("SUPABASE_KEY", FakePostgREST.API_KEY)
+    get_supabase_client.cache_clear()
+    try:
+        yield server
+    finally:
+        get_supabase_client.cache_clear()
+        server.stop()
@@ -0,0 +1,165 @@
+import asyncio
+import time
+
+import pytest
+
+from app.db.cache_store import SQLiteCache
+from app.db.campaign_counters import increment_counters
+from app.db.email_rollups import RollupBuffer
+from app.tasks import campaigns
+from app.tasks.campaigns import PERSISTED, RUNNING, CampaignEngine
+
+TEMPLATE = {"purpose": "job_inquiry", "role_interested_in": "Platform Engineer"}
+
+
+def _recipients(n: int):
+    return [
+        {"first_name": f"Person{i}", "last_name": "Doe", "company": "Acme", "email": f"person{i}@acme.com"}
+        for i in range(n)
+    ]
+
+
+class FakeCompose:
+    """compose_email stand-in that records who it wrote for; blocks on `block_at`"""
+
+    def __init__(self, block_at=None):
+        self.block_at = block_at
+        self.calls = []
+        self.release = None
+
+    async def __call__(self, request):
+        if self.release is None:
+            self.release = asyncio.Event()
+        self.calls.append(request.recipient_email)
+        if request.recipient_email == self.block_at:
+            await self.release.wait()
+        return {
+            "subject_line": f"Hello {request.recipient_first_name}",
+            "body": "Body",
+            "confidence_score": 0.8,
+            "body_model": "fake-model",
+            "latency_ms": 5,
+        }
+
+
+@pytest.fixture
+def rollups(monkeypatch):
+    buffer = RollupBuffer(flush_interval=60)
+    monkeypatch.setattr(campaigns, "email_rollups", buffer)
+    return buffer
+
+
+def _engine(cache_path, compose, **options) -> CampaignEngine:
+    options = {"concurrency": {"discover": 1, "generate": 1, "persist": 1}, "queue_size": 1, "flush_every": 2,
+               **options}
+    return CampaignEngine(cache=SQLiteCache(cache_path, "campaigns"), compose=compose, **options)
+
+
+async def _until(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting"
+        await asyncio.sleep(0.01)
+
+
+def _persisted(engine: CampaignEngine, campaign_id: str, total: int):
+    return [
+        i for i in range(total)
+        if (engine.items.get(engine._item_key(campaign_id, i)) or {}).get("stage") == PERSISTED
+    ]
+
+
+def _generated_rollups(buffer: RollupBuffer) -> int:
+    return sum(deltas["generated_count"] for (dimension, _), deltas in buffer._pending.items() if dimension == "model")
+
+
+def test_resumed_run_finishes_each_recipient_once(postgrest, cache_path, rollups):
+    async def scenario():
+        first_compose = FakeCompose(block_at="person3@acme.com")
+        first = _engine(cache_path, first_compose)
+        campaign = first.create("Resume", _recipients(5), TEMPLATE, "user-1")
+        first.start(campaign["id"])
+        await _until(lambda: len(_persisted(first, campaign["id"], 5)) == 3)
+        done_before_crash = _persisted(first, campaign["id"], 5)
+        # The worker goes away mid-run (deploy, recycle); its lease is released
+        await first.stop()
+
+        second_compose = FakeCompose()
+        second = _engine(cache_path, second_compose)
+        assert second.resume_orphaned() == [campaign["id"]]
+        await second._runs[campaign["id"]]
+        return campaign["id"], done_before_crash, second_compose.calls, second
+
+    campaign_id, done_before_crash, regenerated, second = asyncio.run(scenario())
+
+    assert not {f"person{i}@acme.com" for i in done_before_crash} & set(regenerated)
+    emails = postgrest.tables["emails"]
+    assert len(emails) == len({row["id"] for row in emails}) == 5
+    row = next(r for r in postgrest.tables["campaigns"] if r["id"] == campaign_id)
+    assert row["generated_count"] == 5
+    assert second.progress(campaign_id)["status"] == "completed"
+    assert second.progress(campaign_id)["generated"] == 5
+    assert _generated_rollups(rollups) == 5
+
+
+def test_replayed_counter_batch_is_not_counted_twice(postgrest, cache_path, rollups):
+    compose = FakeCompose()
+    engine = _engine(cache_path, compose)
+    campaign = engine.create("Replay", _recipients(3), TEMPLATE, "user-1")
+    campaign_id = campaign["id"]
+    # Crash after the batch reached the database, before its recipients were marked counted
+    for i in range(3):
+        engine.items.set(engine._item_key(campaign_id, i), {
+            "stage": PERSISTED, "email": f"person{i}@acme.com", "email_id": engine.email_id(campaign_id, i),
+            "counted": False,
+        }, ttl=60)
+    batch = {"id": "batch-1", "deltas": {"generated_count": 3}, "indexes": [0, 1, 2]}
+    engine.items.set(engine._batch_key(campaign_id), batch, ttl=60)
+    assert increment_counters(campaign_id, batch["deltas"], batch["id"])
+    spec = engine.get(campaign_id)
+    spec["status"] = RUNNING
+    engine._save_spec(campaign_id, spec)
+
+    async def resume():
+        assert engine.resume_orphaned() == [campaign_id]
+        await engine._runs[campaign_id]
+
+    asyncio.run(resume())
+
+    row = next(r for r in postgrest.tables["campaigns"] if r["id"] == campaign_id)
+    assert row["generated_count"] == 3
+    assert engine.progress(campaign_id)["generated"] == 3
+    assert compose.calls == []
+    assert all(engine.items.get(engine._item_key(campaign_id, i))["counted"] for i in range(3))
+    assert _generated_rollups(rollups) == 0
+
+
+def test_run_stops_when_its_lease_is_taken_over(postgrest, cache_path, rollups):
+    async def scenario():
+        compose = FakeCompose(block_at="person0@acme.com")
+        engine = _engine(cache_path, compose, lease_seconds=0.3)
+        campaign = engine.create("Takeover", _recipients(2), TEMPLATE, "user-1")
+        engine.start(campaign["id"])
+        task = engine._runs[campaign["id"]]
+        await _until(lambda: compose.calls)
+        # The lease lapsed (e.g. a long GC pause) and another worker took the campaign
+        engine.leases.set(campaign["id"], "other-worker", ttl=60)
+        await asyncio.wait_for(asyncio.gather(task, return_exceptions=True), timeout=2)
+        return engine, campaign["id"]
+
+    engine, campaign_id = asyncio.run(scenario())
+
+    assert campaign_id not in engine._runs
+    # The new owner's lease survives the old run's cleanup
+    assert engine.leases.get(campaign_id) == "other-worker"
+    assert engine.progress(campaign_id)["status"] == RUNNING
+
+
+def test_lease_compare_and_set(cache_path):
+    leases = SQLiteCache(cache_path, "leases")
+    assert leases.add("campaign", "mine", ttl=60)
+    assert leases.replace_if("campaign", "mine", "mine", ttl=60)
+    assert not leases.replace_if("campaign", "theirs", "theirs", ttl=60)
+    assert not leases.delete_if("campaign", "theirs")
+    assert leases.delete_if("campaign", "mine")
+    assert leases.get("campaign") is None
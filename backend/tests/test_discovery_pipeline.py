@@ -0,0 +1,209 @@
+import time
+import uuid
+
+import pytest
+
+from app.core.config import settings
+from app.services.discovery import pipeline
+from app.services.discovery.pipeline import DiscoveryContext, DiscoveryPipeline, ProbeSession, default_stages
+from app.services.verification import mx_strategy
+from app.services.verification.mx_strategy import MxHealth
+from app.services.verification.smtp_scheduler import HostScheduler, SchedulerBusy
+from benchmarks.fakes import FakeResolver, FakeSMTPServer
+
+MX = "127.0.0.1"
+
+
+@pytest.fixture
+def resolver():
+    fake = FakeResolver(mx_hosts=[MX], nxdomains=["gone.test"]).install()
+    try:
+        yield fake
+    finally:
+        fake.uninstall()
+
+
+@pytest.fixture
+def scheduler(monkeypatch) -> HostScheduler:
+    """A scheduler of its own, so budgets and backoffs don't leak between tests"""
+    fresh = HostScheduler(max_concurrent=2, probes_per_minute=100, base_backoff=30.0)
+    monkeypatch.setattr(pipeline, "smtp_scheduler", fresh)
+    return fresh
+
+
+@pytest.fixture
+def smtp():
+    servers = []
+
+    def start(script=None, default_code=550) -> FakeSMTPServer:
+        server = FakeSMTPServer(script=script, default_code=default_code).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def discover(server: FakeSMTPServer, domain: str = "", first: str = "Jane") -> DiscoveryContext:
+    # A fresh domain per run: MX answers and verdicts are cached
+    domain = domain or f"{uuid.uuid4().hex[:10]}.test"
+    return DiscoveryPipeline(default_stages(port=server.port, timeout=5)).run(
+        DiscoveryContext(first, "Doe", domain)
+    )
+
+
+def by_email(ctx: DiscoveryContext) -> dict:
+    return {c["email"].split("@")[0]: c for c in ctx.candidates}
+
+
+def test_every_rcpt_is_charged_to_the_per_minute_budget(resolver, scheduler, smtp):
+    server = smtp(default_code=550)
+    ctx = discover(server, first="Robert")  # robert, rob, bob: more spellings than the cap
+
+    assert len(ctx.candidates) == settings.DISCOVERY_MAX_CANDIDATES == 12
+    # The catch-all probe plus 12 candidates, in one session
+    assert server.sessions == 1 and server.rcpt_count == 13
+    assert len(scheduler._state(MX).recent_probes) == 13
+    assert all(c["valid"] is False for c in ctx.candidates)
+
+
+def test_rcpts_stop_when_the_budget_runs_out(resolver, scheduler, smtp, monkeypatch):
+    monkeypatch.setattr(settings, "SMTP_QUEUE_TIMEOUT", 0.1)
+    scheduler.probes_per_minute = 5
+    server = smtp(default_code=550)
+    ctx = discover(server, first="Robert")
+
+    assert server.rcpt_count == 5
+    rejected = [c for c in ctx.candidates if c["valid"] is False]
+    limited = [c for c in ctx.candidates if c["reason"].startswith("Rate limited")]
+    assert len(rejected) == 4 and len(limited) == 8
+
+
+def test_first_accepted_address_ends_probing(resolver, scheduler, smtp):
+    server = smtp(script={r"^jane\.doe@": 250})
+    ctx = discover(server)
+
+    assert server.rcpt_count == 2
+    assert ctx.candidates[0]["email"].startswith("jane.doe@")
+    assert ctx.candidates[0]["valid"] is True and ctx.candidates[0]["confidence"] == 0.9
+    assert all(c["reason"].startswith("Not probed") for c in ctx.candidates[1:])
+
+
+def test_catch_all_domain_is_not_verified(resolver, scheduler, smtp):
+    server = smtp(default_code=250)
+    ctx = discover(server)
+
+    assert server.rcpt_count == 1
+    assert all(c["valid"] is None and c["reason"].startswith("Catch-all") for c in ctx.candidates)
+
+
+def test_greylisted_candidate_is_provisional(resolver, scheduler, smtp):
+    server = smtp(script={r"^jane\.doe@": 451})
+    ctx = discover(server)
+
+    candidate = by_email(ctx)["jane.doe"]
+    assert candidate["greylisted"] is True and candidate["confidence"] == 0.5
+    assert scheduler.backoff_remaining(MX) > 0
+
+
+def test_busy_server_leaves_candidates_unverified_and_backs_off(resolver, scheduler, smtp):
+    server = smtp(script={r"^reachcraft-probe-": 421})
+    ctx = discover(server)
+
+    assert server.rcpt_count == 1
+    assert all(c["valid"] is None and "busy" in c["reason"] for c in ctx.candidates)
+    assert scheduler.backoff_remaining(MX) > 0
+
+
+def test_busy_reply_mid_session_stops_probing(resolver, scheduler, smtp):
+    server = smtp(script={r"^jane\.doe@": 550, r"^jane@": 421})
+    ctx = discover(server)
+
+    assert server.rcpt_count == 3
+    assert by_email(ctx)["jane.doe"]["valid"] is False
+    unverified = [c for c in ctx.candidates if c["valid"] is None]
+    assert len(unverified) == len(ctx.candidates) - 1
+    assert all("busy" in c["reason"] for c in unverified)
+
+
+def test_missing_domain_is_settled_without_smtp(resolver, scheduler, smtp):
+    server = smtp()
+    ctx = discover(server, domain="gone.test")
+
+    assert server.sessions == 0
+    assert all(c["valid"] is False and c["reason"] == "Domain does not exist" for c in ctx.candidates)
+
+
+def test_cached_verdicts_skip_the_smtp_session(resolver, scheduler, smtp):
+    server = smtp(script={r"^jane\.doe@": 250})
+    domain = f"{uuid.uuid4().hex[:10]}.test"
+    first = discover(server, domain)
+    second = discover(server, domain)
+
+    assert server.sessions == 1
+    assert by_email(second)["jane.doe"]["valid"] is True
+    assert [c["email"] for c in first.candidates] == [c["email"] for c in second.candidates]
+
+
+@pytest.fixture
+def health(monkeypatch) -> MxHealth:
+    fresh = MxHealth()
+    monkeypatch.setattr(pipeline, "mx_health", fresh)
+    monkeypatch.setattr(mx_strategy, "mx_health", fresh)
+    return fresh
+
+
+def test_slot_key_is_the_preferred_mx_whatever_the_health_order(scheduler, health):
+    hosts, preferences = ["mx1.test", "mx2.test"], {"mx1.test": 10, "mx2.test": 20}
+    health.record_success("mx1.test", 4.0)  # Slow: sorts after mx2
+    slow_first = ProbeSession(hosts, "user", preferences=preferences)
+    health.record_success("mx1.test", 0.01)
+    health.record_success("mx1.test", 0.01)
+    health.record_success("mx1.test", 0.01)
+    fast_first = ProbeSession(hosts, "user", preferences=preferences)
+
+    assert slow_first.mx_hosts[0] == "mx2.test" and fast_first.mx_hosts[0] == "mx1.test"
+    assert slow_first.slot_host == fast_first.slot_host == "mx1.test"
+
+
+def test_backoff_is_reported_for_the_host_that_answered(scheduler, health, smtp):
+    server = smtp(script={r"^jane\.doe@": 451})
+    # "localhost" is preferred but parked, so 127.0.0.1 answers
+    health.record_failure("localhost")
+    health.record_failure("localhost")
+    session = ProbeSession(["localhost", MX], "user", port=server.port, timeout=5,
+                           preferences={"localhost": 10, MX: 20})
+    session.open()
+    try:
+        assert session.rcpt("jane.doe@acme.test") == 451
+    finally:
+        session.close()
+
+    assert session.slot_host == "localhost" and session.connected_host == MX
+    assert scheduler.backoff_remaining(MX) > 0
+    assert scheduler.backoff_remaining("localhost") == 0
+    # The RCPT was charged to the provider's key, not the answering host
+    assert len(scheduler._state("localhost").recent_probes) == 1
+
+
+def test_hosts_backing_off_are_left_out_of_the_race(scheduler, health, smtp):
+    server = smtp()
+    scheduler.report("localhost", 451)
+    session = ProbeSession(["localhost", MX], "user", port=server.port, timeout=5,
+                           preferences={"localhost": 10, MX: 20})
+    session.open()
+    session.close()
+    assert session.connected_host == MX
+
+
+def test_every_host_backing_off_fails_fast(scheduler, health, smtp):
+    server = smtp()
+    scheduler.report("localhost", 451)
+    scheduler.report(MX, 421)
+    session = ProbeSession(["localhost", MX], "user", port=server.port, timeout=5)
+    started = time.monotonic()
+    with pytest.raises(SchedulerBusy):
+        session.open()
+    assert time.monotonic() - started < 1.0
+    assert server.sessions == 0
@@ -0,0 +1,36 @@
+from app.services.ai.draft_quality import DraftQualityAnalyzer
+
+analyzer = DraftQualityAnalyzer()
+
+PARAGRAPH = ("I saw your team moved the ingestion pipeline to streaming last quarter. "
+             "I have built similar systems and would like to hear how it went.")
+
+
+def test_batch_matches_per_draft_with_length_changing_lowercase():
+    # 'İ'.lower() is two code points, which shifts every later offset
+    bodies = [
+        # Ends in a cliché that the shifted offsets would credit to the next draft
+        "Hi Ayşe,\n\nGreetings from " + ", ".join(["İstanbul", "İzmir"] * 15) + ".\n\n"
+        + PARAGRAPH + "\n\nA go-getter",
+        "Hi Ayşe,\n\nI am a team player and a self-starter at Globex.\n\n" + PARAGRAPH,
+        "Hi Ayşe,\n\nClick here for a guaranteed, risk-free offer!!!\n\n" + PARAGRAPH,
+    ]
+    batch = analyzer.analyze_batch(bodies, recipient_name="Ayşe", company="Globex")
+    single = [analyzer.analyze(body, recipient_name="Ayşe", company="Globex") for body in bodies]
+
+    assert batch == single
+    assert batch[0]["cliches"] == ["go-getter"] and batch[0]["spam_triggers"] == []
+    assert sorted(batch[1]["cliches"]) == ["self-starter", "team player"]
+    assert batch[1]["company_mentions"] == 1
+    assert sorted(batch[2]["spam_triggers"]) == ["!!!", "click here", "guaranteed", "risk-free"]
+
+
+def test_feel_free_is_not_a_spam_trigger():
+    assert analyzer.analyze("Feel free to ignore this.")["spam_triggers"] == []
+    assert analyzer.analyze("Get a free audit today.")["spam_triggers"] == ["free"]
+
+
+def test_non_english_words_are_counted():
+    assert analyzer.analyze("Viele Grüße aus München")["word_count"] == 4
+    assert analyzer.analyze("Привет, как дела?")["word_count"] == 3
+    assert analyzer.analyze("l'équipe d'ingénierie")["word_count"] == 2
@@ -0,0 +1,171 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException, Response
+
+from app.core.deadline import set_deadline
+from app.core.idempotency import REPLAYED_HEADER, RequestCoalescer, canonical_hash
+from app.db.cache_store import SQLiteCache
+
+
+@pytest.fixture
+def coalescer(cache_path) -> RequestCoalescer:
+    return RequestCoalescer(store=SQLiteCache(cache_path, "idempotency"), ttl=60)
+
+
+class Work:
+    """An endpoint body that blocks until released and counts its calls"""
+
+    def __init__(self, result=None):
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.result = result if result is not None else {"email_id": "e1"}
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        return self.result
+
+
+def test_key_reused_with_different_body_while_in_flight_is_rejected(coalescer):
+    async def scenario():
+        work = Work()
+        first = asyncio.create_task(coalescer.run("generate", {"to": "a"}, work, idempotency_key="k1"))
+        await asyncio.sleep(0.01)
+        with pytest.raises(HTTPException) as rejected:
+            await coalescer.run("generate", {"to": "b"}, Work(), idempotency_key="k1")
+        work.release.set()
+        return await first, rejected.value
+
+    result, rejected = asyncio.run(scenario())
+    assert rejected.status_code == 422
+    assert result == {"email_id": "e1"}
+
+
+def test_same_key_and_body_in_flight_share_one_call(coalescer):
+    async def scenario():
+        work = Work()
+        first = asyncio.create_task(coalescer.run("generate", {"to": "a"}, work, idempotency_key="k1"))
+        await asyncio.sleep(0.01)
+        response = Response()
+        second = asyncio.create_task(coalescer.run("generate", {"to": "a"}, work, idempotency_key="k1",
+                                                   response=response))
+        await asyncio.sleep(0.01)
+        work.release.set()
+        return work.calls, await first, await second, response
+
+    calls, first, second, response = asyncio.run(scenario())
+    assert calls == 1
+    assert first == second == {"email_id": "e1"}
+    assert response.headers[REPLAYED_HEADER] == "true"
+
+
+def test_finished_key_replays_and_still_rejects_other_bodies(coalescer):
+    async def scenario():
+        work = Work()
+        work.release.set()
+        await coalescer.run("generate", {"to": "a"}, work, idempotency_key="k1")
+        response = Response()
+        replayed = await coalescer.run("generate", {"to": "a"}, work, idempotency_key="k1", response=response)
+        with pytest.raises(HTTPException) as rejected:
+            await coalescer.run("generate", {"to": "b"}, work, idempotency_key="k1")
+        return work.calls, replayed, response, rejected.value
+
+    calls, replayed, response, rejected = asyncio.run(scenario())
+    assert calls == 1
+    assert replayed == {"email_id": "e1"}
+    assert response.headers[REPLAYED_HEADER] == "true"
+    assert rejected.status_code == 422
+
+
+def test_failed_or_partial_requests_release_the_key(coalescer):
+    async def fail():
+        raise RuntimeError("model unavailable")
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await coalescer.run("generate", {"to": "a"}, fail, idempotency_key="k1")
+        partial = Work({"email_id": None, "partial": True})
+        partial.release.set()
+        await coalescer.run("generate", {"to": "b"}, partial, idempotency_key="k1")
+        complete = Work()
+        complete.release.set()
+        return await coalescer.run("generate", {"to": "c"}, complete, idempotency_key="k1")
+
+    assert asyncio.run(scenario()) == {"email_id": "e1"}
+    assert coalescer.store.get("generate:k1")["hash"] == canonical_hash({"to": "c"})
+
+
+def test_requests_without_a_key_coalesce_by_body(coalescer):
+    async def scenario():
+        work = Work()
+        tasks = [asyncio.create_task(coalescer.run("discover", {"to": "a"}, work)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        work.release.set()
+        return work.calls, await asyncio.gather(*tasks)
+
+    calls, results = asyncio.run(scenario())
+    assert calls == 1 and len(results) == 3
+    assert coalescer.store.get("discover:None") is None
+
+
+def _workers(cache_path):
+    """Two coalescers on one cache file, as two server processes would have"""
+    return [RequestCoalescer(store=SQLiteCache(cache_path, "idempotency"), ttl=60, poll_interval=0.01)
+            for _ in range(2)]
+
+
+def test_retry_on_another_worker_waits_for_the_first_response(cache_path):
+    first, second = _workers(cache_path)
+
+    async def scenario():
+        work, repeat = Work(), Work()
+        running = asyncio.create_task(first.run("generate", {"to": "a"}, work, idempotency_key="k1"))
+        await asyncio.sleep(0.02)
+        response = Response()
+        retry = asyncio.create_task(second.run("generate", {"to": "a"}, repeat, idempotency_key="k1",
+                                               response=response))
+        await asyncio.sleep(0.05)
+        assert not retry.done()
+        work.release.set()
+        return work.calls + repeat.calls, await running, await retry, response
+
+    calls, result, replayed, response = asyncio.run(scenario())
+    assert calls == 1
+    assert result == replayed == {"email_id": "e1"}
+    assert response.headers[REPLAYED_HEADER] == "true"
+
+
+def test_retry_on_another_worker_gives_up_at_its_deadline(cache_path):
+    first, second = _workers(cache_path)
+
+    async def retry():
+        set_deadline(0.1)
+        return await second.run("generate", {"to": "a"}, Work(), idempotency_key="k1")
+
+    async def scenario():
+        work = Work()
+        running = asyncio.create_task(first.run("generate", {"to": "a"}, work, idempotency_key="k1"))
+        await asyncio.sleep(0.02)
+        with pytest.raises(HTTPException) as busy:
+            await asyncio.create_task(retry())
+        work.release.set()
+        await running
+        return busy.value
+
+    assert asyncio.run(scenario()).status_code == 409
+
+
+def test_claim_of_a_dead_worker_expires(cache_path):
+    coalescer = RequestCoalescer(store=SQLiteCache(cache_path, "idempotency"), ttl=60, pending_ttl=0.1,
+                                 poll_interval=0.01)
+    coalescer.store.add("generate:k1", {"hash": canonical_hash({"to": "a"}), "pending": True, "owner": "gone"},
+                        ttl=0.1)
+
+    async def scenario():
+        work = Work()
+        work.release.set()
+        return work, await coalescer.run("generate", {"to": "a"}, work, idempotency_key="k1")
+
+    work, result = asyncio.run(scenario())
+    assert work.calls == 1 and result == {"email_id": "e1"}
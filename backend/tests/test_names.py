@@ -0,0 +1,48 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.services.discovery.names import UnsupportedName, has_spelling, name_variants
+from app.services.discovery.pipeline import DiscoveryContext, DiscoveryPipeline, default_stages
+from app.services.email_discovery import EmailDiscoveryService
+
+
+def test_transliterates_latin_names():
+    names = name_variants("José", "van der Berg")
+    assert names["first"][0] == ("jose", 1.0)
+    assert [spelling for spelling, _ in names["last"]] == ["vanderberg", "berg", "van-der-berg"]
+
+
+@pytest.mark.parametrize("first, last", [("李", "王"), ("Дмитрий", "Иванов"), ("محمد", "")])
+def test_non_latin_names_have_no_spelling(first, last):
+    assert not has_spelling(name_variants(first, last))
+
+
+def test_one_latin_name_is_enough():
+    assert has_spelling(name_variants("Anna", "Иванова"))
+
+
+def test_pipeline_flags_unsupported_name_without_probing():
+    ctx = DiscoveryPipeline(default_stages()).run(DiscoveryContext("李", "王", "acme.test"))
+    assert ctx.unsupported_name is True
+    assert ctx.candidates == [] and ctx.mx_hosts == []
+
+
+def test_discovery_service_raises_unsupported_name():
+    with pytest.raises(UnsupportedName, match="romanized"):
+        EmailDiscoveryService().discover_email("Дмитрий", "Иванов", "acme.test", verify=False)
+
+
+def test_discover_route_answers_422(monkeypatch):
+    from app.api.routes.email_discovery import router
+
+    monkeypatch.setattr(settings, "DISCOVERY_CRAWL_ENABLED", False)
+    app = FastAPI()
+    app.include_router(router, prefix="/api/email-discovery")
+    response = TestClient(app).post("/api/email-discovery/discover", json={
+        "first_name": "李", "last_name": "王", "company_domain": "acme.test",
+        "verify": False, "save_to_db": False,
+    })
+    assert response.status_code == 422
+    assert "no Latin letters" in response.json()["detail"]
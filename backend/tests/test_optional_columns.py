@@ -0,0 +1,57 @@
+import pytest
+
+from app.db import optional_columns
+from app.db.optional_columns import save_row, unknown_column
+
+EMAILS_BEFORE_MIGRATION = {"recipient_name", "recipient_email", "subject_line", "body", "status"}
+ROW = {
+    "recipient_name": "Jane Doe",
+    "recipient_email": "jane@acme.test",
+    "subject_line": "Hello",
+    "body": "Hi Jane",
+    "status": "generated",
+    "model": "gemini-2.5-flash",
+    "tone": "casual",
+    "generation_ms": 1800,
+}
+
+
+@pytest.fixture(autouse=True)
+def forget_missing_columns(monkeypatch):
+    monkeypatch.setattr(optional_columns, "_missing", {})
+
+
+def test_unknown_columns_are_dropped_and_remembered(postgrest):
+    postgrest.columns["emails"] = EMAILS_BEFORE_MIGRATION
+
+    saved = save_row("emails", ROW)
+
+    assert len(saved) == 1 and saved[0]["body"] == "Hi Jane"
+    assert "model" not in saved[0]
+    assert optional_columns.missing_columns("emails") == {"model", "tone", "generation_ms"}
+    assert len(postgrest.tables["emails"]) == 1
+
+    calls = postgrest.requests
+    save_row("emails", ROW)
+    assert postgrest.requests - calls == 1  # Known gaps are skipped up front
+    assert len(postgrest.tables["emails"]) == 2
+
+
+def test_all_columns_are_kept_once_migrated(postgrest):
+    saved = save_row("emails", ROW)
+    assert saved[0]["model"] == "gemini-2.5-flash" and saved[0]["generation_ms"] == 1800
+    assert optional_columns.missing_columns("emails") == set()
+
+
+def test_upsert_drops_unknown_columns(postgrest):
+    postgrest.columns["emails"] = EMAILS_BEFORE_MIGRATION
+    save_row("emails", {**ROW, "id": "e1"}, on_conflict="id")
+    save_row("emails", {**ROW, "id": "e1", "status": "sent"}, on_conflict="id")
+    assert [row["status"] for row in postgrest.tables["emails"]] == ["sent"]
+
+
+def test_unknown_column_parses_postgrest_and_postgres_errors():
+    assert unknown_column(Exception("Could not find the 'tone' column of 'emails' in the schema cache")) == "tone"
+    assert unknown_column(Exception('column "generation_ms" of relation "emails" does not exist')) == "generation_ms"
+    assert unknown_column(Exception("column emails.model does not exist")) == "model"
+    assert unknown_column(Exception("duplicate key value violates unique constraint")) is None
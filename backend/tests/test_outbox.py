@@ -0,0 +1,116 @@
+import asyncio
+import uuid
+from datetime import datetime
+
+import pytest
+
+from app.db.cache_store import SQLiteCache
+from app.services.email.relay import RelayPool
+from app.services.email.sender import EmailSender
+from app.services.verification.smtp_scheduler import HostScheduler
+from app.tasks.outbox import QUEUED, SendQueue
+from benchmarks.fakes import FakeRelay
+
+pytest.importorskip("aiosmtpd")
+
+
+@pytest.fixture
+def relay():
+    server = FakeRelay().start()
+    try:
+        yield server
+    finally:
+        server.stop()
+
+
+@pytest.fixture
+def queue(postgrest, relay, cache_path):
+    pool = RelayPool(host="127.0.0.1", port=relay.port, username="", tls="none", size=1, timeout=2.0)
+    send_queue = SendQueue(
+        sender=EmailSender(pool=pool, scheduler=HostScheduler(max_concurrent=10, probes_per_minute=1000)),
+        leases=SQLiteCache(cache_path, "send_leases"),
+        batch_size=10,
+        retry_delay=0.0,
+        max_attempts=3,
+        concurrency=1,
+    )
+    try:
+        yield send_queue
+    finally:
+        pool.close()
+
+
+def _seed(postgrest, count: int):
+    rows = [{
+        "id": str(uuid.uuid4()),
+        "recipient_name": f"Person {i}",
+        "recipient_email": f"person{i}@example.com",
+        "subject_line": f"Hello #{i}",
+        "body": "Hi,\n\nQuick question.\n\nBest",
+        "status": "generated",
+        "created_at": datetime.utcnow().isoformat(),
+    } for i in range(count)]
+    postgrest.tables["emails"] = rows
+    return [row["id"] for row in rows]
+
+
+def _statuses(postgrest):
+    return sorted(row["status"] for row in postgrest.tables["emails"])
+
+
+def test_accepted_message_is_not_resent_when_its_status_write_fails(postgrest, relay, queue):
+    queue.enqueue(email_ids=_seed(postgrest, 3))
+    # The PATCH marking them sent fails, then the first replay fails too
+    postgrest.failing_writes = 2
+    assert asyncio.run(queue.process_batch()) == 3
+    assert _statuses(postgrest) == [QUEUED] * 3
+    assert len(list(queue.journal.items())) == 3
+
+    # Even once the claims lapse, journaled rows are not sent again
+    queue.leases.clear()
+    assert asyncio.run(queue.process_batch()) == 0
+    assert _statuses(postgrest) == [QUEUED] * 3
+
+    asyncio.run(queue.process_batch())
+    assert _statuses(postgrest) == ["sent"] * 3
+    assert list(queue.journal.items()) == []
+    assert len(relay.messages) == 3
+
+
+def test_poll_skips_rows_other_workers_are_sending(postgrest, relay, queue):
+    ids = queue.enqueue(email_ids=_seed(postgrest, 4))
+    queue.batch_size = 2
+    busy = {row["id"] for row in postgrest.tables["emails"][:2]}
+    for email_id in busy:
+        queue.leases.add(email_id, 12345, ttl=60)
+
+    assert asyncio.run(queue.process_batch()) == 2
+    sent = {row["id"] for row in postgrest.tables["emails"] if row["status"] == "sent"}
+    assert sent == set(ids) - busy
+
+
+def test_reconnects_after_the_relay_drops_pooled_connections(postgrest, relay, queue):
+    queue.enqueue(email_ids=_seed(postgrest, 2))
+    queue.batch_size = 1
+    assert asyncio.run(queue.process_batch()) == 1
+
+    # Relay restart: the pooled connection is dead, the message is sent over a new one
+    relay.stop()
+    relay.start()
+    assert asyncio.run(queue.process_batch()) == 1
+    assert _statuses(postgrest) == ["sent"] * 2
+    assert queue.sender.pool.stats["dropped"] == 1
+    assert len(relay.messages) == 2
+
+
+def test_relay_outage_retries_then_sends_once(postgrest, relay, queue):
+    queue.enqueue(email_ids=_seed(postgrest, 2))
+    relay.stop()
+    assert asyncio.run(queue.process_batch()) == 2
+    assert _statuses(postgrest) == [QUEUED] * 2
+    assert all(row["send_attempts"] == 1 for row in postgrest.tables["emails"])
+
+    relay.start()
+    assert asyncio.run(queue.process_batch()) == 2
+    assert _statuses(postgrest) == ["sent"] * 2
+    assert len(relay.messages) == 2
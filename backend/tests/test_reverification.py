@@ -0,0 +1,119 @@
+import asyncio
+import time
+import uuid
+
+from app.db.cache_store import SQLiteCache
+from app.services.discovery import pipeline
+from app.services.verification.smtp_scheduler import smtp_scheduler
+from app.tasks.reverification import PENDING, UNRESOLVED, VERIFIED, ReverificationQueue
+
+GREYLISTED = {"valid": True, "confidence": 0.5, "reason": "Greylisted (451)", "greylisted": True}
+RATE_LIMITED = {"valid": None, "confidence": 0.5, "reason": "Rate limited for mx.test, not verified"}
+VERIFIED_250 = {"valid": True, "confidence": 0.9, "reason": "SMTP verified (250)"}
+
+
+class ScriptedVerifier:
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+    def verify_email_smtp(self, email, user_key="anonymous"):
+        self.calls += 1
+        return self.results.pop(0)
+
+
+def _domain_with_mx() -> tuple:
+    """A fresh domain whose (cached) MX is a fresh host name"""
+    domain = f"{uuid.uuid4().hex[:8]}.test"
+    host = f"mx.{domain}"
+    pipeline.mx_cache.set(domain, {"records": [[10, host]], "error": None}, ttl=600)
+    return domain, host
+
+
+def _queue(cache_path, verifier, **kwargs) -> ReverificationQueue:
+    return ReverificationQueue(verifier=verifier, cache=SQLiteCache(cache_path, "reverify_jobs"),
+                               retry_delay=0.0, transient_delay=0.0, **kwargs)
+
+
+def test_backing_off_host_defers_without_probing(cache_path):
+    domain, host = _domain_with_mx()
+    verifier = ScriptedVerifier(VERIFIED_250)
+    queue = _queue(cache_path, verifier)
+    job = queue.schedule(f"jane@{domain}")
+    smtp_scheduler.report(host, 451)
+
+    started = time.time()
+    asyncio.run(queue._attempt(job["id"]))
+
+    job = queue.get(job["id"])
+    assert verifier.calls == 0
+    assert job["status"] == PENDING and job["attempts"] == 1 and job["deferrals"] == 1
+    # Due when the backoff ends (retry_delay is 0 here)
+    backoff = smtp_scheduler.backoff_remaining(host)
+    assert backoff > 0
+    assert abs(job["next_attempt_at"] - (started + backoff)) < 1.0
+
+
+def test_transient_outcome_is_rescheduled_without_using_an_attempt(cache_path):
+    domain, _ = _domain_with_mx()
+    verifier = ScriptedVerifier(RATE_LIMITED, RATE_LIMITED, VERIFIED_250)
+    queue = _queue(cache_path, verifier, max_attempts=2)
+    job = queue.schedule(f"jane@{domain}")
+
+    for _ in range(3):
+        asyncio.run(queue._attempt(job["id"]))
+
+    job = queue.get(job["id"])
+    assert verifier.calls == 3
+    assert job["status"] == VERIFIED
+    assert job["attempts"] == 2 and job["deferrals"] == 2
+
+
+def test_only_greylist_replies_count_against_max_attempts(cache_path):
+    domain, _ = _domain_with_mx()
+    verifier = ScriptedVerifier(RATE_LIMITED, GREYLISTED, RATE_LIMITED, GREYLISTED)
+    queue = _queue(cache_path, verifier, max_attempts=3)
+    job = queue.schedule(f"jane@{domain}")
+
+    statuses = []
+    for _ in range(4):
+        asyncio.run(queue._attempt(job["id"]))
+        statuses.append(queue.get(job["id"])["status"])
+
+    assert statuses == [PENDING, PENDING, PENDING, UNRESOLVED]
+    assert queue.get(job["id"])["attempts"] == 3
+
+
+def test_deferrals_are_bounded(cache_path):
+    domain, _ = _domain_with_mx()
+    verifier = ScriptedVerifier(*[RATE_LIMITED] * 3)
+    queue = _queue(cache_path, verifier, max_deferrals=2)
+    job = queue.schedule(f"jane@{domain}")
+
+    for _ in range(3):
+        asyncio.run(queue._attempt(job["id"]))
+
+    job = queue.get(job["id"])
+    assert job["status"] == UNRESOLVED and job["deferrals"] == 2
+
+
+def test_stale_heap_entry_on_another_worker_waits_for_the_rescheduled_time(cache_path):
+    domain, _ = _domain_with_mx()
+    first_verifier, second_verifier = ScriptedVerifier(GREYLISTED), ScriptedVerifier(VERIFIED_250)
+    first = _queue(cache_path, first_verifier, max_attempts=3)
+    second = _queue(cache_path, second_verifier, max_attempts=3)
+    first.retry_delay = 30.0
+    job = first.schedule(f"jane@{domain}")
+    # Both workers loaded the job while it was due
+    job["next_attempt_at"] = time.time() - 1
+    first._save(job)
+    second._push(job)
+
+    asyncio.run(first._attempt(job["id"]))
+    rescheduled = first.get(job["id"])
+    assert rescheduled["attempts"] == 2 and rescheduled["next_attempt_at"] > time.time()
+
+    asyncio.run(second._attempt(job["id"]))
+    assert second_verifier.calls == 0
+    assert first.get(job["id"]) == rescheduled
+    assert (rescheduled["next_attempt_at"], job["id"]) in second._heap
@@ -0,0 +1,167 @@
+import threading
+import time
+
+import pytest
+
+from app.db.cache_store import SQLiteCache
+from app.services.verification.smtp_scheduler import HostScheduler, SchedulerBusy
+
+HOST = "mx.example.com"
+
+
+def _wait_until(condition, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting"
+        time.sleep(0.005)
+
+
+def test_probes_per_minute_cap_and_window_expiry():
+    scheduler = HostScheduler(max_concurrent=10, probes_per_minute=3, window=0.3)
+    for _ in range(3):
+        with scheduler.slot(HOST):
+            pass
+
+    with pytest.raises(SchedulerBusy):
+        with scheduler.slot(HOST, timeout=0.05):
+            pass
+
+    started = time.monotonic()
+    with scheduler.slot(HOST, timeout=2.0):
+        pass
+    # Waited for the oldest probe to leave the window, not for the timeout
+    assert 0.1 < time.monotonic() - started < 1.0
+
+
+def test_concurrent_session_cap():
+    scheduler = HostScheduler(max_concurrent=2, probes_per_minute=100)
+    with scheduler.slot(HOST), scheduler.slot(HOST):
+        with pytest.raises(SchedulerBusy):
+            with scheduler.slot(HOST, timeout=0.05):
+                pass
+    with scheduler.slot(HOST, timeout=0.05):
+        pass
+
+
+def test_hosts_are_keyed_case_and_dot_insensitively():
+    scheduler = HostScheduler(max_concurrent=1, probes_per_minute=100)
+    with scheduler.slot("MX.Example.com."):
+        with pytest.raises(SchedulerBusy):
+            with scheduler.slot(HOST, timeout=0.05):
+                pass
+
+
+def test_round_robin_between_users():
+    scheduler = HostScheduler(max_concurrent=1, probes_per_minute=100)
+    served = []
+
+    def probe(user: str, label: str) -> None:
+        with scheduler.slot(HOST, user_key=user, timeout=5):
+            served.append(label)
+
+    def queued() -> int:
+        state = scheduler._state(HOST)
+        return sum(len(tickets) for tickets in state.waiting.values())
+
+    threads = []
+    with scheduler.slot(HOST, user_key="holder"):
+        # Heavy user queues three probes before the light user queues one
+        for user, label in [("heavy", "h1"), ("heavy", "h2"), ("heavy", "h3"), ("light", "l1")]:
+            thread = threading.Thread(target=probe, args=(user, label))
+            thread.start()
+            threads.append(thread)
+            _wait_until(lambda n=len(threads): queued() == n)
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert served == ["h1", "l1", "h2", "h3"]
+
+
+def test_backoff_grows_exponentially_and_resets():
+    scheduler = HostScheduler(base_backoff=10.0, max_backoff=25.0)
+    scheduler.report(HOST, 451)
+    assert 9.0 < scheduler.backoff_remaining(HOST) <= 10.0
+    scheduler.report(HOST, 421)
+    assert 19.0 < scheduler.backoff_remaining(HOST) <= 20.0
+    scheduler.report(HOST, 451)
+    assert scheduler.backoff_remaining(HOST) <= 25.0  # Capped
+
+    scheduler.report(HOST, 250)
+    assert scheduler._state(HOST).backoff_level == 0
+    # A success resets the level, not the pause already in force
+    assert scheduler.backoff_remaining(HOST) > 0
+
+
+def test_backoff_blocks_slots_until_it_expires():
+    scheduler = HostScheduler(base_backoff=0.3)
+    scheduler.report(HOST, 421)
+    with pytest.raises(SchedulerBusy):
+        with scheduler.slot(HOST, timeout=0.05):
+            pass
+    with scheduler.slot(HOST, timeout=2.0):
+        pass
+
+
+def test_backoff_is_shared_through_the_cache(cache_path):
+    first = HostScheduler(base_backoff=30.0, backoffs=SQLiteCache(cache_path, "smtp_backoff"))
+    second = HostScheduler(base_backoff=30.0, backoffs=SQLiteCache(cache_path, "smtp_backoff"))
+    first.report(HOST, 451)
+    with pytest.raises(SchedulerBusy):
+        with second.slot(HOST, timeout=0.05):
+            pass
+    assert second.backoff_remaining(HOST) > 29.0
+
+
+def test_session_slot_charges_each_probe_not_the_session():
+    scheduler = HostScheduler(max_concurrent=1, probes_per_minute=3, window=60.0)
+    with scheduler.slot(HOST, charge=False):
+        for _ in range(3):
+            scheduler.charge(HOST)
+        with pytest.raises(SchedulerBusy):
+            scheduler.charge(HOST, timeout=0.05)
+    assert len(scheduler._state(HOST).recent_probes) == 3
+    # A full window also keeps new sessions from opening
+    with pytest.raises(SchedulerBusy):
+        with scheduler.slot(HOST, charge=False, timeout=0.05):
+            pass
+
+
+def _worker(cache_path, **limits) -> HostScheduler:
+    """A scheduler as a separate server process would build it"""
+    return HostScheduler(leases=SQLiteCache(cache_path, "smtp_leases"), poll_interval=0.01, **limits)
+
+
+def test_session_cap_holds_across_processes(cache_path):
+    workers = [_worker(cache_path, max_concurrent=2, probes_per_minute=100) for _ in range(4)]
+    with workers[0].slot(HOST), workers[1].slot(HOST):
+        for worker in workers:
+            with pytest.raises(SchedulerBusy):
+                with worker.slot(HOST, timeout=0.05):
+                    pass
+    # Leaving the slots hands the leases back
+    with workers[2].slot(HOST, timeout=0.05), workers[3].slot(HOST, timeout=0.05):
+        pass
+
+
+def test_probe_budget_holds_across_processes(cache_path):
+    first, second = (_worker(cache_path, max_concurrent=10, probes_per_minute=3, window=0.3) for _ in range(2))
+    with first.slot(HOST, charge=False):
+        first.charge(HOST)
+        first.charge(HOST)
+    with second.slot(HOST, charge=False):
+        second.charge(HOST)
+        with pytest.raises(SchedulerBusy):
+            second.charge(HOST, timeout=0.05)
+        # The probe leases expire with the window
+        second.charge(HOST, timeout=2.0)
+
+
+def test_crashed_process_session_lease_expires(cache_path):
+    crashed = SQLiteCache(cache_path, "smtp_leases")
+    crashed.set(f"{HOST}|session0", "gone", ttl=0.2)
+    worker = _worker(cache_path, max_concurrent=1, probes_per_minute=100)
+    with pytest.raises(SchedulerBusy):
+        with worker.slot(HOST, timeout=0.05):
+            pass
+    with worker.slot(HOST, timeout=2.0):
+        pass
@@ -0,0 +1,88 @@
+import uuid
+
+import pytest
+
+from app.db.campaign_counters import CounterBuffer
+from app.db.email_rollups import RollupBuffer
+from app.services.email.tracking import CLICK, OPEN
+from app.tasks import tracking
+from app.tasks.tracking import TrackingBuffer
+
+CAMPAIGN = "c0ffee00-0000-4000-8000-000000000001"
+
+
+@pytest.fixture
+def emails(postgrest, monkeypatch):
+    """Three sent emails of one campaign, with fresh counter and rollup buffers"""
+    monkeypatch.setattr(tracking, "campaign_counters", CounterBuffer())
+    monkeypatch.setattr(tracking, "email_rollups", RollupBuffer(flush_interval=60))
+    ids = [str(uuid.uuid4()) for _ in range(3)]
+    postgrest.tables["emails"] = [
+        {"id": email_id, "campaign_id": CAMPAIGN, "recipient_company": "Acme", "status": "sent",
+         "opened_at": None, "clicked_at": None, "replied_at": None}
+        for email_id in ids
+    ]
+    postgrest.tables["campaigns"] = [{"id": CAMPAIGN, "opened_count": 0, "clicked_count": 0}]
+    return ids
+
+
+def _campaign(postgrest):
+    return postgrest.tables["campaigns"][0]
+
+
+def _rollup(field: str) -> int:
+    return sum(deltas[field] for (dimension, _), deltas in tracking.email_rollups._pending.items()
+               if dimension == "company")
+
+
+def test_repeats_are_dropped_while_pending_and_after_writing(emails):
+    buffer = TrackingBuffer(flush_interval=60, flush_size=100)
+    assert buffer.record(OPEN, emails[0])
+    assert not buffer.record(OPEN, emails[0])
+    assert buffer.record(CLICK, emails[0])  # Another kind is another event
+    assert buffer.pending() == 2
+
+    assert buffer.flush() == 2
+    assert not buffer.record(OPEN, emails[0])
+    assert buffer.pending() == 0
+
+
+def test_each_email_counts_once_however_many_workers_see_it(emails, postgrest):
+    workers = [TrackingBuffer(flush_interval=60, flush_size=100) for _ in range(2)]
+    for worker in workers:
+        worker.record(OPEN, emails[0])
+        worker.record(OPEN, emails[1])
+
+    assert [worker.flush() for worker in workers] == [2, 0]
+    assert _campaign(postgrest)["opened_count"] == 2
+    assert _rollup("opened_count") == 2
+    assert all(row["opened_at"] for row in postgrest.tables["emails"][:2])
+    assert postgrest.tables["emails"][2]["opened_at"] is None
+
+
+def test_failed_write_is_retried_on_the_next_flush(emails, postgrest):
+    buffer = TrackingBuffer(flush_interval=60, flush_size=100)
+    buffer.record(CLICK, emails[0])
+    postgrest.failing_writes = 1
+
+    assert buffer.flush() == 0
+    assert buffer.pending() == 1
+    # Still pending, so a repeat doesn't queue it twice
+    assert not buffer.record(CLICK, emails[0])
+
+    assert buffer.flush() == 1
+    assert buffer.pending() == 0
+    assert _campaign(postgrest)["clicked_count"] == 1
+
+
+def test_forgotten_ids_are_still_counted_once(emails, postgrest):
+    buffer = TrackingBuffer(flush_interval=60, flush_size=100, seen_size=2)
+    for email_id in emails:
+        buffer.record(OPEN, email_id)
+        buffer.flush()
+
+    # The oldest id fell out of the bounded seen set; the database still has it
+    assert buffer.record(OPEN, emails[0])
+    assert buffer.flush() == 0
+    assert _campaign(postgrest)["opened_count"] == 3
+    assert _rollup("opened_count") == 3
@@ -0,0 +1,83 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.services.discovery import website_crawler
+from app.services.discovery.website_crawler import WebsiteCrawler, is_crawlable_domain
+
+ADDRESSES = {
+    "acme.test": ["93.184.216.34"],
+    "www.acme.test": ["93.184.216.34"],
+    "intranet.acme.test": ["10.0.0.5"],
+    "metadata.acme.test": ["169.254.169.254"],
+    "dual.acme.test": ["93.184.216.34", "::ffff:127.0.0.1"],
+}
+
+
+@pytest.fixture
+def resolver(monkeypatch):
+    async def resolve(host):
+        return ADDRESSES[host]
+
+    monkeypatch.setattr(website_crawler, "_resolve", resolve)
+
+
+class Site:
+    """MockTransport handler: acme.test's home page redirects to `redirect_to`"""
+
+    def __init__(self, redirect_to=None):
+        self.redirect_to = redirect_to
+        self.requested = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requested.append(str(request.url))
+        if request.url.path == "/" and self.redirect_to:
+            return httpx.Response(302, headers={"Location": self.redirect_to})
+        if request.url.path in ("/", "/secret"):
+            return httpx.Response(200, html="<p>Contact jane.doe@acme.test</p>")
+        return httpx.Response(404)
+
+
+def _crawl(site: Site, domain: str):
+    async def run():
+        crawler = WebsiteCrawler(max_pages=2, transport=httpx.MockTransport(site))
+        try:
+            return await crawler.crawl(domain)
+        finally:
+            await crawler.aclose()
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("domain", [
+    "localhost", "127.0.0.1", "10.0.0.5", "169.254.169.254", "[::1]", "::1",
+    "acme.com:8080", "user@acme.com", "acme.com/path", "acme.com.", "",
+])
+def test_ip_literals_ports_and_non_hostnames_are_not_crawlable(domain):
+    assert not is_crawlable_domain(domain)
+
+
+def test_public_hosts_are_crawled(resolver):
+    site = Site()
+    harvest = _crawl(site, "acme.test")
+    assert harvest["emails"] == ["jane.doe@acme.test"]
+
+
+@pytest.mark.parametrize("domain", ["intranet.acme.test", "metadata.acme.test", "dual.acme.test", "10.0.0.5"])
+def test_hosts_resolving_to_private_addresses_are_refused(resolver, domain):
+    site = Site()
+    assert _crawl(site, domain)["pages"] == 0
+    assert site.requested == []
+
+
+@pytest.mark.parametrize("target", [
+    "http://metadata.acme.test/secret",
+    "http://127.0.0.1/secret",
+    "https://www.acme.test:8443/secret",
+])
+def test_redirects_to_private_hosts_are_refused(resolver, target):
+    site = Site(redirect_to=target)
+    harvest = _crawl(site, "acme.test")
+    assert harvest["emails"] == []
+    assert not any(url.endswith("/secret") for url in site.requested)